@@ -0,0 +1,140 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        burst_planner_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Processes the coherence of a pair of synthetic IW SLC products for an aoi within a single burst of IW2 with the
+# ----checked-in graphs and the stub gpt. Without annotation files the split selects the burst by the wktAoi and is
+# ----reprocessed with two bursts, with annotation files the BurstPlanner sets the two burst window before the split.
+# ----The burst windows of all subswaths of a scene not yet in the catalog are planned from concurrent threads as done by
+# ----the subswath branches.
+# ----Execute from the repository folder via "python3 benchmarks/burst_planner_benchmark.py <startup sec> <graph sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from shapely.geometry import Polygon
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.burst_planner import BurstPlanner
+from controller_modules.specific_snap_graph_processing import SpecificSnapGraphProcessing
+from subswath_footprint_benchmark import createProduct, toLonLat
+from subswath_fan_out_benchmark import BufferLog, XML_FOLDER, STUB_GPT
+
+
+class CountingExecutor(SubprocessGptExecutor):
+
+    def __init__(self):
+        SubprocessGptExecutor.__init__(self, [sys.executable, STUB_GPT, "-e"])
+        self.calls = 0
+        self.splitWindows = []
+
+    def execute(self, xmlFile) -> str:
+        self.calls = self.calls + 1
+        split = etree.parse(xmlFile).getroot().xpath("//node[operator = 'TOPSAR-Split']/parameters")
+        if len(split) > 0:
+            self.splitWindows.append((split[0].findtext("firstBurstIndex"), split[0].findtext("lastBurstIndex"),
+                                      split[0].findtext("wktAoi") or ""))
+        return SubprocessGptExecutor.execute(self, xmlFile)
+
+
+def processPair(folder, withAnnotation):
+    scenes = [createProduct(folder, withAnnotation, date) for date in ["20200101", "20200113"]]
+    processing = SpecificSnapGraphProcessing(XML_FOLDER, folder, folder + "scratch_%s/" % int(withAnnotation))
+    processing.createSceneScratch()
+
+    # #Aoi of 2 km in the middle of the fifth burst of IW2
+    aoi = Polygon([toLonLat(123.0, 96.0), toLonLat(125.0, 96.0), toLonLat(125.0, 98.0), toLonLat(123.0, 98.0)]).wkt
+    processing.renderedGraphs.setNewOperatorParameter(processing.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                      "TOPSAR-Split", "wktAoi", aoi)
+
+    executor = CountingExecutor()
+    GptExecutor.setDefault(executor)
+    logObject = BufferLog()
+
+    timeBefore = time.perf_counter()
+    success = processing.setAndProcessCoherence(scenes[0], scenes[1], "coh_%s" % int(withAnnotation), ["IW2"],
+                                                folder, logObject)
+    seconds = time.perf_counter() - timeBefore
+    processing.removeSceneScratch()
+
+    success = success and not logObject.getError()
+    return seconds, executor, success, logObject
+
+
+def planFromBranches(folder):
+    """Plans the burst windows of the subswaths of a new scene from one thread per subswath, after the catalog was used
+    by the main thread."""
+    scenes = [createProduct(folder, True, date) for date in ["20200125", "20200206"]]
+    aoi = Polygon([toLonLat(123.0, 96.0), toLonLat(125.0, 96.0), toLonLat(125.0, 98.0), toLonLat(123.0, 98.0)]).wkt
+    SceneCatalog.setDefaultLocation(folder + "branches_")
+    SceneCatalog.default().getScene(scenes[0] + "/manifest.safe")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(BurstPlanner().getBurstWindow, scenes[1], subswath, aoi)
+                   for subswath in ["IW1", "IW2", "IW3"]]
+    try:
+        return [future.result() for future in futures], \
+            [BurstPlanner().getBurstWindow(scenes[1], subswath, aoi) for subswath in ["IW1", "IW2", "IW3"]]
+    except Exception as e:
+        print("Planning from branch threads failed: " + repr(e))
+        return None, None
+
+
+def main():
+    os.environ["STUB_GPT_STARTUP"] = sys.argv[1] if len(sys.argv) > 1 else "0.5"
+    os.environ["STUB_GPT_GRAPH"] = sys.argv[2] if len(sys.argv) > 2 else "0.5"
+
+    # #A split by the wktAoi of the stub gpt selects only the fifth burst
+    os.environ["STUB_GPT_AOI_BURSTS"] = "5,5"
+    folder = tempfile.mkdtemp(prefix="burst_planner_") + "/"
+
+    try:
+        SceneCatalog.setDefaultLocation(folder)
+        timeLegacy, legacy, successLegacy, logLegacy = processPair(folder, False)
+        timePlanned, planned, successPlanned, logPlanned = processPair(folder, True)
+        branchWindows, serialWindows = planFromBranches(folder)
+    finally:
+        GptExecutor.setDefault(None)
+        SceneCatalog.setDefaultLocation(None)
+        shutil.rmtree(folder)
+
+    print("Simulated gpt startup: %s sec, graph: %s sec" % (os.environ["STUB_GPT_STARTUP"],
+                                                            os.environ["STUB_GPT_GRAPH"]))
+    print("Split and reprocess: %.2f sec, %s gpt calls, %s splits" % (timeLegacy, legacy.calls,
+                                                                      len(legacy.splitWindows)))
+    print("Planned burst window: %.2f sec, %s gpt calls, %s splits, window %s-%s" % (
+        timePlanned, planned.calls, len(planned.splitWindows), planned.splitWindows[0][0],
+        planned.splitWindows[0][1]))
+
+    checks = {
+        "both coherences processed": successLegacy and successPlanned,
+        "one split per scene with planned window": len(planned.splitWindows) == 2,
+        "planned window of two bursts around the aoi": all(window[:2] == ("4", "5") and window[2] == ""
+                                                           for window in planned.splitWindows),
+        "same window as the reprocessed split": legacy.splitWindows[-1][:2] == ("4", "5"),
+        "windows planned from branch threads": branchWindows is not None and branchWindows == serialWindows,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        print("\n".join(logLegacy.content + logPlanned.content))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
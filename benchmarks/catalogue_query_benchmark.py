@@ -0,0 +1,107 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        catalogue_query_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Runs the Sentinel-1 tile query of PyFuncQueries against a local stand-in of the resto catalogue of Code-De.
+# ----The stand-in serves synthetic products in pages of maxRecords entries and delays every response to simulate the network.
+# ----The query is executed once with an empty response cache and once more with the cache of the first run.
+# ----Execute from the repository folder via "python3 benchmarks/catalogue_query_benchmark.py <amount products> <delay sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.pyFunc_queries import PyFuncQueries
+from controller_modules.code_de_catalogue_client import CodeDeCatalogueClient
+
+
+class RestoStandIn(BaseHTTPRequestHandler):
+
+    amountProducts = 0
+    delay = 0.0
+    requestCount = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with RestoStandIn.lock:
+            RestoStandIn.requestCount = RestoStandIn.requestCount + 1
+
+        parts = urlsplit(self.path)
+        if not parts.path.endswith("/search.json"):
+            self.send_error(404)
+            return
+
+        parameters = parse_qs(parts.query)
+        maxRecords = int(parameters.get("maxRecords", ["2000"])[0])
+        page = int(parameters.get("page", ["1"])[0])
+        first = (page - 1) * maxRecords
+        last = min(first + maxRecords, self.amountProducts)
+
+        features = [{"properties": {"productIdentifier": "/codede/Sentinel-1/SAR/SLC/S1A_IW_SLC__1SDV_%06d.SAFE" % i}}
+                    for i in range(first, last)]
+        body = json.dumps({"type": "FeatureCollection", "properties": {"totalResults": self.amountProducts},
+                           "features": features}).encode("utf-8")
+
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def runQuery(baseUrl, cacheFolder):
+    RestoStandIn.requestCount = 0
+    pyFuncQueries = PyFuncQueries(CodeDeCatalogueClient(cacheFolder, baseUrl=baseUrl))
+
+    timeBefore = time.perf_counter()
+    tiles = pyFuncQueries.buildSentinel1QueryTileList([(10.0, 52.0), (11.0, 52.0), (11.0, 53.0), (10.0, 52.0)],
+                                                      "2021-01-01", "2021-12-31", "SLC")
+    return tiles, time.perf_counter() - timeBefore, RestoStandIn.requestCount
+
+
+def main():
+    RestoStandIn.amountProducts = int(sys.argv[1]) if len(sys.argv) > 1 else 15000
+    RestoStandIn.delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RestoStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    baseUrl = "http://127.0.0.1:%s/resto/api/collections/" % server.server_address[1]
+    cacheFolder = tempfile.mkdtemp(prefix="query_cache_")
+
+    try:
+        tilesCold, timeCold, requestsCold = runQuery(baseUrl, cacheFolder)
+        tilesWarm, timeWarm, requestsWarm = runQuery(baseUrl, cacheFolder)
+    finally:
+        server.shutdown()
+        shutil.rmtree(cacheFolder)
+
+    if len(tilesCold) != RestoStandIn.amountProducts or len(set(tilesCold)) != len(tilesCold) or \
+            tilesCold != tilesWarm:
+        print("Query returned a wrong list of products")
+        sys.exit(1)
+
+    print("Products: %s, response delay: %s sec" % (RestoStandIn.amountProducts, RestoStandIn.delay))
+    print("Empty cache: %.2f sec, %s requests" % (timeCold, requestsCold))
+    print("Filled cache: %.2f sec, %s requests" % (timeWarm, requestsWarm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        cog_output_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Converts a synthetic striped and uncompressed backscatter GeoTIFF, as written by Snap, to cloud optimized GeoTIFFs
+# ----with the RasterPostProcessing and counts the bytes read for a small window, as read by the zonal statistics, and
+# ----for a view of the whole product at 1/16 of the resolution, as read by a tile server.
+# ----Execute from the repository folder via "python3 benchmarks/cog_output_benchmark.py <size> <amount windows>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controller_modules.raster_post_processing import RasterPostProcessing
+from raster_post_processing_benchmark import createProduct
+
+WINDOW_SIZE = 256
+OVERVIEW_FACTOR = 16
+
+
+def getReadBytes():
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("rchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+def readWindows(product, windows):
+    """Bytes read for the windows and for the view of the whole product, each with a new dataset."""
+    bytesBefore = getReadBytes()
+    values = []
+    for window in windows:
+        with rasterio.open(product) as source:
+            values.append(source.read(window=window))
+    bytesWindows = (getReadBytes() - bytesBefore) / len(windows)
+
+    bytesBefore = getReadBytes()
+    with rasterio.open(product) as source:
+        source.read(out_shape=(source.count, source.height // OVERVIEW_FACTOR, source.width // OVERVIEW_FACTOR))
+    return bytesWindows, getReadBytes() - bytesBefore, values
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    amountWindows = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    folder = tempfile.mkdtemp(prefix="cog_output_") + "/"
+    random.seed(1)
+    windows = [Window(random.randrange(size - WINDOW_SIZE), random.randrange(size - WINDOW_SIZE), WINDOW_SIZE,
+                      WINDOW_SIZE) for i in range(amountWindows)]
+
+    rows = []
+    checks = {}
+    try:
+        createProduct(folder + "striped.tif", size)
+        with rasterio.Env(GDAL_CACHEMAX=RasterPostProcessing.GDAL_CACHE):
+            bytesWindows, bytesOverview, reference = readWindows(folder + "striped.tif", windows)
+        rows.append(("striped GeoTIFF", os.path.getsize(folder + "striped.tif"), 0.0, bytesWindows, bytesOverview))
+
+        for compression in RasterPostProcessing.COG_COMPRESSIONS:
+            cogFolder = folder + compression.lower() + "/"
+            os.makedirs(cogFolder)
+            shutil.copy(folder + "striped.tif", cogFolder + "S1A_area.tif")
+
+            timeBefore = time.perf_counter()
+            written = RasterPostProcessing([], cogCompression=compression).processFolder(cogFolder, areaName="area")
+            seconds = time.perf_counter() - timeBefore
+
+            with rasterio.Env(GDAL_CACHEMAX=RasterPostProcessing.GDAL_CACHE):
+                bytesWindows, bytesOverview, values = readWindows(cogFolder + "S1A_area.tif", windows)
+                with rasterio.open(cogFolder + "S1A_area.tif") as cog:
+                    layout = cog.tags(ns="IMAGE_STRUCTURE").get("LAYOUT")
+                    overviews = cog.overviews(1)
+                    blockShape = cog.block_shapes[0]
+            rows.append(("COG " + compression, os.path.getsize(cogFolder + "S1A_area.tif"), seconds, bytesWindows,
+                         bytesOverview))
+
+            converted = RasterPostProcessing([], cogCompression=compression).processFolder(cogFolder, areaName="area")
+            checks["%s written once as COG" % compression] = written == 1 and converted == 0 and layout == "COG"
+            checks["%s tiled with overviews" % compression] = blockShape == (512, 512) and len(overviews) > 0
+            checks["%s same values" % compression] = all(np.array_equal(first, second)
+                                                         for first, second in zip(reference, values))
+            checks["%s no temp files left" % compression] = os.listdir(cogFolder) == ["S1A_area.tif"]
+    finally:
+        shutil.rmtree(folder)
+
+    print("Product: %s x %s x 2 bands float32, %s windows of %s x %s, overview 1/%s" % (
+        size, size, amountWindows, WINDOW_SIZE, WINDOW_SIZE, OVERVIEW_FACTOR))
+    for name, fileSize, seconds, bytesWindows, bytesOverview in rows:
+        print("%-16s file %7.1f MB, conversion %5.2f sec | window read %7.2f MB | overview read %8.1f MB" % (
+            name, fileSize / 1024 ** 2, seconds, bytesWindows / 1024 ** 2, bytesOverview / 1024 ** 2))
+
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        coherence_matching_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Compares the coherence pair matching of CreateInputOutput on a synthetic list of SLC tiles.
+# ----The previous substring search over the whole tile list is compared with the lookup in the date and hour index.
+# ----Both must find the same 6 and 12 day partners for every tile.
+# ----Execute from the repository folder via "python3 benchmarks/coherence_matching_benchmark.py <amount tiles>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.create_input_output import CreateInputOutput
+
+
+def createSyntheticTiles(amount):
+    """Creates SLC tile paths and their info rows as in CreateInputOutput.generateFileList. Tiles are spread over
+    several relative orbits with three slices each and acquisitions every 6 days."""
+
+    tiles = []
+    infos = []
+    startDate = datetime.datetime(2017, 1, 1)
+    orbitSlots = [(5, 25), (5, 42), (17, 10), (17, 33), (16, 51), (5, 58)]
+
+    day = 0
+    while len(tiles) < amount:
+        date = startDate + datetime.timedelta(days=day)
+        for hour, minute in orbitSlots:
+            for sliceNo in range(3):
+                if len(tiles) >= amount:
+                    break
+                sensor = "S1A" if (day // 6) % 2 == 0 else "S1B"
+                start = date.replace(hour=hour, minute=minute, second=sliceNo * 25)
+                stop = start + datetime.timedelta(seconds=27)
+                absOrbit = "%06d" % (15000 + day * 15 + orbitSlots.index((hour, minute)))
+                uniqueId = "%04X" % (len(tiles) % 65536)
+                name = "%s_IW_SLC__1SDV_%s_%s_%s_04DF48_%s.SAFE" % (sensor, start.strftime("%Y%m%dT%H%M%S"),
+                                                                    stop.strftime("%Y%m%dT%H%M%S"), absOrbit,
+                                                                    uniqueId)
+                path = "/codede/Sentinel-1/SAR/SLC/" + date.strftime("%Y/%m/%d/") + name
+                tiles.append(path)
+                infos.append([path, sensor, "VVVH", start.strftime("%Y%m%dT%H%M%S"),
+                              stop.strftime("%Y%m%dT%H%M%S"), absOrbit, "66", "desc", uniqueId])
+        day = day + 6
+
+    return tiles, infos
+
+
+def legacyCohMatching(tile, tiles):
+    # The substring search over the whole tile list as used before the index
+    date1 = datetime.datetime.strptime(tile[3][0: tile[3].index("T")], "%Y%m%d")
+    date2 = datetime.datetime.strftime(date1 + datetime.timedelta(days=6), "%Y%m%d")
+    date3 = datetime.datetime.strftime(date1 + datetime.timedelta(days=12), "%Y%m%d")
+    time6d = date2 + 'T' + tile[3][9:11]
+    time12d = date3 + 'T' + tile[3][9:11]
+    matching_SLC_6d = [s for s in [s for s in tiles if date2 in s] if time6d in s]
+    matching_SLC_12d = [s for s in [s for s in tiles if date3 in s] if time12d in s]
+    return matching_SLC_6d, matching_SLC_12d
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sampleSize = min(amount, 500)
+
+    tiles, infos = createSyntheticTiles(amount)
+    createInputOutput = CreateInputOutput()
+    indexedCohMatching = createInputOutput._CreateInputOutput__getCohMatching
+
+    timeBefore = time.perf_counter()
+    cohIndex = createInputOutput.buildCohMatchingIndex(tiles)
+    indexedResults = [indexedCohMatching(info, cohIndex) for info in infos]
+    timeIndex = time.perf_counter() - timeBefore
+
+    # The substring search is only measured on a sample, the full list would take too long
+    sample = infos[::max(1, amount // sampleSize)][:sampleSize]
+    timeBefore = time.perf_counter()
+    legacyResults = [legacyCohMatching(info, tiles) for info in sample]
+    timeLegacy = (time.perf_counter() - timeBefore) / len(sample) * amount
+
+    for info, legacyResult in zip(sample, legacyResults):
+        if legacyResult != indexedResults[infos.index(info)]:
+            print("Different matching for tile: " + info[0])
+            sys.exit(1)
+
+    amountPairs = sum(len(result[0]) + len(result[1]) for result in indexedResults)
+    print("Tiles: %s, coherence partners found: %s" % (amount, amountPairs))
+    print("Substring search (extrapolated from %s tiles): %.2f sec" % (len(sample), timeLegacy))
+    print("Index build and lookup for all tiles: %.2f sec" % timeIndex)
+    print("Speedup: %.0fx" % (timeLegacy / timeIndex))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        coherence_planner_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Counts the Split/Apply-Orbit executions of the 6-day and 12-day coherence lists of a dense time series with and
+# ----without the CoherencePlanner and the shared SplitOrbitStore. Each pair acquires the split products of its scenes
+# ----per subswath and releases its scenes when finished, serial and in a pool of worker processes.
+# ----Afterwards the lists of three aois are processed as one run: two aois cover the same bursts, one other bursts.
+# ----A split is simulated by writing its .dim file after STUB_SPLIT sec.
+# ----Execute from the repository folder via "python3 benchmarks/coherence_planner_benchmark.py <amount scenes> <workers>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import glob
+import shutil
+import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.coherence_planner import CoherencePlanner
+from controller_modules.split_orbit_store import SplitOrbitStore
+
+SUBSWATHS = ["IW1", "IW2"]
+
+
+def createLists(amountScenes):
+    startDate = datetime.datetime(2020, 1, 1, 5, 30)
+    scenes = ["/data/S1A_IW_SLC__1SDV_" + (startDate + datetime.timedelta(days=6 * i)).strftime("%Y%m%dT%H%M%S") +
+              "_" + (startDate + datetime.timedelta(days=6 * i, seconds=27)).strftime("%Y%m%dT%H%M%S") +
+              "_030000_038000_A000.SAFE" for i in range(amountScenes)]
+
+    lists = []
+    for step in [1, 2]:
+        lists.append([[scenes[i], scenes[i + step], "coh_%s_%s" % (i, i + step)] for i in range(amountScenes - step)])
+    return lists
+
+
+def processSplit(productBase):
+    time.sleep(float(os.environ.get("STUB_SPLIT", "0.01")))
+    with open(productBase + ".dim", "w") as f:
+        f.write("split")
+    return SplitOrbitStore.AVAILABLE
+
+
+def processEntry(storeFolder, entry, window=None):
+    store = SplitOrbitStore(storeFolder)
+    sceneIds = CoherencePlanner.getSceneIds(entry)
+    try:
+        for subswath in SUBSWATHS:
+            for sceneId in sceneIds:
+                status, productBase = store.acquire(sceneId, subswath, processSplit, window)
+                if status != SplitOrbitStore.AVAILABLE or not os.path.exists(productBase + ".dim"):
+                    raise RuntimeError("Split product of " + sceneId + " missing")
+        storedProducts = len(glob.glob(storeFolder + "*.dim"))
+    finally:
+        for sceneId in sceneIds:
+            store.release(sceneId)
+    return store.processed, storedProducts
+
+
+def processRun(storeFolder, entries, consumers, workers, windows=None):
+    store = SplitOrbitStore(storeFolder)
+    if consumers is not None:
+        store.setConsumers(consumers)
+    windows = windows or [None] * len(entries)
+
+    timeBefore = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(processEntry, [storeFolder] * len(entries), entries, windows))
+    else:
+        results = [processEntry(storeFolder, entry, window) for entry, window in zip(entries, windows)]
+    seconds = time.perf_counter() - timeBefore
+
+    leftProducts = len(glob.glob(storeFolder + "*.dim"))
+    store.remove()
+    return seconds, sum(result[0] for result in results), max(result[1] for result in results), leftProducts
+
+
+def main():
+    amountScenes = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    folder = tempfile.mkdtemp(prefix="coherence_planner_") + "/"
+
+    try:
+        list6Days, list12Days = createLists(amountScenes)
+        planner = CoherencePlanner(list6Days, list12Days)
+
+        # #Without planner every pair splits its own scenes, the products are removed with the pair
+        unplanned = processRun(folder + "unplanned/", list6Days + list12Days, None, 1)
+        serial = processRun(folder + "serial/", planner.getEntries(), planner.getConsumers(), 1)
+        parallel = processRun(folder + "parallel/", planner.getEntries(), planner.getConsumers(), workers)
+
+        # #The entries of each aoi are copied like by BatchProcessing.calculateCohForAois, the burst window of an aoi
+        # #is the same for all its scenes
+        aoiWindows = {"field1": "b2-4", "field2": "b2-4", "field3": "b6-7"}
+        entryWindows = {}
+        aoiLists = []
+        for window in aoiWindows.values():
+            for processingList in [list6Days, list12Days]:
+                entries = [list(entry) for entry in processingList]
+                entryWindows.update((id(entry), window) for entry in entries)
+                aoiLists.append(entries)
+        aoiPlanner = CoherencePlanner(*aoiLists)
+        aois = processRun(folder + "aois/", aoiPlanner.getEntries(), aoiPlanner.getConsumers(), workers,
+                          [entryWindows[id(entry)] for entry in aoiPlanner.getEntries()])
+    finally:
+        shutil.rmtree(folder)
+
+    print("Scenes: %s, pairs: %s, subswaths: %s" % (amountScenes, len(planner.getEntries()), len(SUBSWATHS)))
+    for name, result in [("Per pair", unplanned), ("Planned", serial), ("Planned, %s workers" % workers, parallel)]:
+        print("%s: %.2f sec, %s Split/Orbit executions, max %s products stored" % (name, result[0], result[1],
+                                                                                  result[2]))
+    print("Reduction of Split/Orbit executions: %.1fx" % (unplanned[1] / float(serial[1])))
+    print("%s aois in one run: %.2f sec, %s Split/Orbit executions for %s pairs" % (
+        len(aoiWindows), aois[0], aois[1], len(aoiPlanner.getEntries())))
+
+    checks = {
+        "each scene subswath split once": serial[1] == parallel[1] == amountScenes * len(SUBSWATHS),
+        "all products freed after the last pair": serial[3] == parallel[3] == 0,
+        "stored products bounded by the time window": serial[2] <= 4 * len(SUBSWATHS),
+        "each scene subswath split once per burst window of the aois": aois[1] == amountScenes * len(SUBSWATHS) * len(
+            set(aoiWindows.values())) and aois[3] == 0,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        dp_rvi_engine_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Computes the DpRVI of a synthetic C2 matrix product "polarmlsf_<scene id>.dim" with the DpRviEngine and compares it
+# ----with a pixel by pixel port of the Radar-Vegetation-Index operator on a crop including the image borders.
+# ----If a Snap gpt is found ("gpt" in the PATH or the environment variable GPT) calc_dp_rad_veg_index.xml is executed on
+# ----the same product and both outputs are compared as well.
+# ----Execute from the repository folder via "python3 benchmarks/dp_rvi_engine_benchmark.py <lines> <samples>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import math
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.dp_rvi_engine import DpRviEngine
+
+GRAPH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     "sentinel_docker_process/processing_tool/Sentinel-1-SLC-process/snap_graph_files/"
+                     "main_calc_graphs/calc_dp_rad_veg_index.xml")
+WINDOW_SIZE = 3
+CROP = 60
+
+
+def createProduct(folder, lines, samples):
+    base = folder + "polarmlsf_S1A_IW_SLC__1SDV_20200101T053000"
+    os.makedirs(base + ".data/tie_point_grids")
+    random = np.random.default_rng(1)
+
+    # #Hermitian positive semi-definite C2 matrices of a speckled dual-pol scene
+    vh = random.gamma(2.0, 0.02, (lines, samples))
+    vv = random.gamma(2.0, 0.1, (lines, samples))
+    correlation = random.uniform(0.0, 0.9, (lines, samples)) * np.sqrt(vh * vv)
+    phase = random.uniform(-math.pi, math.pi, (lines, samples))
+    bands = {"C11": vh, "C12_real": correlation * np.cos(phase), "C12_imag": correlation * np.sin(phase), "C22": vv}
+
+    dataFiles = ""
+    bandInfos = ""
+    for index, (name, values) in enumerate(bands.items()):
+        values.astype(">f4").tofile(base + ".data/" + name + ".img")
+        with open(base + ".data/" + name + ".hdr", "w") as f:
+            f.write("ENVI\nsamples = %s\nlines = %s\nbands = 1\nheader offset = 0\nfile type = ENVI Standard\n"
+                    "data type = 4\ninterleave = bsq\nbyte order = 1\nband names = { %s }\n" % (samples, lines, name))
+        dataFiles += ("<Data_File><DATA_FILE_PATH href=\"%s.data/%s.hdr\"/><BAND_INDEX>%s</BAND_INDEX></Data_File>" %
+                      (os.path.basename(base), name, index))
+        bandInfos += ("<Spectral_Band_Info><BAND_INDEX>%s</BAND_INDEX><BAND_NAME>%s</BAND_NAME><DATA_TYPE>float32"
+                      "</DATA_TYPE><PHYSICAL_UNIT>intensity</PHYSICAL_UNIT></Spectral_Band_Info>" % (index, name))
+
+    with open(base + ".dim", "w") as f:
+        f.write("<Dimap_Document><Dataset_Id><DATASET_NAME>" + os.path.basename(base) + "</DATASET_NAME></Dataset_Id>"
+                "<Raster_Dimensions><NCOLS>%s</NCOLS><NROWS>%s</NROWS><NBANDS>4</NBANDS></Raster_Dimensions>"
+                "<Data_Access>%s</Data_Access><Image_Interpretation>%s</Image_Interpretation></Dimap_Document>" %
+                (samples, lines, dataFiles, bandInfos))
+    return base + ".dim", bands
+
+
+def getReferenceDpRvi(bands, line, sample):
+    """Pixel by pixel port of the Radar-Vegetation-Index operator for C2 products."""
+    lines, samples = bands["C11"].shape
+    half = WINDOW_SIZE // 2
+    means = {}
+    for name in ["C11", "C12_real", "C12_imag", "C22"]:
+        total = 0.0
+        count = 0
+        for y in range(max(line - half, 0), min(line + half, lines - 1) + 1):
+            for x in range(max(sample - half, 0), min(sample + half, samples - 1) + 1):
+                total = total + float(np.float32(bands[name][y, x]))
+                count = count + 1
+        means[name] = total / count
+
+    span = means["C11"] + means["C22"]
+    det = means["C11"] * means["C22"] - (means["C12_real"] ** 2 + means["C12_imag"] ** 2)
+    m = math.sqrt(max(0.0, 1.0 - 4.0 * det / (span * span)))
+    lambda1 = (span + math.sqrt(max(0.0, span * span - 4.0 * det))) / 2.0
+    return 1.0 - m * lambda1 / span
+
+
+def readBand(base, name, lines, samples):
+    return np.fromfile(base + ".data/" + name + ".img", dtype=">f4").reshape(lines, samples)
+
+
+def runGpt(gpt, inputDim, outputBase):
+    root = etree.parse(GRAPH).getroot()
+    root.xpath("//node[@id = 'Read']/parameters/file")[0].text = inputDim
+    root.xpath("//node[@id = 'Write']/parameters/file")[0].text = outputBase
+    graphFile = os.path.dirname(outputBase) + "/calc_dp_rad_veg_index.xml"
+    etree.ElementTree(root).write(graphFile)
+
+    timeBefore = time.perf_counter()
+    subprocess.run([gpt, graphFile], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - timeBefore
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    folder = tempfile.mkdtemp(prefix="dp_rvi_engine_") + "/"
+    gpt = os.environ.get("GPT") or shutil.which("gpt")
+
+    try:
+        inputDim, bands = createProduct(folder, lines, samples)
+
+        timeBefore = time.perf_counter()
+        success = DpRviEngine(blockLines=512).process(inputDim, folder + "numpy_dpradid", WINDOW_SIZE)
+        timeEngine = time.perf_counter() - timeBefore
+        result = readBand(folder + "numpy_dpradid", "DpRVI", lines, samples)
+
+        # #The crops of the top left and bottom right corner include the image borders and block borders
+        timeBefore = time.perf_counter()
+        deviation = 0.0
+        for lineOffset, sampleOffset in [(0, 0), (lines - CROP, samples - CROP), (512 - CROP // 2, samples // 2)]:
+            for line in range(lineOffset, lineOffset + CROP):
+                for sample in range(sampleOffset, sampleOffset + CROP):
+                    reference = getReferenceDpRvi(bands, line, sample)
+                    deviation = max(deviation, abs(reference - float(result[line, sample])))
+        timeReference = (time.perf_counter() - timeBefore) / (3 * CROP * CROP) * lines * samples
+
+        gptDeviation = None
+        if gpt is not None:
+            timeGpt = runGpt(gpt, inputDim, folder + "gpt_dpradid")
+            gptDeviation = float(np.nanmax(np.abs(readBand(folder + "gpt_dpradid", "DpRVI", lines, samples) -
+                                                  result)))
+    finally:
+        shutil.rmtree(folder)
+
+    print("Product: %s x %s pixels, window size %s" % (samples, lines, WINDOW_SIZE))
+    print("DpRviEngine: %.2f sec" % timeEngine)
+    print("Pixel by pixel operator port: %.1f sec (estimated from %s pixels), max deviation %.2e" % (
+        timeReference, 3 * CROP * CROP, deviation))
+    if gptDeviation is not None:
+        print("gpt calc_dp_rad_veg_index.xml: %.2f sec, max deviation %.2e" % (timeGpt, gptDeviation))
+    else:
+        print("gpt not found, comparison with the Snap operator skipped")
+
+    # #Without gpt the comparison with the Snap operator is not verified, it is reported as skipped and not as ok
+    checks = {
+        "product written": success,
+        "equal to the operator port": deviation < 1e-5,
+        "equal to the Snap operator": None if gptDeviation is None else gptDeviation < 1e-4,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "SKIPPED" if result is None else "ok" if result else "FAILED"))
+    if any(result is False for result in checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
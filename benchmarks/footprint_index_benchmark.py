@@ -0,0 +1,108 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        footprint_index_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Compares the footprint overlap tests of the slice assembly and coherence pairing on synthetic SLC products of
+# ----several tracks. All pairs of products are tested pair by pair with GeoPosition as done by former versions and with
+# ----the STRtree of the FootprintIndex. Both must return the same overlap areas and rounded intersects.
+# ----Execute from the repository folder via "python3 benchmarks/footprint_index_benchmark.py <amount products>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import Polygon
+from controller_modules.geo_position import GeoPosition
+from controller_modules.footprint_index import FootprintIndex
+from controller_modules.scene_catalog import SceneCatalog
+
+# #First longitude of each track
+TRACKS = [2.0, 4.5, 7.0, 9.5, 12.0, 14.5]
+
+
+def createProduct(folder, number):
+    random.seed(number)
+    lon = TRACKS[number % len(TRACKS)] + random.uniform(-0.05, 0.05)
+    lat = 45.0 + 1.5 * ((number // len(TRACKS)) % 6) + random.uniform(-0.05, 0.05)
+    footprint = Polygon([(lon, lat), (lon + 2.5, lat + 0.3), (lon + 2.2, lat + 1.9), (lon - 0.3, lat + 1.6)])
+    coordinates = " ".join("%.6f,%.6f" % (y, x) for x, y in list(footprint.exterior.coords)[:-1])
+
+    product = folder + "S1A_IW_SLC__1SDV_20210101T053000_20210101T053027_%06d_04DF48_%04X.SAFE" % (35000 + number,
+                                                                                                    number)
+    os.makedirs(product)
+    with open(product + "/manifest.safe", "w") as f:
+        f.write("<xfdu:XFDU xmlns:xfdu=\"urn:ccsds:schema:xfdu:1\" xmlns:safe=\"http://www.esa.int/safe/sentinel-1.0\" "
+                "xmlns:gml=\"http://www.opengis.net/gml\" xmlns:s1=\"http://www.esa.int/safe/sentinel-1.0/sentinel-1\" "
+                "xmlns:s1sarl1=\"http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1\"><metadataSection>"
+                "<safe:footPrint><gml:coordinates>" + coordinates + "</gml:coordinates></safe:footPrint>"
+                "<s1:pass>ASCENDING</s1:pass><s1sarl1:sliceNumber>1</s1sarl1:sliceNumber>"
+                "<safe:orbitNumber type=\"start\">" + str(35000 + number) + "</safe:orbitNumber>"
+                "<safe:startTime>2021-01-01T05:30:00</safe:startTime>"
+                "<s1sarl1:transmitterReceiverPolarisation>VV</s1sarl1:transmitterReceiverPolarisation>"
+                "</metadataSection></xfdu:XFDU>")
+    return product
+
+
+def testPairwise(products):
+    geoPosition = GeoPosition()
+    return [(geoPosition.areaOverlap(product1 + "/manifest.safe", product2 + "/manifest.safe"),
+             geoPosition.roundedIntersect(product1 + "/manifest.safe", product2 + "/manifest.safe"))
+            for product1 in products for product2 in products]
+
+
+def testIndexed(products):
+    footprintIndex = FootprintIndex(products)
+    return [(footprintIndex.areaOverlap(product1, product2), footprintIndex.roundedIntersect(product1, product2))
+            for product1 in products for product2 in products]
+
+
+def main():
+    amountProducts = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    folder = tempfile.mkdtemp(prefix="footprint_index_") + "/"
+
+    try:
+        products = [createProduct(folder + "products/", number) for number in range(amountProducts)]
+        SceneCatalog.setDefaultLocation(folder)
+        # #The metadata of the products is read once for both variants
+        for product in products:
+            SceneCatalog.default().getScene(product)
+
+        timeBefore = time.perf_counter()
+        pairwise = testPairwise(products)
+        timePairwise = time.perf_counter() - timeBefore
+
+        timeBefore = time.perf_counter()
+        indexed = testIndexed(products)
+        timeIndexed = time.perf_counter() - timeBefore
+    finally:
+        SceneCatalog.setDefaultLocation(None)
+        shutil.rmtree(folder)
+
+    print("Products: %s, tested pairs: %s, overlapping pairs: %s" % (amountProducts, len(pairwise),
+                                                                     sum(1 for area, rounded in pairwise if area > 0)))
+    print("GeoPosition pair by pair: %.2f sec" % timePairwise)
+    print("FootprintIndex: %.2f sec" % timeIndexed)
+
+    checks = {
+        "same overlap areas": all(abs(p[0] - i[0]) < 1e-9 for p, i in zip(pairwise, indexed)),
+        "same rounded intersects": [p[1] for p in pairwise] == [i[1] for i in indexed],
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        gpt_admission_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Executes a mix of heavy terrain flattening and light subset graphs from concurrent threads with the stub gpt on a
+# ----simulated machine of 8 cores and 1000 MB, where a stub gpt exceeding the memory together with the running ones is
+# ----killed like by the OOM killer. The graphs are executed once without admission and twice with the
+# ----GptResourceScheduler: with the estimates of the user settings and with the estimates learned from the first run.
+# ----Afterwards a heavy graph is executed with a too small heap, the failed run raises the heap of the next run.
+# ----Finally the database holds the live slot of a sibling container, whose pid does not exist on this host, and the
+# ----expired slot of a crashed run of another host: the live slot must hold back the next run, the expired one must be
+# ----removed.
+# ----Execute from the repository folder via "python3 benchmarks/gpt_admission_benchmark.py <graphs> <threads> <node sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.resource_aware_gpt_executor import ResourceAwareGptExecutor
+from controller_modules.gpt_resource_scheduler import GptResourceScheduler
+
+STUB_GPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_gpt.py")
+SIMULATED_RAM_MB = 1000
+SIMULATED_CORES = 8
+# #Memory of the operators in MB, a heavy graph needs 300 MB and a light graph 40 MB besides the stub gpt itself
+OPERATOR_MEMORY = "Terrain-Flattening:300,Subset:40"
+
+
+def createGraphs(folder, amountGraphs):
+    with open(folder + "input.dim", "w") as f:
+        f.write("<Dimap_Document/>")
+    graphs = []
+    for i in range(amountGraphs):
+        operator = "Terrain-Flattening" if i % 3 == 0 else "Subset"
+        graph = folder + "graph_%03d.xml" % i
+        with open(graph, "w") as f:
+            f.write("<graph id=\"Graph\"><version>1.0</version>"
+                    "<node id=\"Read\"><operator>Read</operator><parameters><file>" + folder + "input.dim</file>"
+                    "</parameters></node>"
+                    "<node id=\"" + operator + "\"><operator>" + operator + "</operator><sources>"
+                    "<sourceProduct refid=\"Read\"/></sources><parameters/></node>"
+                    "<node id=\"Write\"><operator>Write</operator><sources><sourceProduct refid=\"" + operator + "\"/>"
+                    "</sources><parameters><file>" + folder + "output_%03d" % i + "</file></parameters></node>"
+                    "</graph>")
+        graphs.append(graph)
+    return graphs
+
+
+def executeGraph(executor, graph):
+    try:
+        return True, executor.execute(graph)
+    except RuntimeError as e:
+        return False, str(e)
+
+
+def executeGraphs(executor, graphs, threads):
+    timeBefore = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda graph: executeGraph(executor, graph), graphs))
+    return time.perf_counter() - timeBefore, results
+
+
+def createScheduler(folder, gptMemory):
+    scheduler = GptResourceScheduler(folder, folder + "scratch/", str(SIMULATED_RAM_MB / 1024.0), gptMemory,
+                                     SIMULATED_CORES)
+    # #The simulated machine
+    scheduler.cpuCount = SIMULATED_CORES
+    scheduler.POLL_INTERVAL = 0.05
+    scheduler.MIN_MEMORY = 16 * 1024 ** 2
+    return scheduler
+
+
+def checkOtherHostSlots(folder, graph):
+    scheduler = createScheduler(folder, "0.4")
+    now = time.time()
+    with contextlib.closing(sqlite3.connect(scheduler.stateFile)) as connection:
+        connection.execute("INSERT INTO slots (host, pid, pidStart, graphType, memory, cores, scratch, startTime, "
+                           "heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           ("sibling:pid:[4026532000]", 999998, "boot:1", "sibling",
+                            int(0.9 * scheduler.memoryBudget), 1, 0, now, now))
+        connection.execute("INSERT INTO slots (host, pid, pidStart, graphType, memory, cores, scratch, startTime, "
+                           "heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           ("crashed-host:pid:[4026531836]", 999999, "boot:1", "crashed", 1, 1, 0,
+                            now - 2 * scheduler.LEASE_TIMEOUT, now - 2 * scheduler.LEASE_TIMEOUT))
+        connection.commit()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        acquired = pool.submit(scheduler.acquire, graph)
+        time.sleep(0.5)
+        heldBack = not acquired.done()
+        with contextlib.closing(sqlite3.connect(scheduler.stateFile)) as connection:
+            expiredRemoved = connection.execute("SELECT COUNT(*) FROM slots WHERE graphType = 'crashed'").fetchone()[
+                0] == 0
+            # #The sibling container releases its slot
+            connection.execute("DELETE FROM slots WHERE graphType = 'sibling'")
+            connection.commit()
+        slot = acquired.result(timeout=10)
+    scheduler.release(slot, 0.0)
+    return heldBack, expiredRemoved
+
+
+def getHeaps(results):
+    return [int(output.split("-J-Xmx")[1].split("M")[0]) for success, output in results if "-J-Xmx" in output]
+
+
+def main():
+    amountGraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    os.environ["STUB_GPT_NODE"] = sys.argv[3] if len(sys.argv) > 3 else "0.5"
+    os.environ["STUB_GPT_STARTUP"] = "0.1"
+    os.environ["STUB_GPT_GRAPH"] = "0"
+    os.environ["STUB_GPT_MEMORY"] = OPERATOR_MEMORY
+    os.environ["STUB_GPT_RAM"] = str(SIMULATED_RAM_MB)
+    folder = tempfile.mkdtemp(prefix="gpt_admission_") + "/"
+    os.environ["STUB_GPT_RAM_FOLDER"] = folder + "ram/"
+    os.makedirs(folder + "ram/")
+    stubGpt = SubprocessGptExecutor([sys.executable, STUB_GPT, "-e"])
+
+    try:
+        graphs = createGraphs(folder, amountGraphs)
+        heavyType = GptResourceScheduler.getGraphInfo(graphs[0])[0]
+        lightType = GptResourceScheduler.getGraphInfo(graphs[1])[0]
+
+        timeWithout, resultsWithout = executeGraphs(stubGpt, graphs, threads)
+
+        # #The user settings estimate a gpt process of 0.4 GB heap
+        scheduler = createScheduler(folder, "0.4")
+        admitted = ResourceAwareGptExecutor(stubGpt, scheduler)
+        timeCold, resultsCold = executeGraphs(admitted, graphs, threads)
+        estimates = {"heavy": scheduler.estimate(heavyType), "light": scheduler.estimate(lightType)}
+        timeLearned, resultsLearned = executeGraphs(admitted, graphs, threads)
+
+        # #A heap too small for the heavy graph
+        shortScheduler = createScheduler(folder + "short_", "0.2")
+        shortAdmitted = ResourceAwareGptExecutor(stubGpt, shortScheduler)
+        shortResults = [executeGraph(shortAdmitted, graphs[0]) for attempt in range(2)]
+
+        otherHostHeldBack, otherHostExpired = checkOtherHostSlots(folder + "hosts_", graphs[0])
+    finally:
+        shutil.rmtree(folder)
+
+    print("Graphs: %s (every third heavy), threads: %s, simulated machine: %s cores, %s MB, %s sec per operator" % (
+        amountGraphs, threads, SIMULATED_CORES, SIMULATED_RAM_MB, os.environ["STUB_GPT_NODE"]))
+    for name, seconds, results in [("Without admission", timeWithout, resultsWithout),
+                                   ("Admission, settings", timeCold, resultsCold),
+                                   ("Admission, learned", timeLearned, resultsLearned)]:
+        killed = sum(1 for success, output in results if not success and "137" in output)
+        heaps = sorted(set(getHeaps(results)))
+        print("%-20s %.2f sec, %s of %s graphs failed, %s killed, heaps: %s" % (
+            name, seconds, sum(1 for success, output in results if not success), len(results), killed,
+            ", ".join("%sM" % heap for heap in heaps) or "-"))
+    for name, estimate in estimates.items():
+        print("Learned estimate of the %s graph: %.0f MB, %s cores" % (name, estimate["memory"] / 1024 ** 2,
+                                                                      estimate["cores"]))
+    print("Heavy graph with 0.2 GB heap: " + ", ".join(
+        "%s with -J-Xmx%sM" % ("done" if success else "failed", output.split("-J-Xmx")[1].split("M")[0])
+        if "-J-Xmx" in output else ("done" if success else "failed") for success, output in shortResults))
+
+    checks = {
+        "runs killed without admission": any(not success for success, output in resultsWithout),
+        "no run failed with admission": all(success for success, output in resultsCold + resultsLearned),
+        "heap sized to each slot": len(getHeaps(resultsCold + resultsLearned)) == 2 * amountGraphs,
+        "learned estimates fit the graphs": 300 * 1024 ** 2 < estimates["heavy"]["memory"] < 0.5 * 1024 ** 3 and
+        estimates["light"]["memory"] < estimates["heavy"]["memory"],
+        "learned estimates admit more runs": timeLearned < timeCold,
+        "heap raised after a run short of memory": not shortResults[0][0] and "OutOfMemoryError" in shortResults[0][1]
+        and shortResults[1][0],
+        "live slot of a sibling container kept": otherHostHeldBack,
+        "expired slot of another host removed": otherHostExpired,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        gpt_executor_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Compares the execution of graphs with one gpt call per graph and with the WarmGptWorkerPool, using the stub gpt.
+# ----Additionally the failure handling of the pool is checked: failing graphs, dying workers and the subprocess fallback.
+# ----Execute from the repository folder via "python3 benchmarks/gpt_executor_benchmark.py <amount graphs> <startup sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.warm_gpt_worker_pool import WarmGptWorkerPool
+
+STUB_GPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_gpt.py")
+
+
+def createGraph(folder, name, nodeId="Calibration"):
+    xmlFile = folder + name + ".xml"
+    with open(xmlFile, "w") as f:
+        f.write("<graph id=\"Graph\"><version>1.0</version>"
+                "<node id=\"Read\"><operator>Read</operator><parameters><file>in.SAFE</file></parameters></node>"
+                "<node id=\"" + nodeId + "\"><operator>" + nodeId + "</operator><parameters/></node>"
+                "<node id=\"Write\"><operator>Write</operator><parameters><file>" + folder + name +
+                ".tif</file></parameters></node></graph>")
+    return xmlFile
+
+
+def executeAll(executor, graphs):
+    timeBefore = time.perf_counter()
+    for graph in graphs:
+        executor.execute(graph)
+    return time.perf_counter() - timeBefore
+
+
+def expectFailure(executor, graph):
+    try:
+        executor.execute(graph)
+    except RuntimeError:
+        return True
+    return False
+
+
+def main():
+    amountGraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    os.environ["STUB_GPT_STARTUP"] = sys.argv[2] if len(sys.argv) > 2 else "2.0"
+    folder = tempfile.mkdtemp(prefix="gpt_executor_") + "/"
+
+    try:
+        graphs = [createGraph(folder, "graph_%02d" % i) for i in range(amountGraphs)]
+
+        timeSubprocess = executeAll(SubprocessGptExecutor([sys.executable, STUB_GPT, "-e"]), graphs)
+
+        pool = WarmGptWorkerPool(1, [sys.executable, STUB_GPT, "--worker"], maxGraphsPerWorker=1000)
+        timePool = executeAll(pool, graphs)
+        if not all(os.path.exists(graph.replace(".xml", ".tif")) for graph in graphs):
+            print("Not all graphs were executed")
+            sys.exit(1)
+
+        # #The pool must report failures and replace a dying worker
+        os.environ["STUB_GPT_STARTUP"] = "0"
+        checks = {
+            "failing graph raises": expectFailure(pool, createGraph(folder, "fail", "Fail")),
+            "crashing worker raises": expectFailure(pool, createGraph(folder, "crash", "Crash")),
+            "replaced worker executes": not expectFailure(pool, createGraph(folder, "after_crash")),
+        }
+        pool.close()
+
+        fallbackPool = WarmGptWorkerPool(1, [sys.executable, "-c", "import sys; sys.exit(1)"],
+                                         fallbackExecutor=SubprocessGptExecutor([sys.executable, STUB_GPT, "-e"]))
+        checks["fallback executes"] = not expectFailure(fallbackPool, createGraph(folder, "fallback"))
+        fallbackPool.close()
+    finally:
+        shutil.rmtree(folder)
+
+    print("Graphs: %s, simulated gpt startup: %s sec" % (amountGraphs, sys.argv[2] if len(sys.argv) > 2 else "2.0"))
+    print("One gpt call per graph: %.2f sec" % timeSubprocess)
+    print("Warm worker pool: %.2f sec" % timePool)
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
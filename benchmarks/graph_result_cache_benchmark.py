@@ -0,0 +1,151 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        graph_result_cache_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Processes a 6-day and a 12-day coherence list over the same scenes with and without the GraphResultCache, using
+# ----the stub gpt. Each pair is split and orbit corrected in its own scene scratch folder, as in the batch processing.
+# ----Afterwards the whole run is repeated, as after a crash, and the LRU eviction is checked with a small cache.
+# ----Execute from the repository folder via "python3 benchmarks/graph_result_cache_benchmark.py <amount scenes>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.graph_result_cache import GraphResultCache
+from controller_modules.snap_graph_templates import SnapGraphTemplates
+from controller_modules.snap_graph_job import SnapGraphJob
+
+STUB_GPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_gpt.py")
+
+
+class CountingExecutor(SubprocessGptExecutor):
+
+    def __init__(self):
+        SubprocessGptExecutor.__init__(self, [sys.executable, STUB_GPT, "-e"])
+        self.calls = 0
+
+    def execute(self, xmlFile) -> str:
+        self.calls = self.calls + 1
+        return SubprocessGptExecutor.execute(self, xmlFile)
+
+
+def createTemplates(folder):
+    os.makedirs(folder + "spacial_calc_graphs/")
+    with open(folder + "spacial_calc_graphs/split_orbit.xml", "w") as f:
+        f.write("<graph id=\"Graph\"><version>1.0</version>"
+                "<node id=\"Read\"><operator>Read</operator><parameters><file/></parameters></node>"
+                "<node id=\"TOPSAR-Split\"><operator>TOPSAR-Split</operator><sources><sourceProduct refid=\"Read\"/>"
+                "</sources><parameters><subswath>IW2</subswath></parameters></node>"
+                "<node id=\"Write\"><operator>Write</operator><sources><sourceProduct refid=\"TOPSAR-Split\"/>"
+                "</sources><parameters><file/><formatName>BEAM-DIMAP</formatName></parameters></node></graph>")
+    with open(folder + "spacial_calc_graphs/coherence.xml", "w") as f:
+        f.write("<graph id=\"Graph\"><version>1.0</version>"
+                "<node id=\"Read (1)\"><operator>Read</operator><parameters><file/></parameters></node>"
+                "<node id=\"Read (2)\"><operator>Read</operator><parameters><file/></parameters></node>"
+                "<node id=\"Coherence\"><operator>Coherence</operator><sources><sourceProduct refid=\"Read (1)\"/>"
+                "<sourceProduct.1 refid=\"Read (2)\"/></sources><parameters/></node>"
+                "<node id=\"Write\"><operator>Write</operator><sources><sourceProduct refid=\"Coherence\"/>"
+                "</sources><parameters><file/><formatName>GeoTIFF</formatName></parameters></node></graph>")
+
+
+def processPair(job, scratchRoot, outputPath, scene1, scene2):
+    jobFolder = tempfile.mkdtemp(prefix="job_", dir=scratchRoot) + "/"
+    job.jobDir = jobFolder + "graphs/"
+    xmlFolder = job.templates.xmlFolder + "spacial_calc_graphs/"
+
+    splitProducts = []
+    for scene in [scene1, scene2]:
+        sceneId = os.path.basename(scene).replace(".SAFE", "")
+        job.setInOutputPaths(xmlFolder + "split_orbit.xml", scene, jobFolder + sceneId + "_IW2_split")
+        job.performProcessing(xmlFolder + "split_orbit.xml")
+        splitProducts.append(jobFolder + sceneId + "_IW2_split.dim")
+
+    job.setMultiplePaths(xmlFolder + "coherence.xml", splitProducts, "Read")
+    job.setMultiplePaths(xmlFolder + "coherence.xml", [outputPath + os.path.basename(splitProducts[0])
+                                                       .replace("_IW2_split.dim", "_coh.tif")], "Write")
+    job.performProcessing(xmlFolder + "coherence.xml")
+    shutil.rmtree(jobFolder)
+
+
+def processLists(folder, scenes, cacheBytes):
+    scratchRoot = folder + "scratch/"
+    outputPath = folder + "output/"
+    os.makedirs(scratchRoot, exist_ok=True)
+    os.makedirs(outputPath, exist_ok=True)
+
+    resultCache = GraphResultCache(scratchRoot + "graph_cache/", scratchRoot, cacheBytes) if cacheBytes else None
+    job = SnapGraphJob(SnapGraphTemplates(folder + "templates/"), scratchRoot, resultCache=resultCache)
+    executor = CountingExecutor()
+    GptExecutor.setDefault(executor)
+
+    timeBefore = time.perf_counter()
+    for days in [1, 2]:
+        for i in range(len(scenes) - days):
+            processPair(job, scratchRoot, outputPath, scenes[i], scenes[i + days])
+    return time.perf_counter() - timeBefore, executor.calls, resultCache
+
+
+def getFolderSize(folder):
+    return sum(os.path.getsize(os.path.join(path, file)) for path, dirs, files in os.walk(folder) for file in files)
+
+
+def main():
+    amountScenes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    os.environ.setdefault("STUB_GPT_STARTUP", "0.3")
+    os.environ.setdefault("STUB_GPT_SIZE", str(1024 * 1024))
+    folder = tempfile.mkdtemp(prefix="graph_cache_") + "/"
+
+    try:
+        createTemplates(folder + "templates/")
+        scenes = []
+        for i in range(amountScenes):
+            scene = folder + "data/S1A_IW_SLC__1SDV_202001%02dT053000.SAFE" % (i + 1)
+            os.makedirs(scene)
+            with open(scene + "/manifest.safe", "w") as f:
+                f.write("manifest %s" % i)
+            scenes.append(scene)
+
+        timeNoCache, callsNoCache, cache = processLists(folder, scenes, 0)
+        timeCache, callsCache, cache = processLists(folder, scenes, 10 * 1024 ** 3)
+        timeRerun, callsRerun, cache = processLists(folder, scenes, 10 * 1024 ** 3)
+
+        # #A cache smaller than all split products must stay within its size
+        shutil.rmtree(folder + "scratch/")
+        processLists(folder, scenes, 3 * 1024 * 1024)
+        cacheSize = getFolderSize(folder + "scratch/graph_cache/")
+    finally:
+        GptExecutor.setDefault(None)
+        shutil.rmtree(folder)
+
+    pairs = 2 * amountScenes - 3
+    print("Scenes: %s, coherence pairs of the 6-day and 12-day lists: %s" % (amountScenes, pairs))
+    print("Without cache: %.2f sec, %s gpt calls" % (timeNoCache, callsNoCache))
+    print("With cache: %.2f sec, %s gpt calls" % (timeCache, callsCache))
+    print("Rerun with filled cache: %.2f sec, %s gpt calls (%s hits)" % (timeRerun, callsRerun, cache.hits))
+    print("Cache size with 3 MB limit: %.2f MB" % (cacheSize / 1024 ** 2))
+
+    checks = {
+        "split products computed once per scene": callsCache == amountScenes + pairs,
+        "rerun only computes the coherences": callsRerun == pairs,
+        "eviction keeps the size limit": cacheSize <= 3 * 1024 * 1024 + 4096,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        grd_window_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Plans the pixel windows of random field aois in a synthetic GRD scene with the GrdWindowPlanner and compares the
+# ----pixels read by the first backscatter graph with the whole scene. Each window must contain the aoi with the margin
+# ----of the border noise removal, the true pixel positions are known from the synthetic geometry.
+# ----Execute from the repository folder via "python3 benchmarks/grd_window_benchmark.py <amount aois> <aoi km>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import math
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import Polygon
+from controller_modules.grd_window_planner import GrdWindowPlanner
+
+LAT0 = 50.0
+LON0 = 10.0
+HEADING = math.radians(-12.0)
+PIXEL_KM = 0.01
+LINES = 16700
+SAMPLES = 25500
+BORDER_LIMIT = 500
+
+
+def toLonLat(pixel, line):
+    """Pixel and line of the synthetic scene to lon, lat. The grid is slightly bent, like a real grid."""
+    x = pixel * PIXEL_KM
+    y = line * PIXEL_KM + 0.00003 * x ** 2
+    east = x * math.cos(HEADING) + y * math.sin(HEADING)
+    north = -x * math.sin(HEADING) + y * math.cos(HEADING)
+    return LON0 + east / (111.32 * math.cos(math.radians(LAT0))), LAT0 + north / 110.57
+
+
+def createScene(folder):
+    scene = folder + "S1A_IW_GRDH_1SDV_20200101T053000_20200101T053027_030000_038000_A000.SAFE"
+    os.makedirs(scene + "/annotation/")
+
+    points = ""
+    for line in [round(i * (LINES - 1) / 9.0) for i in range(10)]:
+        for pixel in [round(j * (SAMPLES - 1) / 20.0) for j in range(21)]:
+            lon, lat = toLonLat(pixel, line)
+            points += ("<geolocationGridPoint><line>%s</line><pixel>%s</pixel><latitude>%.8f</latitude>"
+                       "<longitude>%.8f</longitude></geolocationGridPoint>" % (line, pixel, lat, lon))
+
+    with open(scene + "/annotation/s1a-iw-grd-vv-20200101t053000.xml", "w") as f:
+        f.write("<product><imageAnnotation><imageInformation><numberOfSamples>" + str(SAMPLES) +
+                "</numberOfSamples><numberOfLines>" + str(LINES) + "</numberOfLines></imageInformation>"
+                "</imageAnnotation><geolocationGrid><geolocationGridPointList>" + points +
+                "</geolocationGridPointList></geolocationGrid></product>")
+    return scene
+
+
+def main():
+    amountAois = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    aoiKm = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    folder = tempfile.mkdtemp(prefix="grd_window_") + "/"
+    random.seed(1)
+
+    aoiPixels = aoiKm / PIXEL_KM
+    margin = BORDER_LIMIT + GrdWindowPlanner.MARGIN
+    windowPixels = []
+    containedWithMargin = True
+
+    try:
+        scene = createScene(folder)
+        timeBefore = time.perf_counter()
+        for i in range(amountAois):
+            pixel = random.uniform(0, SAMPLES - aoiPixels)
+            line = random.uniform(0, LINES - aoiPixels)
+            corners = [(pixel, line), (pixel + aoiPixels, line), (pixel + aoiPixels, line + aoiPixels),
+                       (pixel, line + aoiPixels)]
+            aoi = Polygon([toLonLat(*corner) for corner in corners]).wkt
+
+            window = GrdWindowPlanner().getPixelWindow(scene, aoi, margin)
+            if window is None:
+                containedWithMargin = False
+                continue
+            windowPixels.append(window[2] * window[3])
+
+            # #Margin on each side of the aoi, except at the scene borders
+            if not (window[0] <= max(0, pixel - margin) and window[1] <= max(0, line - margin) and
+                    window[0] + window[2] >= min(SAMPLES, pixel + aoiPixels + margin) and
+                    window[1] + window[3] >= min(LINES, line + aoiPixels + margin)):
+                containedWithMargin = False
+        seconds = time.perf_counter() - timeBefore
+    finally:
+        shutil.rmtree(folder)
+
+    scenePixels = float(LINES * SAMPLES)
+    meanWindow = sum(windowPixels) / max(1, len(windowPixels))
+    print("Aois: %s of %s km, scene: %s x %s pixels, margin: %s pixels" % (amountAois, aoiKm, SAMPLES, LINES, margin))
+    print("Window planning: %.3f sec for all aois" % seconds)
+    print("Mean window: %.0f pixels, %.2f %% of the scene, %.0fx less pixels read" % (
+        meanWindow, 100 * meanWindow / scenePixels, scenePixels / meanWindow))
+
+    checks = {
+        "window planned for each aoi": len(windowPixels) == amountAois,
+        "aoi with margin inside each window": containedWithMargin,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
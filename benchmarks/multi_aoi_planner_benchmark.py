@@ -0,0 +1,208 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        multi_aoi_planner_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Creates the processing lists of clustered field aois over synthetic SLC and GRD products of overlapping tracks, once
+# ----with a SLC and a GRD query and a list generation per aoi as done by former versions and once with the MultiAoiPlanner.
+# ----The products are served by a local stand-in of the resto catalogue of Code-De returning the products intersecting
+# ----the queried polygon, every response is delayed to simulate the network.
+# ----Execute from the repository folder via
+# ----"python3 benchmarks/multi_aoi_planner_benchmark.py <amount aois> <delay sec> <workers>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import datetime
+import tempfile
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely import wkt
+from shapely.geometry import box
+from controller_modules.pyFunc_queries import PyFuncQueries
+from controller_modules.code_de_catalogue_client import CodeDeCatalogueClient
+from controller_modules.create_input_output import CreateInputOutput
+from controller_modules.multi_aoi_planner import MultiAoiPlanner
+from controller_modules.scene_catalog import SceneCatalog
+
+START_DATE = "2021-01-01"
+END_DATE = "2021-03-31"
+AMOUNT_DATES = 12
+# #Track: first longitude, day offset of the acquisitions
+TRACKS = [(9.0, 0), (10.5, 2), (12.0, 4)]
+CLUSTERS = [(10.2, 50.1), (11.8, 49.8), (13.1, 50.4)]
+AOI_SIZE = 0.02
+
+
+class RestoStandIn(BaseHTTPRequestHandler):
+
+    products = {}
+    delay = 0.0
+    requestCount = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with RestoStandIn.lock:
+            RestoStandIn.requestCount = RestoStandIn.requestCount + 1
+
+        parameters = parse_qs(urlsplit(self.path).query)
+        productType = parameters["productType"][0]
+        geometry = wkt.loads(parameters["geometry"][0])
+        found = sorted([(start, product) for product, (footprint, start, type) in self.products.items()
+                        if type == productType and footprint.intersects(geometry)], reverse=True)
+
+        features = [{"properties": {"productIdentifier": product}} for start, product in found]
+        body = json.dumps({"type": "FeatureCollection", "features": features}).encode("utf-8")
+
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def createProduct(folder, productType, track, date, absoluteOrbit, uniqueId):
+    lon, dayOffset = TRACKS[track]
+    start = date.strftime("%Y%m%dT053000")
+    stop = date.strftime("%Y%m%dT053027")
+    name = ("S1A_IW_SLC__1SDV_" if productType == "SLC" else "S1A_IW_GRDH_1SDV_") + \
+        "%s_%s_%06d_%06X_%04X.SAFE" % (start, stop, absoluteOrbit, absoluteOrbit, uniqueId)
+    product = folder + name
+    os.makedirs(product)
+
+    footprint = box(lon, 49.0, lon + 2.5, 51.0)
+    coordinates = " ".join("%.6f,%.6f" % (lat, lon) for lon, lat in list(footprint.exterior.coords)[:-1])
+    with open(product + "/manifest.safe", "w") as f:
+        f.write("<xfdu:XFDU xmlns:xfdu=\"urn:ccsds:schema:xfdu:1\" xmlns:safe=\"http://www.esa.int/safe/sentinel-1.0\" "
+                "xmlns:gml=\"http://www.opengis.net/gml\" xmlns:s1=\"http://www.esa.int/safe/sentinel-1.0/sentinel-1\" "
+                "xmlns:s1sarl1=\"http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1\"><metadataSection>"
+                "<safe:footPrint><gml:coordinates>" + coordinates + "</gml:coordinates></safe:footPrint>"
+                "<s1:pass>ASCENDING</s1:pass><s1sarl1:sliceNumber>1</s1sarl1:sliceNumber>"
+                "<safe:orbitNumber type=\"start\">" + str(absoluteOrbit) + "</safe:orbitNumber>"
+                "<safe:startTime>" + date.strftime("%Y-%m-%dT05:30:00") + "</safe:startTime>"
+                "<s1sarl1:transmitterReceiverPolarisation>VV</s1sarl1:transmitterReceiverPolarisation>"
+                "</metadataSection></xfdu:XFDU>")
+    RestoStandIn.products[product] = (footprint, start, productType)
+
+
+def createProducts(folder):
+    uniqueId = 0
+    for track, (lon, dayOffset) in enumerate(TRACKS):
+        for i in range(AMOUNT_DATES):
+            date = datetime.datetime(2021, 1, 1) + datetime.timedelta(days=6 * i + dayOffset)
+            absoluteOrbit = 35000 + 90 * i + 30 * track
+            for productType in ["SLC", "GRD"]:
+                createProduct(folder, productType, track, date, absoluteOrbit, uniqueId)
+                uniqueId = uniqueId + 1
+
+
+def createAois(folder, amountAois):
+    random.seed(1)
+    aois = {}
+    for i in range(amountAois):
+        lon, lat = CLUSTERS[i % len(CLUSTERS)]
+        lon = lon + random.uniform(-0.2, 0.2)
+        lat = lat + random.uniform(-0.2, 0.2)
+        aois["field_%03d" % i] = folder + "field_%03d.geojson" % i
+        with open(aois["field_%03d" % i], "w") as f:
+            json.dump({"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {}, "geometry": {
+                "type": "Polygon", "coordinates": [list(box(lon, lat, lon + AOI_SIZE, lat + AOI_SIZE).exterior.coords)]
+            }}]}, f)
+    return aois
+
+
+def planPerAoi(aois, baseUrl, resultPath):
+    """The list creation of former versions, executed for each aoi in turn."""
+    pyFuncQueries = PyFuncQueries(CodeDeCatalogueClient(baseUrl=baseUrl))
+    processingLists = {}
+    for areaName, geojson in aois.items():
+        tilesSlc = pyFuncQueries.buildSentinel1QueryTileList(geojson, START_DATE, END_DATE, "SLC")
+        tilesGrd = pyFuncQueries.buildSentinel1QueryTileList(geojson, START_DATE, END_DATE, "GRD")
+        inOutputListSlc = CreateInputOutput().generateFileList(tilesSlc, "SLC", START_DATE, END_DATE, resultPath,
+                                                               areaName, True)
+        inOutputListGrd = CreateInputOutput().generateFileList(tilesGrd, "GRD", START_DATE, END_DATE, resultPath,
+                                                               areaName, True)
+        processingLists[areaName] = MultiAoiPlanner.getProcessingLists(inOutputListSlc, inOutputListGrd)
+    return processingLists
+
+
+def planMultiAoi(aois, baseUrl, resultPath, workers, dataPath):
+    planner = MultiAoiPlanner(aois, PyFuncQueries(CodeDeCatalogueClient(baseUrl=baseUrl)), workers, dataPath)
+    return planner.planProcessingLists(START_DATE, END_DATE, resultPath, True), len(planner.getQueryPolygons())
+
+
+def measure(function, dataPath, *args):
+    os.makedirs(dataPath)
+    SceneCatalog.setDefaultLocation(dataPath)
+    RestoStandIn.requestCount = 0
+    timeBefore = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, time.perf_counter() - timeBefore, RestoStandIn.requestCount
+
+
+def main():
+    amountAois = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    RestoStandIn.delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    folder = tempfile.mkdtemp(prefix="multi_aoi_planner_") + "/"
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RestoStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    baseUrl = "http://127.0.0.1:%s/resto/api/collections/" % server.server_address[1]
+
+    try:
+        createProducts(folder + "products/")
+        os.makedirs(folder + "aois/")
+        aois = createAois(folder + "aois/", amountAois)
+
+        perAoi, timePerAoi, requestsPerAoi = measure(planPerAoi, folder + "per_aoi/", aois, baseUrl,
+                                                     folder + "per_aoi/")
+        (planned, amountPolygons), timePlanned, requestsPlanned = measure(planMultiAoi, folder + "planned/", aois,
+                                                                          baseUrl, folder + "planned/", workers,
+                                                                          folder + "planned/")
+        listFiles = [sorted(name.split("_tiles_")[0] + name.split("_")[-1] for name in os.listdir(folder + path)
+                            if name.endswith(".jsonl")) for path in ["per_aoi/", "planned/"]]
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder)
+
+    amountEntries = sum(len(entries) for lists in perAoi.values() for entries in lists.values())
+    print("Products: %s, aois: %s in %s clusters, response delay: %s sec, workers: %s" % (
+        len(RestoStandIn.products), amountAois, len(CLUSTERS), RestoStandIn.delay, workers))
+    print("List entries of all aois: %s" % amountEntries)
+    print("Query and list generation per aoi: %.2f sec, %s requests" % (timePerAoi, requestsPerAoi))
+    print("MultiAoiPlanner: %.2f sec, %s requests for %s query polygons" % (timePlanned, requestsPlanned,
+                                                                          amountPolygons))
+
+    checks = {
+        "same list entries of each aoi": perAoi == planned and amountEntries > 0,
+        "same list files of each aoi": listFiles[0] == listFiles[1] and len(listFiles[0]) == 4 * amountAois,
+        "one request per query polygon and product type": requestsPlanned == 2 * amountPolygons,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        multi_aoi_shared_processing_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Processes the Radar Vegetation Index of one SLC scene for close field aois with the checked-in graphs and the stub
+# ----gpt, once per aoi as done by former versions and once for all aois with the graph fanned out to one subset and
+# ----terrain correction per aoi. The operators executed by the stub gpt are counted.
+# ----The fanned out graphs are executed through the pyroSAR path of the SubprocessGptExecutor as well, which needs a node
+# ----"Write". Without pyroSAR and GDAL the node lookup of pyroSAR is checked instead.
+# ----Execute from the repository folder via
+# ----"python3 benchmarks/multi_aoi_shared_processing_benchmark.py <amount aois> <startup sec> <node sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from collections import Counter
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import box
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.specific_snap_graph_processing import SpecificSnapGraphProcessing
+
+STUB_GPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_gpt.py")
+XML_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "sentinel_docker_process/processing_tool/Sentinel-1-SLC-process/snap_graph_files/")
+OUTPUT_NAME = "20210101_S1A_VVVH_117_asc_A000"
+AOI_SIZE = 0.02
+
+
+class BufferLog:
+    """Stand-in for LogOutput without log files."""
+
+    def __init__(self):
+        self.content = []
+        self.error = False
+        self.errorMessage = ""
+
+    def appendOutputToLog(self, content, error=False):
+        self.content.append(content)
+        self.error = self.error or error
+
+    def appendSceneToList(self, scene):
+        self.content.append("Scene to list: " + str(scene))
+
+    def getError(self):
+        return self.error
+
+    def getCurrentErrorMsg(self):
+        return self.errorMessage
+
+    def setCurrentErrorMsg(self, msg):
+        self.errorMessage = msg
+
+
+class RecordingExecutor(SubprocessGptExecutor):
+    """Executes the graphs with the stub gpt and keeps a copy of each fanned out graph."""
+
+    def __init__(self, graphFolder):
+        SubprocessGptExecutor.__init__(self, [sys.executable, STUB_GPT, "-e"])
+        self.graphFolder = graphFolder
+        self.fannedGraphs = []
+
+    def execute(self, xmlFile, gptArgs=None) -> str:
+        if os.path.basename(xmlFile).startswith("fan_out_"):
+            self.fannedGraphs.append(self.graphFolder + "%03d_" % len(self.fannedGraphs) + os.path.basename(xmlFile))
+            shutil.copyfile(xmlFile, self.fannedGraphs[-1])
+        return SubprocessGptExecutor.execute(self, xmlFile, gptArgs)
+
+
+def executeByPyroSar(graphFile):
+    """Returns the error of executing the graph through pyroSAR, None if pyroSAR accepted the graph."""
+    try:
+        from pyroSAR.snap.auxil import Workflow
+    except ImportError:
+        Workflow = None
+
+    if Workflow is not None:
+        try:
+            SubprocessGptExecutor().execute(graphFile)
+        except RuntimeError as e:
+            # #The inputs of the graph are removed and Snap may not be installed, pyroSAR fails after the node lookup
+            return str(e) if "unknown key" in str(e) else None
+        return None
+
+    # #The lookup of pyroSAR's execute: Workflow(xmlfile)['Write'].parameters['file']
+    write = etree.parse(graphFile).getroot().find(".//node[@id='Write']")
+    return None if write is not None and write.findtext("parameters/file") else "KeyError: unknown key: Write"
+
+
+def createAois(amountAois):
+    random.seed(1)
+    aois = {}
+    for i in range(amountAois):
+        lon = 10.5 + random.uniform(-0.03, 0.03)
+        lat = 50.0 + random.uniform(-0.03, 0.03)
+        aois["field_%03d" % i] = box(lon, lat, lon + AOI_SIZE, lat + AOI_SIZE).wkt
+    return aois
+
+
+def processAois(folder, name, scene, aois, shared):
+    outputPath = folder + name + "/"
+    os.makedirs(outputPath)
+    os.environ["STUB_GPT_LOG"] = folder + name + "_operators.txt"
+    processing = SpecificSnapGraphProcessing(XML_FOLDER, outputPath, folder + name + "_scratch/")
+    logObject = BufferLog()
+
+    timeBefore = time.perf_counter()
+    if shared:
+        processing.createSceneScratch()
+        processing.multiSceneProcRadVegIdForAois([scene, OUTPUT_NAME], list(aois), list(aois.values()), outputPath,
+                                                 logObject)
+        processing.removeSceneScratch()
+    else:
+        for areaName, wktAoi in aois.items():
+            processing.createSceneScratch()
+            processing.multiSceneProcRadVegId([scene, OUTPUT_NAME], areaName, wktAoi, outputPath, logObject)
+            processing.removeSceneScratch()
+    seconds = time.perf_counter() - timeBefore
+
+    with open(os.environ["STUB_GPT_LOG"]) as f:
+        operators = Counter(line.strip() for line in f)
+    products = sorted(file for file in os.listdir(outputPath) if file.endswith("_dp.tif"))
+    return seconds, operators, products, logObject
+
+
+def main():
+    amountAois = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    os.environ["STUB_GPT_STARTUP"] = sys.argv[2] if len(sys.argv) > 2 else "0.5"
+    os.environ["STUB_GPT_NODE"] = sys.argv[3] if len(sys.argv) > 3 else "0.2"
+    os.environ["STUB_GPT_GRAPH"] = "0"
+    folder = tempfile.mkdtemp(prefix="multi_aoi_shared_") + "/"
+    os.makedirs(folder + "fanned_graphs/")
+    recordingExecutor = RecordingExecutor(folder + "fanned_graphs/")
+    GptExecutor.setDefault(recordingExecutor)
+
+    try:
+        scene = folder + "S1A_IW_SLC__1SDV_20210101T053000_20210101T053027_035000_041000_A000.SAFE"
+        os.makedirs(scene)
+        aois = createAois(amountAois)
+
+        timePerAoi, operatorsPerAoi, productsPerAoi, logPerAoi = processAois(folder, "per_aoi", scene, aois, False)
+        timeShared, operatorsShared, productsShared, logShared = processAois(folder, "shared", scene, aois, True)
+        pyroSarErrors = [error for error in map(executeByPyroSar, recordingExecutor.fannedGraphs) if error is not None]
+    finally:
+        GptExecutor.setDefault(None)
+        os.environ.pop("STUB_GPT_LOG", None)
+        shutil.rmtree(folder)
+
+    print("Aois: %s, simulated gpt startup: %s sec, %s sec per operator" % (amountAois, os.environ["STUB_GPT_STARTUP"],
+                                                                          os.environ["STUB_GPT_NODE"]))
+    for name, seconds, operators in [("Processing per aoi", timePerAoi, operatorsPerAoi),
+                                     ("Shared processing", timeShared, operatorsShared)]:
+        print("%-19s %.2f sec, %s operator executions: %s" % (name, seconds, sum(operators.values()),
+                                                              dict(sorted(operators.items()))))
+
+    checks = {
+        "products of all aois written": len(productsPerAoi) == amountAois,
+        "same product names": productsShared == productsPerAoi,
+        "scene preprocessed once": operatorsShared["Polarimetric-Speckle-Filter"] == 1 and
+        operatorsShared["Radar-Vegetation-Index"] == 1 and operatorsPerAoi["Polarimetric-Speckle-Filter"] == amountAois,
+        "subset and terrain correction per aoi": operatorsShared["Terrain-Correction"] == amountAois and
+        operatorsShared["Subset"] == amountAois + 1,
+        "fanned out graphs executable by pyroSAR": len(recordingExecutor.fannedGraphs) > 0 and len(pyroSarErrors) == 0,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        print("\n".join(str(line) for line in logPerAoi.content + logShared.content + pyroSarErrors))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        processing_list_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Writes synthetic coherence lists in the JSON lines format of the ProcessingListFile and in the text format of former
+# ----versions and compares reading both. A list written entry by entry in a thread is read while it is written, the
+# ----time until the first entry is compared with waiting for the complete list.
+# ----Execute from the repository folder via "python3 benchmarks/processing_list_benchmark.py <entries> <write delay ms>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.processing_list_file import ProcessingListFile
+from controller_modules.create_input_output import CreateInputOutput
+
+STREAMED_ENTRIES = 20
+
+
+def createEntries(amountEntries):
+    """Coherence entries of sliced and single scenes, as created by CreateInputOutput.generateFileList."""
+    entries = []
+    for i in range(amountEntries):
+        day = 1 + i % 28
+        scenes = ["/codede/Sentinel-1/SAR/IW_SLC__1S/2021/01/%02d/S1A_IW_SLC__1SDV_202101%02dT053%03d_%04X.SAFE" % (
+            day, day, slice, i) for slice in range(1 + i % 2)]
+        pairScenes = [scene.replace("202101%02d" % day, "202102%02d" % day) for scene in scenes]
+        outputName = "202101%02d_202102%02d_S1A_VVVH_117_asc_%04X_%04X_coh6d" % (day, day, i, i + 1)
+        entries.append([", ".join(scenes), ", ".join(pairScenes), outputName])
+    return entries
+
+
+def writeTextList(fileName, entries):
+    """The text list of former versions, one Python list per line."""
+    with open(fileName, "w") as file:
+        for entry in entries:
+            file.write(str(entry) + "\n")
+
+
+def writeSlowly(fileName, entries, delay):
+    with ProcessingListFile(fileName, "coherence_6d") as listFile:
+        for entry in entries:
+            listFile.append(entry)
+            time.sleep(delay)
+
+
+def main():
+    amountEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0) / 1000.0
+    folder = tempfile.mkdtemp(prefix="processing_list_") + "/"
+    entries = createEntries(amountEntries)
+
+    checks = {}
+    try:
+        timeBefore = time.perf_counter()
+        ProcessingListFile.write(folder + "area_SLC_coherence_6d.jsonl", "coherence_6d", entries)
+        timeWriteJson = time.perf_counter() - timeBefore
+        writeTextList(folder + "area_SLC_coherence_6d.txt", entries)
+
+        timeBefore = time.perf_counter()
+        jsonEntries = CreateInputOutput().readFileToList(folder + "area_SLC_coherence_6d.jsonl")
+        timeReadJson = time.perf_counter() - timeBefore
+        timeBefore = time.perf_counter()
+        textEntries = CreateInputOutput().readFileToList(folder + "area_SLC_coherence_6d.txt")
+        timeReadText = time.perf_counter() - timeBefore
+
+        checks["same entries from both formats"] = jsonEntries == entries and textEntries == entries
+        checks["list types from the file names"] = [ProcessingListFile.getListType(name) for name in [
+            "a_GRD_backscatter.jsonl", "a_SLC_polarimetry.jsonl", "a_veg_index.txt", "a_SLC_coherence_12d.txt",
+            "a_coherence_6d.jsonl", "notes.txt"]] == ["backscatter", "polarimetry", "polarimetry", "coherence_12d",
+                                                      "coherence_6d", None]
+
+        # #Scene paths with brackets and quotes are changed by the text format
+        special = [["/data/S1A_IW_GRDH_[copy].SAFE", "20210101_S1A_VVVH_117_asc_0001_BS"],
+                   ["/data/tiles 'A'/S1A_IW_GRDH_2.SAFE, /data/S1A_IW_GRDH_3.SAFE", "20210102_S1A_VVVH_117_asc_0002_BS"]]
+        ProcessingListFile.write(folder + "special_GRD_backscatter.jsonl", "backscatter", special)
+        writeTextList(folder + "special_GRD_backscatter.txt", special)
+        checks["special paths kept by the JSON lines format"] = list(ProcessingListFile.readEntries(
+            folder + "special_GRD_backscatter.jsonl")) == special
+        specialText = list(ProcessingListFile.readEntries(folder + "special_GRD_backscatter.txt"))
+
+        # #A list whose writer crashed within the third record
+        with open(folder + "crashed_GRD_backscatter.jsonl", "w") as file:
+            for entry in special:
+                file.write(json.dumps(ProcessingListFile.toRecord(entry, "backscatter")) + "\n")
+            file.write(json.dumps(ProcessingListFile.toRecord(special[0], "backscatter"))[:40])
+        checks["incomplete last record of a crashed writer skipped"] = list(ProcessingListFile.readEntries(
+            folder + "crashed_GRD_backscatter.jsonl", follow=True, timeout=0.1)) == special
+
+        with open(folder + "special_GRD_backscatter.jsonl") as file:
+            record = ProcessingListFile.toRecord(special[1], "backscatter")
+            checks["explicit fields of a record"] = record["scenes"] == ["/data/tiles 'A'/S1A_IW_GRDH_2.SAFE",
+                                                                         "/data/S1A_IW_GRDH_3.SAFE"] and \
+                record["pairScenes"] == [] and record["metadata"]["relativeOrbit"] == 117 and \
+                record["metadata"]["date"] == "2021-01-02" and len(file.readlines()) == 3
+
+        # #A list read while it is written entry by entry
+        streamed = entries[:STREAMED_ENTRIES]
+        writer = threading.Thread(target=writeSlowly, args=(folder + "stream_coherence_6d.jsonl", streamed, delay))
+        timeBefore = time.perf_counter()
+        writer.start()
+        while not os.path.exists(folder + "stream_coherence_6d.jsonl"):
+            time.sleep(0.001)
+        ProcessingListFile.POLL_INTERVAL = delay / 10.0
+        readTimes = []
+        streamedEntries = []
+        for entry in ProcessingListFile.readEntries(folder + "stream_coherence_6d.jsonl", follow=True, timeout=5.0):
+            readTimes.append(time.perf_counter() - timeBefore)
+            streamedEntries.append(entry)
+        writer.join()
+        timeComplete = time.perf_counter() - timeBefore
+        checks["all entries of the written list read"] = streamedEntries == streamed
+    finally:
+        shutil.rmtree(folder)
+
+    print("Coherence list of %s entries" % amountEntries)
+    print("JSON lines: write %.2f sec, read %.2f sec | text list: read %.2f sec" % (timeWriteJson, timeReadJson,
+                                                                                   timeReadText))
+    print("Text format of the special paths: %s" % specialText)
+    print("List of %s entries written every %.0f ms: first entry after %.3f sec, complete list after %.3f sec" % (
+        STREAMED_ENTRIES, delay * 1000, readTimes[0], timeComplete))
+
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
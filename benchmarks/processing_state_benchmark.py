@@ -0,0 +1,176 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        processing_state_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Processes a synthetic backscatter list with a stand-in processing writing empty final products through the
+# ----ProcessingState: the first run crashes half way in its own process, the second run resumes with a list extended
+# ----by new dates and a third run with the same list only retries the failed entries. Every 50th entry fails.
+# ----The last entry is left running by a run on another host sharing the data path, it must not be taken over.
+# ----Afterwards the time to compute the delta of the whole list against the state is measured.
+# ----Execute from the repository folder via "python3 benchmarks/processing_state_benchmark.py <entries> <seconds per entry>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import gc
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.processing_state import ProcessingState
+
+AREA_NAME = "area"
+OTHER_HOST = "other-host:pid:[4026531836]"
+FAILING_ENTRY = 50
+
+
+class CrashedRun(Exception):
+    pass
+
+
+def createEntries(folder, amountEntries):
+    entries = []
+    for i in range(amountEntries):
+        scene = folder + "scenes/S1A_IW_GRDH_1SDV_%08d.SAFE" % i
+        os.makedirs(scene)
+        open(scene + "/manifest.safe", "w").close()
+        entries.append([scene, "%08d_S1A_VVVH_117_asc_%04X_BS" % (20200101 + i, i)])
+    return entries
+
+
+def processEntry(entry, outputPath, seconds):
+    time.sleep(seconds)
+    number = int(entry[0].split("_")[-1].split(".")[0])
+    if number % FAILING_ENTRY != FAILING_ENTRY - 1:
+        open(outputPath + entry[-1] + "_" + AREA_NAME + ".tif", "w").close()
+
+
+def runWithState(state, entries, outputPath, seconds, crashAfter=None):
+    processed = 0
+    for entry in state.getScheduledEntries("backscatter", entries, AREA_NAME, "", outputPath):
+        if crashAfter is not None and processed == crashAfter:
+            # #The crash leaves a partly written product
+            state.startEntry("backscatter", entry, AREA_NAME, outputPath)
+            with open(outputPath + entry[-1] + "_" + AREA_NAME + ".tif", "w") as product:
+                product.write("partial")
+            raise CrashedRun()
+        state.startEntry("backscatter", entry, AREA_NAME, outputPath)
+        timeBefore = time.perf_counter()
+        processEntry(entry, outputPath, seconds)
+        state.finishEntry("backscatter", entry, AREA_NAME, outputPath, time.perf_counter() - timeBefore)
+        processed = processed + 1
+    return processed
+
+
+def runCrashing(folder, entries, outputPath, seconds, crashAfter):
+    try:
+        runWithState(ProcessingState(folder), entries, outputPath, seconds, crashAfter)
+    except CrashedRun:
+        pass
+
+
+def startOnOtherHost(folder, entry, outputPath, pid):
+    """Records the entry as running on another host with a pid that does not exist on this host, with a partly
+    written product."""
+    outputFile = ProcessingState.getOutputFile("backscatter", entry, AREA_NAME, outputPath)
+    list(ProcessingState(folder).getScheduledEntries("backscatter", [entry], AREA_NAME, "", outputPath))
+    ProcessingState(folder).startEntry("backscatter", entry, AREA_NAME, outputPath)
+    connection = sqlite3.connect(folder + ProcessingState.STATE_FILE)
+    with connection:
+        connection.execute("UPDATE entries SET host = ?, pid = ?, pidStart = ? WHERE outputFile = ?",
+                           (OTHER_HOST, pid, "boot:1", outputFile))
+    connection.close()
+    with open(outputFile, "w") as product:
+        product.write("partial")
+    return outputFile
+
+
+def main():
+    amountEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 0.002
+    folder = tempfile.mkdtemp(prefix="processing_state_") + "/"
+
+    rows = []
+    try:
+        entries = createEntries(folder, amountEntries + amountEntries // 4)
+        firstList = entries[:amountEntries]
+        outputPath = folder + "output/"
+        os.makedirs(outputPath)
+
+        # #Each run uses a new state object like a new run of the processing, the crashed run has its own process
+        crashedAfter = amountEntries // 2
+        crashedRun = multiprocessing.get_context("fork").Process(target=runCrashing, args=(
+            folder, firstList, outputPath, seconds, crashedAfter))
+        crashedRun.start()
+        crashedRun.join()
+        otherHostFile = startOnOtherHost(folder, entries[-1], outputPath, crashedRun.pid)
+        crashedEntry = ProcessingState(folder).getEntry(ProcessingState.getOutputFile("backscatter",
+                                                                                      firstList[crashedAfter],
+                                                                                      AREA_NAME, outputPath))
+
+        for name, runList in [("resumed run, extended list", entries), ("same list again", entries)]:
+            timeBefore = time.perf_counter()
+            processed = runWithState(ProcessingState(folder), runList, outputPath, seconds)
+            if len(rows) == 0:
+                with open(ProcessingState.getOutputFile("backscatter", firstList[crashedAfter], AREA_NAME,
+                                                        outputPath)) as product:
+                    partialReplaced = product.read() == ""
+                with open(otherHostFile) as product:
+                    otherHostKept = product.read() == "partial"
+            rows.append((name, processed, time.perf_counter() - timeBefore))
+        counts = ProcessingState(folder).getStatusCounts("backscatter", AREA_NAME)
+        otherHostEntry = ProcessingState(folder).getEntry(otherHostFile)
+
+        # #The delta of a list of done entries only
+        for entry in entries:
+            if not os.path.exists(outputPath + entry[-1] + "_" + AREA_NAME + ".tif"):
+                open(outputPath + entry[-1] + "_" + AREA_NAME + ".tif", "w").close()
+        timeBefore = time.perf_counter()
+        scheduledDone = list(ProcessingState(folder).getScheduledEntries("backscatter", entries, AREA_NAME, "",
+                                                                         outputPath))
+        timeDelta = time.perf_counter() - timeBefore
+    finally:
+        # #The sqlite connections of the state objects are reference cycles, they are closed before their files are
+        # #removed
+        gc.collect()
+        shutil.rmtree(folder)
+
+    amountFailing = sum(1 for i in range(len(entries) - 1) if i % FAILING_ENTRY == FAILING_ENTRY - 1)
+    failingBeforeCrash = sum(1 for i in range(crashedAfter) if i % FAILING_ENTRY == FAILING_ENTRY - 1)
+
+    print("List of %s entries extended by %s entries, %.3f sec per processed entry, every %sth entry fails" % (
+        amountEntries, len(entries) - amountEntries, seconds, FAILING_ENTRY))
+    print("First run crashed after %s entries" % crashedAfter)
+    for name, processed, runSeconds in rows:
+        print("%-27s %5s of %s entries processed, %.2f sec" % (name, processed, len(entries), runSeconds))
+    print("Final state: %s" % counts)
+    print("Delta of %s entries without scheduled entries: %.3f sec, %.3f ms per entry" % (
+        len(entries), timeDelta, timeDelta / len(entries) * 1000))
+
+    checks = {
+        "crashed entry left running": crashedEntry is not None and crashedEntry["status"] == ProcessingState.RUNNING,
+        "partial product of the crashed entry replaced": partialReplaced,
+        "entry running on another host kept": otherHostKept and otherHostEntry["status"] == ProcessingState.RUNNING,
+        "resumed at the first unfinished entry": rows[0][1] == len(entries) - 1 - crashedAfter + failingBeforeCrash,
+        "only failed entries retried": rows[1][1] == amountFailing,
+        "state of all entries": counts.get(ProcessingState.DONE) == len(entries) - 1 - amountFailing and
+        counts.get(ProcessingState.FAILED) == amountFailing and counts.get(ProcessingState.RUNNING) == 1,
+        "nothing scheduled once all products exist": scheduledDone == [],
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        raster_post_processing_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Applies the post processing steps nodata, aoiMask and dB to synthetic terrain corrected backscatter GeoTIFFs of
+# ----growing size, once block by block with the RasterPostProcessing and once with the whole product read into memory.
+# ----Each product is processed in a new process, the peak memory of the process is compared.
+# ----Afterwards a folder of products is processed with one and with several workers.
+# ----Execute from the repository folder via "python3 benchmarks/raster_post_processing_benchmark.py <max size> <workers>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import transform_geom
+from shapely import wkt, geometry
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.raster_post_processing import RasterPostProcessing
+
+STEPS = ["nodata", "aoiMask", "dB"]
+PIXEL_SIZE = 10.0
+EASTING = 500000.0
+NORTHING = 5600000.0
+
+
+def createProduct(file, size):
+    random = np.random.default_rng(size)
+    profile = {"driver": "GTiff", "dtype": "float32", "count": 2, "width": size, "height": size, "crs": "EPSG:25832",
+               "transform": from_origin(EASTING, NORTHING, PIXEL_SIZE, PIXEL_SIZE)}
+
+    # #Striped and uncompressed like the GeoTIFF writer of Snap, zero outside of the rotated scene
+    with rasterio.open(file, "w", **profile) as target:
+        for firstLine in range(0, size, 512):
+            lines = min(512, size - firstLine)
+            line, sample = np.mgrid[firstLine:firstLine + lines, 0:size]
+            inside = (sample > 0.1 * (size - line)) & (sample < size - 0.1 * line)
+            values = random.gamma(2.0, 0.05, (2, lines, size)).astype(np.float32) * inside
+            target.write(values, window=rasterio.windows.Window(0, firstLine, size, lines))
+
+
+def getAoi(size):
+    """Rotated square within the product, in wkt of lon, lat as the aoi of the user settings. The corners are not on
+    pixel centers, so the mask does not depend on the rounding of the pixel positions."""
+    center = size * PIXEL_SIZE / 2.0 + PIXEL_SIZE / 3.0
+    half = size * PIXEL_SIZE * 0.3
+    corners = [(center, center - half), (center + half, center), (center, center + half), (center - half, center)]
+    aoi = geometry.Polygon([(EASTING + x, NORTHING - y) for x, y in corners])
+    return geometry.shape(transform_geom("EPSG:25832", "EPSG:4326", geometry.mapping(aoi))).wkt
+
+
+def getPeakMemory():
+    """Peak resident memory of the process in MB. Unlike ru_maxrss it does not include the parent process."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def processStreamed(product, wktAoi):
+    timeBefore = time.perf_counter()
+    RasterPostProcessing.processProduct(product, STEPS, wktAoi, float("nan"), RasterPostProcessing.BLOCK_PIXELS)
+    return time.perf_counter() - timeBefore, getPeakMemory()
+
+
+def processInMemory(product, wktAoi):
+    """The whole product is read, processed and written at once."""
+    timeBefore = time.perf_counter()
+    with rasterio.open(product) as source:
+        values = source.read().astype(np.float32)
+        valid = np.ones(values.shape, dtype=bool)
+        context = {"aoi": transform_geom("EPSG:4326", source.crs, geometry.mapping(wkt.loads(wktAoi))),
+                   "transform": source.transform}
+        for step in STEPS:
+            values, valid = getattr(RasterPostProcessing, RasterPostProcessing.STEPS[step])(values, valid, context)
+        values[~valid] = np.nan
+        profile = source.profile.copy()
+        profile.update(nodata=float("nan"))
+    with rasterio.open(product[:-len(".tif")] + "_memory.tif", "w", **profile) as target:
+        target.write(values)
+    return time.perf_counter() - timeBefore, getPeakMemory()
+
+
+def runInNewProcess(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def isEqual(streamed, inMemory):
+    with rasterio.open(streamed) as first, rasterio.open(inMemory) as second:
+        # #The streamed product is clipped to the aoi window
+        window = rasterio.windows.from_bounds(*first.bounds, transform=second.transform).round_offsets().round_lengths()
+        valuesFirst = first.read()
+        valuesSecond = second.read(window=window)
+        outside = np.ones(second.shape, dtype=bool)
+        outside[int(window.row_off):int(window.row_off + window.height),
+                int(window.col_off):int(window.col_off + window.width)] = False
+        return valuesFirst.shape == valuesSecond.shape and np.allclose(valuesFirst, valuesSecond, equal_nan=True) \
+            and np.isnan(second.read(1)[outside]).all()
+
+
+def main():
+    maxSize = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    folder = tempfile.mkdtemp(prefix="raster_post_processing_") + "/"
+    sizes = [maxSize // 4, maxSize // 2, maxSize]
+
+    rows = []
+    equal = True
+    try:
+        for size in sizes:
+            product = folder + "backscatter_%s.tif" % size
+            createProduct(product, size)
+            wktAoi = getAoi(size)
+            timeMemory, rssMemory = runInNewProcess(processInMemory, product, wktAoi)
+            timeStreamed, rssStreamed = runInNewProcess(processStreamed, product, wktAoi)
+            equal = equal and isEqual(product, product[:-len(".tif")] + "_memory.tif")
+            rows.append((size, timeMemory, rssMemory, timeStreamed, rssStreamed))
+
+        # #A folder of products of the medium size of the area field1 and a product of the area field10
+        productsFolder = folder + "products/"
+        os.makedirs(productsFolder)
+        for i in range(2 * workers):
+            createProduct(productsFolder + "202101%02d_S1A_VVVH_117_asc_BS_field1.tif" % (i + 1), maxSize // 2)
+        createProduct(productsFolder + "20210101_S1A_VVVH_117_asc_BS_field10.tif", 64)
+        timesFolder = []
+        for amountWorkers in [1, workers]:
+            for file in os.listdir(productsFolder):
+                with rasterio.open(productsFolder + file, "r+") as product:
+                    product.update_tags(**{RasterPostProcessing.TAG: ""})
+            timeBefore = time.perf_counter()
+            written = RasterPostProcessing(["nodata", "dB"], amountWorkers).processFolder(productsFolder,
+                                                                                          areaName="field1")
+            timesFolder.append((amountWorkers, time.perf_counter() - timeBefore, written))
+        skipped = RasterPostProcessing(["nodata", "dB"], workers).processFolder(productsFolder, areaName="field1")
+        with rasterio.open(productsFolder + "20210101_S1A_VVVH_117_asc_BS_field10.tif") as product:
+            otherAreaProcessed = product.tags().get(RasterPostProcessing.TAG, "") != ""
+    finally:
+        shutil.rmtree(folder)
+
+    print("Steps: %s, block: %s pixels per band" % (",".join(STEPS), RasterPostProcessing.BLOCK_PIXELS))
+    for size, timeMemory, rssMemory, timeStreamed, rssStreamed in rows:
+        print("%s x %s x 2 bands: whole product %.2f sec, peak %.0f MB | blocks %.2f sec, peak %.0f MB" % (
+            size, size, timeMemory, rssMemory, timeStreamed, rssStreamed))
+    for amountWorkers, seconds, written in timesFolder:
+        print("Folder of %s products with %s workers: %.2f sec" % (written, amountWorkers, seconds))
+
+    checks = {
+        "same values as the whole product": equal,
+        "peak memory independent of the product size": rows[-1][4] < rows[0][4] * 1.5,
+        "all products of the folder written": all(written == 2 * workers for _, _, written in timesFolder),
+        "steps not applied twice": skipped == 0,
+        "products of other areas not processed": not otherAreaProcessed,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
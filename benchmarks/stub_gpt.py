@@ -0,0 +1,152 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        stub_gpt
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Stand-in for the Snap gpt to test the graph executors without a Snap installation.
+# ----"python3 stub_gpt.py -e <graph.xml>" executes one graph like a gpt call.
+# ----"python3 stub_gpt.py --worker" runs as graph processing worker of the WarmGptWorkerPool (see SnapGraphWorker).
+# ----The startup of the JVM is simulated by a delay of STUB_GPT_STARTUP sec, each graph takes STUB_GPT_GRAPH sec and
+# ----STUB_GPT_NODE sec per node other than Read and Write. With STUB_GPT_LOG set the operator of each of these nodes is
+# ----appended to the given file.
+# ----"python3 stub_gpt.py -e <gpt arguments> <graph.xml>" takes the heap of "-J-Xmx<size>M". A graph uses the memory
+# ----of its operators given by STUB_GPT_MEMORY, e.g. "Terrain-Flattening:300,Subset:40" in MB. A graph needing more
+# ----than the heap fails with an OutOfMemoryError once the heap is used. With STUB_GPT_RAM set, the processes
+# ----register their memory in the folder STUB_GPT_RAM_FOLDER and a process exceeding the simulated RAM of STUB_GPT_RAM
+# ----MB together with the running processes ends like one killed by the OOM killer.
+# ----A graph writes the text "processed" to the file of each Write node. Write files without extension are written as
+# ----BEAM-DIMAP product: a .dim header with burst indices and a .data folder with a band file of STUB_GPT_SIZE bytes.
+# ----The burst indices are taken from the TOPSAR-Split node, a split by wktAoi selects the bursts STUB_GPT_AOI_BURSTS.
+# ----A graph containing a node with the id "Fail" fails,
+# ----a graph containing a node with the id "Crash" ends the process.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.snap_graph_worker import SnapGraphWorker
+
+
+def executeGraph(xmlFile, gptArgs=()):
+    root = etree.parse(xmlFile).getroot()
+    if len(root.xpath("//node[@id = 'Crash']")) > 0:
+        os._exit(137)
+    if len(root.xpath("//node[@id = 'Fail']")) > 0:
+        raise RuntimeError("Operator 'Fail' failed")
+
+    operators = [node.findtext("operator") for node in root.findall("node")
+                 if node.findtext("operator") not in ["Read", "Write"]]
+    memory = dict((entry.split(":")[0], int(entry.split(":")[1]))
+                  for entry in os.environ.get("STUB_GPT_MEMORY", "").split(",") if ":" in entry)
+    needed = sum(memory.get(operator, 0) for operator in operators)
+    heap = next((int(arg[len("-J-Xmx"):-1]) for arg in gptArgs if arg.startswith("-J-Xmx") and arg.endswith("M")),
+                None)
+    used = min(needed, heap) if heap is not None else needed
+
+    # #The memory is held while the operators are executed
+    with simulatedRam(used):
+        ballast = b"\1" * (used * 1024 ** 2)
+        time.sleep(float(os.environ.get("STUB_GPT_GRAPH", "0.1")) +
+                   float(os.environ.get("STUB_GPT_NODE", "0")) * len(operators))
+        if heap is not None and needed > heap:
+            raise RuntimeError("java.lang.OutOfMemoryError: Java heap space")
+        del ballast
+    if os.environ.get("STUB_GPT_LOG"):
+        with open(os.environ["STUB_GPT_LOG"], "a") as f:
+            f.write("".join(operator + "\n" for operator in operators))
+
+    for outputFile in root.xpath("//node[operator = 'Write']/parameters/file/text()"):
+        writeProduct(root, outputFile)
+    print("Executed graph " + os.path.basename(xmlFile))
+
+
+def writeProduct(root, outputFile):
+    if os.path.splitext(outputFile)[1] != "":
+        with open(outputFile, "w") as f:
+            f.write("processed")
+    else:
+        name = os.path.basename(outputFile)
+        burstIndices = getBurstIndices(root)
+        with open(outputFile + ".dim", "w") as f:
+            f.write("<Dimap_Document><DATA_FILE_PATH href=\"" + name + ".data/band.hdr\"/>"
+                    "<MDATTR name=\"firstBurstIndex\">" + burstIndices[0] + "</MDATTR>"
+                    "<MDATTR name=\"lastBurstIndex\">" + burstIndices[1] + "</MDATTR></Dimap_Document>")
+        os.makedirs(outputFile + ".data", exist_ok=True)
+        with open(outputFile + ".data/band.img", "wb") as f:
+            f.write(b"\0" * int(os.environ.get("STUB_GPT_SIZE", "1024")))
+
+
+class simulatedRam:
+    """Registers the memory of the process in the simulated RAM while the graph is executed."""
+
+    def __init__(self, megabytes):
+        self.folder = os.environ.get("STUB_GPT_RAM_FOLDER")
+        self.file = os.path.join(self.folder, str(os.getpid())) if self.folder and os.environ.get("STUB_GPT_RAM") \
+            else None
+        self.megabytes = megabytes
+
+    def __enter__(self):
+        if self.file is None:
+            return self
+        with open(self.file, "w") as f:
+            f.write(str(self.megabytes))
+        inUse = 0
+        for name in os.listdir(self.folder):
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    inUse = inUse + int(f.read() or 0)
+            except (OSError, ValueError):
+                continue
+        if inUse > int(os.environ["STUB_GPT_RAM"]):
+            os.remove(self.file)
+            print("Killed: %s MB in use of %s MB" % (inUse, os.environ["STUB_GPT_RAM"]))
+            sys.stdout.flush()
+            os._exit(137)
+        return self
+
+    def __exit__(self, *args):
+        if self.file is not None and os.path.exists(self.file):
+            os.remove(self.file)
+
+
+def getBurstIndices(root):
+    split = root.xpath("//node[operator = 'TOPSAR-Split']/parameters")
+    if len(split) == 0:
+        return ["1", "3"]
+    if (split[0].findtext("wktAoi") or "") != "":
+        return os.environ.get("STUB_GPT_AOI_BURSTS", "1,3").split(",")
+    return [split[0].findtext("firstBurstIndex") or "1", split[0].findtext("lastBurstIndex") or "3"]
+
+
+def main():
+    time.sleep(float(os.environ.get("STUB_GPT_STARTUP", "2.0")))
+
+    if len(sys.argv) > 2 and sys.argv[1] == "-e":
+        try:
+            executeGraph(sys.argv[-1], sys.argv[2:-1])
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+        return
+
+    SnapGraphWorker.reportReady()
+    for line in sys.stdin:
+        if line.strip() == "":
+            continue
+        try:
+            executeGraph(line.strip())
+            SnapGraphWorker.reportDone()
+        except RuntimeError as e:
+            SnapGraphWorker.reportDone(e)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        subswath_fan_out_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Processes the coherence of a scene pair spanning three subswaths with the checked-in graphs and the stub gpt,
+# ----once with the subswaths one after another and once with concurrent subswath branches joined before the merge.
+# ----The branches must share the split store of the processing instead of creating one each, the store is removed
+# ----with the scene scratch.
+# ----Execute from the repository folder via "python3 benchmarks/subswath_fan_out_benchmark.py <startup sec> <graph sec>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+from controller_modules.specific_snap_graph_processing import SpecificSnapGraphProcessing
+
+STUB_GPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_gpt.py")
+XML_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "sentinel_docker_process/processing_tool/Sentinel-1-SLC-process/snap_graph_files/")
+SUBSWATHS = ["IW3", "IW2", "IW1"]
+
+
+class BufferLog:
+    """Stand-in for LogOutput without log files."""
+
+    def __init__(self):
+        self.content = []
+        self.error = False
+        self.errorMessage = ""
+
+    def appendOutputToLog(self, content, error=False):
+        self.content.append(content)
+        self.error = self.error or error
+
+    def appendSceneToList(self, scene):
+        self.content.append("Scene to list: " + str(scene))
+
+    def getError(self):
+        return self.error
+
+    def getCurrentErrorMsg(self):
+        return self.errorMessage
+
+    def setCurrentErrorMsg(self, msg):
+        self.errorMessage = msg
+
+    def createBranch(self):
+        return BufferLog()
+
+    def appendBranch(self, branch):
+        self.content.extend(branch.content)
+        if branch.error:
+            self.error = True
+            self.errorMessage = branch.errorMessage
+
+
+def processPair(folder, scenes, subswathBranches):
+    processing = SpecificSnapGraphProcessing(XML_FOLDER, folder, folder + "scratch_%s/" % subswathBranches,
+                                             subswathBranches=subswathBranches)
+    processing.createSceneScratch()
+    logObject = BufferLog()
+
+    timeBefore = time.perf_counter()
+    success = processing.setAndProcessCoherence(scenes[0], scenes[1], "coh_%s" % subswathBranches, SUBSWATHS,
+                                                folder, logObject)
+    seconds = time.perf_counter() - timeBefore
+    splitStores = getSplitStores(processing)
+    processing.removeSceneScratch()
+
+    success = success and not logObject.getError() and os.path.exists(folder + "coh_%s.dim" % subswathBranches)
+    return seconds, success, logObject, splitStores, getSplitStores(processing)
+
+
+def getSplitStores(processing):
+    return [name for name in os.listdir(processing.scratchRoot) if name.startswith("split_orbit_")]
+
+
+def main():
+    os.environ["STUB_GPT_STARTUP"] = sys.argv[1] if len(sys.argv) > 1 else "1.0"
+    os.environ["STUB_GPT_GRAPH"] = sys.argv[2] if len(sys.argv) > 2 else "1.0"
+    folder = tempfile.mkdtemp(prefix="subswath_fan_out_") + "/"
+    GptExecutor.setDefault(SubprocessGptExecutor([sys.executable, STUB_GPT, "-e"]))
+
+    try:
+        scenes = []
+        for date in ["20200101", "20200107"]:
+            scene = folder + "S1A_IW_SLC__1SDV_" + date + "T053000_" + date + "T053027_030000_038000_A000.SAFE"
+            os.makedirs(scene)
+            scenes.append(scene)
+
+        timeSerial, successSerial, logSerial, storesSerial, leftSerial = processPair(folder, scenes, 1)
+        timeBranches, successBranches, logBranches, storesBranches, leftBranches = processPair(folder, scenes, 3)
+    finally:
+        GptExecutor.setDefault(None)
+        shutil.rmtree(folder)
+
+    print("Subswaths: %s, simulated gpt startup: %s sec, graph: %s sec" % (len(SUBSWATHS), os.environ["STUB_GPT_STARTUP"],
+                                                                        os.environ["STUB_GPT_GRAPH"]))
+    print("Subswaths one after another: %.2f sec" % timeSerial)
+    print("Concurrent subswath branches: %.2f sec" % timeBranches)
+
+    checks = {
+        "serial coherence written": successSerial,
+        "branched coherence written": successBranches,
+        "branch logs joined": all(any("subswath " + subswath in line for line in logBranches.content)
+                                  for subswath in SUBSWATHS),
+        "one split store shared by the branches": len(storesSerial) == 1 and len(storesBranches) == 1,
+        "split store removed with the scene scratch": leftSerial == leftBranches == [],
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        print("\n".join(logSerial.content + logBranches.content))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        subswath_footprint_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Classifies random aois against the subswaths of a synthetic IW SLC product, once with the subswaths approximated by
+# ----thirds of the scene footprint and once with the burst footprints of the annotation geolocation grids.
+# ----The subswaths of the synthetic product have different widths, overlap each other and their bursts are shifted in
+# ----azimuth, like in real products. A subswath classified as overlapping without overlapping any burst launches a
+# ----TOPSAR-Split run failing with "wktAOI does not overlap any burst", a missed subswath loses data.
+# ----Execute from the repository folder via "python3 benchmarks/subswath_footprint_benchmark.py <amount aois> <aoi km>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import math
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import Polygon, box
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.geo_position import GeoPosition
+
+LAT0 = 50.0
+LON0 = 10.0
+HEADING = math.radians(-12.0)
+LINES_PER_BURST = 1500
+BURST_KM = 20.0
+BURSTS = 9
+PIXELS = 21
+
+# #Subswath: near range km, far range km, azimuth shift km of the first burst
+SUBSWATHS = {"IW1": (0.0, 88.0, 0.0), "IW2": (80.0, 168.0, 7.0), "IW3": (160.0, 250.0, 14.0)}
+
+
+def toLonLat(x, y):
+    """Across track x and along track y in km to lon, lat. The swath edges are slightly bent, like a real grid."""
+    y = y + 0.00003 * x ** 2
+    east = x * math.cos(HEADING) + y * math.sin(HEADING)
+    north = -x * math.sin(HEADING) + y * math.cos(HEADING)
+    return LON0 + east / (111.32 * math.cos(math.radians(LAT0))), LAT0 + north / 110.57
+
+
+def getSwathPoint(subswath, line, column):
+    near, far, shift = SUBSWATHS[subswath]
+    return toLonLat(near + (far - near) * column / (PIXELS - 1), shift + BURST_KM * line / LINES_PER_BURST)
+
+
+def getTrueBursts(subswath):
+    bursts = []
+    for k in range(BURSTS):
+        row1 = [getSwathPoint(subswath, k * LINES_PER_BURST, column) for column in range(PIXELS)]
+        row2 = [getSwathPoint(subswath, (k + 1) * LINES_PER_BURST, column) for column in range(PIXELS)]
+        bursts.append(Polygon(row1 + row2[::-1]))
+    return bursts
+
+
+def createProduct(folder, withAnnotation, date="20200101"):
+    product = folder + "S1A_IW_SLC__1SDV_%sT053000_%sT053027_030000_038000_A00%s.SAFE" % (date, date,
+                                                                                         int(withAnnotation))
+    os.makedirs(product + "/annotation/")
+
+    # #Scene corners in the order of the manifest: near first line, far first line, far last line, near last line
+    lastY = BURSTS * BURST_KM
+    corners = [toLonLat(0.0, 0.0), toLonLat(250.0, 14.0), toLonLat(250.0, 14.0 + lastY), toLonLat(0.0, lastY)]
+    coordinates = " ".join("%.6f,%.6f" % (lat, lon) for lon, lat in corners)
+    with open(product + "/manifest.safe", "w") as f:
+        f.write("<xfdu:XFDU xmlns:xfdu=\"urn:ccsds:schema:xfdu:1\" xmlns:safe=\"http://www.esa.int/safe/sentinel-1.0\" "
+                "xmlns:gml=\"http://www.opengis.net/gml\" "
+                "xmlns:s1sarl1=\"http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1\"><metadataSection>"
+                "<safe:footPrint><gml:coordinates>" + coordinates + "</gml:coordinates></safe:footPrint>"
+                "<s1sarl1:transmitterReceiverPolarisation>VV</s1sarl1:transmitterReceiverPolarisation>"
+                "</metadataSection></xfdu:XFDU>")
+
+    if not withAnnotation:
+        return product
+
+    # #The grid lines are not aligned to the burst boundaries, the catalog interpolates them
+    gridLines = [round(i * BURSTS * LINES_PER_BURST / 10.0) for i in range(11)]
+    for subswath in SUBSWATHS:
+        points = ""
+        for line in gridLines:
+            for column in range(PIXELS):
+                lon, lat = getSwathPoint(subswath, line, column)
+                points += ("<geolocationGridPoint><line>%s</line><pixel>%s</pixel><latitude>%.8f</latitude>"
+                           "<longitude>%.8f</longitude></geolocationGridPoint>" % (line, column * 1000, lat, lon))
+
+        with open(product + "/annotation/s1a-" + subswath.lower() + "-slc-vv-" + date + "t053000.xml", "w") as f:
+            f.write("<product><adsHeader><swath>" + subswath + "</swath></adsHeader><swathTiming><linesPerBurst>" +
+                    str(LINES_PER_BURST) + "</linesPerBurst><burstList count=\"" + str(BURSTS) + "\">" +
+                    "<burst/>" * BURSTS + "</burstList></swathTiming><geolocationGrid><geolocationGridPointList>" +
+                    points + "</geolocationGridPointList></geolocationGrid></product>")
+    return product
+
+
+def classify(product, aois):
+    """Returns per aoi the overlap flags of IW3, IW2, IW1 in the same way as the coherence processing."""
+    swBursts = GeoPosition().swBurstPolygonsFromScene(product + "/manifest.safe")
+    if swBursts is None:
+        swBursts = [[polygon] for polygon in GeoPosition().swMultiPolygonFromScene(product + "/manifest.safe")]
+    return [[any(burst.intersects(aoi) for burst in swBursts[i]) for i in range(3)] for aoi in aois]
+
+
+def countErrors(result, truth):
+    failedSplits = sum(1 for flags, trueFlags in zip(result, truth) for i in range(3) if flags[i] and not trueFlags[i])
+    missedSubswaths = sum(1 for flags, trueFlags in zip(result, truth) for i in range(3) if trueFlags[i] and not flags[i])
+    return failedSplits, missedSubswaths
+
+
+def main():
+    amountAois = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    aoiKm = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    folder = tempfile.mkdtemp(prefix="subswath_footprint_") + "/"
+    random.seed(1)
+
+    try:
+        productThirds = createProduct(folder, False)
+        productBursts = createProduct(folder, True)
+        SceneCatalog.setDefaultLocation(folder)
+
+        trueBursts = [getTrueBursts(subswath) for subswath in ["IW3", "IW2", "IW1"]]
+        bounds = Polygon([toLonLat(-10.0, -10.0), toLonLat(260.0, 4.0), toLonLat(260.0, 204.0),
+                          toLonLat(-10.0, 190.0)]).bounds
+        sizeLon = aoiKm / (111.32 * math.cos(math.radians(LAT0)))
+        sizeLat = aoiKm / 110.57
+        aois = []
+        for i in range(amountAois):
+            lon = random.uniform(bounds[0], bounds[2])
+            lat = random.uniform(bounds[1], bounds[3])
+            aois.append(box(lon, lat, lon + sizeLon, lat + sizeLat))
+        truth = [[any(burst.intersects(aoi) for burst in trueBursts[i]) for i in range(3)] for aoi in aois]
+
+        timeBefore = time.perf_counter()
+        resultThirds = classify(productThirds, aois)
+        timeThirds = time.perf_counter() - timeBefore
+
+        timeBefore = time.perf_counter()
+        resultBursts = classify(productBursts, aois)
+        timeBursts = time.perf_counter() - timeBefore
+
+        # #A following run reads the burst boundaries from the catalog database
+        SceneCatalog.setDefaultLocation(folder)
+        timeBefore = time.perf_counter()
+        resultStored = classify(productBursts, aois)
+        timeStored = time.perf_counter() - timeBefore
+    finally:
+        SceneCatalog.setDefaultLocation(None)
+        shutil.rmtree(folder)
+
+    candidates = sum(1 for flags in truth for flag in flags if flag)
+    thirdsErrors = countErrors(resultThirds, truth)
+    burstErrors = countErrors(resultBursts, truth)
+    print("Aois: %s of %s km, subswaths overlapping a burst: %s" % (amountAois, aoiKm, candidates))
+    print("Scene thirds: %.3f sec, %s failing TOPSAR-Split runs, %s missed subswaths" % (
+        timeThirds, thirdsErrors[0], thirdsErrors[1]))
+    print("Burst footprints: %.3f sec (%.3f sec from the catalog database), %s failing TOPSAR-Split runs, "
+          "%s missed subswaths" % (timeBursts, timeStored, burstErrors[0], burstErrors[1]))
+
+    checks = {
+        "no split launched without burst overlap": burstErrors[0] == 0,
+        "no subswath missed": burstErrors[1] == 0,
+        "stored footprints equal the parsed ones": resultStored == resultBursts,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        time_series_cube_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Appends synthetic backscatter GeoTIFFs of one relative orbit to a time series cube with the TimeSeriesCube, in two
+# ----runs with a crashed append in between, and compares reading the time series of random pixels and parcels from the
+# ----cube and from the GeoTIFFs. One product is shifted by a pixel, so it is warped to the grid of the cube.
+# ----Execute from the repository folder via "python3 benchmarks/time_series_cube_benchmark.py <products> <size>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import random
+import tempfile
+import numpy as np
+import rasterio
+import zarr
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controller_modules.time_series_cube import TimeSeriesCube
+from raster_post_processing_benchmark import createProduct, PIXEL_SIZE
+
+AMOUNT_READS = 100
+PARCEL_SIZE = 32
+
+
+def createProducts(folder, amountProducts, size):
+    products = []
+    for i in range(amountProducts):
+        date = (np.datetime64("2020-01-01") + np.timedelta64(12 * i, "D")).astype(str).replace("-", "")
+        products.append(folder + "%s_S1A_VVVH_117_asc_A%03d_BS_area.tif" % (date, i))
+        createProduct(products[-1], size)
+        with rasterio.open(products[-1], "r+") as product:
+            product.nodata = 0.0
+            product.write(product.read() * (i + 1))
+
+    # #The last product starts one pixel further east
+    with rasterio.open(products[-1], "r+") as product:
+        product.transform = product.transform * rasterio.Affine.translation(1, 0)
+    return products
+
+
+def readFromProducts(products, windows):
+    """The time series of each window with a new dataset per product, as done for single files."""
+    series = []
+    for window in windows:
+        values = []
+        for product in products:
+            with rasterio.open(product) as source:
+                values.append(source.read(1, window=window, masked=True).filled(np.nan))
+        series.append(np.stack(values))
+    return series
+
+
+def readFromCube(cube, windows):
+    values = zarr.open_group(cube, mode="r")["values"]
+    return [values[:, 0, int(window.row_off):int(window.row_off + window.height),
+                   int(window.col_off):int(window.col_off + window.width)] for window in windows]
+
+
+def getReadBytes():
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("rchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measureReads(function, *args):
+    bytesBefore = getReadBytes()
+    timeBefore = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - timeBefore, getReadBytes() - bytesBefore, result
+
+
+def main():
+    amountProducts = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    folder = tempfile.mkdtemp(prefix="time_series_cube_") + "/"
+    random.seed(1)
+    pixels = [Window(random.randrange(size - 1), random.randrange(size - 1), 1, 1) for i in range(AMOUNT_READS)]
+    parcels = [Window(random.randrange(size - PARCEL_SIZE), random.randrange(size - PARCEL_SIZE), PARCEL_SIZE,
+                      PARCEL_SIZE) for i in range(AMOUNT_READS)]
+
+    checks = {}
+    try:
+        outputFolder = folder + "backscatter/"
+        os.makedirs(outputFolder)
+        products = createProducts(outputFolder, amountProducts, size)
+        # #A product of the area area10 in the same output folder
+        createProduct(outputFolder + "20200107_S1A_VVVH_117_asc_BS_area10.tif", size)
+        cube = folder + "cube/BS_117.zarr"
+
+        # #First run with the first half of the products, then a crashed append of garbage after the stored length
+        half = folder + "half/"
+        os.makedirs(half)
+        for product in products[:amountProducts // 2]:
+            os.symlink(product, half + os.path.basename(product))
+        timeBefore = time.perf_counter()
+        appendedFirst = TimeSeriesCube(folder + "cube/").processFolder(half, areaName="area")
+        group = zarr.open_group(cube, mode="a")
+        length = group.attrs["length"]
+        group["values"].resize(length + 3, *group["values"].shape[1:])
+        group["values"][length:length + 3] = -1.0
+
+        appendedSecond = TimeSeriesCube(folder + "cube/").processFolder(outputFolder, areaName="area")
+        timeAppend = time.perf_counter() - timeBefore
+        appendedAgain = TimeSeriesCube(folder + "cube/").processFolder(outputFolder, areaName="area")
+
+        group = zarr.open_group(cube, mode="r")
+        checks["all products appended once"] = appendedFirst == amountProducts // 2 and \
+            appendedSecond == amountProducts - amountProducts // 2 and appendedAgain == 0 and \
+            group.attrs["length"] == amountProducts and group["values"].shape[0] == amountProducts and \
+            group.attrs["sources"] == [os.path.basename(product) for product in products]
+        firstDay = TimeSeriesCube.getDays(TimeSeriesCube.EPOCH.replace(year=2020))
+        checks["products of other areas not appended"] = not any(source.endswith("_area10.tif")
+                                                                 for source in group.attrs["sources"])
+        checks["time from the output names"] = group["time"][:].tolist() == [firstDay + 12 * i
+                                                                            for i in range(amountProducts)]
+        checks["crashed append overwritten"] = not (group["values"][:] == -1.0).any()
+
+        # #The shifted product is warped to the grid of the cube
+        with rasterio.open(products[-1]) as source:
+            shifted = source.read(1, masked=True).filled(np.nan)
+        checks["shifted product on the grid of the cube"] = np.array_equal(
+            group["values"][-1, 0, :, 1:], shifted[:, :-1], equal_nan=True) and np.isnan(
+            group["values"][-1, 0, :, 0]).all()
+
+        rows = []
+        for name, windows in [("pixel", pixels), ("parcel %sx%s" % (PARCEL_SIZE, PARCEL_SIZE), parcels)]:
+            timeProducts, bytesProducts, seriesProducts = measureReads(readFromProducts, products[:-1], windows)
+            timeCube, bytesCube, seriesCube = measureReads(readFromCube, cube, windows)
+            rows.append((name, timeProducts, bytesProducts, timeCube, bytesCube))
+            checks["same %s time series" % name] = all(
+                np.array_equal(first, second[:-1], equal_nan=True) for first, second in zip(seriesProducts,
+                                                                                             seriesCube))
+        cubeSize = sum(os.path.getsize(os.path.join(root, file)) for root, dirs, files in os.walk(cube)
+                       for file in files)
+        productsSize = sum(os.path.getsize(product) for product in products)
+    finally:
+        shutil.rmtree(folder)
+
+    print("Products: %s of %s x %s x 2 bands, %.0f m pixels, chunks %s time steps x %s x %s pixels" % (
+        amountProducts, size, size, PIXEL_SIZE, TimeSeriesCube.TIME_CHUNK, TimeSeriesCube.SPATIAL_CHUNK,
+        TimeSeriesCube.SPATIAL_CHUNK))
+    print("Append: %.2f sec in two runs, cube %.1f MB, GeoTIFFs %.1f MB" % (timeAppend, cubeSize / 1024 ** 2,
+                                                                            productsSize / 1024 ** 2))
+    for name, timeProducts, bytesProducts, timeCube, bytesCube in rows:
+        print("%s series of %s products, %s reads: GeoTIFFs %.2f sec, %.1f MB | cube %.2f sec, %.1f MB" % (
+            name, amountProducts - 1, AMOUNT_READS, timeProducts, bytesProducts / 1024 ** 2, timeCube,
+            bytesCube / 1024 ** 2))
+
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        zonal_statistics_benchmark
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----Computes the statistics of random field parcels for synthetic backscatter GeoTIFFs of one relative orbit with the
+# ----ZonalStatistics and compares them with a loop over the parcels masking the product per parcel.
+# ----The loop is timed on a part of the parcels and extrapolated to all parcels.
+# ----Execute from the repository folder via "python3 benchmarks/zonal_statistics_benchmark.py <parcels> <products>"
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import rasterio
+import rasterio.mask
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controller_modules.zonal_statistics import ZonalStatistics
+from raster_post_processing_benchmark import createProduct, PIXEL_SIZE, EASTING, NORTHING
+
+SIZE = 4000
+LOOP_PARCELS = 200
+
+
+def createParcels(file, amountParcels):
+    """Fields of 50 to 300 m in a regular layout without overlaps, stored in lon, lat like a parcel layer."""
+    random = np.random.default_rng(1)
+    perRow = int(np.ceil(np.sqrt(amountParcels)))
+    cell = SIZE * PIXEL_SIZE / perRow
+    parcels = []
+    for i in range(amountParcels):
+        x = EASTING + (i % perRow) * cell
+        y = NORTHING - (i // perRow + 1) * cell
+        width, height = random.uniform(0.2, 0.95, 2) * cell
+        parcels.append(box(x, y, x + width, y + height))
+
+    layer = gpd.GeoDataFrame({"id": ["field_%05d" % i for i in range(amountParcels)]}, geometry=parcels,
+                             crs="EPSG:25832")
+    layer.to_crs("EPSG:4326").to_file(file, driver="GeoJSON")
+
+
+def getLoopStatistics(product, parcels):
+    """The statistics of each parcel from the product masked by the parcel."""
+    rows = []
+    with rasterio.open(product) as source:
+        for parcelId, parcel in zip(parcels["id"], parcels.geometry):
+            values, transform = rasterio.mask.mask(source, [parcel], crop=True, filled=False)
+            for band in range(source.count):
+                bandValues = values[band].compressed().astype(np.float64)
+                bandValues = bandValues[np.isfinite(bandValues) & (bandValues != 0)]
+                if len(bandValues) == 0:
+                    continue
+                rows.append((parcelId, "band_" + str(band + 1), bandValues.mean(), np.median(bandValues),
+                             bandValues.std(), len(bandValues)))
+    return pd.DataFrame(rows, columns=["parcel_id", "band", "mean", "median", "std", "count"])
+
+
+def main():
+    amountParcels = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    amountProducts = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    folder = tempfile.mkdtemp(prefix="zonal_statistics_") + "/"
+
+    try:
+        outputFolder = folder + "backscatter/"
+        os.makedirs(outputFolder)
+        for i in range(amountProducts):
+            date = (np.datetime64("2020-01-01") + np.timedelta64(12 * i, "D")).astype(str).replace("-", "")
+            createProduct(outputFolder + "%s_S1A_VVVH_117_asc_A%03d_BS_area.tif" % (date, i), SIZE)
+        createParcels(folder + "parcels.geojson", amountParcels)
+        products = sorted(os.listdir(outputFolder))
+        # #A product of the area area10 in the same output folder
+        createProduct(outputFolder + "20200107_S1A_VVVH_117_asc_BS_area10.tif", SIZE)
+
+        zonalStatistics = ZonalStatistics(folder + "parcels.geojson", "id", folder + "label_cache/")
+        timeBefore = time.perf_counter()
+        added = zonalStatistics.processFolder(outputFolder, folder + "table/", None, "area")
+        timeVectorised = time.perf_counter() - timeBefore
+        table = pd.read_parquet(folder + "table/")
+
+        timeBefore = time.perf_counter()
+        addedAgain = ZonalStatistics(folder + "parcels.geojson", "id", folder + "label_cache/").processFolder(
+            outputFolder, folder + "table/", None, "area")
+        timeRerun = time.perf_counter() - timeBefore
+
+        # #The loop on a part of the parcels of the first product
+        with rasterio.open(outputFolder + products[0]) as source:
+            parcels = gpd.read_file(folder + "parcels.geojson").to_crs(source.crs.to_wkt())
+        timeBefore = time.perf_counter()
+        loop = getLoopStatistics(outputFolder + products[0], parcels.iloc[:LOOP_PARCELS])
+        timeLoop = (time.perf_counter() - timeBefore) / LOOP_PARCELS * amountParcels * amountProducts
+    finally:
+        shutil.rmtree(folder)
+
+    first = table[table["source"] == products[0]].merge(loop, on=["parcel_id", "band"], suffixes=("", "_loop"))
+    deviation = max(float(np.abs(first[statistic] - first[statistic + "_loop"]).max())
+                    for statistic in ZonalStatistics.STATISTICS)
+
+    print("Parcels: %s, products: %s of %s x %s pixels and 2 bands" % (amountParcels, amountProducts, SIZE, SIZE))
+    print("Vectorised: %.2f sec for all products, %s rows" % (timeVectorised, len(table)))
+    print("Parcel loop: %.1f sec (estimated from %s parcels)" % (timeLoop, LOOP_PARCELS))
+    print("Max deviation of %s compared parcels and bands: %.2e" % (len(first), deviation))
+
+    checks = {
+        "table of each product": added == amountProducts and table["source"].nunique() == amountProducts,
+        "products of other areas not processed": not table["source"].str.endswith("_area10.tif").any(),
+        "dates from the output names": table["date"].dt.strftime("%Y%m%d").isin(
+            [product[:8] for product in products]).all(),
+        "equal to the parcel loop": len(first) == len(loop) and deviation < 1e-6,
+        "existing tables not computed again": addedAgain == 0,
+    }
+    for check, result in checks.items():
+        print("%s: %s" % (check, "ok" if result else "FAILED"))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,21 +11,84 @@
 #----------Batch processing sequences for Backscatter, Radar Vegetation Index and Coherence are defined.
 #----------The processing is performed on a given list of scenes primarily created with the InOutputFile class.
 #----------For each processing sequence a log file is created and saved, containing all processing information.
+#----------If more than one parallel worker is set in the user settings, the scene entries are processed in a
+#----------bounded pool of worker processes.
+#----------Each scene entry is processed in its own temp folder within the scratch root, together with its rendered graphs.
+#----------The log content of each scene is added to the log file once the scene is finished.
+#----------Only the entries not done by former runs are processed, the state of each entry is recorded in the
+#----------ProcessingState of the data path.
+#----------The 6-day and 12-day coherence lists are processed as one run planned by the CoherencePlanner.
+#----------The subswaths of a scene are processed concurrently as far as the memory budget of the gpt processes allows.
+#----------With gpt admission enabled all subswaths are branched and the GptResourceScheduler admits their gpt runs.
+#----------The post processing steps and the output profile of the user settings are applied to the final products of each
+#----------processing sequence.
+#----------With a parcel layer the statistics per parcel of the final products are added to the table of the area in
+#----------"zonal_statistics" of the data path.
+#----------Optionally the final products are appended to the time series cubes of the area in "time_series_cube" of the
+#----------data path.
+#----------The backscatter and vegetation index entries shared by close aois of an aoi folder can be processed once for
+#----------all of them, see calculateForAois.
 #-------------------------------------------------------------------------------------------------------------
 
 from controller_modules.log_output import LogOutput
 from controller_modules.specific_snap_graph_processing import SpecificSnapGraphProcessing
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.gpt_resource_scheduler import GptResourceScheduler
+from controller_modules.coherence_planner import CoherencePlanner
+from controller_modules.split_orbit_store import SplitOrbitStore
+from controller_modules.raster_post_processing import RasterPostProcessing
+from controller_modules.zonal_statistics import ZonalStatistics
+from controller_modules.time_series_cube import TimeSeriesCube
+from controller_modules.processing_state import ProcessingState
+from controller_modules.multi_aoi_planner import MultiAoiPlanner
+
+from shapely import wkt
 
 import os
+import uuid
 import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 class BatchProcessing:
 
     specificSnapGraphProcessing = None
+    parallelWorkers = 1
+
+    # Processing objects of a worker process. Set once per worker by initWorker.
+    workerProcessing = None
+    workerLogOutput = None
 
     def __init__(self, userSettings):
-        self.specificSnapGraphProcessing = SpecificSnapGraphProcessing(os.getcwd() + "/snap_graph_files/", userSettings.dataPath)
+        self.graphFusion = str(userSettings.graphFusion).strip().lower() != "false"
+        self.graphCacheSize = userSettings.graphCacheSize
+        self.aoiPushdown = str(userSettings.aoiPushdown).strip().lower() == "true"
+        self.dpRviEngine = str(userSettings.dpRviEngine).strip().lower() or "snap"
+        self.dataPath = userSettings.dataPath
+        self.processingState = ProcessingState(userSettings.dataPath)
+        self.scratchPath = userSettings.scratchPath
+        self.gptExecutor = userSettings.gptExecutor
+        self.gptWorkers = userSettings.gptWorkers
+
+        workers = str(userSettings.parallelWorkers).strip()
+        self.parallelWorkers = int(workers) if workers.isdigit() and int(workers) > 0 else 1
+        self.postProcessing = RasterPostProcessing.fromSetting(userSettings.postProcessing, self.parallelWorkers,
+                                                               userSettings.outputProfile, userSettings.cogCompression)
+        self.zonalStatistics = ZonalStatistics(userSettings.parcelLayer, userSettings.parcelIdField or "id",
+                                               str(userSettings.dataPath) + "zonal_statistics/label_cache/")
+        self.timeSeriesCube = str(userSettings.timeSeriesCube).strip().lower() == "true"
+        self.resourceScheduler = GptResourceScheduler.fromSetting(userSettings.gptAdmission, userSettings.dataPath,
+                                                                  userSettings.scratchPath, userSettings.memoryBudget,
+                                                                  userSettings.gptMemory, self.parallelWorkers)
+        # #With gpt admission the scheduler decides how many subswath branches run at the same time
+        self.subswathBranches = 3 if self.resourceScheduler is not None else \
+            BatchProcessing.getSubswathBranches(userSettings.memoryBudget, userSettings.gptMemory, self.parallelWorkers)
+
+        self.specificSnapGraphProcessing = SpecificSnapGraphProcessing(os.getcwd() + "/snap_graph_files/", userSettings.dataPath,
+                                                                       userSettings.scratchPath, self.graphFusion,
+                                                                       self.graphCacheSize, self.subswathBranches,
+                                                                       self.aoiPushdown, self.dpRviEngine)
 
     # ###################This is for calculation of backscatter ######################
     def calculateBackscatter(self, backscatterProcessingList, wktAoi, userSettings):
@@ -36,19 +99,24 @@ class BatchProcessing:
                                                                                                              "geojson: "
                                     + str(userSettings.currentAoi))
 
-        for scene in backscatterProcessingList:
-
-            timeBefore = datetime.datetime.now()
-            self.specificSnapGraphProcessing.multiSceneProcBackscatter(scene, userSettings.areaName, wktAoi, userSettings.backscatterOutputPath, logOutput)
-
-            timeAfter = datetime.datetime.now()
-            timeForProcessing = timeAfter-timeBefore
-            timeOutput = "The total processing time for one scene is: %s sec" % (datetime.timedelta(
-                seconds=timeForProcessing.seconds))
+        # #Only the entries not done by former runs are processed
+        backscatterProcessingList = self.processingState.getScheduledEntries(
+            "backscatter", backscatterProcessingList, userSettings.areaName, wktAoi, userSettings.backscatterOutputPath,
+            logOutput)
 
-            logOutput.appendProcTime(timeForProcessing.seconds)
-            logOutput.appendOutputToLog(timeOutput)
+        if self.parallelWorkers > 1:
+            self.processInParallel("multiSceneProcBackscatter", "backscatter", backscatterProcessingList, wktAoi,
+                                   userSettings.backscatterOutputPath, userSettings, logOutput)
+        else:
+            self.processSequentially("multiSceneProcBackscatter", "backscatter", backscatterProcessingList, wktAoi,
+                                     userSettings.backscatterOutputPath, userSettings, logOutput)
 
+        self.postProcessing.processFolder(userSettings.backscatterOutputPath, wktAoi, logOutput, userSettings.areaName)
+        self.zonalStatistics.processFolder(userSettings.backscatterOutputPath,
+                                           self.getZonalTableFolder(userSettings.areaName),
+                                           logOutput, userSettings.areaName)
+        self.getTimeSeriesCube(userSettings.areaName).processFolder(userSettings.backscatterOutputPath, logOutput,
+                                                                    userSettings.areaName)
         logOutput.setTotalTime()
 
         logOutput.closeCurrentFiles()
@@ -60,24 +128,27 @@ class BatchProcessing:
         logOutput.appendOutputToLog("Vegetation Index processes starting for AOI: " + str(userSettings.areaName)
                                     + " and geojson: " + str(userSettings.currentAoi))
 
-        for scene in vegIdProcessingList:
-            timeBefore = datetime.datetime.now()
-            self.specificSnapGraphProcessing.multiSceneProcRadVegId(scene, userSettings.areaName, wktAoi,
-                                                                    userSettings.dpVegIndexPath,
-                                                                    logOutput)
-
-            timeAfter = datetime.datetime.now()
-            timeForProcessing = timeAfter - timeBefore
-            timeOutput = "The total processing time for one scene is: %s sec" % (datetime.timedelta(
-                seconds=timeForProcessing.seconds))
+        vegIdProcessingList = self.processingState.getScheduledEntries(
+            "veg_index", vegIdProcessingList, userSettings.areaName, wktAoi, userSettings.dpVegIndexPath, logOutput)
 
-            logOutput.appendProcTime(timeForProcessing.seconds)
-            logOutput.appendOutputToLog(timeOutput)
+        if self.parallelWorkers > 1:
+            self.processInParallel("multiSceneProcRadVegId", "veg_index", vegIdProcessingList, wktAoi,
+                                   userSettings.dpVegIndexPath, userSettings, logOutput)
+        else:
+            self.processSequentially("multiSceneProcRadVegId", "veg_index", vegIdProcessingList, wktAoi,
+                                     userSettings.dpVegIndexPath, userSettings, logOutput)
 
+        # #The indices are not converted to dB
+        self.postProcessing.withoutSteps(["dB"]).processFolder(userSettings.dpVegIndexPath, wktAoi, logOutput,
+                                                               userSettings.areaName)
+        self.zonalStatistics.processFolder(userSettings.dpVegIndexPath,
+                                           self.getZonalTableFolder(userSettings.areaName),
+                                           logOutput, userSettings.areaName)
+        self.getTimeSeriesCube(userSettings.areaName).processFolder(userSettings.dpVegIndexPath, logOutput,
+                                                                    userSettings.areaName)
         logOutput.setTotalTime()
 
         logOutput.closeCurrentFiles()
-        self.specificSnapGraphProcessing.deleteAllTempFiles()
 
     # ###################This is for calculation of coherence##########################
     def calculateCoh(self, cohProcessingList6Days, cohProcessingList12Days,  wktAoi, userSettings):
@@ -87,33 +158,321 @@ class BatchProcessing:
                                                                                                            "geojson: "
                                     + str(userSettings.currentAoi))
 
-        for scene in cohProcessingList6Days:
-            timeBefore = datetime.datetime.now()
-            self.specificSnapGraphProcessing.multiSceneProcCoherence(scene, userSettings.areaName, wktAoi,
-                                                                     userSettings.cohOutputPath,
-                                                                     logOutput)
+        cohProcessingList6Days = self.processingState.getScheduledEntries(
+            "coherence", cohProcessingList6Days, userSettings.areaName, wktAoi, userSettings.cohOutputPath, logOutput)
+        cohProcessingList12Days = self.processingState.getScheduledEntries(
+            "coherence", cohProcessingList12Days, userSettings.areaName, wktAoi, userSettings.cohOutputPath, logOutput)
 
-            timeAfter = datetime.datetime.now()
-            timeForProcessing = timeAfter - timeBefore
-            timeOutput = "The total processing time for one scene is: %s sec" % (datetime.timedelta(
-                seconds=timeForProcessing.seconds))
+        # #Both lists are processed as one run, so the split products of a scene are shared by all its pairs
+        planner = CoherencePlanner(cohProcessingList6Days, cohProcessingList12Days)
+        self.__processCoherencePlan(planner, None, wktAoi, userSettings, logOutput)
 
-            logOutput.appendProcTime(timeForProcessing.seconds)
-            logOutput.appendOutputToLog(timeOutput)
+        self.postProcessing.withoutSteps(["dB"]).processFolder(userSettings.cohOutputPath, wktAoi, logOutput,
+                                                               userSettings.areaName)
+        self.zonalStatistics.processFolder(userSettings.cohOutputPath,
+                                           self.getZonalTableFolder(userSettings.areaName),
+                                           logOutput, userSettings.areaName)
+        self.getTimeSeriesCube(userSettings.areaName).processFolder(userSettings.cohOutputPath, logOutput,
+                                                                    userSettings.areaName)
+        logOutput.setTotalTime()
+        logOutput.closeCurrentFiles()
+
+    def calculateCohForAois(self, cohProcessingLists6Days, cohProcessingLists12Days, wktAois, userSettings):
+        """Processes the coherence lists of several aois as one run. The pairs of all aois share one SplitOrbitStore,
+        so a scene subswath is split once for all aois covering the same bursts. The pairs are still processed per
+        aoi, as their burst windows and pair checks depend on the aoi.
+
+        Parameters
+        ----------
+        cohProcessingLists6Days : dict
+            The area name as key, the 6-day coherence list as value
+        cohProcessingLists12Days : dict
+            The area name as key, the 12-day coherence list as value
+        wktAois : dict
+            The area name as key, the aoi in Wkt format as value
+        userSettings : CreateUserSetting
+            The current user settings
+        """
+
+        logOutput = LogOutput()
+        logOutput.createLogOutputFile("coherence")
+        logOutput.appendOutputToLog("Coherence process starting for the aois: " + ", ".join(cohProcessingLists6Days))
+
+        # #Each entry is copied, so the area of an entry is found after the planner sorted the entries of all aois
+        entryAreas = {}
+        processingLists = []
+        for areaName in cohProcessingLists6Days:
+            for processingList in [cohProcessingLists6Days[areaName], cohProcessingLists12Days[areaName]]:
+                entries = [list(entry) for entry in self.processingState.getScheduledEntries(
+                    "coherence", processingList, areaName, wktAois[areaName], userSettings.cohOutputPath, logOutput)]
+                entryAreas.update((id(entry), (areaName, wktAois[areaName])) for entry in entries)
+                processingLists.append(entries)
+
+        planner = CoherencePlanner(*processingLists)
+        self.__processCoherencePlan(planner, [entryAreas[id(entry)] for entry in planner.getEntries()], "",
+                                    userSettings, logOutput)
+
+        for areaName in cohProcessingLists6Days:
+            self.postProcessing.withoutSteps(["dB"]).processFolder(userSettings.cohOutputPath, wktAois[areaName],
+                                                                   logOutput, areaName)
+            self.zonalStatistics.processFolder(userSettings.cohOutputPath, self.getZonalTableFolder(areaName),
+                                               logOutput, areaName)
+            self.getTimeSeriesCube(areaName).processFolder(userSettings.cohOutputPath, logOutput, areaName)
+        logOutput.setTotalTime()
+        logOutput.closeCurrentFiles()
 
-        for scene in cohProcessingList12Days:
+    def __processCoherencePlan(self, planner, entryAreas, wktAoi, userSettings, logOutput):
+        """Processes the entries of the planner with a SplitOrbitStore holding the split products until their last
+        pair is finished."""
+
+        splitOrbitStore = SplitOrbitStore(self.specificSnapGraphProcessing.scratchRoot + "split_orbit_" +
+                                          uuid.uuid4().hex[:8] + "/")
+        splitOrbitStore.setConsumers(planner.getConsumers())
+        splitsWithoutSharing, splitsWithSharing = planner.getSplitsPerSubswath()
+        logOutput.appendOutputToLog("Split/Orbit executions per subswath: " + str(splitsWithSharing) + " for " +
+                                    str(splitsWithoutSharing) + " scene uses in " + str(len(planner.getEntries())) +
+                                    " pairs.")
+
+        try:
+            if self.parallelWorkers > 1:
+                self.processInParallel("multiSceneProcCoherence", "coherence", planner.getEntries(), wktAoi,
+                                       userSettings.cohOutputPath, userSettings, logOutput, splitOrbitStore.storeFolder,
+                                       entryAreas)
+            else:
+                self.specificSnapGraphProcessing.setSplitOrbitStore(splitOrbitStore)
+                self.processSequentially("multiSceneProcCoherence", "coherence", planner.getEntries(), wktAoi,
+                                         userSettings.cohOutputPath, userSettings, logOutput, entryAreas)
+        finally:
+            self.specificSnapGraphProcessing.setSplitOrbitStore(None)
+            splitOrbitStore.remove()
+
+    # ###################This is for calculation of entries shared by several aois##########################
+    def calculateForAois(self, sequence, processingLists, wktAois, userSettings):
+        """Processes the backscatter or vegetation index lists of several aois. Entries in the lists of close aois are
+        processed once for all of them, only the subset and terrain correction are executed per aoi (see
+        SpecificSnapGraphProcessing.multiSceneProcBackscatterForAois). The final products are named as by the
+        processing per aoi.
+
+        Parameters
+        ----------
+        sequence : str
+            The processing sequence, "backscatter" or "veg_index"
+        processingLists : dict
+            The area name as key, the processing list of the sequence as value
+        wktAois : dict
+            The area name as key, the aoi in Wkt format as value
+        userSettings : CreateUserSetting
+            The current user settings
+        """
+
+        if sequence == "backscatter":
+            procMethod, outputPath = "multiSceneProcBackscatterForAois", userSettings.backscatterOutputPath
+            postProcessing = self.postProcessing
+        else:
+            procMethod, outputPath = "multiSceneProcRadVegIdForAois", userSettings.dpVegIndexPath
+            # #The indices are not converted to dB
+            postProcessing = self.postProcessing.withoutSteps(["dB"])
+
+        logOutput = LogOutput()
+        logOutput.createLogOutputFile(sequence)
+        logOutput.appendOutputToLog("Processing " + sequence + " entries shared by the aois: " +
+                                    ", ".join(processingLists))
+
+        clusters = MultiAoiPlanner.getClusters({areaName: wkt.loads(wktAois[areaName]) for areaName in processingLists},
+                                               MultiAoiPlanner.SHARING_DISTANCE)
+        clusterNos = {areaName: clusterNo for clusterNo, (clusterBox, areaNames) in enumerate(clusters)
+                      for areaName in areaNames}
+
+        # #The entries not done of each aoi are grouped by the entry and the cluster of the aoi
+        groups = {}
+        for areaName, processingList in processingLists.items():
+            for entry in self.processingState.getScheduledEntries(sequence, processingList, areaName,
+                                                                  wktAois[areaName], outputPath, logOutput):
+                groupEntry, areaNames, entryAois = groups.setdefault((tuple(entry), clusterNos[areaName]),
+                                                                     (entry, [], []))
+                areaNames.append(areaName)
+                entryAois.append(wktAois[areaName])
+
+        entries = [entry for entry, areaNames, entryAois in groups.values()]
+        entryAreas = [(areaNames, entryAois) for entry, areaNames, entryAois in groups.values()]
+        logOutput.appendOutputToLog(str(sum(len(areaNames) for areaNames, entryAois in entryAreas)) +
+                                    " entries of the aois processed in " + str(len(entries)) + " executions.")
+
+        if self.parallelWorkers > 1:
+            self.processInParallel(procMethod, sequence, entries, "", outputPath, userSettings, logOutput,
+                                   entryAreas=entryAreas)
+        else:
+            self.processSequentially(procMethod, sequence, entries, "", outputPath, userSettings, logOutput,
+                                     entryAreas)
+
+        for areaName in processingLists:
+            postProcessing.processFolder(outputPath, wktAois[areaName], logOutput, areaName)
+            self.zonalStatistics.processFolder(outputPath, self.getZonalTableFolder(areaName), logOutput, areaName)
+            self.getTimeSeriesCube(areaName).processFolder(outputPath, logOutput, areaName)
+        logOutput.setTotalTime()
+
+        logOutput.closeCurrentFiles()
+
+    # ###################This is for processing of scene entries##########################
+    def processSequentially(self, procMethod, sequence, processingList, wktAoi, outputPath, userSettings, logOutput,
+                            entryAreas=None):
+        """Processes the entries of the given list one after another and records their state. With entryAreas the
+        area names and aois of each entry are given in the order of the list, see calculateForAois."""
+
+        for sceneNo, scene in enumerate(processingList):
+            areaName, sceneAoi = entryAreas[sceneNo] if entryAreas is not None else (userSettings.areaName, wktAoi)
+            self.__startEntry(sequence, scene, areaName, outputPath)
             timeBefore = datetime.datetime.now()
-            self.specificSnapGraphProcessing.multiSceneProcCoherence(scene, userSettings.areaName, wktAoi,
-                                                                     userSettings.cohOutputPath, logOutput)
+            try:
+                BatchProcessing.processInSceneScratch(self.specificSnapGraphProcessing, procMethod, scene,
+                                                      areaName, sceneAoi, outputPath, logOutput)
+            except Exception as e:
+                self.__finishEntry(sequence, scene, areaName, outputPath,
+                                   (datetime.datetime.now() - timeBefore).seconds, str(e))
+                raise
 
             timeAfter = datetime.datetime.now()
             timeForProcessing = timeAfter - timeBefore
+            self.__finishEntry(sequence, scene, areaName, outputPath, timeForProcessing.seconds)
             timeOutput = "The total processing time for one scene is: %s sec" % (datetime.timedelta(
                 seconds=timeForProcessing.seconds))
 
             logOutput.appendProcTime(timeForProcessing.seconds)
             logOutput.appendOutputToLog(timeOutput)
 
-        logOutput.setTotalTime()
-        logOutput.closeCurrentFiles()
-        self.specificSnapGraphProcessing.deleteAllTempFiles()
+    def processInParallel(self, procMethod, sequence, processingList, wktAoi, outputPath, userSettings, logOutput,
+                          splitOrbitFolder=None, entryAreas=None):
+        """Processes the entries of the given list in a pool of parallelWorkers processes. The scene number in the
+        log file and in the proc_times csv file is the position of the entry in the given list.
+
+        Parameters
+        ----------
+        procMethod : str
+            The name of the SpecificSnapGraphProcessing method to process one entry with, e.g.
+            "multiSceneProcBackscatter"
+        sequence : str
+            The processing sequence of the entries in the processing state, see ProcessingState.OUTPUT_SUFFIXES
+        processingList : iterable
+            The list of scene entries to process. Entries of a generator are submitted as they are read
+        wktAoi : str
+            The Aoi in Wkt format
+        outputPath : str
+            The path where the result data is produced
+        userSettings : CreateUserSetting
+            The current user settings
+        logOutput : LogOutput
+            The logOutput class object of the processing sequence
+        splitOrbitFolder : str
+            The folder of the SplitOrbitStore shared by the coherence pairs of the run
+        entryAreas : list
+            The area names and aois of each entry in the order of the list, instead of the area of the user settings
+        """
+
+        amount = str(len(processingList)) + " " if isinstance(processingList, list) else ""
+        logOutput.appendOutputToLog("Processing " + amount + "entries with " + str(self.parallelWorkers) +
+                                    " parallel workers.")
+
+        with ProcessPoolExecutor(max_workers=self.parallelWorkers, initializer=BatchProcessing.initWorker,
+                                 initargs=(self.dataPath, self.scratchPath, self.gptExecutor,
+                                           self.gptWorkers, self.graphFusion, self.graphCacheSize,
+                                           self.subswathBranches, self.aoiPushdown,
+                                           self.dpRviEngine, self.resourceScheduler)) as executor:
+            futures = {}
+            for sceneNo, scene in enumerate(processingList, start=1):
+                areaName, sceneAoi = entryAreas[sceneNo - 1] if entryAreas is not None else (userSettings.areaName,
+                                                                                             wktAoi)
+                self.__startEntry(sequence, scene, areaName, outputPath)
+                futures[executor.submit(BatchProcessing.processSceneByWorker, procMethod, sceneNo, scene,
+                                        areaName, sceneAoi, outputPath, splitOrbitFolder)] = (scene, areaName)
+
+            for future in as_completed(futures):
+                scene, areaName = futures[future]
+                try:
+                    sceneNo, seconds, sceneBuffer = future.result()
+                except Exception as e:
+                    logOutput.appendOutputToLog("Worker failed: " + str(e), error=True)
+                    self.__finishEntry(sequence, scene, areaName, outputPath, None, str(e))
+                    continue
+
+                self.__finishEntry(sequence, scene, areaName, outputPath, seconds)
+
+                logOutput.appendSceneBuffer(sceneNo, *sceneBuffer)
+                timeOutput = "The total processing time for scene %s is: %s sec" % (sceneNo, datetime.timedelta(
+                    seconds=seconds))
+                logOutput.appendProcTime(seconds, sceneNo)
+                logOutput.appendOutputToLog(timeOutput)
+
+    def __startEntry(self, sequence, scene, areaName, outputPath):
+        # #An entry processed for several aois is recorded per aoi
+        for name in areaName if isinstance(areaName, list) else [areaName]:
+            self.processingState.startEntry(sequence, scene, name, outputPath)
+
+    def __finishEntry(self, sequence, scene, areaName, outputPath, seconds, message=None):
+        for name in areaName if isinstance(areaName, list) else [areaName]:
+            self.processingState.finishEntry(sequence, scene, name, outputPath, seconds, message)
+
+    def getZonalTableFolder(self, areaName):
+        """Returns the folder of the statistics table of the given area."""
+        return str(self.dataPath) + "zonal_statistics/" + str(areaName or "area") + "/"
+
+    def getTimeSeriesCube(self, areaName):
+        """Returns the time series cubes of the given area, without cube folder if disabled."""
+        return TimeSeriesCube(str(self.dataPath) + "time_series_cube/" + str(areaName or "area") + "/"
+                              if self.timeSeriesCube else None)
+
+    @staticmethod
+    def getSubswathBranches(memoryBudget, gptMemory, parallelWorkers):
+        """Returns the amount of subswaths processed concurrently per scene, so the gpt processes of all parallel
+        workers fit into the memory budget. Without a budget the physical memory is used."""
+
+        try:
+            budget = float(memoryBudget) if str(memoryBudget).strip() != "" else \
+                os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+            processMemory = float(gptMemory) if str(gptMemory).strip() != "" else 8.0
+        except (ValueError, OSError):
+            return 1
+
+        if processMemory <= 0:
+            return 1
+        # #A scene has at most three subswaths
+        return max(1, min(3, int(budget / parallelWorkers // processMemory)))
+
+    @staticmethod
+    def initWorker(dataPath, scratchPath, gptExecutor, gptWorkers, graphFusion, graphCacheSize, subswathBranches,
+                   aoiPushdown, dpRviEngine, resourceScheduler=None):
+        SceneCatalog.setDefaultLocation(dataPath)
+        # #Each worker process executes its graphs with its own executor, the admitted runs are shared by all workers
+        GptExecutor.setDefault(GptExecutor.create(gptExecutor, gptWorkers, resourceScheduler))
+        BatchProcessing.workerProcessing = SpecificSnapGraphProcessing(os.getcwd() + "/snap_graph_files/", dataPath,
+                                                                       scratchPath, graphFusion, graphCacheSize,
+                                                                       subswathBranches, aoiPushdown, dpRviEngine)
+        BatchProcessing.workerLogOutput = LogOutput()
+
+    @staticmethod
+    def processSceneByWorker(procMethod, sceneNo, scene, areaName, wktAoi, outputPath, splitOrbitFolder=None):
+        logOutput = BatchProcessing.workerLogOutput
+        logOutput.createSceneBuffer()
+
+        processing = BatchProcessing.workerProcessing
+        if splitOrbitFolder is not None and (processing.splitOrbitStore is None or
+                                             processing.splitOrbitStore.storeFolder != splitOrbitFolder):
+            processing.setSplitOrbitStore(SplitOrbitStore(splitOrbitFolder))
+
+        timeBefore = datetime.datetime.now()
+        BatchProcessing.processInSceneScratch(BatchProcessing.workerProcessing, procMethod, scene, areaName, wktAoi,
+                                              outputPath, logOutput)
+        timeForProcessing = datetime.datetime.now() - timeBefore
+
+        return sceneNo, timeForProcessing.seconds, logOutput.getSceneBuffer()
+
+    @staticmethod
+    def processInSceneScratch(specificSnapGraphProcessing, procMethod, scene, areaName, wktAoi, outputPath,
+                              logOutput):
+        """Processes one scene entry in its own temp folder. The folder is removed afterwards, also if the
+        processing fails, so no intermediate products of other jobs on the same scratch root are touched."""
+
+        specificSnapGraphProcessing.createSceneScratch()
+        try:
+            getattr(specificSnapGraphProcessing, procMethod)(scene, areaName, wktAoi, outputPath, logOutput)
+        finally:
+            specificSnapGraphProcessing.removeSceneScratch()
@@ -0,0 +1,65 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        burst_planner
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class plans the burst window of a TOPSAR-Split run from the burst footprints of the SceneCatalog.
+#-------The window covers all bursts overlapping the aoi. Later processing steps need at least two bursts, so a window of
+#-------a single burst is extended by the previous burst, or by the following burst if it is the first burst.
+#-------With a planned window the split is executed once with the burst indices instead of the wktAoi selection of
+#-------TOPSAR-Split, which had to be read back from the product and reprocessed in the single burst case.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+from shapely import wkt
+
+from controller_modules.scene_catalog import SceneCatalog
+
+
+class BurstPlanner:
+
+    MIN_BURSTS = 2
+    NO_OVERLAP = (0, 0)
+
+    def getBurstWindow(self, scene, subswath, wktAoi):
+        """Returns the burst window of the subswath overlapping the aoi.
+
+        Parameters
+        ----------
+        scene : str
+            The path of the SAFE product folder
+        subswath : str
+            The subswath, e.g. "IW1"
+        wktAoi : str
+            The Aoi in wkt format, empty for all bursts
+
+        Returns
+        -------
+        tuple
+            firstBurstIndex and lastBurstIndex as used by TOPSAR-Split, starting with 1. NO_OVERLAP if the aoi does
+            not overlap any burst. None if the burst footprints of the scene are not available.
+        """
+
+        bursts = SceneCatalog.default().getBurstPolygons(scene.strip() + "/manifest.safe").get(subswath)
+        if not bursts:
+            return None
+
+        if wktAoi is None or wktAoi == "":
+            return 1, len(bursts)
+
+        polyWktAoi = wkt.loads(wktAoi)
+        indices = [i + 1 for i in range(0, len(bursts)) if bursts[i].intersects(polyWktAoi)]
+        if len(indices) == 0:
+            return BurstPlanner.NO_OVERLAP
+
+        firstBurstIndex = indices[0]
+        lastBurstIndex = indices[-1]
+        if lastBurstIndex - firstBurstIndex + 1 < BurstPlanner.MIN_BURSTS and len(bursts) >= BurstPlanner.MIN_BURSTS:
+            if firstBurstIndex == 1:
+                lastBurstIndex = lastBurstIndex + 1
+            else:
+                firstBurstIndex = firstBurstIndex - 1
+        return firstBurstIndex, lastBurstIndex
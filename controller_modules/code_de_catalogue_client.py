@@ -0,0 +1,142 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        code_de_catalogue_client
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class performs the requests to the resto catalogue of Code-De used by PyFuncQueries.
+#-------All requests share one pooled HTTP session with a timeout and retries on connection and server errors.
+#-------Several query urls (pages or polygons) are fetched concurrently, limited to maxConcurrency requests at the same time.
+#-------Responses are stored in an on-disk cache keyed by the normalised query url and reused until the ttl expired.
+#-------The catalogue url can be set to a local stand-in resto server, e.g. for testing.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CodeDeCatalogueClient:
+
+    CODE_DE_URL = 'https://finder.code-de.org/resto/api/collections/'
+
+    def __init__(self, cacheFolder=None, ttl=24 * 3600, maxConcurrency=4, timeout=(10, 120), baseUrl=None):
+        """
+        Parameters
+        ----------
+        cacheFolder : str
+            Folder of the response cache. No responses are cached if None.
+        ttl : int
+            Time in seconds a cached response is reused
+        maxConcurrency : int
+            Maximum number of requests sent at the same time
+        timeout : tuple
+            Connect and read timeout of each request in seconds
+        baseUrl : str
+            Url of the resto collections, default is the Code-De catalogue
+        """
+
+        self.cacheFolder = cacheFolder
+        self.ttl = ttl
+        self.maxConcurrency = max(1, int(maxConcurrency))
+        self.timeout = timeout
+        self.baseUrl = baseUrl if baseUrl else self.CODE_DE_URL
+
+        if self.cacheFolder is not None and not os.path.exists(self.cacheFolder):
+            os.makedirs(self.cacheFolder)
+
+        retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                        allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=self.maxConcurrency, pool_maxsize=self.maxConcurrency,
+                              max_retries=retries)
+        self.__session = requests.Session()
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.__requestSlots = threading.BoundedSemaphore(self.maxConcurrency)
+
+    # ##################################Requests#################################
+
+    def getJson(self, queryUrl):
+        """Returns the parsed json response of the given query url, from the cache if available.
+
+        Raises
+        ------
+        requests.exceptions.RequestException
+            If the request fails after all retries
+        """
+
+        cached = self.__readCache(queryUrl)
+        if cached is not None:
+            return cached
+
+        with self.__requestSlots:
+            try:
+                response = self.__session.get(queryUrl, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as err:
+                print(err)
+                raise
+
+        print('Request was sucessful.')
+        result = response.json()
+        self.__writeCache(queryUrl, result)
+        return result
+
+    def getAllJson(self, queryUrls):
+        """Returns the parsed json responses of all given query urls in the same order. The urls are fetched
+        concurrently."""
+
+        if len(queryUrls) <= 1:
+            return [self.getJson(queryUrl) for queryUrl in queryUrls]
+
+        with ThreadPoolExecutor(max_workers=min(self.maxConcurrency, len(queryUrls))) as executor:
+            return list(executor.map(self.getJson, queryUrls))
+
+    # ##################################Response cache#################################
+
+    @staticmethod
+    def normaliseUrl(queryUrl):
+        """Returns the query url with sorted and decoded query parameters, so equal queries share one cache entry."""
+        parts = urlsplit(queryUrl.strip())
+        parameters = sorted(parse_qsl(parts.query, keep_blank_values=True))
+        return parts.scheme.lower() + "://" + parts.netloc.lower() + parts.path + "?" + \
+            "&".join(key + "=" + value for key, value in parameters)
+
+    def __getCacheFile(self, queryUrl):
+        key = hashlib.sha256(self.normaliseUrl(queryUrl).encode("utf-8")).hexdigest()
+        return os.path.join(self.cacheFolder, key + ".json")
+
+    def __readCache(self, queryUrl):
+        if self.cacheFolder is None:
+            return None
+
+        cacheFile = self.__getCacheFile(queryUrl)
+        try:
+            if time.time() - os.path.getmtime(cacheFile) > self.ttl:
+                return None
+            with open(cacheFile) as data:
+                return json.load(data)
+        except (OSError, ValueError):
+            return None
+
+    def __writeCache(self, queryUrl, result):
+        if self.cacheFolder is None:
+            return
+
+        # #Written to a temporary file first, so parallel runs never read a partial entry
+        cacheFile = self.__getCacheFile(queryUrl)
+        tempFile = cacheFile + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+        with open(tempFile, "w") as data:
+            json.dump(result, data)
+        os.replace(tempFile, cacheFile)
@@ -0,0 +1,63 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        coherence_planner
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class plans the coherence processing of the 6-day and 12-day lists as one run.
+#-------In a dense time series each scene is part of up to four pairs: the reference of the following 6-day and 12-day
+#-------pair and the secondary scene of the previous ones. The planner orders the entries of both lists by the date of
+#-------their first scene, so the pairs sharing a scene are processed close in time, and counts the pairs consuming each
+#-------scene. With these counts the SplitOrbitStore keeps the split products of a scene until its last pair is finished.
+#-------Entry format of the coherence lists: ["<scene(s) 1>", "<scene(s) 2>", "<output file name>"], slices comma separated.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+
+class CoherencePlanner:
+
+    def __init__(self, *processingLists):
+        self.entries = [entry for processingList in processingLists for entry in processingList]
+
+        # #The sort is stable, so entries of the same date keep the order of the lists
+        self.entries.sort(key=lambda entry: CoherencePlanner.__getEntryDate(entry))
+
+    def getEntries(self) -> list:
+        return self.entries
+
+    def getConsumers(self) -> dict:
+        """Returns the amount of entries consuming each scene: scene id -> amount of entries"""
+
+        consumers = {}
+        for entry in self.entries:
+            for sceneId in CoherencePlanner.getSceneIds(entry):
+                consumers[sceneId] = consumers.get(sceneId, 0) + 1
+        return consumers
+
+    def getSplitsPerSubswath(self):
+        """Returns the amount of splits per subswath without and with sharing the split products between the pairs."""
+
+        consumers = self.getConsumers()
+        return sum(consumers.values()), len(consumers)
+
+    @staticmethod
+    def getSceneIds(entry) -> list:
+        if len(entry) != 3:
+            return []
+
+        sceneIds = []
+        for scenes in entry[:2]:
+            for scene in scenes.split(","):
+                # #Same id as SpecificSnapGraphProcessing.getSceneId
+                sceneId = scene.strip().split(".")[0].split("/")[-1]
+                if sceneId != "" and sceneId not in sceneIds:
+                    sceneIds.append(sceneId)
+        return sceneIds
+
+    @staticmethod
+    def __getEntryDate(entry):
+        # #Scene ids contain the sensing start at position 17, e.g. S1A_IW_SLC__1SDV_20200101T053000_...
+        sceneIds = CoherencePlanner.getSceneIds(entry)
+        return sceneIds[0][17:32] if len(sceneIds) > 0 else ""
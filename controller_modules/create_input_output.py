@@ -15,12 +15,13 @@
 #-------------------------------------------------------------------------------
 
 import os
+import re
 import numpy as np
 import datetime
 import math
-from controller_modules.geo_position import GeoPosition
 from controller_modules.snap_graph_processing import SnapGraphProcessing
-from lxml import etree
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.footprint_index import FootprintIndex
 
 
 class CreateInputOutput:
@@ -28,6 +29,15 @@ class CreateInputOutput:
     # Set this to true to attach unique scene id to output names
     __WITH_SCENE_ID = True
 
+    # Date and hour of acquisition as contained in scene names, e.g. "20210101T05". Overlapping matches are found.
+    __DATE_HOUR_PATTERN = re.compile(r"(?=(\d{8}T\d{2}))")
+
+    # Output file names as created by generateFileList, extended by the area name and the product suffix, e.g.
+    # "20210101_S1A_VVVH_117_asc_7A3F_BS_area.tif" or "20210101_20210107_S1A_VVVH_117_asc_7A3F_9C01_coh6d_area.tif"
+    __OUTPUT_NAME_PATTERN = re.compile(r"^(\d{8})(?:_(\d{8}))?_(S1[A-D])_([A-Z]{4})_(\d+)_(asc|desc|)"
+                                       r"((?:_[0-9A-F]{4})*)_(BS|polVI|coh6d|coh12d)(?:_(.*?))?(?:_(dp|cp))?"
+                                       r"\.tiff?$")
+
     def generateFileList(self, tiles, productType, startDate, endDate, resultPath, areaNameExtension="Test Area",
                          sliceMode=True):
         ###################################################################################################################################
@@ -38,6 +48,11 @@ class CreateInputOutput:
         if len(tiles) == 0:
             return [],[],[]
 
+        # Parse the metadata of all products once. All following queries are answered by the scene catalog.
+        SceneCatalog.default().addScenes(tiles)
+        # Footprints of all candidates in a spatial index for the overlap tests of slice assembly and coherence pairing
+        self.__footprintIndex = FootprintIndex(tiles)
+
         info=np.array(tiles)
         ac_info=[]
 
@@ -106,17 +121,17 @@ class CreateInputOutput:
 
         if productType == 'GRD':
             fileName = areaNameExtension + '_tiles_' + productType + '_' + startDate + '_' + endDate + "_" + date + \
-                       "_" + time + '_GRD_backscatter.txt'
+                       "_" + time + '_GRD_backscatter.jsonl'
             outputProduct = 'BS'
         if productType == 'SLC':
             fileName = areaNameExtension + '_tiles_' + productType + '_' + startDate + '_' + endDate + "_" + date + \
-                       "_" + time + '_SLC_polarimetry.txt'
+                       "_" + time + '_SLC_polarimetry.jsonl'
             outputProduct = 'polVI'
             fileNameCoh1 = areaNameExtension + '_tiles_' + productType + '_' + startDate + '_' + endDate + "_" + date + \
-                       "_" + time+ '_SLC_coherence_6d.txt'
+                       "_" + time+ '_SLC_coherence_6d.jsonl'
             outputProductCoh1 = 'coh6d'
             fileNameCoh2 = areaNameExtension + '_tiles_' + productType + '_' + startDate + '_' + endDate + "_" + date + \
-                       "_" + time+ '_SLC_coherence_12d.txt'
+                       "_" + time+ '_SLC_coherence_12d.jsonl'
             outputProductCoh2 = 'coh12d'
 
         # check for duplicates - identical start time
@@ -155,6 +170,9 @@ class CreateInputOutput:
             ac_info = np.delete(ac_info, redundantScenes, axis=0)
             len_info, len_start = len(ac_info), len(ac_info)
 
+        # index for coherence pair matching, built once on the final tile list
+        cohIndex = self.buildCohMatchingIndex(tiles) if productType == 'SLC' else {}
+
         # output array
         array = []
         array_coh_6d = []
@@ -173,7 +191,7 @@ class CreateInputOutput:
 
                 # for SLC date: write coherence input file
                 if productType == 'SLC':
-                    match = self.__getCohMatching(ac_info[i], tiles)
+                    match = self.__getCohMatching(ac_info[i], cohIndex)
                     matching_6d = match[0]
                     matching_12d = match[1]
 
@@ -274,7 +292,7 @@ class CreateInputOutput:
 
                 # for SLC date: write coherence input file
                 if productType == 'SLC':
-                    match = self.__getCohMatching(ac_info[j], tiles)
+                    match = self.__getCohMatching(ac_info[j], cohIndex)
                     matching_SLC_6d = match[0]
                     matching_SLC_12d = match[1]
 
@@ -313,58 +331,58 @@ class CreateInputOutput:
             return array, array_coh_12d, array_coh_6d
 
     def __isPairValid(self, scene1, scene2):
-        if GeoPosition().areaOverlap(scene1 + "/manifest.safe", scene2 + "/manifest.safe") < 1 and GeoPosition(
-        ).roundedIntersect(scene1 + "/manifest.safe", scene2 + "/manifest.safe"):
+        if self.__footprintIndex.areaOverlap(scene1, scene2) < 1 and \
+                self.__footprintIndex.roundedIntersect(scene1, scene2):
             return True
         return False
 
     def writeGrdListToFile(self, array, resultFileName):
-        # Delete files if exist
-        if os.path.exists(resultFileName):
-            os.remove(resultFileName)
+        # The list files are written by the ProcessingListFile, which reads the output names with this class
+        from controller_modules.processing_list_file import ProcessingListFile
 
-        writeArray = open(resultFileName, "w")
-        for item in array:
-            writeArray.write(str(item) + "\n")
-        writeArray.close()
+        ProcessingListFile.write(resultFileName, "backscatter", array)
 
     def writeSlcListToFile(self, array, array_coh_6d, array_coh_12d, resultFileName, resultFileNameCoh1,
                            resultFileNameCoh2):
-
-        if os.path.exists(resultFileName):
-            os.remove(resultFileName)
-        if os.path.exists(resultFileNameCoh2):
-            os.remove(resultFileNameCoh2)
-        if os.path.exists(resultFileNameCoh1):
-            os.remove(resultFileNameCoh1)
-        if os.path.exists(resultFileNameCoh2):
-            os.remove(resultFileNameCoh2)
-
-        input2_6d = open(resultFileNameCoh1, 'w')
-        input2_12d = open(resultFileNameCoh2, 'w')
-        writeArray = open(resultFileName, "w")
-
-        for item in array:
-            writeArray.write(str(item) + "\n")
-
-        for item in array_coh_6d:
-            input2_6d.write(str(item) + "\n")
-
-        for item in array_coh_12d:
-            input2_12d.write(str(item) + "\n")
-
-        writeArray.close()
-        input2_6d.close()
-        input2_12d.close()
+        from controller_modules.processing_list_file import ProcessingListFile
+
+        ProcessingListFile.write(resultFileName, "polarimetry", array)
+        ProcessingListFile.write(resultFileNameCoh1, "coherence_6d", array_coh_6d)
+        ProcessingListFile.write(resultFileNameCoh2, "coherence_12d", array_coh_12d)
+
+    @staticmethod
+    def parseOutputName(fileName):
+        """Returns the fields of an output file name created from the lists of generateFileList.
+
+        Parameters
+        ----------
+        fileName : str
+            The path or name of the output GeoTIFF
+
+        Returns
+        -------
+        dict
+            date, secondDate (coherence only) as datetime, sensor, polarisation, relativeOrbit, direction, sceneIds,
+            product, areaName and index (dp or cp for the vegetation indices). None if the name is not an output name.
+        """
+
+        match = CreateInputOutput.__OUTPUT_NAME_PATTERN.match(os.path.basename(fileName))
+        if match is None:
+            return None
+
+        date, secondDate, sensor, polarisation, relativeOrbit, direction, sceneIds, product, areaName, index = \
+            match.groups()
+        return {"date": datetime.datetime.strptime(date, "%Y%m%d"),
+                "secondDate": datetime.datetime.strptime(secondDate, "%Y%m%d") if secondDate is not None else None,
+                "sensor": sensor, "polarisation": polarisation, "relativeOrbit": int(relativeOrbit),
+                "direction": direction, "sceneIds": [sceneId for sceneId in sceneIds.split("_") if sceneId != ""],
+                "product": product, "areaName": areaName or "", "index": index}
 
     def readFileToList(self, listFileName):
-        result = []
-        with open(listFileName, 'r') as file:
-            for line in file:
-                entryList = line.replace("\n", "").split("', '")
-                entryList = [entry.replace("'", "").replace("[", "").replace("]", "") for entry in entryList]
-                result.append(entryList)
-        return result
+        """Returns all entries of a list file, of the JSON lines format or of the text format of former versions."""
+        from controller_modules.processing_list_file import ProcessingListFile
+
+        return list(ProcessingListFile.readEntries(listFileName))
 
     def updateDuplicatePositions(self, indexDuplicates, acInfo):
         result = []
@@ -391,13 +409,31 @@ class CreateInputOutput:
         return result
     
     def __getSliceId(self, scene):
-        tree = etree.parse(scene + "/manifest.safe")
-        root = tree.getroot()
-        result = root.findall('.//{http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1}sliceNumber')
-        sliceNumber = result[0].text if result is not None and len(result) > 0 else None
-        return sliceNumber
-
-    def __getCohMatching(self, tile, tiles):
+        return SceneCatalog.default().getSliceNumber(scene)
+
+    def buildCohMatchingIndex(self, tiles):
+        """Indexes the given tiles by acquisition date and hour ("YYYYMMDDTHH"), e.g. "20210101T05".
+        A tile is listed under every date and hour contained in its path, so a lookup returns the same tiles in the
+        same order as a substring search over the whole tile list.
+
+        Parameters
+        ----------
+        tiles : list
+            The paths of all queried scenes
+
+        Returns
+        -------
+        dict
+            Date and hour as key, list of tiles as value
+        """
+
+        index = {}
+        for tile in tiles:
+            for key in dict.fromkeys(self.__DATE_HOUR_PATTERN.findall(str(tile))):
+                index.setdefault(key, []).append(tile)
+        return index
+
+    def __getCohMatching(self, tile, cohIndex):
         dateAndTime = tile[3]
         time = dateAndTime[9:11]
         date1_str = tile[3][0: tile[3].index("T")]
@@ -410,16 +446,12 @@ class CreateInputOutput:
         date2 = datetime.datetime.strftime(date2, "%Y%m%d")
         date3 = datetime.datetime.strftime(date3, "%Y%m%d")
 
-        # print(date1_str, date2)
-
-        # find 2nd SLC pair in input file list
-        matching_SLC_6d = [s for s in tiles if date2 in s]
-        matching_SLC_12d = [s for s in tiles if date3 in s]
+        # find 2nd SLC pair in index of input file list
         ### auch Orbit, Aufnahmezeitpunkt muss passen!!! Ausschnitt so gross, dass Frueh- und Nachmittagsaufnahmen
         time6d = date2 + 'T' + time
-        matching_SLC_6d = [s for s in matching_SLC_6d if time6d in s]
+        matching_SLC_6d = list(cohIndex.get(time6d, []))
         time12d = date3 + 'T' + time
-        matching_SLC_12d = [s for s in matching_SLC_12d if time12d in s]
+        matching_SLC_12d = list(cohIndex.get(time12d, []))
         return  matching_SLC_6d, matching_SLC_12d
 
     def __getMultipleCohMatchingLines(self, tile, elements, days):
@@ -441,8 +473,7 @@ class CreateInputOutput:
 
         validElements = []
         for scene in elements:
-            if len(test1) == 0 and test2 == -1 and GeoPosition().areaOverlap(tile[0] + "/manifest.safe", \
-                    str(scene) + "/manifest.safe") > 0:
+            if len(test1) == 0 and test2 == -1 and self.__footprintIndex.areaOverlap(tile[0], scene) > 0:
                 uniqueId1 = '_' + tile[8]
 
                 sceneIdList = scene.replace('/', "").replace(".SAFE", "").split("_")
@@ -461,38 +492,30 @@ class CreateInputOutput:
 
         #This only works for AOIs that overlap max two scenes -> size sliceMatching, size cohMatching max 2
         if len(sliceMatching) == 1 and len(cohMatching) == 2:
-            overlapS1Coh1 = GeoPosition().areaOverlap(str(sliceMatching[0]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[0]).strip(" ") + "/manifest.safe") > 1
+            overlapS1Coh1 = self.__footprintIndex.areaOverlap(sliceMatching[0], cohMatching[0]) > 1
 
-            overlapS1Coh2 = GeoPosition().areaOverlap(str(sliceMatching[0]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[1]).strip(" ") + "/manifest.safe") > 1
+            overlapS1Coh2 = self.__footprintIndex.areaOverlap(sliceMatching[0], cohMatching[1]) > 1
 
             if overlapS1Coh1 and overlapS1Coh2:
                 sliceMatching = [sliceMatching[0],sliceMatching[0]]
 
         elif len(sliceMatching) == 2 and len(cohMatching) == 1:
-            overlapS1Coh1 = GeoPosition().areaOverlap(str(sliceMatching[0]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[0]).strip(" ") + "/manifest.safe") > 1
+            overlapS1Coh1 = self.__footprintIndex.areaOverlap(sliceMatching[0], cohMatching[0]) > 1
 
-            overlapS2Coh1 = GeoPosition().areaOverlap(str(sliceMatching[1]) + "/manifest.safe",
-                                                      str(cohMatching[0]).strip(" ") + "/manifest.safe") > 1
+            overlapS2Coh1 = self.__footprintIndex.areaOverlap(sliceMatching[1], cohMatching[0]) > 1
 
             if overlapS1Coh1 and overlapS2Coh1:
                 cohMatching = [cohMatching[0],cohMatching[0]]
 
         elif len(sliceMatching) == 2 and len(cohMatching) == 2:
 
-            overlapS1Coh1 = GeoPosition().areaOverlap(str(sliceMatching[0]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[0]).strip(" ") + "/manifest.safe") > 1.5
+            overlapS1Coh1 = self.__footprintIndex.areaOverlap(sliceMatching[0], cohMatching[0]) > 1.5
 
-            overlapS1Coh2 = GeoPosition().areaOverlap(str(sliceMatching[0]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[1]).strip(" ") + "/manifest.safe") > 1.5
+            overlapS1Coh2 = self.__footprintIndex.areaOverlap(sliceMatching[0], cohMatching[1]) > 1.5
 
-            overlapS2Coh1 = GeoPosition().areaOverlap(str(sliceMatching[1]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[0]).strip(" ") + "/manifest.safe") > 1.5
+            overlapS2Coh1 = self.__footprintIndex.areaOverlap(sliceMatching[1], cohMatching[0]) > 1.5
 
-            overlapS2Coh2 = GeoPosition().areaOverlap(str(sliceMatching[1]).strip(" ") + "/manifest.safe",
-                                                      str(cohMatching[1]).strip(" ") + "/manifest.safe") > 1.2
+            overlapS2Coh2 = self.__footprintIndex.areaOverlap(sliceMatching[1], cohMatching[1]) > 1.2
 
             if not overlapS1Coh1 and not overlapS1Coh2 and overlapS2Coh1 and overlapS2Coh2:
                 sliceMatching = [sliceMatching[1],sliceMatching[1]]
@@ -14,6 +14,17 @@
 #-----The start and end date must be set to define the time range within to aquire the data in.
 #-----A name extension can be set to be added to each output file name.
 #-----The processing sequence must be set.
+#-----Optionally the amount of scenes processed in parallel can be set. Default is one scene at a time.
+#-----Optionally a scratch folder for temporary calculations can be set, e.g. on a local disk.
+#-----Optionally the snap graphs can be executed by a pool of warm graph processing workers instead of one gpt call per graph.
+#-----Optionally concurrent gpt runs are admitted by their learned memory, core and scratch estimates.
+#-----Optionally only the AOI window of GRD scenes is read in the backscatter processing.
+#-----Optionally the dual-pol radar vegetation index is computed with NumPy instead of the snap operator.
+#-----Optionally post processing steps are applied to the final GeoTIFF products, e.g. the conversion to dB.
+#-----Optionally the final products are written as cloud optimized GeoTIFFs.
+#-----Optionally statistics per parcel of a parcel layer are computed from the final products.
+#-----Optionally the final products are appended to Zarr time series cubes.
+#-----Optionally the scenes shared by close AOIs of an AOI folder are processed once for all of them.
 #-----All these settings must be saved in the user_settings.xml file and are accessed during processing.
 #--------------------------------------------------------------------------------------------------------------------------------
 
@@ -36,6 +47,50 @@ class CreateUserSetting:
     currentAoi = ""
     processingList = ""
     processingMode = ""
+    parallelWorkers = ""
+    scratchPath = ""
+    gptExecutor = ""
+    gptWorkers = ""
+    graphFusion = ""
+    graphCacheSize = ""
+    gptMemory = ""
+    memoryBudget = ""
+    gptAdmission = ""
+    aoiPushdown = ""
+    dpRviEngine = ""
+    postProcessing = ""
+    outputProfile = ""
+    cogCompression = ""
+    parcelLayer = ""
+    parcelIdField = ""
+    timeSeriesCube = ""
+    sharedAoiProcessing = ""
+
+    # Optional entries following the base entries. Missing entries are added to existing files with their default.
+    # Entry tag: [entry description, default value]
+    __OPTIONAL_ENTRIES = {
+        "parallelWorkers": ["amount of scenes processed in parallel", "1"],
+        "scratchPath": ["folder for temporary calculations, default is temp in sentinel data", ""],
+        "gptExecutor": ["execution of snap graphs: subprocess or warmPool", "subprocess"],
+        "gptWorkers": ["amount of warm graph processing workers per process", "1"],
+        "graphFusion": ["compose consecutive snap graphs to one graph per job: true or false", "true"],
+        "graphCacheSize": ["size of the graph result cache in the scratch folder in GB, 0 disables the cache", "0"],
+        "gptMemory": ["memory of one gpt process in GB, as -Xmx in gpt.vmoptions", "8"],
+        "memoryBudget": ["memory for concurrent gpt processes in GB, empty for the physical memory", ""],
+        "gptAdmission": ["admit concurrent gpt runs by their learned memory, cores and scratch bytes and size -Xmx, -c "
+                         "and -q per run: true or false", "false"],
+        "aoiPushdown": ["read only the AOI window of GRD scenes in the backscatter processing: true or false", "false"],
+        "dpRviEngine": ["computation of the dual-pol radar vegetation index: snap or numpy", "snap"],
+        "postProcessing": ["steps applied to the final GeoTIFF products in this order, e.g. nodata,aoiMask,dB", ""],
+        "outputProfile": ["layout of the final GeoTIFF products: geotiff or cog", "geotiff"],
+        "cogCompression": ["compression of the cog products: DEFLATE or ZSTD", "DEFLATE"],
+        "parcelLayer": ["parcel layer for statistics per parcel of the final products, empty for none", ""],
+        "parcelIdField": ["attribute of the parcel id in the parcel layer", "id"],
+        "timeSeriesCube": ["append the final products to Zarr cubes per product and relative orbit: true or false",
+                           "false"],
+        "sharedAoiProcessing": ["process the scenes shared by close AOIs of an AOI folder once for all of them: true or "
+                                "false", "false"],
+    }
 
     def __init__(self):
 
@@ -61,6 +116,8 @@ class CreateUserSetting:
             etree.SubElement(paths, "processingSequence", name="sequence to process").text = ""
             etree.SubElement(paths, "folderToProcessByList", name="scene list folder containing lists of scenes as txt file").text = ""
             etree.SubElement(paths, "processingMode", name="Mode to handle derived scenes").text = ""
+            for entry, (description, default) in self.__OPTIONAL_ENTRIES.items():
+                etree.SubElement(paths, entry, name=description).text = default
 
             etree.ElementTree(root)
             prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
@@ -85,7 +142,18 @@ class CreateUserSetting:
                 with open(self.userFolder[0] + "/user_settings.xml", "w") as f:
                     f.write(prettyString)
 
-        if len(root.find("paths")) == 11:
+            missingEntries = [entry for entry in self.__OPTIONAL_ENTRIES if paths.find(entry) is None]
+            for entry in missingEntries:
+                description, default = self.__OPTIONAL_ENTRIES[entry]
+                etree.SubElement(paths, entry, name=description).text = default
+
+            if len(missingEntries) > 0:
+                prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
+
+                with open(self.userFolder[0] + "/user_settings.xml", "w") as f:
+                    f.write(prettyString)
+
+        if len(root.find("paths")) >= 11:
             self.dataPath = root[0][0].text
             self.cohOutputPath = root[0][1].text
             self.backscatterOutputPath = root[0][2].text
@@ -97,6 +165,8 @@ class CreateUserSetting:
             self.processingSequence = root[0][8].text
             self.processingList = root[0][9].text
             self.processingMode = root[0][10].text
+            for entry in self.__OPTIONAL_ENTRIES:
+                setattr(self, entry, root[0].find(entry).text)
         else:
             print("user_settings.xml file Error")
 
@@ -37,6 +37,8 @@ class CreateUserSettingsGui:
     entryCohPath = None
     entryVegIdPath = None
     entryProcessingList = None
+    entryParallelWorkers = None
+    entryScratchPath = None
     varProcessingSpinbox = None
     varProcessingModeSpinbox = None
     displayLabelVar = None
@@ -55,7 +57,7 @@ class CreateUserSettingsGui:
     def makeGui(self):
 
         master = Tk()
-        master.geometry("800x450")
+        master.geometry("800x530")
         Label(master,text="Enter All Attributes for processing").grid(row=0, column = 1, padx=5, pady=5)
 
         Label(master,text="Start Date in Format 'YYYY-MM-DD'").grid(row=1, column=0, sticky = 'w', padx=5, pady=5)
@@ -114,12 +116,20 @@ class CreateUserSettingsGui:
         self.varProcessingModeSpinbox.set('AOI Processing')
         processingMode.grid(row=12, column=1, sticky='w', padx=5, pady=5)
 
-        Button(master, text='Save All and execute', command=self.saveAllSettings).grid(row=13, column=0, sticky='',
+        Label(master, text="Scenes processed in parallel").grid(row=13, column=0, sticky='w', padx=5, pady=5)
+        self.entryParallelWorkers = Entry(master, width=10)
+        self.entryParallelWorkers.grid(row=13, column=1, sticky='w', padx=5, pady=5)
+
+        Label(master, text="Scratch Folder path (optional)").grid(row=14, column=0, sticky='w', padx=5, pady=5)
+        self.entryScratchPath = Entry(master, width=75)
+        self.entryScratchPath.grid(row=14, column=1, padx=5, pady=5)
+
+        Button(master, text='Save All and execute', command=self.saveAllSettings).grid(row=15, column=0, sticky='',
                                                                                        padx=10, pady=10)
 
         self.displayLabelVar = StringVar(master)
         Label(master, textvariable = self.displayLabelVar, bg = 'yellow', fg='red', width = 70, height = 3).grid(
-            row=13, column=1, columnspan = 10, rowspan = 10, sticky = 'w', padx=5, pady=5)
+            row=15, column=1, columnspan = 10, rowspan = 10, sticky = 'w', padx=5, pady=5)
 
     def loadSettings(self):
         if (self.userSettings.calculationStartDate != None and self.userSettings.calculationStartDate != ""):
@@ -159,6 +169,12 @@ class CreateUserSettingsGui:
         if (self.userSettings.processingMode != None and self.userSettings.processingMode != ""):
             self.varProcessingModeSpinbox.set(self.userSettings.processingMode)
 
+        if (self.userSettings.parallelWorkers != None and self.userSettings.parallelWorkers != ""):
+            self.entryParallelWorkers.insert(0, self.userSettings.parallelWorkers)
+
+        if (self.userSettings.scratchPath != None and self.userSettings.scratchPath != ""):
+            self.entryScratchPath.insert(0, self.userSettings.scratchPath)
+
     def saveAllSettings(self):
         entriesComplete = ""
         if (self.entryStartDate.get() != "" and self.entryEndDate.get() != ""):
@@ -230,6 +246,13 @@ class CreateUserSettingsGui:
             self.userSettings.setAttribute("processingMode", self.varProcessingModeSpinbox.get())
             self.userSettings.processingMode = self.varProcessingModeSpinbox.get()
 
+        if (self.entryParallelWorkers.get() != ""):
+            self.userSettings.setAttribute("parallelWorkers", self.entryParallelWorkers.get())
+            self.userSettings.parallelWorkers = self.entryParallelWorkers.get()
+
+        self.userSettings.setAttribute("scratchPath", self.entryScratchPath.get())
+        self.userSettings.scratchPath = self.entryScratchPath.get()
+
         if (entriesComplete != ""):
             if entriesComplete == "Aoi": 
                 self.displayLabelVar.set("Aoi Entry not Correct.\n EITHER Aoi in Wkt format OR path must be set.")
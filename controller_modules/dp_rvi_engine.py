@@ -0,0 +1,222 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        dp_rvi_engine
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class computes the dual-pol radar vegetation index without a gpt call, as the Radar-Vegetation-Index operator
+#-------of calc_dp_rad_veg_index.xml does on the C2 matrix product "polarmlsf_<scene id>.dim".
+#-------The bands of the BEAM-DIMAP product are read as memory mapped ENVI .img files and processed in blocks of lines.
+#-------Per pixel the C2 elements are averaged in a window of windowSize x windowSize pixels, cut at the image borders:
+#-------m = sqrt(1 - 4 det(C2) / span^2), beta = lambda1 / span, DpRVI = 1 - m * beta with the largest eigenvalue lambda1.
+#-------Products with Sigma0_VH and Sigma0_VV bands instead of C2 get the dual-pol RVI = 4 VH / (VV + VH).
+#-------The result is written as BEAM-DIMAP product with the metadata and tie point grids of the source product, so the
+#-------terrain correction reads it like the product of the gpt graph.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import numpy as np
+from lxml import etree
+
+
+class DpRviEngine:
+
+    C2_BANDS = ["C11", "C12_real", "C12_imag", "C22"]
+    SIGMA0_BANDS = ["Sigma0_VH", "Sigma0_VV"]
+
+    # #ENVI data type codes of the BEAM-DIMAP bands
+    ENVI_TYPES = {"1": "u1", "2": "i2", "3": "i4", "4": "f4", "5": "f8", "12": "u2", "13": "u4"}
+
+    def __init__(self, blockLines=512):
+        self.blockLines = blockLines
+
+    def process(self, inputDim, outputBase, windowSize=3, logObject=None) -> bool:
+        """Computes the index of the input product and writes it to outputBase.dim.
+
+        Parameters
+        ----------
+        inputDim : str
+            The path of the BEAM-DIMAP .dim file with C2 or Sigma0 bands
+        outputBase : str
+            The path of the output product without extension, as the Write node of the graph
+        windowSize : int
+            The averaging window of the C2 elements
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+
+        Returns
+        -------
+        bool
+            True if the product is written
+        """
+
+        try:
+            bands = self.__openBands(inputDim)
+        except (OSError, etree.XMLSyntaxError, ValueError) as e:
+            self.__log(logObject, "DpRVI can not be computed from " + inputDim + ": " + str(e), True)
+            return False
+
+        if all(band in bands for band in self.C2_BANDS):
+            bandName = "DpRVI"
+            computeBlock = lambda values, first, last: self.__getDpRvi(values, first, last, windowSize)
+            sourceBands = self.C2_BANDS
+        elif all(band in bands for band in self.SIGMA0_BANDS):
+            bandName = "RVI"
+            computeBlock = lambda values, first, last: self.__getRvi(values, first, last)
+            sourceBands = self.SIGMA0_BANDS
+        else:
+            self.__log(logObject, "DpRVI can not be computed from " + inputDim + ": no C2 or Sigma0 bands", True)
+            return False
+
+        lines, samples = bands[sourceBands[0]].shape
+        dataFolder = outputBase + ".data/"
+        self.__copyProductStructure(inputDim, outputBase)
+
+        output = np.memmap(dataFolder + bandName + ".img", dtype=">f4", mode="w+", shape=(lines, samples))
+        halo = windowSize // 2 if bandName == "DpRVI" else 0
+        for firstLine in range(0, lines, self.blockLines):
+            lastLine = min(firstLine + self.blockLines, lines)
+
+            # #The block is read with the lines of the window above and below, so the averages match the whole image
+            readFirst = max(firstLine - halo, 0)
+            readLast = min(lastLine + halo, lines)
+            values = [np.asarray(bands[band][readFirst:readLast], dtype=np.float64) for band in sourceBands]
+            output[firstLine:lastLine] = computeBlock(values, firstLine - readFirst, lastLine - readFirst)
+        output.flush()
+        del output
+
+        self.__writeHeader(dataFolder + bandName + ".hdr", samples, lines, bandName)
+        self.__writeDim(inputDim, outputBase, bandName)
+        self.__log(logObject, "DpRVI computed without gpt: " + outputBase + ".dim")
+        return True
+
+    # ##################################Index computation#################################
+
+    @staticmethod
+    def __getDpRvi(values, first, last, windowSize):
+        half = windowSize // 2
+        c11, c12Real, c12Imag, c22 = [DpRviEngine.getWindowMean(value, half)[first:last] for value in values]
+
+        span = c11 + c22
+        det = c11 * c22 - (c12Real * c12Real + c12Imag * c12Imag)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = np.sqrt(np.clip(1.0 - 4.0 * det / (span * span), 0.0, 1.0))
+            lambda1 = (span + np.sqrt(np.clip(span * span - 4.0 * det, 0.0, None))) / 2.0
+            dpRvi = 1.0 - m * lambda1 / span
+        return np.where(span > 0, dpRvi, 0.0)
+
+    @staticmethod
+    def __getRvi(values, first, last):
+        vh, vv = [value[first:last] for value in values]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rvi = 4.0 * vh / (vv + vh)
+        return np.where(vv + vh > 0, rvi, 0.0)
+
+    @staticmethod
+    def getWindowMean(values, half):
+        """Returns the mean of each pixel in a window of 2 * half + 1 pixels, cut at the borders of the values."""
+        lines, samples = values.shape
+        integral = np.zeros((lines + 1, samples + 1))
+        integral[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+
+        lineIndex = np.arange(lines)
+        sampleIndex = np.arange(samples)
+        top = np.clip(lineIndex - half, 0, lines)[:, None]
+        bottom = np.clip(lineIndex + half + 1, 0, lines)[:, None]
+        left = np.clip(sampleIndex - half, 0, samples)[None, :]
+        right = np.clip(sampleIndex + half + 1, 0, samples)[None, :]
+
+        sums = integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+        return sums / ((bottom - top) * (right - left))
+
+    # ##################################BEAM-DIMAP access#################################
+
+    def __openBands(self, inputDim):
+        dataFolder = inputDim[:-len(".dim")] + ".data/"
+        bands = {}
+        for file in os.listdir(dataFolder):
+            if not file.endswith(".hdr"):
+                continue
+
+            header = self.__readHeader(dataFolder + file)
+            dataType = self.ENVI_TYPES.get(header.get("data type"))
+            if dataType is None or not os.path.exists(dataFolder + file[:-len(".hdr")] + ".img"):
+                continue
+
+            byteOrder = ">" if header.get("byte order", "1") == "1" else "<"
+            bands[file[:-len(".hdr")]] = np.memmap(dataFolder + file[:-len(".hdr")] + ".img",
+                                                   dtype=byteOrder + dataType, mode="r",
+                                                   offset=int(header.get("header offset", "0")),
+                                                   shape=(int(header["lines"]), int(header["samples"])))
+        return bands
+
+    @staticmethod
+    def __readHeader(hdrFile):
+        header = {}
+        with open(hdrFile) as f:
+            for line in f:
+                if "=" in line:
+                    key, value = line.split("=", 1)
+                    header[key.strip().lower()] = value.strip()
+        return header
+
+    @staticmethod
+    def __writeHeader(hdrFile, samples, lines, bandName):
+        with open(hdrFile, "w") as f:
+            f.write("ENVI\ndescription = {Sentinel Application Platform (SNAP) Image File}\nsamples = " + str(samples) +
+                    "\nlines = " + str(lines) + "\nbands = 1\nheader offset = 0\nfile type = ENVI Standard\n"
+                    "data type = 4\ninterleave = bsq\nbyte order = 1\nband names = { " + bandName + " }\n")
+
+    @staticmethod
+    def __copyProductStructure(inputDim, outputBase):
+        inputData = inputDim[:-len(".dim")] + ".data/"
+        if os.path.exists(outputBase + ".data"):
+            shutil.rmtree(outputBase + ".data")
+        os.makedirs(outputBase + ".data")
+
+        # #Tie point grids and vectors are needed by the terrain correction
+        for folder in ["tie_point_grids", "vector_data"]:
+            if os.path.isdir(inputData + folder):
+                shutil.copytree(inputData + folder, outputBase + ".data/" + folder)
+
+    @staticmethod
+    def __writeDim(inputDim, outputBase, bandName):
+        root = etree.parse(inputDim).getroot()
+        name = os.path.basename(outputBase)
+
+        for element in root.iter("DATASET_NAME"):
+            element.text = name
+        for element in root.iter("NBANDS"):
+            element.text = "1"
+
+        # #The first band entries are kept as template of the index band
+        for parentTag, childTag in [("Data_Access", "Data_File"), ("Image_Interpretation", "Spectral_Band_Info")]:
+            parent = root.find(parentTag)
+            children = parent.findall(childTag) if parent is not None else []
+            for child in children[1:]:
+                parent.remove(child)
+            if len(children) == 0:
+                continue
+
+            band = children[0]
+            for element in band.iter():
+                if element.tag == "DATA_FILE_PATH":
+                    element.set("href", name + ".data/" + bandName + ".hdr")
+                elif element.tag in ["BAND_INDEX", "BAND_NAME", "BAND_DESCRIPTION", "PHYSICAL_UNIT", "DATA_TYPE",
+                                     "EXPRESSION"]:
+                    element.text = {"BAND_INDEX": "0", "BAND_NAME": bandName, "BAND_DESCRIPTION": "",
+                                    "PHYSICAL_UNIT": "", "DATA_TYPE": "float32", "EXPRESSION": None}[element.tag]
+
+        etree.ElementTree(root).write(outputBase + ".dim", xml_declaration=True, encoding="ISO-8859-1",
+                                      pretty_print=True)
+
+    @staticmethod
+    def __log(logObject, message, error=False):
+        if logObject is not None:
+            logObject.appendOutputToLog(message, error)
+        else:
+            print(message)
@@ -0,0 +1,153 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        footprint_index
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----This class holds the footprints of all candidate scenes of a list creation in a shapely STRtree.
+# ----The footprints are taken once from the SceneCatalog and prepared for repeated intersect tests.
+# ----Overlap and intersect queries between two scenes are answered with the same results as the methods of GeoPosition.
+# ----Scenes whose bounding boxes do not touch are sorted out by the tree without any polygon calculation and the result
+# ----of each tested pair is kept for following queries.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import math
+from shapely import wkt
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.geo_position import GeoPosition
+
+
+class FootprintIndex:
+
+    def __init__(self, tiles):
+        self.__scenes = []
+        self.__positions = {}
+        self.__polygons = {}
+        self.__prepared = {}
+        self.__roundedPolygons = {}
+        self.__overlaps = {}
+        self.__neighbours = {}
+
+        for tile in tiles:
+            scene = SceneCatalog.normaliseProduct(str(tile))
+            if scene in self.__positions:
+                continue
+            polygon = SceneCatalog.default().getFootprintPolygon(scene)
+            if polygon is None:
+                continue
+            self.__positions[scene] = len(self.__scenes)
+            self.__scenes.append(scene)
+            self.__polygons[scene] = polygon
+
+        self.__tree = STRtree([self.__polygons[scene] for scene in self.__scenes]) if self.__scenes else None
+        self.__treeIds = {id(self.__polygons[scene]): index for index, scene in enumerate(self.__scenes)}
+
+    # ##################################Queries on the indexed footprints#################################
+
+    def getOverlappingScenes(self, scene):
+        """Returns all indexed scenes whose footprint intersects the footprint of the given scene, the scene itself
+        included.
+
+        Parameters
+        ----------
+        scene : str
+            The path of the SAFE product folder or of its manifest.safe file
+
+        Returns
+        -------
+        set
+            The normalised paths of the intersecting scenes
+        """
+
+        scene = SceneCatalog.normaliseProduct(str(scene))
+        if scene in self.__neighbours:
+            return self.__neighbours[scene]
+
+        polygon = self.__getPolygon(scene)
+        if polygon is None or self.__tree is None:
+            return set()
+
+        preparedPolygon = self.__getPrepared(scene)
+        neighbours = set()
+        for index in self.__query(polygon):
+            candidate = self.__scenes[index]
+            if preparedPolygon.intersects(self.__polygons[candidate]):
+                neighbours.add(candidate)
+
+        self.__neighbours[scene] = neighbours
+        return neighbours
+
+    def areaOverlap(self, scene1, scene2):
+        """Returns the area of the intersection of both footprints as GeoPosition.areaOverlap does."""
+
+        scene1 = SceneCatalog.normaliseProduct(str(scene1))
+        scene2 = SceneCatalog.normaliseProduct(str(scene2))
+
+        pair = (scene1, scene2) if scene1 <= scene2 else (scene2, scene1)
+        if pair in self.__overlaps:
+            return self.__overlaps[pair]
+
+        if scene1 in self.__positions and scene2 in self.__positions:
+            if scene2 not in self.getOverlappingScenes(scene1):
+                area = 0.0
+            else:
+                area = self.__polygons[scene2].intersection(self.__polygons[scene1]).area
+        else:
+            # #Scenes outside the index are calculated directly
+            area = GeoPosition().areaOverlap(scene1 + "/manifest.safe", scene2 + "/manifest.safe")
+
+        self.__overlaps[pair] = area
+        return area
+
+    def roundedIntersect(self, scene1, scene2):
+        """Returns if both footprints intersect after all coordinates were floored to two decimals as
+        GeoPosition.roundedIntersect does."""
+
+        rounded1 = self.__getRoundedPolygon(SceneCatalog.normaliseProduct(str(scene1)))
+        rounded2 = self.__getRoundedPolygon(SceneCatalog.normaliseProduct(str(scene2)))
+        if rounded1 is None or rounded2 is None:
+            return False
+
+        # #The prepared geometry of the first scene is tested against the plain geometry of the second one
+        return rounded1[0].intersects(rounded2[1])
+
+    # ##################################Helper#################################
+
+    def __query(self, polygon):
+        # #shapely >= 2.0 returns the indices of the candidates, older versions the geometries
+        candidates = self.__tree.query(polygon)
+        if len(candidates) > 0 and hasattr(candidates[0], "geom_type"):
+            return [self.__treeIds[id(candidate)] for candidate in candidates]
+        return [int(index) for index in candidates]
+
+    def __getPolygon(self, scene):
+        if scene not in self.__polygons:
+            polygon = SceneCatalog.default().getFootprintPolygon(scene)
+            if polygon is None:
+                return None
+            self.__polygons[scene] = polygon
+        return self.__polygons[scene]
+
+    def __getPrepared(self, scene):
+        if scene not in self.__prepared:
+            self.__prepared[scene] = prep(self.__polygons[scene])
+        return self.__prepared[scene]
+
+    def __getRoundedPolygon(self, scene):
+        if scene not in self.__roundedPolygons:
+            polygon = self.__getPolygon(scene)
+            if polygon is None:
+                return None
+
+            floorCoord = lambda x: math.floor(x * 100) / 100
+            roundedWkt = "POLYGON((" + ",".join(str(floorCoord(x)) + " " + str(floorCoord(y))
+                                                for x, y in polygon.exterior.coords) + "))"
+            roundedPolygon = wkt.loads(roundedWkt)
+            self.__roundedPolygons[scene] = (prep(roundedPolygon), roundedPolygon)
+        return self.__roundedPolygons[scene]
@@ -9,6 +9,8 @@
 #
 # ----This class contains multiple methods for coordinate derivation, calculation and coordinate format transformation.
 # ----To derive the coordinates for a sentinel-1 SAR scene a xml file query is performed.
+# ----The coordinates of a manifest.safe file are taken from the SceneCatalog, so each product is parsed only once.
+# ----The subswath and burst footprints are derived from the annotation geolocation grids stored in the SceneCatalog.
 #--------------------------------------------------------------------------------------------------------------------------------
 
 
@@ -23,6 +25,8 @@ from shapely.geometry import shape, Polygon, Point
 from shapely import wkt, geometry
 import math
 
+from controller_modules.scene_catalog import SceneCatalog
+
 
 class GeoPosition:
 
@@ -49,15 +53,17 @@ class GeoPosition:
         return g2.wkt
 
     def snapCoordsToWkt(self, snapCoords) -> str:
-        transformationFunc = (lambda x: (' '.join((lambda y: [y[1], y[0]])(i.split(","))) for i in x))
+        return SceneCatalog.snapCoordsToWkt(snapCoords)
 
-        openPolygon = list(transformationFunc(snapCoords.split(" ")))
-        openPolygon.append(openPolygon[0])
+    def swMultiPolygonFromScene(self, scene):
+        """Returns the footprints of the subswaths IW3, IW2 and IW1 of the scene. Without annotation files the
+        subswaths are approximated by equal thirds of the scene footprint."""
 
-        coordinatesAsString = ','.join(openPolygon)
-        return "POLYGON((" + coordinatesAsString + "))"
+        if scene.strip().endswith("manifest.safe"):
+            footprints = SceneCatalog.default().getSubswathFootprints(scene)
+            if all(subswath in footprints for subswath in ["IW3", "IW2", "IW1"]):
+                return [wkt.loads(footprints[subswath]) for subswath in ["IW3", "IW2", "IW1"]]
 
-    def swMultiPolygonFromScene(self, scene):
         wktScene = self.getWktFromScene(scene)
         if wktScene is None:
             return None
@@ -83,18 +89,37 @@ class GeoPosition:
         polyList.append(geometry.Polygon([[p.x, p.y] for p in pointList3]))
         return [polyList[0], polyList[1], polyList[2]]
 
+    def swBurstPolygonsFromScene(self, scene):
+        """Returns the burst polygons of the subswaths IW3, IW2 and IW1 of the scene as three lists.
+        None if the burst boundaries are not available from the annotation files."""
+
+        if not scene.strip().endswith("manifest.safe"):
+            return None
+
+        bursts = SceneCatalog.default().getBurstPolygons(scene)
+        if not all(len(bursts.get(subswath, [])) > 0 for subswath in ["IW3", "IW2", "IW1"]):
+            return None
+        return [bursts["IW3"], bursts["IW2"], bursts["IW1"]]
+
     def getWktFromScene(self, scene: str) -> str:
+        if scene.strip().endswith("manifest.safe"):
+            return SceneCatalog.default().getFootprint(scene)
+
         tree = etree.parse(scene)
         root = tree.getroot()
         result = root.findall('.//{http://www.opengis.net/gml}coordinates')
         return self.snapCoordsToWkt(result[0].text) if result is not None and len(result) > 0 else None
 
-    def areaOverlap(self, scene1, scene2):
-        wkt1 = self.getWktFromScene(scene1)
-        wkt2 = self.getWktFromScene(scene2)
+    def getPolygonFromScene(self, scene: str) -> Polygon:
+        if scene.strip().endswith("manifest.safe"):
+            return SceneCatalog.default().getFootprintPolygon(scene)
 
-        poly1: Polygon = wkt.loads(wkt1)
-        poly2: Polygon = wkt.loads(wkt2)
+        wktScene = self.getWktFromScene(scene)
+        return wkt.loads(wktScene) if wktScene is not None else None
+
+    def areaOverlap(self, scene1, scene2):
+        poly1: Polygon = self.getPolygonFromScene(scene1)
+        poly2: Polygon = self.getPolygonFromScene(scene2)
 
         areaOverlap = poly2.intersection(poly1).area
         return areaOverlap
@@ -0,0 +1,92 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        gpt_executor
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class is the interface of the backends executing rendered Snap graph .xml files.
+#-------Available backends:
+#-------"subprocess": one gpt call per graph via pyroSAR (SubprocessGptExecutor). This is the default.
+#-------"warmPool": a pool of long-lived graph processing workers, each keeping its JVM warm (WarmGptWorkerPool).
+#-------With a GptResourceScheduler the graphs are executed by the backend once their resources are free, each gpt process
+#-------sized to its slot (ResourceAwareGptExecutor).
+#-------The executor of the current run is set once and used by SnapGraphProcessing.performProcessing.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import threading
+
+
+class GptExecutor:
+
+    BACKENDS = ["subprocess", "warmPool"]
+
+    __defaultExecutor = None
+    __lock = threading.Lock()
+
+    def execute(self, xmlFile, gptArgs=None) -> str:
+        """Executes the given graph file.
+
+        Parameters
+        ----------
+        xmlFile : str
+            The path of the rendered graph file
+        gptArgs : list
+            Additional arguments of the gpt call, e.g. ["-q", "4"]
+
+        Returns
+        -------
+        str
+            The output of the graph execution
+
+        Raises
+        ------
+        RuntimeError
+            If the graph execution fails
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # ##################################Executor of the current run#################################
+
+    @staticmethod
+    def create(backend="subprocess", workers=1, resourceScheduler=None):
+        """Creates the executor of the given backend. Unknown backends fall back to the subprocess backend.
+        With a GptResourceScheduler the graphs of the backend are admitted by their resources."""
+        from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+        from controller_modules.warm_gpt_worker_pool import WarmGptWorkerPool
+        from controller_modules.resource_aware_gpt_executor import ResourceAwareGptExecutor
+
+        workers = str(workers).strip() if workers is not None else ""
+        workers = int(workers) if workers.isdigit() and int(workers) > 0 else 1
+
+        if backend == "warmPool":
+            executor = WarmGptWorkerPool(workers)
+        else:
+            if backend not in [None, "", "subprocess"]:
+                print("Unknown gpt executor " + str(backend) + ". Graphs are executed by subprocess.")
+            executor = SubprocessGptExecutor()
+
+        if resourceScheduler is not None:
+            return ResourceAwareGptExecutor(executor, resourceScheduler)
+        return executor
+
+    @staticmethod
+    def setDefault(executor):
+        """Sets the executor used by all modules of the current run. The previous executor is closed."""
+        with GptExecutor.__lock:
+            previousExecutor = GptExecutor.__defaultExecutor
+            GptExecutor.__defaultExecutor = executor
+        if previousExecutor is not None and previousExecutor is not executor:
+            previousExecutor.close()
+
+    @staticmethod
+    def default():
+        with GptExecutor.__lock:
+            if GptExecutor.__defaultExecutor is None:
+                GptExecutor.__defaultExecutor = GptExecutor.create()
+            return GptExecutor.__defaultExecutor
@@ -0,0 +1,352 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        gpt_resource_scheduler
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class admits concurrent gpt runs only while their estimated resources fit into the free resources of the
+#-------machine, so parallel workers and subswath branches neither swap nor lose a gpt process to the OOM killer.
+#-------Each graph type, the operators of the graph in node order, has an estimate of the memory, cores and scratch
+#-------bytes of one gpt run. The estimates are learned from the past runs recorded in "gpt_resources.sqlite" in the log
+#-------output folder: the peak memory and cpu time of the gpt process and the size of the written products per run.
+#-------Graph types without recorded runs are estimated from the user settings "gptMemory" and "parallelWorkers".
+#-------A run is admitted if the memory of all admitted runs stays within the memory budget and the available memory,
+#-------their cores within the cpu cores and their scratch bytes within the free space of the scratch folder.
+#-------The admitted runs of all processes sharing the log output folder are recorded in the same database with the
+#-------host, pid and start time of their process (see ProcessOwner). Slots of processes of this host that ended without
+#-------releasing them are removed. Processes of other hosts or containers can not be checked, each process renews the
+#-------heartbeat of its slots every HEARTBEAT_INTERVAL sec and their slots are removed once the heartbeat is older than
+#-------LEASE_TIMEOUT sec. A run is always admitted if no other run is admitted, its slot is reduced to the resources of
+#-------the machine then.
+#-------The heap (-Xmx), tile cache (-c) and parallelism (-q) of each gpt process are sized to the slot of its run.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import math
+import time
+import shutil
+import sqlite3
+import threading
+import contextlib
+from lxml import etree
+from controller_modules.process_owner import ProcessOwner
+
+
+class GptResourceScheduler:
+
+    STATE_FILE = "gpt_resources.sqlite"
+
+    # #Memory of a gpt process beyond its heap, e.g. for the JVM itself and native buffers of the readers
+    JVM_OVERHEAD = 1.25
+    # #Share of the heap used as tile cache
+    TILE_CACHE_SHARE = 0.5
+    # #The estimates are raised by this factor over the largest recorded usage
+    SAFETY_FACTOR = 1.2
+    # #A failed run with a peak above this share of its memory may have been short of memory
+    MEMORY_FAILURE_SHARE = 0.8
+    MIN_MEMORY = 1024 ** 3
+    RECENT_RUNS = 20
+    POLL_INTERVAL = 1.0
+    HEARTBEAT_INTERVAL = 30.0
+    LEASE_TIMEOUT = 300.0
+
+    # #Heartbeat thread of each process and state file, started with the first admitted run of the process
+    __heartbeats = {}
+    __heartbeatLock = threading.Lock()
+
+    def __init__(self, stateFolder, scratchPath, memoryBudget="", gptMemory="", parallelWorkers=1):
+        """
+        Parameters
+        ----------
+        stateFolder : str
+            The folder of the database of the recorded runs and admitted slots, e.g. the log output folder
+        scratchPath : str
+            The folder the gpt runs write their intermediate products to
+        memoryBudget : str
+            The memory for concurrent gpt processes in GB, the user settings entry 'memoryBudget'. Empty for the
+            physical memory
+        gptMemory : str
+            The heap of one gpt process in GB, the user settings entry 'gptMemory'. Used for graph types without
+            recorded runs
+        parallelWorkers : int or str
+            The amount of scenes processed in parallel, the user settings entry 'parallelWorkers'
+        """
+
+        self.stateFile = stateFolder + self.STATE_FILE
+        self.scratchPath = scratchPath
+        self.cpuCount = GptResourceScheduler.getCpuCount()
+
+        self.memoryBudget = GptResourceScheduler.__toBytes(memoryBudget, None) or \
+            GptResourceScheduler.getPhysicalMemory()
+        self.defaultMemory = int(GptResourceScheduler.__toBytes(gptMemory, 8 * 1024 ** 3) * self.JVM_OVERHEAD)
+        workers = str(parallelWorkers).strip()
+        self.defaultCores = max(1, self.cpuCount // (int(workers) if workers.isdigit() and int(workers) > 0 else 1))
+
+        if not os.path.exists(stateFolder):
+            os.makedirs(stateFolder, exist_ok=True)
+        if not os.path.exists(scratchPath):
+            os.makedirs(scratchPath, exist_ok=True)
+        with contextlib.closing(self.__connect()) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS runs (graphType TEXT, time REAL, seconds REAL, "
+                               "inputBytes INTEGER, peakBytes INTEGER, cpuSeconds REAL, scratchBytes INTEGER, "
+                               "memory INTEGER, cores INTEGER, success INTEGER)")
+            connection.execute("CREATE INDEX IF NOT EXISTS runsByType ON runs (graphType, time)")
+            connection.execute("CREATE TABLE IF NOT EXISTS slots (slotId INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "host TEXT, pid INTEGER, pidStart TEXT, graphType TEXT, memory INTEGER, cores INTEGER, "
+                               "scratch INTEGER, startTime REAL, heartbeat REAL)")
+            # #Databases of former versions have no owner and heartbeat, their slots expire with the first admission
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(slots)")]
+            for column, columnType in [("host", "TEXT"), ("pidStart", "TEXT"), ("heartbeat", "REAL")]:
+                if column not in columns:
+                    connection.execute("ALTER TABLE slots ADD COLUMN " + column + " " + columnType)
+
+    @staticmethod
+    def fromSetting(setting, dataPath, scratchPath, memoryBudget, gptMemory, parallelWorkers):
+        """Returns the scheduler of the user settings, None if the entry 'gptAdmission' is not "true"."""
+        if str(setting).strip().lower() != "true":
+            return None
+        scratchPath = scratchPath if scratchPath else str(dataPath) + "temp/"
+        return GptResourceScheduler(str(dataPath) + "log_output/", scratchPath if scratchPath.endswith("/") else
+                                    scratchPath + "/", memoryBudget, gptMemory, parallelWorkers)
+
+    # ##################################Admission#################################
+
+    def acquire(self, xmlFile):
+        """Waits until the estimated resources of the graph fit and admits its run.
+
+        Parameters
+        ----------
+        xmlFile : str
+            The path of the rendered graph file
+
+        Returns
+        -------
+        dict
+            The slot of the run: its memory in bytes, cores and scratch bytes, released by release
+        """
+
+        graphType, readFiles, writeFiles = GptResourceScheduler.getGraphInfo(xmlFile)
+        inputBytes = sum(GptResourceScheduler.getProductBytes(file) for file in readFiles)
+        need = self.estimate(graphType, inputBytes)
+
+        timeBefore = time.time()
+        slot = self.__admit(graphType, need)
+        while slot is None:
+            time.sleep(self.POLL_INTERVAL)
+            slot = self.__admit(graphType, need)
+        self.__startHeartbeat()
+
+        slot.update({"graphType": graphType, "inputBytes": inputBytes, "writeFiles": writeFiles,
+                     "waited": time.time() - timeBefore})
+        return slot
+
+    def release(self, slot, seconds, peakBytes=None, cpuSeconds=None, success=True):
+        """Frees the slot of a finished run and records the run for the estimates of its graph type.
+
+        Parameters
+        ----------
+        slot : dict
+            The slot returned by acquire
+        seconds : float
+            The duration of the run
+        peakBytes : int
+            The peak memory of the gpt process, None if it was not measured
+        cpuSeconds : float
+            The cpu time of the gpt process, None if it was not measured
+        success : bool
+            The run wrote its products
+        """
+
+        scratchBytes = sum(GptResourceScheduler.getProductBytes(file) for file in slot["writeFiles"])
+        with contextlib.closing(self.__connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("INSERT INTO runs (graphType, time, seconds, inputBytes, peakBytes, cpuSeconds, "
+                               "scratchBytes, memory, cores, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (slot["graphType"], time.time(), seconds, slot["inputBytes"], peakBytes, cpuSeconds,
+                                scratchBytes, slot["memory"], slot["cores"], 1 if success else 0))
+            connection.execute("DELETE FROM slots WHERE slotId = ?", (slot["id"],))
+            connection.execute("COMMIT")
+
+    def getGptArgs(self, slot):
+        """Returns the gpt arguments sizing the heap, tile cache and parallelism of the process to its slot."""
+        heapMb = max(1, int(slot["memory"] / self.JVM_OVERHEAD / 1024 ** 2))
+        return ["-J-Xmx" + str(heapMb) + "M", "-c", str(int(heapMb * self.TILE_CACHE_SHARE)) + "M", "-q",
+                str(slot["cores"])]
+
+    def __admit(self, graphType, need):
+        host, pid, pidStart = ProcessOwner.getOwner()
+        with contextlib.closing(self.__connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                slots = connection.execute("SELECT slotId, memory, cores, scratch, host, pid, pidStart, heartbeat "
+                                           "FROM slots").fetchall()
+                # #Slots of processes of this host that ended without releasing them, slots of other hosts and
+                # #containers once their heartbeat expired
+                now = time.time()
+                staleSlots = [(slot[0],) for slot in slots if ProcessOwner.isGone(slot[4], slot[5], slot[6]) or
+                              (slot[4] != host and now - (slot[7] or 0) > self.LEASE_TIMEOUT)]
+                connection.executemany("DELETE FROM slots WHERE slotId = ?", staleSlots)
+                slots = [slot for slot in slots if (slot[0],) not in staleSlots]
+
+                availableMemory = GptResourceScheduler.getAvailableMemory()
+                if len(slots) == 0:
+                    # #A run is always admitted alone, so graphs larger than the machine are still executed
+                    slot = {"memory": max(self.MIN_MEMORY, min(need["memory"], self.memoryBudget, availableMemory)),
+                            "cores": min(need["cores"], self.cpuCount), "scratch": need["scratch"]}
+                elif sum(slot[1] for slot in slots) + need["memory"] > self.memoryBudget or \
+                        need["memory"] > availableMemory or \
+                        sum(slot[2] for slot in slots) + need["cores"] > self.cpuCount or \
+                        sum(slot[3] for slot in slots) + need["scratch"] > self.getFreeScratch():
+                    connection.execute("COMMIT")
+                    return None
+                else:
+                    slot = dict(need)
+
+                cursor = connection.execute("INSERT INTO slots (host, pid, pidStart, graphType, memory, cores, "
+                                            "scratch, startTime, heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            (host, pid, pidStart, graphType, slot["memory"], slot["cores"],
+                                             slot["scratch"], now, now))
+                slot["id"] = cursor.lastrowid
+                connection.execute("COMMIT")
+                return slot
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    # ##################################Estimates#################################
+
+    def estimate(self, graphType, inputBytes=0):
+        """Returns the memory in bytes, cores and scratch bytes of a run of the graph type, learned from its recent
+        runs."""
+
+        with contextlib.closing(self.__connect()) as connection:
+            runs = connection.execute("SELECT seconds, inputBytes, peakBytes, cpuSeconds, scratchBytes, memory, cores, "
+                                      "success FROM runs WHERE graphType = ? ORDER BY time DESC LIMIT ?",
+                                      (graphType, self.RECENT_RUNS)).fetchall()
+
+        memory, cores, scratch = self.defaultMemory, self.defaultCores, 2 * inputBytes
+        succeeded = [run for run in runs if run[7] == 1]
+
+        peaks = [run[2] for run in succeeded if run[2]]
+        if peaks:
+            memory = max(peaks) * self.SAFETY_FACTOR
+        # #A failed run close to its memory may have been short of memory, the next run gets more
+        shortRuns = [run[5] for run in runs if run[7] == 0 and run[2] and run[2] >= self.MEMORY_FAILURE_SHARE * run[5]]
+        if shortRuns:
+            memory = max(memory, max(shortRuns) * 1.5)
+
+        usages = [(run[3] / run[0], run[6]) for run in succeeded if run[3] is not None and run[0] and run[0] > 0]
+        if usages:
+            cores = math.ceil(sum(usage for usage, granted in usages) / len(usages))
+            # #A graph using all of its cores may scale to more
+            if any(usage >= 0.9 * granted for usage, granted in usages):
+                cores = max(cores, max(granted for usage, granted in usages) + 1)
+
+        written = [(run[4], run[1]) for run in succeeded if run[4]]
+        if written:
+            ratios = [scratchBytes / inputSize for scratchBytes, inputSize in written if inputSize]
+            scratch = max(ratios) * inputBytes if ratios and inputBytes else max(run[0] for run in written)
+            scratch = scratch * self.SAFETY_FACTOR
+
+        return {"memory": int(min(max(memory, self.MIN_MEMORY), self.memoryBudget)),
+                "cores": int(min(max(cores, 1), self.cpuCount)), "scratch": int(scratch)}
+
+    # ##################################Resources#################################
+
+    def getFreeScratch(self):
+        try:
+            return shutil.disk_usage(self.scratchPath).free
+        except OSError:
+            return 0
+
+    @staticmethod
+    def getCpuCount():
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+    @staticmethod
+    def getPhysicalMemory():
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    @staticmethod
+    def getAvailableMemory():
+        """Returns the memory available for new processes without swapping, the physical memory if unknown."""
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return GptResourceScheduler.getPhysicalMemory()
+
+    # ##################################Graph files#################################
+
+    @staticmethod
+    def getGraphInfo(xmlFile):
+        """Returns the graph type, the files of the Read nodes and the files of the Write nodes of the graph."""
+        root = etree.parse(xmlFile).getroot()
+        operators = []
+        readFiles = []
+        writeFiles = []
+        for node in root.findall("node"):
+            operator = node.findtext("operator") or ""
+            operators.append(operator)
+            file = (node.findtext("parameters/file") or "").strip()
+            if operator == "Read" and file != "":
+                readFiles.append(file)
+            elif operator == "Write" and file != "":
+                writeFiles.append(file)
+        return ">".join(operators), readFiles, writeFiles
+
+    @staticmethod
+    def getProductBytes(path):
+        """Returns the size of a product on disk: a file, a folder, or a BEAM-DIMAP product with its .data folder."""
+        base = path[:-len(".dim")] if path.endswith(".dim") else path
+        size = 0
+        for candidate in sorted({path, base + ".dim", base + ".data", base + ".tif"}):
+            if os.path.isfile(candidate):
+                size = size + os.path.getsize(candidate)
+            elif os.path.isdir(candidate):
+                for root, dirs, files in os.walk(candidate):
+                    size = size + sum(os.path.getsize(os.path.join(root, file)) for file in files
+                                      if os.path.isfile(os.path.join(root, file)))
+        return size
+
+    # ##################################Helper#################################
+
+    def __connect(self):
+        # #One connection per call, the scheduler is shared by the threads of the subswath branches
+        return sqlite3.connect(self.stateFile, timeout=60, isolation_level=None)
+
+    @staticmethod
+    def __toBytes(gigabytes, default):
+        try:
+            return int(float(gigabytes) * 1024 ** 3) if str(gigabytes).strip() != "" else default
+        except ValueError:
+            return default
+
+    def __startHeartbeat(self):
+        # #The scheduler is passed to the worker processes, so the thread is kept per process and not in the object
+        key = (os.getpid(), self.stateFile)
+        with GptResourceScheduler.__heartbeatLock:
+            if key not in GptResourceScheduler.__heartbeats:
+                thread = threading.Thread(target=self.__renewHeartbeats, daemon=True)
+                GptResourceScheduler.__heartbeats[key] = thread
+                thread.start()
+
+    def __renewHeartbeats(self):
+        host, pid, pidStart = ProcessOwner.getOwner()
+        while True:
+            time.sleep(self.HEARTBEAT_INTERVAL)
+            try:
+                with contextlib.closing(self.__connect()) as connection:
+                    connection.execute("UPDATE slots SET heartbeat = ? WHERE host = ? AND pid = ? AND pidStart IS ?",
+                                       (time.time(), host, pid, pidStart))
+            except sqlite3.Error as e:
+                print("Heartbeat of the gpt slots failed: " + str(e))
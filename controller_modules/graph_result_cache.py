@@ -0,0 +1,283 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        graph_result_cache
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class caches the products written by graph executions on the scratch volume, so a rerun of a batch or an
+#-------overlapping processing list, e.g. the 6-day and 12-day coherence lists, does not recompute the same intermediates.
+#-------The key of a graph execution is the hash of the bound graph without its output paths plus the fingerprints of its
+#-------input products. A product written or restored by the cache is fingerprinted by the key that produced it, any
+#-------other product (e.g. the .SAFE scenes) by its name, size and modification time.
+#-------On a hit the cached products are hard linked to the requested output paths instead of executing the graph.
+#-------Only graphs writing all products to the scratch folder are cached, final results are never cached.
+#-------Entries are evicted least recently used first once the cache exceeds maxBytes.
+#-------Layout: <cacheFolder>/<key>/entry.json and <cacheFolder>/<key>/<write no>/<product files>
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+import hashlib
+import copy
+import threading
+from lxml import etree
+
+
+class GraphResultCache:
+
+    ENTRY_FILE = "entry.json"
+
+    def __init__(self, cacheFolder, scratchRoot, maxBytes):
+        """
+        Parameters
+        ----------
+        cacheFolder : str
+            The folder holding the cache entries, should be on the same volume as the scratch folder
+        scratchRoot : str
+            Only graphs writing all products into this folder are cached
+        maxBytes : int
+            The maximum size of all cache entries
+        """
+
+        self.cacheFolder = cacheFolder if cacheFolder.endswith("/") else cacheFolder + "/"
+        self.scratchRoot = os.path.abspath(scratchRoot)
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+        # #Products written or restored by this process: product path -> (key, modification time of the product)
+        self.__producedBy = {}
+
+        if not os.path.exists(self.cacheFolder):
+            os.makedirs(self.cacheFolder, exist_ok=True)
+
+    def getKey(self, root):
+        """Returns the cache key of the bound graph or None if the graph is not cached.
+
+        Parameters
+        ----------
+        root : lxml.etree._Element
+            The root of the bound graph
+
+        Returns
+        -------
+        str
+            The key of the graph execution
+        """
+
+        canonical = etree.Element("graph")
+        for node in root.findall("node"):
+            node = copy.deepcopy(node)
+            operator = node.findtext("operator")
+            file = node.find("parameters/file")
+
+            if operator == "Write":
+                if file is None or file.text is None or not self.__isInScratch(file.text.strip()):
+                    return None
+                file.text = ""
+            elif operator == "Read":
+                if file is None or file.text is None or not os.path.exists(file.text.strip()):
+                    return None
+                file.text = self.__getFingerprint(file.text.strip())
+            canonical.append(node)
+
+        if len(self.__getWritePaths(root)) == 0:
+            return None
+
+        canonicalString = etree.tostring(canonical, method="c14n")
+        canonicalString = b"".join(line.strip() for line in canonicalString.splitlines())
+        return hashlib.sha256(canonicalString).hexdigest()
+
+    def restoreResults(self, key, root, logobject=None):
+        """Links the cached products of the given key to the output paths of the bound graph.
+
+        Returns
+        -------
+        bool
+            True if all products were restored, False if the graph must be executed
+        """
+
+        entryFolder = self.cacheFolder + key + "/"
+        try:
+            with open(entryFolder + GraphResultCache.ENTRY_FILE) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses = self.misses + 1
+            return False
+
+        writePaths = self.__getWritePaths(root)
+        if len(writePaths) != len(entry["products"]):
+            self.misses = self.misses + 1
+            return False
+
+        linkedFiles = []
+        try:
+            for writeNo, (writePath, cachedProduct) in enumerate(zip(writePaths, entry["products"])):
+                linkedFiles.extend(self.__linkProduct(entryFolder + str(writeNo) + "/", cachedProduct["base"],
+                                                      cachedProduct["files"], writePath))
+            os.utime(entryFolder)
+        except OSError as e:
+            # #The entry may have been evicted by another process in the meantime
+            print("Graph cache entry " + key + " could not be restored: " + str(e))
+            for file in linkedFiles:
+                GraphResultCache.__removePath(file)
+            self.misses = self.misses + 1
+            return False
+
+        for writePath in writePaths:
+            self.__registerProduct(writePath, key)
+
+        self.hits = self.hits + 1
+        if logobject is not None:
+            logobject.appendOutputToLog("Products of " + ", ".join(os.path.basename(path) for path in writePaths) +
+                                        " taken from graph cache entry " + key)
+        return True
+
+    def storeResults(self, key, root):
+        """Adds the products written by the executed graph as entry of the given key and evicts old entries."""
+
+        writePaths = self.__getWritePaths(root)
+        entryFolder = self.cacheFolder + key + "/"
+        # #Subswath branches of the same process may store at the same time
+        tempFolder = self.cacheFolder + key + ".tmp" + str(os.getpid()) + "_" + str(threading.get_ident()) + "/"
+
+        products = []
+        size = 0
+        try:
+            for writeNo, writePath in enumerate(writePaths):
+                files = GraphResultCache.__getProductFiles(writePath)
+                if len(files) == 0:
+                    raise OSError("no product written to " + writePath)
+
+                os.makedirs(tempFolder + str(writeNo))
+                for file in files:
+                    size = size + GraphResultCache.__linkTree(file, tempFolder + str(writeNo) + "/" +
+                                                              os.path.basename(file))
+                products.append({"base": os.path.basename(writePath), "files": [os.path.basename(file)
+                                                                                 for file in files]})
+
+            with open(tempFolder + GraphResultCache.ENTRY_FILE, "w") as f:
+                json.dump({"products": products, "size": size}, f)
+            os.rename(tempFolder, entryFolder)
+        except OSError as e:
+            # #Another process may have stored the same key in the meantime
+            if not os.path.exists(entryFolder):
+                print("Graph results could not be cached: " + str(e))
+            GraphResultCache.__removePath(tempFolder)
+            return
+
+        for writePath in writePaths:
+            self.__registerProduct(writePath, key)
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is not larger than maxBytes."""
+
+        entries = []
+        totalSize = 0
+        for name in os.listdir(self.cacheFolder):
+            entryFile = self.cacheFolder + name + "/" + GraphResultCache.ENTRY_FILE
+            try:
+                with open(entryFile) as f:
+                    size = json.load(f)["size"]
+                entries.append((os.stat(self.cacheFolder + name).st_mtime, size, name))
+                totalSize = totalSize + size
+            except (OSError, ValueError, KeyError):
+                continue
+
+        for lastUse, size, name in sorted(entries):
+            if totalSize <= self.maxBytes:
+                break
+            GraphResultCache.__removePath(self.cacheFolder + name)
+            totalSize = totalSize - size
+
+    # ##################################Helper#################################
+
+    def __isInScratch(self, path):
+        return os.path.abspath(path).startswith(self.scratchRoot + os.sep)
+
+    def __getFingerprint(self, path):
+        product = GraphResultCache.__getProductBase(path)
+        if product in self.__producedBy:
+            key, modified = self.__producedBy[product]
+            if GraphResultCache.__getModified(product) == modified:
+                return "cache:" + key
+
+        # #For .SAFE folders the manifest changes with the product
+        statPath = path + "/manifest.safe" if os.path.isdir(path) and os.path.exists(path + "/manifest.safe") else path
+        stat = os.stat(statPath)
+        return "file:" + os.path.basename(path.rstrip("/")) + ":" + str(stat.st_size) + ":" + str(stat.st_mtime_ns)
+
+    def __registerProduct(self, writePath, key):
+        product = GraphResultCache.__getProductBase(writePath)
+        self.__producedBy[product] = (key, GraphResultCache.__getModified(product))
+
+    @staticmethod
+    def __getWritePaths(root):
+        return [node.findtext("parameters/file").strip() for node in root.findall("node")
+                if node.findtext("operator") == "Write" and node.findtext("parameters/file")]
+
+    @staticmethod
+    def __getProductBase(path):
+        # #Write nodes are given the product name without extension, Read nodes the .dim file
+        path = os.path.abspath(path)
+        return path[:-len(".dim")] if path.endswith(".dim") else path
+
+    @staticmethod
+    def __getModified(product):
+        for path in [product + ".dim", product + ".tif", product]:
+            if os.path.exists(path):
+                return os.stat(path).st_mtime_ns
+        return None
+
+    @staticmethod
+    def __getProductFiles(writePath):
+        base = GraphResultCache.__getProductBase(writePath)
+        return [path for path in [base + ".dim", base + ".data", base + ".tif", base] if os.path.exists(path)]
+
+    def __linkProduct(self, cachedFolder, cachedBase, cachedFiles, writePath):
+        base = GraphResultCache.__getProductBase(writePath)
+        linkedFiles = []
+        for cachedFile in cachedFiles:
+            target = base + cachedFile[len(cachedBase):] if cachedFile.startswith(cachedBase) else base
+            GraphResultCache.__removePath(target)
+            linkedFiles.append(target)
+
+            if cachedFile.endswith(".dim") and os.path.basename(base) != cachedBase:
+                # #The header references the .data folder by the product name
+                with open(cachedFolder + cachedFile) as f:
+                    header = f.read()
+                with open(target, "w") as f:
+                    f.write(header.replace(cachedBase + ".data", os.path.basename(base) + ".data"))
+            else:
+                GraphResultCache.__linkTree(cachedFolder + cachedFile, target)
+        return linkedFiles
+
+    @staticmethod
+    def __linkTree(source, target):
+        """Hard links the file or folder tree, copies where linking is not possible. Returns the size in bytes."""
+
+        if not os.path.isdir(source):
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            return os.stat(target).st_size
+
+        size = 0
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(source):
+            size = size + GraphResultCache.__linkTree(source + "/" + name, target + "/" + name)
+        return size
+
+    @staticmethod
+    def __removePath(path):
+        path = path.rstrip("/")
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.lexists(path):
+            os.unlink(path)
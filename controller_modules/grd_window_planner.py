@@ -0,0 +1,129 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        grd_window_planner
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class plans the pixel window of an aoi in a GRD scene from the geolocation grid of its annotation file.
+#-------The Read node of the first backscatter graph reads only this window, so border noise removal, thermal noise
+#-------removal and calibration are not executed on the whole scene.
+#-------Within the grid cells overlapping the aoi the geographic coordinates are mapped to line and pixel by an affine
+#-------fit of the cell corners. The window is extended by the given margin and by the largest deviation of the fit and
+#-------never exceeds the overlapping grid cells extended by the margin.
+#-------The geolocation grid of a scene is parsed once per process.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import threading
+import numpy as np
+from lxml import etree
+from shapely import wkt, get_coordinates, polygons, intersects
+
+
+class GrdWindowPlanner:
+
+    # #Pixels added to the border limit of Remove-GRD-Border-Noise
+    MARGIN = 100
+
+    __grids = {}
+    __lock = threading.Lock()
+
+    def getPixelWindow(self, scene, wktAoi, margin):
+        """Returns the pixel window of the aoi in the GRD scene.
+
+        Parameters
+        ----------
+        scene : str
+            The path of the SAFE product folder
+        wktAoi : str
+            The Aoi in wkt format
+        margin : int
+            The pixels added on each side of the window
+
+        Returns
+        -------
+        list
+            x, y, width and height of the window as the pixelRegion of the Read operator.
+            None if the geolocation grid is not available, the aoi does not overlap the scene or the window covers
+            the whole scene.
+        """
+
+        gridEntry = self.__getGrid(scene)
+        if gridEntry is None or wktAoi is None or wktAoi == "":
+            return None
+        cellCorners, cells, numberOfLines, numberOfSamples = gridEntry
+
+        polyWktAoi = wkt.loads(wktAoi)
+        overlapping = intersects(cells, polyWktAoi)
+        if not overlapping.any():
+            return None
+
+        # #Affine fit lon, lat -> line, pixel on the corners of the overlapping cells
+        points = cellCorners[overlapping].reshape(-1, 4)
+        design = np.column_stack([points[:, 2], points[:, 3], np.ones(len(points))])
+        coefficients = np.linalg.lstsq(design, points[:, 0:2], rcond=None)[0]
+        deviation = np.abs(design @ coefficients - points[:, 0:2]).max()
+
+        aoiCoordinates = get_coordinates(polyWktAoi)
+        mapped = np.column_stack([aoiCoordinates, np.ones(len(aoiCoordinates))]) @ coefficients
+        extension = margin + int(np.ceil(deviation))
+
+        firstLine = max(mapped[:, 0].min() - extension, points[:, 0].min() - margin, 0)
+        lastLine = min(mapped[:, 0].max() + extension, points[:, 0].max() + margin, numberOfLines - 1)
+        firstPixel = max(mapped[:, 1].min() - extension, points[:, 1].min() - margin, 0)
+        lastPixel = min(mapped[:, 1].max() + extension, points[:, 1].max() + margin, numberOfSamples - 1)
+        if firstLine > lastLine or firstPixel > lastPixel:
+            return None
+
+        window = [int(np.floor(firstPixel)), int(np.floor(firstLine))]
+        window.extend([int(np.ceil(lastPixel)) - window[0] + 1, int(np.ceil(lastLine)) - window[1] + 1])
+        if window == [0, 0, numberOfSamples, numberOfLines]:
+            return None
+        return window
+
+    def __getGrid(self, scene):
+        scene = scene.strip().rstrip("/")
+        with GrdWindowPlanner.__lock:
+            if scene not in GrdWindowPlanner.__grids:
+                GrdWindowPlanner.__grids[scene] = GrdWindowPlanner.__parseGrid(scene)
+            return GrdWindowPlanner.__grids[scene]
+
+    @staticmethod
+    def __parseGrid(scene):
+        """Parses the geolocation grid of the first annotation file. All polarisations share the same geometry.
+
+        Returns
+        -------
+        tuple
+            The corners of the grid cells of the shape cells x 4 x (line, pixel, lon, lat), the cell polygons and the
+            number of lines and samples of the scene. None if the grid is not available or not regular.
+        """
+
+        annotationPath = scene + "/annotation/"
+        files = sorted(file for file in os.listdir(annotationPath) if file.endswith(".xml")) \
+            if os.path.isdir(annotationPath) else []
+        if len(files) == 0:
+            return None
+
+        try:
+            root = etree.parse(annotationPath + files[0]).getroot()
+            numberOfLines = int(root.findtext("imageAnnotation/imageInformation/numberOfLines"))
+            numberOfSamples = int(root.findtext("imageAnnotation/imageInformation/numberOfSamples"))
+            grid = np.array([[float(point.findtext(tag)) for tag in ["line", "pixel", "longitude", "latitude"]]
+                             for point in root.iter("geolocationGridPoint")])
+        except (OSError, etree.XMLSyntaxError, TypeError, ValueError):
+            return None
+
+        if len(grid) == 0:
+            return None
+        lines = np.unique(grid[:, 0])
+        pixels = np.unique(grid[:, 1])
+        if len(lines) < 2 or len(pixels) < 2 or len(lines) * len(pixels) != len(grid):
+            return None
+
+        grid = grid[np.lexsort((grid[:, 1], grid[:, 0]))].reshape(len(lines), len(pixels), 4)
+        cellCorners = np.stack([grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]], axis=2).reshape(-1, 4, 4)
+        return cellCorners, polygons(cellCorners[:, :, 2:4]), numberOfLines, numberOfSamples
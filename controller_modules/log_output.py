@@ -11,11 +11,16 @@
 #-----An interface is provided to add content to the logfile at any point in the processing.
 #-----An error flag and error content holder can be set and derived to indicate if there were processing errors
 #-----and the specific error content. In case of an error, this is added to the logfile before finalization.
+#-----For scenes processed in a parallel worker the content is buffered per scene and handed to the logfile of the
+#-----main process once the scene is finished. Like this the content of each scene stays together in the logfile.
+#-----Branches processed concurrently within a scene, e.g. subswaths, log to their own buffer (see createBranch), which
+#-----is appended once the branch is joined.
 #--------------------------------------------------------------------------------------------------------------------------------
 
 from controller_modules.create_user_setting_file import CreateUserSetting
 
 import os
+import copy
 import datetime
 import csv
 
@@ -31,6 +36,8 @@ class LogOutput:
     __lastErrorMessage = ""
     __totalTime = 0
     __amountScenes = 0
+    __logBuffer = None
+    __tilesBuffer = None
 
     def __init__(self):
 
@@ -60,21 +67,66 @@ class LogOutput:
 
         self.__fileHandlerWriter.writerow(["SceneNo", "Time"])
 
+    def createSceneBuffer(self):
+        self.__error = False
+        self.__lastErrorMessage = ""
+        self.__logBuffer = []
+        self.__tilesBuffer = []
+
+    def getSceneBuffer(self):
+        return self.__logBuffer, self.__tilesBuffer, self.__error
+
+    def appendSceneBuffer(self, sceneNo, logBuffer, tilesBuffer, error):
+        self.appendOutputToLog("-----------------------Output of scene " + str(sceneNo) + "------------------")
+        for content in logBuffer:
+            if self.__fileHandlerLog is not None:
+                self.__fileHandlerLog.write(content + "\n")
+        for scene in tilesBuffer:
+            self.appendSceneToList(scene)
+        if error:
+            self.__error = error
+
+    def createBranch(self):
+        """Returns a log object buffering the content of one concurrent branch, see appendBranch."""
+        branch = copy.copy(self)
+        branch.__fileHandlerLog = None
+        branch.__fileHandlerTiles = None
+        branch.__fileHandlerWriter = None
+        branch.__fileHandlerCsv = None
+        branch.createSceneBuffer()
+        return branch
+
+    def appendBranch(self, branch):
+        for content in branch.__logBuffer:
+            if self.__fileHandlerLog is not None:
+                self.__fileHandlerLog.write(content + "\n")
+            if self.__logBuffer is not None:
+                self.__logBuffer.append(content)
+        for scene in branch.__tilesBuffer:
+            self.appendSceneToList(scene)
+        if branch.__error:
+            self.__error = True
+            self.__lastErrorMessage = branch.__lastErrorMessage
+
     def appendOutputToLog(self, content, error=False):
         print(content)
         if self.__fileHandlerLog is not None:
             self.__fileHandlerLog.write(content + "\n")
+        if self.__logBuffer is not None:
+            self.__logBuffer.append(content)
         if error:
             self.__error = error
 
-    def appendProcTime(self, time):
+    def appendProcTime(self, time, sceneNo=None):
         self.__amountScenes = self.__amountScenes + 1
         self.__totalTime = self.__totalTime + time
-        self.__fileHandlerWriter.writerow([self.__amountScenes, time])
+        self.__fileHandlerWriter.writerow([self.__amountScenes if sceneNo is None else sceneNo, time])
 
     def appendSceneToList(self, scene):
         if self.__fileHandlerTiles is not None:
             self.__fileHandlerTiles.write(str(scene) + "\n")
+        if self.__tilesBuffer is not None:
+            self.__tilesBuffer.append(str(scene))
 
     def setTotalTime(self):
         self.__fileHandlerWriter.writerow([self.__amountScenes, self.__totalTime])
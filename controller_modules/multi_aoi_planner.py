@@ -0,0 +1,246 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        multi_aoi_planner
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----This class creates the processing lists of all aois of an aoi folder from one catalogue query per product type.
+# ----The bounding boxes of neighbouring aois are merged to clusters, the catalogue is queried once with the bounding box
+# ----of each cluster and the metadata of all found scenes is parsed once into the SceneCatalog.
+# ----The scene footprints are indexed in a shapely STRtree, each aoi gets the scenes whose footprint intersects the aoi,
+# ----as a query with the aoi itself returns them. The scenes keep the order of the catalogue, start date descending.
+# ----The lists of the aois are generated from their scenes by the CreateInputOutput in a pool of parallelWorkers
+# ----processes, with the same list files and entries as a separate query per aoi.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from shapely import wkt
+from shapely.geometry import box
+from shapely.ops import unary_union
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+from controller_modules.create_input_output import CreateInputOutput
+from controller_modules.geo_position import GeoPosition
+from controller_modules.scene_catalog import SceneCatalog
+
+
+class MultiAoiPlanner:
+
+    PRODUCT_TYPE_SLC = 'SLC'
+    PRODUCT_TYPE_GRD = 'GRD'
+
+    # #Degrees added around each aoi before the bounding boxes are merged. A scene covers about 250 km, so the boxes of
+    # #aois closer than this are queried together without returning many more scenes.
+    CLUSTER_DISTANCE = 0.5
+
+    # #Degrees added around each aoi before the aois sharing a scene are processed together, see
+    # #BatchProcessing.calculateForAois. Only close aois are processed together, as their bounding box is processed.
+    SHARING_DISTANCE = 0.05
+
+    def __init__(self, aois, pyFuncQueries, parallelWorkers=1, dataPath=None):
+        """
+        Parameters
+        ----------
+        aois : dict
+            The area name of each aoi as key, the path of its geojson file as value
+        pyFuncQueries : PyFuncQueries
+            The queries to the Code-De catalogue
+        parallelWorkers : int or str
+            The amount of processes generating lists, the user settings entry 'parallelWorkers'
+        dataPath : str
+            The main data path of the SceneCatalog
+        """
+
+        self.aois = aois
+        self.pyFuncQueries = pyFuncQueries
+        workers = str(parallelWorkers).strip()
+        self.parallelWorkers = int(workers) if workers.isdigit() and int(workers) > 0 else 1
+        self.dataPath = dataPath
+        self.geometries = {areaName: wkt.loads(GeoPosition().loadWktFromGeojson(geojson))
+                           for areaName, geojson in aois.items()}
+
+    # ##################################Planning#################################
+
+    def planProcessingLists(self, startDate, endDate, resultPath, sliceMode=True):
+        """Queries the scenes of all aois once and generates the processing lists of each aoi.
+
+        Parameters
+        ----------
+        startDate : str
+            The first date of the calculation, 'YYYY-MM-DD'
+        endDate : str
+            The last date of the calculation, 'YYYY-MM-DD'
+        resultPath : str
+            The folder of the list files
+        sliceMode : bool
+            Slices of the same orbit are assembled, see CreateInputOutput.generateFileList
+
+        Returns
+        -------
+        dict
+            The area name as key, the lists of the aoi as value, see getProcessingLists
+        """
+
+        if len(self.aois) == 0:
+            return {}
+
+        tilesSlc = self.queryScenes(self.PRODUCT_TYPE_SLC, startDate, endDate)
+        tilesGrd = self.queryScenes(self.PRODUCT_TYPE_GRD, startDate, endDate)
+
+        # #All scenes are parsed once, the list generation of each aoi reads them from the catalog
+        SceneCatalog.default().addScenes(tilesSlc + tilesGrd)
+        scenesSlc = self.assignScenes(tilesSlc)
+        scenesGrd = self.assignScenes(tilesGrd)
+
+        arguments = [(areaName, scenesSlc[areaName], scenesGrd[areaName], startDate, endDate, resultPath, sliceMode)
+                     for areaName in self.aois]
+        print("Generating the processing lists of " + str(len(arguments)) + " aois with " +
+              str(min(self.parallelWorkers, len(arguments))) + " parallel workers.")
+
+        if self.parallelWorkers > 1 and len(arguments) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.parallelWorkers, len(arguments)),
+                                     initializer=SceneCatalog.setDefaultLocation,
+                                     initargs=(self.dataPath,)) as executor:
+                results = list(executor.map(MultiAoiPlanner.generateLists, *zip(*arguments)))
+        else:
+            results = [MultiAoiPlanner.generateLists(*argument) for argument in arguments]
+
+        return dict(results)
+
+    def getQueryPolygons(self):
+        """Returns the bounding boxes of the clusters of neighbouring aois."""
+
+        return [clusterBox for clusterBox, areaNames in self.getClusters(self.geometries, self.CLUSTER_DISTANCE)]
+
+    @staticmethod
+    def getClusters(geometries, distance):
+        """Returns the clusters of aois closer than the given distance. The bounding boxes of the aois extended by the
+        distance are merged until no two of them intersect.
+
+        Parameters
+        ----------
+        geometries : dict
+            The area name as key, the shapely geometry of the aoi as value
+        distance : float
+            The degrees added around each aoi
+
+        Returns
+        -------
+        list
+            The bounding box and the list of area names of each cluster
+        """
+
+        boxes = []
+        for geometry in geometries.values():
+            minX, minY, maxX, maxY = geometry.bounds
+            boxes.append(box(minX - distance, minY - distance, maxX + distance, maxY + distance))
+
+        while True:
+            union = unary_union(boxes)
+            parts = list(union.geoms) if hasattr(union, "geoms") else [union]
+            merged = [box(*part.bounds) for part in parts if not part.is_empty]
+            if len(merged) == len(boxes):
+                break
+            boxes = merged
+
+        # #The merged boxes are disjoint, each aoi lies in exactly one of them
+        clusters = [(clusterBox, []) for clusterBox in boxes]
+        for areaName, geometry in geometries.items():
+            next(areaNames for clusterBox, areaNames in clusters if clusterBox.intersects(geometry)).append(areaName)
+        return clusters
+
+    def queryScenes(self, productType, startDate, endDate):
+        """Returns the scenes of all query polygons without duplicates, start date descending as sorted by the
+        catalogue."""
+
+        polygons = self.getQueryPolygons()
+        geometry = polygons[0] if len(polygons) == 1 else unary_union(polygons)
+        tiles = self.pyFuncQueries.buildSentinel1QueryTileList(geometry, startDate, endDate, productType)
+
+        # #The responses of several polygons are merged without order
+        return sorted(set(tiles), key=self.__getSortKey, reverse=True)
+
+    def assignScenes(self, tiles):
+        """Returns the scenes intersecting each aoi in the order of the given tiles.
+
+        Parameters
+        ----------
+        tiles : list
+            The paths of the queried scenes
+
+        Returns
+        -------
+        dict
+            The area name as key, the list of scenes as value
+        """
+
+        footprints = []
+        indexedTiles = []
+        for tile in tiles:
+            polygon = SceneCatalog.default().getFootprintPolygon(tile)
+            if polygon is None:
+                print("No footprint of " + str(tile) + ", the scene is not assigned to any aoi.")
+                continue
+            footprints.append(polygon)
+            indexedTiles.append(tile)
+
+        tree = STRtree(footprints) if footprints else None
+        treeIds = {id(polygon): index for index, polygon in enumerate(footprints)}
+
+        scenes = {}
+        for areaName, geometry in self.geometries.items():
+            positions = []
+            if tree is not None:
+                preparedAoi = prep(geometry)
+                positions = [index for index in self.__query(tree, treeIds, geometry)
+                             if preparedAoi.intersects(footprints[index])]
+            scenes[areaName] = [indexedTiles[index] for index in sorted(positions)]
+        return scenes
+
+    # ##################################List generation#################################
+
+    @staticmethod
+    def generateLists(areaName, tilesSlc, tilesGrd, startDate, endDate, resultPath, sliceMode):
+        """Generates and writes the lists of one aoi, executed by the worker processes."""
+
+        inOutputListSlc = CreateInputOutput().generateFileList(tilesSlc, MultiAoiPlanner.PRODUCT_TYPE_SLC, startDate,
+                                                               endDate, resultPath, areaName, sliceMode)
+        inOutputListGrd = CreateInputOutput().generateFileList(tilesGrd, MultiAoiPlanner.PRODUCT_TYPE_GRD, startDate,
+                                                               endDate, resultPath, areaName, sliceMode)
+        return areaName, MultiAoiPlanner.getProcessingLists(inOutputListSlc, inOutputListGrd)
+
+    @staticmethod
+    def getProcessingLists(inOutputListSlc, inOutputListGrd):
+        """Returns the lists returned by CreateInputOutput.generateFileList by the list types of the
+        ProcessingListFile."""
+
+        return {
+            "polarimetry": inOutputListSlc[0] if len(inOutputListSlc) >= 1 else [],
+            "coherence_12d": inOutputListSlc[1] if len(inOutputListSlc) >= 2 else [],
+            "coherence_6d": inOutputListSlc[2] if len(inOutputListSlc) == 3 else [],
+            # #Without GRD scenes three empty lists are returned
+            "backscatter": inOutputListGrd if isinstance(inOutputListGrd, list) else [],
+        }
+
+    # ##################################Helper#################################
+
+    @staticmethod
+    def __getSortKey(tile):
+        # #Start time of the scene name, e.g. S1A_IW_SLC__1SDV_20210101T053012_..., then the name
+        name = os.path.basename(SceneCatalog.normaliseProduct(str(tile))).replace("__", "_")
+        fields = name.split("_")
+        return (fields[4] if len(fields) > 4 else "", name)
+
+    @staticmethod
+    def __query(tree, treeIds, geometry):
+        # #shapely >= 2.0 returns the indices of the candidates, older versions the geometries
+        candidates = tree.query(geometry)
+        if len(candidates) > 0 and hasattr(candidates[0], "geom_type"):
+            return [treeIds[id(candidate)] for candidate in candidates]
+        return [int(index) for index in candidates]
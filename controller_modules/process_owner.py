@@ -0,0 +1,81 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        process_owner
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----This class identifies the process owning a record shared by several runs, e.g. an entry of the processing state
+# ----in the data path. A process is identified by its host, its pid and its start time:
+# ----The host includes the pid namespace, so the processes of containers on the same machine are not taken for
+# ----processes of the own host. The start time includes the boot id, so a pid reused by a later process or after a
+# ----reboot is not taken for the owner.
+# ----Only processes of the own host can be checked, the owner on another host is never regarded as gone.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import socket
+
+
+class ProcessOwner:
+
+    @staticmethod
+    def getHost():
+        """Returns the host name and the pid namespace of this process, e.g. node1:pid:[4026531836]."""
+        host = socket.gethostname()
+        try:
+            host = host + ":" + os.readlink("/proc/self/ns/pid")
+        except OSError:
+            pass
+        return host
+
+    @staticmethod
+    def getStartTime(pid):
+        """Returns the boot id and the start time in clock ticks since the boot of a process of this host. None if the
+        process does not exist or the start time can not be read."""
+        try:
+            with open("/proc/sys/kernel/random/boot_id") as f:
+                bootId = f.read().strip()
+            with open("/proc/" + str(int(pid)) + "/stat") as f:
+                # #The command name may contain spaces and brackets, the start time is the 20th field after it
+                fields = f.read().rsplit(")", 1)[1].split()
+            return bootId + ":" + fields[19]
+        except (OSError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def getOwner():
+        """Returns host, pid and start time of this process."""
+        return ProcessOwner.getHost(), os.getpid(), ProcessOwner.getStartTime(os.getpid())
+
+    @staticmethod
+    def isOwn(host, pid, startTime):
+        return (host, pid, startTime) == ProcessOwner.getOwner()
+
+    @staticmethod
+    def isGone(host, pid, startTime):
+        """Returns True only if the owner is provably gone: it ran on this host and its pid does not exist anymore or
+        belongs to a process started later. Owners of other hosts and owners without host are never gone.
+
+        Parameters
+        ----------
+        host : str
+            The host of the owner, see getHost
+        pid : int
+            The pid of the owner
+        startTime : str
+            The start time of the owner, see getStartTime
+        """
+
+        if host is None or pid is None or host != ProcessOwner.getHost():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        currentStartTime = ProcessOwner.getStartTime(pid)
+        return startTime is not None and currentStartTime is not None and currentStartTime != startTime
@@ -0,0 +1,186 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        processing_list_file
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class writes and reads the processing lists of the backscatter, polarimetry, 6-day and 12-day coherence
+#-------processing as JSON lines files "<name>_<list type>.jsonl", one record per entry:
+#-------{"list": "coherence_6d", "scenes": [<slice members>], "pairScenes": [<slice members of the pair partner>],
+#-------"outputName": "<output file name>", "metadata": {<fields of the output name>}}
+#-------"pairScenes" is empty for backscatter and polarimetry entries. The last line {"end": true, "entries": <amount>}
+#-------marks a complete list.
+#-------Each record is written and flushed at once, so a reader can process the first entries while the list is still
+#-------being written. The reader yields the entries in the list format of the processing, e.g.
+#-------["<scene(s) 1>", "<scene(s) 2>", "<output file name>"], slices comma separated.
+#-------The former text lists with one Python list per line are still read.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+
+from controller_modules.create_input_output import CreateInputOutput
+
+
+class ProcessingListFile:
+
+    EXTENSION = ".jsonl"
+
+    # #List type: file name endings of the list files, the text lists of former versions included
+    LIST_TYPES = {"backscatter": ["backscatter"], "polarimetry": ["polarimetry", "veg_index"],
+                  "coherence_6d": ["coherence_6d"], "coherence_12d": ["coherence_12d"]}
+
+    # #Seconds between the checks for new records and without new records until an incomplete list is finished
+    POLL_INTERVAL = 1.0
+    FOLLOW_TIMEOUT = 60.0
+
+    def __init__(self, fileName, listType):
+        """Creates the list file, an existing file is replaced.
+
+        Parameters
+        ----------
+        fileName : str
+            The path of the list file
+        listType : str
+            The list type, see LIST_TYPES
+        """
+
+        if listType not in self.LIST_TYPES:
+            raise ValueError("Unknown processing list type: " + str(listType))
+        self.fileName = fileName
+        self.listType = listType
+        self.amountEntries = 0
+        self.__file = open(fileName, "w")
+
+    def append(self, entry):
+        """Writes one entry of the processing list format and flushes it to the file."""
+        self.__file.write(json.dumps(ProcessingListFile.toRecord(entry, self.listType)) + "\n")
+        self.__file.flush()
+        self.amountEntries = self.amountEntries + 1
+
+    def close(self):
+        """Marks the list as complete."""
+        if self.__file.closed:
+            return
+        self.__file.write(json.dumps({"end": True, "entries": self.amountEntries}) + "\n")
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        # #A list that failed while being written stays incomplete
+        if excType is None:
+            self.close()
+        else:
+            self.__file.close()
+
+    @staticmethod
+    def write(fileName, listType, entries):
+        """Writes all entries to a new list file."""
+        with ProcessingListFile(fileName, listType) as listFile:
+            for entry in entries:
+                listFile.append(entry)
+
+    # ##################################Records#################################
+
+    @staticmethod
+    def toRecord(entry, listType):
+        """Returns the record of an entry of the processing list format."""
+
+        entry = [str(value) for value in entry]
+        pairScenes = ProcessingListFile.__splitScenes(entry[1]) if len(entry) == 3 else []
+        fields = CreateInputOutput.parseOutputName(entry[-1] + ".tif") or {}
+        metadata = {key: value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else value
+                    for key, value in fields.items() if key not in ["areaName", "index"]}
+        return {"list": listType, "scenes": ProcessingListFile.__splitScenes(entry[0]), "pairScenes": pairScenes,
+                "outputName": entry[-1], "metadata": metadata}
+
+    @staticmethod
+    def toEntry(record):
+        """Returns the entry of the processing list format of a record."""
+        entry = [", ".join(record["scenes"])]
+        if len(record.get("pairScenes") or []) > 0:
+            entry.append(", ".join(record["pairScenes"]))
+        entry.append(record["outputName"])
+        return entry
+
+    @staticmethod
+    def __splitScenes(scenes):
+        return [scene.strip() for scene in scenes.split(",") if scene.strip() != ""]
+
+    # ##################################Reading#################################
+
+    @staticmethod
+    def getListType(fileName):
+        """Returns the list type of a list file from the end of its name, None for other files."""
+        name, extension = os.path.splitext(os.path.basename(fileName))
+        if extension not in [ProcessingListFile.EXTENSION, ".txt"]:
+            return None
+        for listType, endings in ProcessingListFile.LIST_TYPES.items():
+            if any(name.endswith(ending) for ending in endings):
+                return listType
+        return None
+
+    @staticmethod
+    def readEntries(fileName, follow=False, timeout=FOLLOW_TIMEOUT):
+        """Yields the entries of a list file in the processing list format.
+
+        Parameters
+        ----------
+        fileName : str
+            The path of a JSON lines list or of a text list of former versions
+        follow : bool
+            Wait for new records until the list is complete, as long as the file grows within the timeout
+        timeout : float
+            Seconds without new records until an incomplete list is finished
+        """
+
+        if not fileName.endswith(ProcessingListFile.EXTENSION):
+            yield from ProcessingListFile.readTextEntries(fileName)
+            return
+
+        with open(fileName, "r") as file:
+            line = ""
+            lastRecordTime = time.monotonic()
+            while True:
+                # #A record without line end is still being written
+                line = line + file.readline()
+                if not line.endswith("\n"):
+                    if not follow or time.monotonic() - lastRecordTime > timeout:
+                        break
+                    time.sleep(ProcessingListFile.POLL_INTERVAL)
+                    continue
+
+                record = json.loads(line) if line.strip() != "" else None
+                line = ""
+                lastRecordTime = time.monotonic()
+                if record is None:
+                    continue
+                if record.get("end"):
+                    return
+                yield ProcessingListFile.toEntry(record)
+
+        # #The last record of a list whose writer crashed or exceeded the timeout may be incomplete
+        if line.strip() != "":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print("Incomplete last record of " + fileName + " not read: " + line)
+                return
+            if not record.get("end"):
+                yield ProcessingListFile.toEntry(record)
+
+    @staticmethod
+    def readTextEntries(fileName):
+        """Yields the entries of a text list of former versions, one Python list per line."""
+        with open(fileName, "r") as file:
+            for line in file:
+                if line.strip() == "":
+                    continue
+                entryList = line.replace("\n", "").split("', '")
+                yield [entry.replace("'", "").replace("[", "").replace("]", "") for entry in entryList]
@@ -0,0 +1,203 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        processing_state
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----This class records the state of each entry of the processing lists in a SQLite database "processing_state.sqlite"
+# ----in the main data path, so following runs only process the entries not done yet.
+# ----Stored per final product: processing sequence, area name, list entry, fingerprint of the inputs, status, amount of
+# ----attempts, start and end time, processing seconds and the message of the last failure.
+# ----Status of an entry: "pending" once scheduled, "running" while it is processed, "done" once its final product
+# ----exists and "failed" otherwise. Entries of a crashed run stay "running". The owner of a running entry is recorded
+# ----by host, pid and process start time (see ProcessOwner): once the owner is provably gone the entry is scheduled
+# ----again and a product it may have written partly is removed before. Running entries of other hosts or containers
+# ----sharing the data path can not be checked, they are never taken over.
+# ----The fingerprint is built from the scene paths, the modification times of their manifest.safe files and the aoi.
+# ----Entries done with other inputs are reported, their product is kept until it is deleted.
+# ----Without a set data path the state is kept in memory only.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from controller_modules.process_owner import ProcessOwner
+
+
+class ProcessingState:
+
+    STATE_FILE = "processing_state.sqlite"
+
+    COLUMNS = ["outputFile", "sequence", "areaName", "entry", "fingerprint", "status", "attempts", "host", "pid",
+               "pidStart", "startTime", "endTime", "seconds", "message"]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    # #Sequence: suffix of the final product checked for the status
+    OUTPUT_SUFFIXES = {"backscatter": ".tif", "veg_index": "_dp.tif", "coherence": ".tif"}
+
+    def __init__(self, dataPath=None):
+        self.stateFile = dataPath + self.STATE_FILE if dataPath else None
+        self.__connection = None
+        self.__connectionPid = None
+
+    # ##################################Scheduling#################################
+
+    def getScheduledEntries(self, sequence, processingList, areaName, wktAoi, outputPath, logObject=None):
+        """Yields the entries of the list not done yet and marks them as pending. Entries with an existing final
+        product that are not in the state yet, e.g. from runs of former versions, are recorded as done.
+
+        Parameters
+        ----------
+        sequence : str
+            The processing sequence, see OUTPUT_SUFFIXES
+        processingList : iterable
+            The scene entries of the processing list
+        areaName : str
+            The name of the aoi, extended to the output file names
+        wktAoi : str
+            The Aoi in Wkt format
+        outputPath : str
+            The path where the result data is produced
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        """
+
+        scheduled = 0
+        done = 0
+        for entry in processingList:
+            outputFile = self.getOutputFile(sequence, entry, areaName, outputPath)
+            fingerprint = self.getFingerprint(entry, wktAoi)
+            row = self.getEntry(outputFile)
+
+            if row is not None and row["status"] == self.RUNNING and \
+                    not ProcessOwner.isOwn(row["host"], row["pid"], row["pidStart"]) and \
+                    not ProcessOwner.isGone(row["host"], row["pid"], row["pidStart"]):
+                self.__log(logObject, "Entry processed by the run of process " + str(row["pid"]) + " on " +
+                           str(row["host"]) + ": " + outputFile)
+                continue
+
+            if os.path.exists(outputFile):
+                if row is not None and row["status"] == self.RUNNING:
+                    # #The product of a crashed run of this host may be incomplete
+                    self.__log(logObject, "Removing the product of an unfinished entry: " + outputFile)
+                    os.remove(outputFile)
+                else:
+                    if row is None or row["status"] != self.DONE:
+                        # #Products of runs of former versions or written after the last attempt
+                        self.__storeEntry(outputFile, sequence, areaName, entry, fingerprint, self.DONE,
+                                          row["attempts"] if row is not None else 0)
+                    elif row["fingerprint"] != fingerprint:
+                        self.__log(logObject, "Inputs changed since " + outputFile + " was processed, delete the "
+                                              "product to process it again.")
+                    done = done + 1
+                    continue
+
+            self.__storeEntry(outputFile, sequence, areaName, entry, fingerprint, self.PENDING,
+                              row["attempts"] if row is not None else 0)
+            scheduled = scheduled + 1
+            yield entry
+
+        self.__log(logObject, "Processing state: " + str(scheduled) + " entries scheduled, " + str(done) +
+                   " entries already done.")
+
+    def startEntry(self, sequence, entry, areaName, outputPath):
+        outputFile = self.getOutputFile(sequence, entry, areaName, outputPath)
+        host, pid, pidStart = ProcessOwner.getOwner()
+        with self.__getConnection() as connection:
+            connection.execute("UPDATE entries SET status = ?, attempts = attempts + 1, host = ?, pid = ?, "
+                               "pidStart = ?, startTime = ?, endTime = NULL, seconds = NULL, message = NULL "
+                               "WHERE outputFile = ?",
+                               (self.RUNNING, host, pid, pidStart, time.time(), outputFile))
+
+    def finishEntry(self, sequence, entry, areaName, outputPath, seconds, message=None):
+        """Sets the status of a processed entry, done if its final product exists and failed otherwise."""
+        outputFile = self.getOutputFile(sequence, entry, areaName, outputPath)
+        status = self.DONE if os.path.exists(outputFile) else self.FAILED
+        if status == self.FAILED and message is None:
+            message = "No final product written"
+        with self.__getConnection() as connection:
+            connection.execute("UPDATE entries SET status = ?, endTime = ?, seconds = ?, message = ? "
+                               "WHERE outputFile = ?", (status, time.time(), seconds, message, outputFile))
+        return status
+
+    # ##################################Entries#################################
+
+    def getEntry(self, outputFile):
+        row = self.__getConnection().execute("SELECT " + ",".join(self.COLUMNS) + " FROM entries WHERE outputFile = ?",
+                                             (outputFile,)).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row is not None else None
+
+    def getStatusCounts(self, sequence=None, areaName=None):
+        """Returns the amount of entries per status, optionally of one sequence and area."""
+        query = "SELECT status, COUNT(*) FROM entries WHERE (? IS NULL OR sequence = ?) AND " \
+                "(? IS NULL OR areaName = ?) GROUP BY status"
+        return dict(self.__getConnection().execute(query, (sequence, sequence, areaName, areaName)).fetchall())
+
+    @staticmethod
+    def getOutputFile(sequence, entry, areaName, outputPath):
+        """Returns the final product of an entry as named by the SpecificSnapGraphProcessing."""
+        return str(outputPath) + entry[-1] + ("_" + areaName if areaName is not None else "") + \
+            ProcessingState.OUTPUT_SUFFIXES[sequence]
+
+    @staticmethod
+    def getFingerprint(entry, wktAoi):
+        inputs = []
+        for scenes in entry[:-1]:
+            for scene in scenes.split(","):
+                scene = scene.strip().rstrip("/")
+                try:
+                    mtime = os.stat(scene + "/manifest.safe").st_mtime
+                except OSError:
+                    mtime = None
+                inputs.append([scene, mtime])
+        return hashlib.sha1(json.dumps([inputs, wktAoi]).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def __log(logObject, message):
+        if logObject is not None:
+            logObject.appendOutputToLog(message)
+        else:
+            print(message)
+
+    # ##################################SQLite storage#################################
+
+    def __getConnection(self):
+        # #Connections can not be shared with forked worker processes
+        if self.__connection is None or self.__connectionPid != os.getpid():
+            self.__connection = sqlite3.connect(self.stateFile if self.stateFile is not None else ":memory:",
+                                                timeout=60)
+            self.__connectionPid = os.getpid()
+            if self.stateFile is not None:
+                # #Several runs may share the data path, readers do not block the writer
+                self.__connection.execute("PRAGMA journal_mode=WAL")
+                self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS entries (outputFile TEXT PRIMARY KEY, sequence TEXT, "
+                                      "areaName TEXT, entry TEXT, fingerprint TEXT, status TEXT, attempts INTEGER, "
+                                      "host TEXT, pid INTEGER, pidStart TEXT, startTime REAL, endTime REAL, "
+                                      "seconds REAL, message TEXT)")
+            # #State files of former versions have no owner host and start time, their running entries are never
+            # #taken over
+            columns = [row[1] for row in self.__connection.execute("PRAGMA table_info(entries)")]
+            for column in ["host", "pidStart"]:
+                if column not in columns:
+                    self.__connection.execute("ALTER TABLE entries ADD COLUMN " + column + " TEXT")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS entriesBySequence ON entries (sequence, areaName, "
+                                      "status)")
+            self.__connection.commit()
+        return self.__connection
+
+    def __storeEntry(self, outputFile, sequence, areaName, entry, fingerprint, status, attempts):
+        with self.__getConnection() as connection:
+            connection.execute("INSERT OR REPLACE INTO entries (outputFile, sequence, areaName, entry, fingerprint, "
+                               "status, attempts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (outputFile, sequence, areaName, json.dumps([str(value) for value in entry]),
+                                fingerprint, status, attempts))
@@ -9,15 +9,25 @@
 #
 #-------This class offers methods to create a Sentinel 1 Query to Code-De and filter out a list of tiles depending on the given parameters
 #-------Code not cleaned up, fully functional. Imported from https://gitea.julius-kuehn.de/FLF/pyQuery_EO_Finder
+#-------The requests are performed by a CodeDeCatalogueClient. Pages and polygons are fetched concurrently and the responses
+#-------are cached on disk, if the client is given a cache folder.
+#-------Besides points and geojson files shapely polygons and multipolygons can be queried, one request per polygon.
 #--------------------------------------------------------------------------------------------------------------------------------
 
 import geopandas as gpd
-import requests
 
+from concurrent.futures import ThreadPoolExecutor
+
+from controller_modules.code_de_catalogue_client import CodeDeCatalogueClient
 
 
 class PyFuncQueries:
 
+    MAX_RECORDS = 2000
+
+    def __init__(self, catalogueClient=None):
+        self.catalogueClient = catalogueClient if catalogueClient is not None else CodeDeCatalogueClient()
+
     def buildSentinel1QueryTileList(self, geometry, startDate, endDate, productType):
 
         url = self.build_query(
@@ -28,7 +38,7 @@ class PyFuncQueries:
         processingLevel='LEVEL1',    # 'LEVEL0','LEVEL1','LEVEL1B','LEVEL1C','LEVEL2','LEVEL2A','LEVEL2AP','LEVEL3'
         productType=productType,           # 'L1C','L2A','L2A-MAJA','L2A-FORCE','GRD','SLC','CARD-BS','CARD-INF6'
         sensorMode='IW',             # 'IW', 'EW', 'WV', 'SM' or None
-        maxRecords=2000
+        maxRecords=self.MAX_RECORDS
         )
         return self.createTileListFromUrl(url)
 
@@ -49,7 +59,7 @@ class PyFuncQueries:
 
         test = False
 
-        url = 'https://finder.code-de.org/resto/api/collections/' + collection + '/search.json?'
+        url = self.catalogueClient.baseUrl + collection + '/search.json?'
 
         query_attributes = []
 
@@ -109,35 +119,18 @@ class PyFuncQueries:
     def createTileListFromUrl(self, url):
 
         if isinstance(url, str):
-            query_results = self.__request_CodeDE(url)
-            tiles = self.__get_result_list(query_results)
-            if len(tiles) < 2000:
-                print('Number of images: {}'.format(len(tiles)))
-                print('first 5 tiles: {}'.format(tiles[0:5]))
-            else:
-                print('More than 2000 images found. Several requests required to collect all images ...')
-                page = 2
-                while len(self.__get_result_list(self.__request_CodeDE(url+'&page='+str(page)))) == 2000:
-                    more_tiles = self.__get_result_list(self.__request_CodeDE(url+'&page='+str(page)))
-                    tiles = tiles + more_tiles
-                    page = page + 1
-                last_tiles = self.__get_result_list(self.__request_CodeDE(url+'&page='+str(page)))
-                tiles = tiles + last_tiles
-
-                print('Number of images: {}'.format(len(tiles)))
-                print('first 5 tiles: {}'.format(tiles[0:5]))
+            tiles = self.__request_all_pages(url)
+            print('Number of images: {}'.format(len(tiles)))
+            print('first 5 tiles: {}'.format(tiles[0:5]))
         else:
             list_of_urls = []
             for polygon in url[1]:
                 url_ = url[0] + '&geometry=' + polygon
                 list_of_urls.append(url_)
+                print('query url: {}'.format(url_))
 
-            list_of_images = []
-            for query in list_of_urls:
-                print('query url: {}'.format(query))
-                query_temp = self.__request_CodeDE(query)
-                tiles_temp = self.__get_result_list(query_temp)
-                list_of_images.append(tiles_temp)
+            # the polygons are queried concurrently, the amount of parallel requests is limited by the client
+            list_of_images = self.__map_concurrently(self.__request_all_pages, list_of_urls)
 
             flat_list = [item for sublist in list_of_images for item in sublist]
             print('number of images with duplicates: {}'.format(len(flat_list)))
@@ -159,6 +152,14 @@ class PyFuncQueries:
             else:
                 print('polygone is not closed! Please enter a correct geometry.')
 
+        elif hasattr(geometry, 'geom_type'):
+            # shapely polygon or multipolygon, e.g. the query polygons of the MultiAoiPlanner
+            polygones = list(geometry.geoms) if hasattr(geometry, 'geoms') else [geometry]
+            geometry_ = [str(polygon).replace('POLYGON ', 'POLYGON').replace(', ','%2C').replace(' ', '+')
+                         for polygon in polygones]
+            if len(geometry_) == 1:
+                geometry_ = geometry_[0]
+
         elif isinstance(geometry, str) and geometry.endswith('.geojson'):
             location = gpd.read_file(geometry)
             polygones = location['geometry']
@@ -179,26 +180,39 @@ class PyFuncQueries:
         return geometry_
 
     def __request_CodeDE(self, query_url):
+        return self.catalogueClient.getJson(query_url)
+
+    def __request_all_pages(self, query_url):
+        # each page is requested only once. Further pages are fetched in concurrent batches until a page is not full.
+        tiles = self.__get_result_list(self.__request_CodeDE(query_url))
+        if len(tiles) < self.MAX_RECORDS:
+            return tiles
+
+        print('More than {} images found. Several requests required to collect all images ...'.format(self.MAX_RECORDS))
+        page = 2
+        lastPageFound = False
+        while not lastPageFound:
+            pages = range(page, page + self.catalogueClient.maxConcurrency)
+            responses = self.catalogueClient.getAllJson([query_url + '&page=' + str(p) for p in pages])
+            for response in responses:
+                more_tiles = self.__get_result_list(response)
+                tiles = tiles + more_tiles
+                if len(more_tiles) < self.MAX_RECORDS:
+                    lastPageFound = True
+                    break
+            page = page + len(pages)
+
+        return tiles
+
+    def __map_concurrently(self, function, items):
+        if len(items) <= 1:
+            return [function(item) for item in items]
 
-        try:
-            response = requests.get(query_url)
-            response.raise_for_status()
-            # Code here will only run if the request is successful
-            if response.status_code == 200:
-                print('Request was sucessful.')
-
-            return response
-        except requests.exceptions.HTTPError as errh:
-            print(errh)
-        except requests.exceptions.ConnectionError as errc:
-            print(errc)
-        except requests.exceptions.Timeout as errt:
-            print(errt)
-        except requests.exceptions.RequestException as err:
-            print(err)
+        with ThreadPoolExecutor(max_workers=min(self.catalogueClient.maxConcurrency, len(items))) as executor:
+            return list(executor.map(function, items))
 
     def __get_result_list(self, response):
-        results = response.json()['features']
+        results = response['features']
 
         dir_list = []
         for i in range(len(results)):
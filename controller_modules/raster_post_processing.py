@@ -0,0 +1,301 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        raster_post_processing
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class applies post processing steps to the final GeoTIFF products of an output folder.
+#-------The steps are declared once by name and executed in the declared order on each block of lines of a product:
+#-------"nodata" sets the no-data value for the zero and non-finite pixels written by the terrain correction,
+#-------"aoiMask" clips the product to the bounding window of the aoi and masks all pixels outside of the aoi,
+#-------"dB" converts the linear values to decibel.
+#-------Only blocks of at most BLOCK_PIXELS pixels per band are held in memory, so the memory of a product does not
+#-------depend on its size. The products of a folder are processed in a pool of worker processes.
+#-------A product is written to a temp file in its folder and renamed once complete. The applied steps are stored in
+#-------the GeoTIFF tag POST_PROCESSING, so a step is never applied twice to the same product.
+#-------With a cog compression the products are converted to tiled, compressed cloud optimized GeoTIFFs with internal
+#-------overviews after the steps, so readers of a part of a product or of a lower resolution read only their tiles.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import uuid
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.features import geometry_mask
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+from shapely import wkt, geometry
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+class RasterPostProcessing:
+
+    # #Step name: method applied to each block
+    STEPS = {"nodata": "fixNodata", "aoiMask": "maskAoi", "dB": "toDb"}
+
+    # #Pixels of one block per band
+    BLOCK_PIXELS = 1024 * 1024
+
+    # #Raster block cache of GDAL per worker in MB
+    GDAL_CACHE = 64
+
+    # #Tile size and compressions of the cloud optimized GeoTIFFs
+    COG_BLOCK_SIZE = 512
+    COG_COMPRESSIONS = ["DEFLATE", "ZSTD"]
+
+    TAG = "POST_PROCESSING"
+    TEMP_SUFFIX = ".tmp.tif"
+
+    def __init__(self, steps, workers=1, nodataValue=float("nan"), cogCompression=None):
+        """
+        Parameters
+        ----------
+        steps : list
+            The names of the steps in the order of execution, see STEPS
+        workers : int
+            The amount of products processed in parallel
+        nodataValue : float
+            The no-data value of the written products
+        cogCompression : str
+            The compression of the cloud optimized GeoTIFFs, see COG_COMPRESSIONS. None keeps the GeoTIFF layout
+        """
+
+        self.steps = []
+        for step in steps:
+            if step in self.STEPS:
+                self.steps.append(step)
+            elif step != "":
+                print("Unknown post processing step: " + str(step))
+        self.workers = max(1, int(workers))
+        self.nodataValue = nodataValue
+
+        self.cogCompression = None
+        if cogCompression is not None:
+            self.cogCompression = str(cogCompression).strip().upper()
+            if self.cogCompression not in self.COG_COMPRESSIONS:
+                print("Unknown cog compression: " + str(cogCompression) + ", DEFLATE is used")
+                self.cogCompression = "DEFLATE"
+
+    @staticmethod
+    def fromSetting(setting, workers=1, outputProfile="geotiff", cogCompression="DEFLATE"):
+        """Returns the post processing of a comma separated list of steps, e.g. "nodata,aoiMask,dB", and of the
+        output profile "geotiff" or "cog"."""
+        isCog = str(outputProfile or "").strip().lower() == "cog"
+        return RasterPostProcessing([step.strip() for step in str(setting or "").split(",")], workers,
+                                    cogCompression=(cogCompression or "DEFLATE") if isCog else None)
+
+    def withoutSteps(self, steps):
+        """Returns a post processing of the same settings without the given steps, e.g. dB for coherence products."""
+        return RasterPostProcessing([step for step in self.steps if step not in steps], self.workers, self.nodataValue,
+                                    self.cogCompression)
+
+    def processFolder(self, outputPath, wktAoi="", logObject=None, areaName=None):
+        """Applies the steps and the output profile to all GeoTIFF products in outputPath and its sub folders.
+
+        Parameters
+        ----------
+        outputPath : str
+            The folder of the final products
+        wktAoi : str
+            The Aoi in wkt format, needed by the step "aoiMask"
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        areaName : str
+            Only products with this area name in their output name are processed, as the output folders are shared
+            by all aois
+
+        Returns
+        -------
+        int
+            The amount of products written
+        """
+
+        if (len(self.steps) == 0 and self.cogCompression is None) or outputPath is None or \
+                not os.path.isdir(outputPath):
+            return 0
+
+        # The worker processes import this module, they do not need the list creation and Snap modules
+        from controller_modules.create_input_output import CreateInputOutput
+
+        products = []
+        for root, dirs, files in os.walk(outputPath):
+            for file in sorted(files):
+                if not file.lower().endswith((".tif", ".tiff")) or file.endswith(self.TEMP_SUFFIX):
+                    continue
+                # #The area name must match exactly, the products of field1 are not the ones of field10
+                if areaName is not None and areaName != "":
+                    fields = CreateInputOutput.parseOutputName(file)
+                    if fields is None or fields["areaName"] != areaName:
+                        continue
+                products.append(os.path.join(root, file))
+        if len(products) == 0:
+            return 0
+
+        arguments = (self.steps, wktAoi, self.nodataValue, self.BLOCK_PIXELS, self.cogCompression)
+        results = []
+        if self.workers > 1 and len(products) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(products))) as executor:
+                futures = {executor.submit(RasterPostProcessing.processProduct, product, *arguments): product
+                           for product in products}
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        results.append((futures[future], False, "Post processing failed: " + str(e)))
+        else:
+            for product in products:
+                try:
+                    results.append(RasterPostProcessing.processProduct(product, *arguments))
+                except Exception as e:
+                    results.append((product, False, "Post processing failed: " + str(e)))
+
+        written = 0
+        for product, success, message in results:
+            if message != "":
+                RasterPostProcessing.__log(logObject, product + ": " + message, not success)
+            written = written + (1 if success and message != "" else 0)
+        return written
+
+    @staticmethod
+    def processProduct(product, steps, wktAoi, nodataValue, blockPixels, cogCompression=None):
+        """Applies the steps not yet applied to one product and converts it to a cloud optimized GeoTIFF if
+        cogCompression is set.
+
+        Returns
+        -------
+        tuple
+            The product, False on an error and the message for the logfile, empty if nothing was done
+        """
+
+        with rasterio.Env(GDAL_CACHEMAX=RasterPostProcessing.GDAL_CACHE):
+            with rasterio.open(product) as source:
+                applied = [step for step in source.tags().get(RasterPostProcessing.TAG, "").split(",") if step != ""]
+                pending = [step for step in steps if step not in applied]
+                isCog = source.tags(ns="IMAGE_STRUCTURE").get("LAYOUT", "").upper() == "COG"
+                if len(pending) == 0 and (cogCompression is None or isCog):
+                    return product, True, ""
+
+                tempFiles = []
+                try:
+                    if len(pending) > 0:
+                        tempFiles.append(product + "." + uuid.uuid4().hex[:8] + RasterPostProcessing.TEMP_SUFFIX)
+                        if not RasterPostProcessing.__writeSteps(source, tempFiles[-1], applied, pending, wktAoi,
+                                                                 nodataValue, blockPixels):
+                            return product, False, "Aoi does not overlap the product, post processing skipped"
+
+                    if cogCompression is not None:
+                        tempFiles.append(product + "." + uuid.uuid4().hex[:8] + RasterPostProcessing.TEMP_SUFFIX)
+                        RasterPostProcessing.__copyToCog(tempFiles[0] if len(tempFiles) > 1 else source,
+                                                         tempFiles[-1], cogCompression)
+                except Exception:
+                    for tempFile in tempFiles:
+                        if os.path.exists(tempFile):
+                            os.remove(tempFile)
+                    raise
+
+        # #The product is replaced by the complete result, the intermediate product of the steps is removed
+        os.replace(tempFiles[-1], product)
+        for tempFile in tempFiles[:-1]:
+            os.remove(tempFile)
+
+        messages = ["post processing steps applied: " + ",".join(pending)] if len(pending) > 0 else []
+        if cogCompression is not None:
+            messages.append("written as cloud optimized GeoTIFF with " + cogCompression + " compression")
+        return product, True, ", ".join(messages)
+
+    @staticmethod
+    def __writeSteps(source, targetFile, applied, pending, wktAoi, nodataValue, blockPixels):
+        context = {"sourceNodata": source.nodata, "nodataValue": nodataValue, "aoi": None}
+        window = Window(0, 0, source.width, source.height)
+        if "aoiMask" in pending and wktAoi is not None and wktAoi != "":
+            context["aoi"] = transform_geom("EPSG:4326", source.crs, geometry.mapping(wkt.loads(wktAoi)))
+            window = RasterPostProcessing.__getAoiWindow(source, context["aoi"])
+            if window is None:
+                return False
+
+        profile = source.profile.copy()
+        profile.update(driver="GTiff", dtype="float32", nodata=nodataValue, width=int(window.width),
+                       height=int(window.height), transform=source.window_transform(window), BIGTIFF="IF_SAFER")
+
+        with rasterio.open(targetFile, "w", **profile) as target:
+            target.update_tags(**source.tags())
+            target.update_tags(**{RasterPostProcessing.TAG: ",".join(applied + pending)})
+            for band, description in enumerate(source.descriptions, start=1):
+                if description is not None:
+                    target.set_band_description(band, description)
+
+            for block, targetBlock in RasterPostProcessing.getBlocks(window, blockPixels):
+                values = source.read(window=block, masked=False).astype(np.float32)
+                valid = source.read_masks(window=block) > 0 if source.nodata is not None else \
+                    np.ones(values.shape, dtype=bool)
+                context["transform"] = source.window_transform(block)
+
+                for step in pending:
+                    values, valid = getattr(RasterPostProcessing, RasterPostProcessing.STEPS[step])(values, valid,
+                                                                                                   context)
+                values[~valid] = nodataValue
+                target.write(values, window=targetBlock)
+        return True
+
+    @staticmethod
+    def __copyToCog(source, targetFile, compression):
+        # #The COG driver reads the source block by block, computes the overviews in a temp file and writes the
+        # #tiles ordered by overview level
+        rasterio.shutil.copy(source, targetFile, driver="COG", COMPRESS=compression, PREDICTOR="YES",
+                             BLOCKSIZE=RasterPostProcessing.COG_BLOCK_SIZE, OVERVIEWS="AUTO",
+                             OVERVIEW_RESAMPLING="AVERAGE", BIGTIFF="IF_SAFER", NUM_THREADS="1")
+
+    @staticmethod
+    def getBlocks(window, blockPixels):
+        """Yields the blocks of whole lines of the window in the source and in the target."""
+        lines = max(1, int(blockPixels // max(1, window.width)))
+        for firstLine in range(0, int(window.height), lines):
+            height = min(lines, int(window.height) - firstLine)
+            yield (Window(window.col_off, window.row_off + firstLine, window.width, height),
+                   Window(0, firstLine, window.width, height))
+
+    @staticmethod
+    def __getAoiWindow(source, aoi):
+        window = from_bounds(*geometry.shape(aoi).bounds, transform=source.transform)
+
+        # #All pixels touched by the bounds of the aoi
+        firstColumn = max(0, int(np.floor(window.col_off)))
+        firstRow = max(0, int(np.floor(window.row_off)))
+        lastColumn = min(source.width, int(np.ceil(window.col_off + window.width)))
+        lastRow = min(source.height, int(np.ceil(window.row_off + window.height)))
+        if firstColumn >= lastColumn or firstRow >= lastRow:
+            return None
+        return Window(firstColumn, firstRow, lastColumn - firstColumn, lastRow - firstRow)
+
+    # ##################################Steps#################################
+
+    @staticmethod
+    def fixNodata(values, valid, context):
+        # #The terrain correction writes zero outside of the scene and for pixels without value
+        return values, valid & np.isfinite(values) & (values != 0)
+
+    @staticmethod
+    def maskAoi(values, valid, context):
+        if context["aoi"] is None:
+            return values, valid
+        inside = geometry_mask([context["aoi"]], out_shape=values.shape[1:], transform=context["transform"],
+                               invert=True)
+        return values, valid & inside[None, :, :]
+
+    @staticmethod
+    def toDb(values, valid, context):
+        positive = valid & (values > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(positive, 10.0 * np.log10(values), values).astype(np.float32)
+        return values, positive
+
+    @staticmethod
+    def __log(logObject, message, error=False):
+        if logObject is not None:
+            logObject.appendOutputToLog(message, error)
+        else:
+            print(message)
@@ -0,0 +1,114 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        resource_aware_gpt_executor
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class executes Snap graph .xml files by another GptExecutor once the GptResourceScheduler admitted them.
+#-------Each gpt process is started with the heap, tile cache and parallelism of its slot.
+#-------While a graph is executed, the peak memory and cpu time of its gpt process are sampled from /proc and recorded
+#-------with the run, so the scheduler learns the estimates of the graph type. The gpt process is found by the graph file
+#-------in its command line. Without /proc only the written products are recorded.
+#-------The workers of the warmPool backend start their JVM once with the heap of gpt.vmoptions, their graphs are only
+#-------admitted, not sized.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import time
+import threading
+
+from controller_modules.gpt_executor import GptExecutor
+
+
+class ResourceAwareGptExecutor(GptExecutor):
+
+    SAMPLE_INTERVAL = 0.2
+
+    def __init__(self, executor, scheduler):
+        """
+        Parameters
+        ----------
+        executor : GptExecutor
+            The backend executing the admitted graphs
+        scheduler : GptResourceScheduler
+            The scheduler admitting and sizing the gpt runs
+        """
+
+        self.executor = executor
+        self.scheduler = scheduler
+
+    def execute(self, xmlFile, gptArgs=None) -> str:
+        slot = self.scheduler.acquire(xmlFile)
+        slotArgs = self.scheduler.getGptArgs(slot)
+
+        usage = {"peakBytes": None, "cpuSeconds": None}
+        stopSampling = threading.Event()
+        sampler = threading.Thread(target=ResourceAwareGptExecutor.__sampleProcesses,
+                                   args=(xmlFile, usage, stopSampling), daemon=True)
+        sampler.start()
+
+        timeBefore = time.time()
+        success = False
+        try:
+            output = self.executor.execute(xmlFile, slotArgs + list(gptArgs or []))
+            success = True
+        finally:
+            stopSampling.set()
+            sampler.join()
+            self.scheduler.release(slot, time.time() - timeBefore, usage["peakBytes"], usage["cpuSeconds"], success)
+
+        peak = "%.0f MB" % (usage["peakBytes"] / 1024 ** 2) if usage["peakBytes"] is not None else "not measured"
+        return output + "\nResources: waited %.1f sec for %s, peak memory %s" % (slot["waited"], " ".join(slotArgs),
+                                                                                 peak)
+
+    def close(self):
+        self.executor.close()
+
+    # ##################################Process usage#################################
+
+    @staticmethod
+    def __sampleProcesses(xmlFile, usage, stopSampling):
+        graphFiles = {xmlFile, os.path.abspath(xmlFile)}
+        peaks = {}
+        cpuTimes = {}
+        while True:
+            for pid, (peakBytes, cpuSeconds) in ResourceAwareGptExecutor.getProcessUsage(graphFiles).items():
+                peaks[pid] = max(peaks.get(pid, 0), peakBytes)
+                cpuTimes[pid] = max(cpuTimes.get(pid, 0.0), cpuSeconds)
+            if peaks:
+                # #The gpt launcher and the JVM it starts
+                usage["peakBytes"] = sum(peaks.values())
+                usage["cpuSeconds"] = sum(cpuTimes.values())
+            if stopSampling.wait(ResourceAwareGptExecutor.SAMPLE_INTERVAL):
+                return
+
+    @staticmethod
+    def getProcessUsage(graphFiles):
+        """Returns the peak resident memory in bytes and the cpu seconds of each process with one of the graph files
+        in its command line."""
+
+        usage = {}
+        if not os.path.isdir("/proc"):
+            return usage
+        clockTicks = os.sysconf("SC_CLK_TCK")
+
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open("/proc/" + pid + "/cmdline", "rb") as cmdline:
+                    arguments = cmdline.read().decode("utf-8", "replace").split("\0")
+                if not any(graphFile in arguments for graphFile in graphFiles):
+                    continue
+                with open("/proc/" + pid + "/status") as status:
+                    peakBytes = next((int(line.split()[1]) * 1024 for line in status if line.startswith("VmHWM:")), 0)
+                with open("/proc/" + pid + "/stat") as stat:
+                    # #utime and stime follow the command name, which may contain spaces
+                    fields = stat.read().rsplit(")", 1)[1].split()
+                usage[int(pid)] = (peakBytes, (int(fields[11]) + int(fields[12])) / clockTicks)
+            except (OSError, IndexError, ValueError):
+                continue
+        return usage
@@ -0,0 +1,353 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        scene_catalog
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+# ----This class holds the metadata of Sentinel-1 SAFE products needed during list creation and processing.
+# ----The manifest.safe and annotation .xml files of each product are parsed only once. The result is stored in a SQLite
+# ----database "scene_catalog.sqlite" in the main data path and reused by following runs.
+# ----An entry is invalidated and rebuilt if the modification time of the manifest.safe file changes.
+# ----Stored per product: footprint, pass direction, slice number, absolute and relative orbit, polarisations,
+# ----start and stop time, the footprint of each subswath and the burst boundaries of each subswath.
+# ----The burst boundaries are stored as arrays of [lon, lat] rows interpolated from the geolocation grid of the annotation
+# ----files at the first line of each burst and the end of the last burst: burst k lies between row k and row k + 1.
+# ----Without a set data path the catalog is kept in memory only.
+# ----The catalog can be used from several threads, e.g. the subswath branches, each thread has its own connection.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+from lxml import etree
+from shapely import wkt
+from shapely.geometry import MultiPoint, Polygon
+
+
+class SceneCatalog:
+
+    NS_SAFE = "{http://www.esa.int/safe/sentinel-1.0}"
+    NS_S1 = "{http://www.esa.int/safe/sentinel-1.0/sentinel-1}"
+    NS_S1SARL1 = "{http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1}"
+    NS_GML = "{http://www.opengis.net/gml}"
+
+    CATALOG_FILE = "scene_catalog.sqlite"
+
+    COLUMNS = ["product", "mtime", "footprint", "pass", "sliceNumber", "absoluteOrbit", "relativeOrbit",
+               "polarisation", "startTime", "stopTime", "subswaths", "bursts"]
+
+    __defaultCatalog = None
+    __lock = threading.Lock()
+
+    def __init__(self, dataPath=None):
+        self.catalogFile = dataPath + self.CATALOG_FILE if dataPath else None
+        self.__entries = {}
+        self.__polygons = {}
+        self.__burstPolygons = {}
+        # #One connection per thread, e.g. for the subswath branches, and per process
+        self.__local = threading.local()
+
+    # ##################################Access to the catalog of the current run#################################
+
+    @staticmethod
+    def setDefaultLocation(dataPath):
+        """Sets the data path of the catalog used by all modules of the current run."""
+        with SceneCatalog.__lock:
+            SceneCatalog.__defaultCatalog = SceneCatalog(dataPath)
+
+    @staticmethod
+    def default():
+        with SceneCatalog.__lock:
+            if SceneCatalog.__defaultCatalog is None:
+                SceneCatalog.__defaultCatalog = SceneCatalog()
+            return SceneCatalog.__defaultCatalog
+
+    # ##################################Metadata queries#################################
+
+    def getScene(self, product):
+        """Returns the metadata entry of the given product. The entry is built if the product is not in the catalog
+        or the manifest.safe was modified since the entry was built.
+
+        Parameters
+        ----------
+        product : str
+            The path of the SAFE product folder or of its manifest.safe file
+
+        Returns
+        -------
+        dict
+            The metadata entry with the keys given in COLUMNS. None if the manifest.safe can not be read.
+        """
+
+        product = self.normaliseProduct(product)
+        manifest = product + "/manifest.safe"
+
+        try:
+            mtime = os.stat(manifest).st_mtime
+        except OSError:
+            return None
+
+        entry = self.__entries.get(product)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        entry = self.__loadEntry(product)
+        if self.__isOutdated(entry, mtime):
+            entry = self.__buildEntry(product, mtime)
+            if entry is None:
+                return None
+            self.__storeEntries([entry])
+
+        self.__entries[product] = entry
+        self.__polygons.pop(product, None)
+        self.__burstPolygons.pop(product, None)
+        return entry
+
+    def addScenes(self, products):
+        """Builds the missing or outdated entries of all given products and stores them in one transaction."""
+        newEntries = []
+        for product in products:
+            product = self.normaliseProduct(product)
+            try:
+                mtime = os.stat(product + "/manifest.safe").st_mtime
+            except OSError:
+                continue
+
+            entry = self.__entries.get(product) or self.__loadEntry(product)
+            if self.__isOutdated(entry, mtime):
+                entry = self.__buildEntry(product, mtime)
+                if entry is None:
+                    continue
+                newEntries.append(entry)
+
+            self.__entries[product] = entry
+            self.__polygons.pop(product, None)
+            self.__burstPolygons.pop(product, None)
+
+        self.__storeEntries(newEntries)
+
+    def getFootprint(self, product):
+        entry = self.getScene(product)
+        return entry["footprint"] if entry is not None else None
+
+    def getFootprintPolygon(self, product):
+        entry = self.getScene(product)
+        if entry is None or entry["footprint"] is None:
+            return None
+
+        product = self.normaliseProduct(product)
+        if product not in self.__polygons:
+            self.__polygons[product] = wkt.loads(entry["footprint"])
+        return self.__polygons[product]
+
+    def getPassDirection(self, product):
+        entry = self.getScene(product)
+        return entry["pass"] if entry is not None else None
+
+    def getSliceNumber(self, product):
+        entry = self.getScene(product)
+        return entry["sliceNumber"] if entry is not None else None
+
+    def getSubswathFootprints(self, product):
+        entry = self.getScene(product)
+        return json.loads(entry["subswaths"]) if entry is not None and entry["subswaths"] else {}
+
+    def getBurstPolygons(self, product):
+        """Returns the burst polygons of each subswath derived from the annotation geolocation grids.
+
+        Returns
+        -------
+        dict
+            subswath -> list of burst polygons in burst order, e.g. {"IW1": [Polygon, ...], ...}.
+            Empty if the product has no annotation files or no bursts.
+        """
+
+        entry = self.getScene(product)
+        if entry is None or not entry["bursts"]:
+            return {}
+
+        product = self.normaliseProduct(product)
+        if product not in self.__burstPolygons:
+            self.__burstPolygons[product] = {
+                swath: [Polygon(rows[k] + rows[k + 1][::-1]) for k in range(len(rows) - 1)]
+                for swath, rows in json.loads(entry["bursts"]).items()}
+        return self.__burstPolygons[product]
+
+    @staticmethod
+    def normaliseProduct(product):
+        product = product.strip().rstrip("/")
+        if product.endswith("manifest.safe"):
+            product = os.path.dirname(product)
+        return product
+
+    @staticmethod
+    def snapCoordsToWkt(snapCoords) -> str:
+        transformationFunc = (lambda x: (' '.join((lambda y: [y[1], y[0]])(i.split(","))) for i in x))
+
+        openPolygon = list(transformationFunc(snapCoords.split(" ")))
+        openPolygon.append(openPolygon[0])
+
+        coordinatesAsString = ','.join(openPolygon)
+        return "POLYGON((" + coordinatesAsString + "))"
+
+    # ##################################Parsing of the product files#################################
+
+    def __buildEntry(self, product, mtime):
+        try:
+            root = etree.parse(product + "/manifest.safe").getroot()
+        except (OSError, etree.XMLSyntaxError) as e:
+            print("Manifest of " + product + " can not be read: " + str(e))
+            return None
+
+        findText = lambda tag, attribute=None: next(
+            (element.text for element in root.iter(tag)
+             if attribute is None or element.get("type") == attribute), None)
+
+        coordinates = findText(self.NS_GML + "coordinates")
+        polarisations = [element.text for element in root.iter(self.NS_S1SARL1 + "transmitterReceiverPolarisation")]
+        footprints, bursts = self.__getSubswathGeometry(product, polarisations)
+
+        absoluteOrbit = findText(self.NS_SAFE + "orbitNumber", "start")
+        relativeOrbit = findText(self.NS_SAFE + "relativeOrbitNumber", "start")
+
+        return {
+            "product": product,
+            "mtime": mtime,
+            "footprint": self.snapCoordsToWkt(coordinates) if coordinates is not None else None,
+            "pass": findText(self.NS_S1 + "pass"),
+            "sliceNumber": findText(self.NS_S1SARL1 + "sliceNumber"),
+            "absoluteOrbit": int(absoluteOrbit) if absoluteOrbit is not None else None,
+            "relativeOrbit": int(relativeOrbit) if relativeOrbit is not None else None,
+            "polarisation": ",".join(polarisations),
+            "startTime": findText(self.NS_SAFE + "startTime"),
+            "stopTime": findText(self.NS_SAFE + "stopTime"),
+            "subswaths": json.dumps(footprints),
+            "bursts": json.dumps(bursts),
+        }
+
+    @staticmethod
+    def __isOutdated(entry, mtime):
+        # #Entries of catalogs created before the burst boundaries were stored have no bursts value
+        return entry is None or entry["mtime"] != mtime or entry["bursts"] is None
+
+    def __getSubswathGeometry(self, product, polarisations):
+        """Derives the footprint and the burst boundaries of each subswath from the geolocation grid of its annotation
+        file. Only the annotation files of the first polarisation are parsed, since all polarisations share the same
+        geometry."""
+
+        annotationPath = product + "/annotation/"
+        if not os.path.isdir(annotationPath):
+            return {}, {}
+
+        polarisation = "-" + polarisations[0].lower() + "-" if len(polarisations) > 0 else ""
+        footprints = {}
+        bursts = {}
+
+        for file in sorted(os.listdir(annotationPath)):
+            if not file.endswith(".xml") or polarisation not in file:
+                continue
+
+            try:
+                root = etree.parse(annotationPath + file).getroot()
+            except (OSError, etree.XMLSyntaxError):
+                continue
+
+            swath = root.findtext("adsHeader/swath")
+            points = [(float(point.findtext("longitude")), float(point.findtext("latitude")))
+                      for point in root.iter("geolocationGridPoint")]
+
+            if swath is None or len(points) <= 2:
+                continue
+
+            rows = self.__getBurstRows(root)
+            if rows is not None:
+                bursts[swath] = rows
+                footprints[swath] = Polygon(rows[0] + rows[-1][::-1]).wkt
+            else:
+                footprints[swath] = MultiPoint(points).convex_hull.wkt
+
+        return footprints, bursts
+
+    @staticmethod
+    def __getBurstRows(root):
+        """Interpolates the geolocation grid at the burst boundaries of a subswath annotation.
+
+        Returns
+        -------
+        list
+            burst count + 1 rows of [lon, lat] at the pixel columns of the grid. None if the annotation has no bursts
+            or the grid is not regular.
+        """
+
+        linesPerBurst = int(root.findtext("swathTiming/linesPerBurst") or 0)
+        burstCount = len(root.findall("swathTiming/burstList/burst"))
+        if linesPerBurst <= 0 or burstCount == 0:
+            return None
+
+        grid = np.array([[float(point.findtext(tag)) for tag in ["line", "pixel", "longitude", "latitude"]]
+                         for point in root.iter("geolocationGridPoint")])
+        lines = np.unique(grid[:, 0])
+        pixels = np.unique(grid[:, 1])
+        if len(lines) < 2 or len(lines) * len(pixels) != len(grid):
+            return None
+
+        # #Order the points by line and pixel, so the grid has the shape lines x pixels x (line, pixel, lon, lat)
+        grid = grid[np.lexsort((grid[:, 1], grid[:, 0]))].reshape(len(lines), len(pixels), 4)
+        boundaries = np.arange(burstCount + 1) * linesPerBurst
+
+        rows = np.empty((len(boundaries), len(pixels), 2))
+        for column in range(len(pixels)):
+            rows[:, column, 0] = np.interp(boundaries, lines, grid[:, column, 2])
+            rows[:, column, 1] = np.interp(boundaries, lines, grid[:, column, 3])
+        return np.round(rows, 5).tolist()
+
+    # ##################################SQLite storage#################################
+
+    def __getConnection(self):
+        if self.catalogFile is None:
+            return None
+
+        # #Connections can neither be shared with other threads nor with forked worker processes
+        if getattr(self.__local, "connection", None) is None or self.__local.pid != os.getpid():
+            self.__local.connection = sqlite3.connect(self.catalogFile, timeout=60)
+            self.__local.pid = os.getpid()
+            self.__local.connection.execute("CREATE TABLE IF NOT EXISTS scenes (product TEXT PRIMARY KEY, mtime REAL, "
+                                      "footprint TEXT, pass TEXT, sliceNumber TEXT, absoluteOrbit INTEGER, "
+                                      "relativeOrbit INTEGER, polarisation TEXT, startTime TEXT, stopTime TEXT, "
+                                      "subswaths TEXT, bursts TEXT)")
+
+            # #Catalogs of earlier versions get the missing columns, their entries are rebuilt when read
+            columns = [row[1] for row in self.__local.connection.execute("PRAGMA table_info(scenes)")]
+            for column in self.COLUMNS:
+                if column not in columns:
+                    try:
+                        self.__local.connection.execute("ALTER TABLE scenes ADD COLUMN " + column + " TEXT")
+                    except sqlite3.OperationalError:
+                        # #Added by a parallel worker process in the meantime
+                        pass
+            self.__local.connection.commit()
+        return self.__local.connection
+
+    def __loadEntry(self, product):
+        connection = self.__getConnection()
+        if connection is None:
+            return None
+
+        row = connection.execute("SELECT " + ",".join(self.COLUMNS) + " FROM scenes WHERE product = ?",
+                                 (product,)).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row is not None else None
+
+    def __storeEntries(self, entries):
+        connection = self.__getConnection()
+        if connection is None or len(entries) == 0:
+            return
+
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO scenes (" + ",".join(self.COLUMNS) + ") VALUES (" +
+                                   ",".join(["?"] * len(self.COLUMNS)) + ")",
+                                   [[entry[column] for column in self.COLUMNS] for entry in entries])
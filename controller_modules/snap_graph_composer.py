@@ -0,0 +1,223 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        snap_graph_composer
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class stitches the bound graphs of consecutive processing stages to one Snap graph, so the whole chain is
+#-------executed by one gpt call without writing and reading back the intermediate products.
+#-------The stages are linked by their paths: a Read node of a later stage, whose file is written by a Write node of an
+#-------earlier stage, is replaced by the node feeding that Write node. Write nodes read by a later stage are removed.
+#-------Write nodes not read by any later stage are kept, e.g. products inspected after the chain was executed.
+#-------The Write node of the last stage keeps the id "Write", all other nodes keep their ids where they are unique.
+#-------A graph can be fanned out to several aois: the nodes from a given operator on up to the Write node are repeated
+#-------per aoi behind a Subset to the aoi, so the nodes before are executed once for all aois (see fanOutGraph).
+#-------The Write node of the first aoi branch keeps the id "Write", pyroSAR only executes graphs with a node of this id.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import copy
+from lxml import etree
+
+
+class SnapGraphComposer:
+
+    @staticmethod
+    def composeGraphs(roots):
+        """Composes the given graphs to one graph.
+
+        Parameters
+        ----------
+        roots : list
+            The roots of the bound graphs in the order they would be executed
+
+        Returns
+        -------
+        lxml.etree._Element
+            The root of the composed graph
+        """
+
+        composed = etree.Element("graph", id="Graph")
+        etree.SubElement(composed, "version").text = "1.0"
+
+        usedIds = set()
+        writtenProducts = {}
+        writeNodes = []
+
+        for stageNo, root in enumerate(roots):
+            nodes = [copy.deepcopy(node) for node in root.findall("node")]
+            idMap = {}
+            replacedIds = set()
+
+            # #Read nodes of products written by earlier stages are replaced by the node feeding that Write node
+            for node in nodes:
+                product = SnapGraphComposer.__getProductPath(node, "Read")
+                if product is not None and product in writtenProducts:
+                    writeNode, sourceId = writtenProducts[product]
+                    idMap[node.get("id")] = sourceId
+                    replacedIds.add(node.get("id"))
+                    writeNode.set("consumed", "true")
+
+            for node in nodes:
+                if node.get("id") not in replacedIds:
+                    idMap[node.get("id")] = SnapGraphComposer.__getUniqueId(node.get("id"), stageNo, usedIds)
+
+            for node in nodes:
+                if node.get("id") in replacedIds:
+                    continue
+
+                node.set("id", idMap[node.get("id")])
+                sources = node.find("sources")
+                if sources is not None:
+                    for source in sources:
+                        if source.get("refid") in idMap:
+                            source.set("refid", idMap[source.get("refid")])
+
+                composed.append(node)
+
+                product = SnapGraphComposer.__getProductPath(node, "Write")
+                if product is not None:
+                    writtenProducts[product] = (node, SnapGraphComposer.__getSourceId(node))
+                    writeNodes.append((stageNo, node))
+
+        # #Remove the intermediate writes read by later stages and give the final Write node its regular id
+        for stageNo, node in writeNodes:
+            if node.get("consumed") == "true" and stageNo < len(roots) - 1:
+                composed.remove(node)
+                usedIds.discard(node.get("id"))
+
+        keptWrites = [(stageNo, node) for stageNo, node in writeNodes if node.getparent() is not None]
+        for stageNo, node in keptWrites:
+            node.attrib.pop("consumed", None)
+            usedIds.discard(node.get("id"))
+        usedIds.add("Write")
+        for stageNo, node in keptWrites[:-1]:
+            node.set("id", SnapGraphComposer.__getUniqueId("Write (" + str(stageNo + 1) + ")", stageNo, usedIds))
+        if keptWrites:
+            keptWrites[-1][1].set("id", "Write")
+
+        return composed
+
+    @staticmethod
+    def fanOutGraph(root, branchOperator, subsetNode, branches):
+        """Returns a copy of the graph with one branch per aoi. The node of the branch operator and all nodes fed by it
+        form the branch, which is repeated for each aoi behind its own copy of the subset node.
+
+        Parameters
+        ----------
+        root : lxml.etree._Element
+            The root of the bound graph, e.g. composed by composeGraphs
+        branchOperator : str
+            The operator of the first node of the branch, e.g. "Terrain-Correction"
+        subsetNode : lxml.etree._Element
+            The Subset node copied in front of each branch, its geoRegion is set to the aoi of the branch
+        branches : list
+            The aoi in Wkt format and the file of the Write node of each branch
+
+        Returns
+        -------
+        lxml.etree._Element
+            The root of the fanned out graph
+        """
+
+        fanned = copy.deepcopy(root)
+        nodes = fanned.findall("node")
+        startNode = next((node for node in nodes if node.findtext("operator") == branchOperator), None)
+        if startNode is None:
+            raise ValueError("No " + branchOperator + " node to fan out in the graph")
+
+        # #The branch holds the start node and all nodes fed by it
+        branchIds = {startNode.get("id")}
+        added = True
+        while added:
+            added = False
+            for node in nodes:
+                sources = node.find("sources")
+                if node.get("id") not in branchIds and sources is not None and \
+                        any(source.get("refid") in branchIds for source in sources):
+                    branchIds.add(node.get("id"))
+                    added = True
+
+        trunkId = SnapGraphComposer.__getSourceId(startNode)
+        branchNodes = [node for node in nodes if node.get("id") in branchIds]
+        for node in branchNodes:
+            fanned.remove(node)
+        # #The presentation data refers to the removed node ids
+        for applicationData in fanned.findall("applicationData"):
+            fanned.remove(applicationData)
+        usedIds = {node.get("id") for node in fanned.findall("node")}
+        # #The Write node of the first branch keeps its id, so the graph still has a node "Write"
+        keptIds = {"Write"} if "Write" in branchIds and "Write" not in usedIds else set()
+        usedIds.update(keptIds)
+
+        for branchNo, (wktAoi, outputFile) in enumerate(branches, start=1):
+            idMap = {nodeId: nodeId if branchNo == 1 and nodeId in keptIds else
+                     SnapGraphComposer.__getUniqueId(nodeId + " (aoi " + str(branchNo) + ")", 0, usedIds)
+                     for nodeId in sorted(branchIds)}
+
+            subset = copy.deepcopy(subsetNode)
+            subset.set("id", SnapGraphComposer.__getUniqueId("Subset (aoi " + str(branchNo) + ")", 0, usedIds))
+            sources = subset.find("sources")
+            if sources is None:
+                sources = etree.SubElement(subset, "sources")
+            for source in list(sources):
+                sources.remove(source)
+            etree.SubElement(sources, "sourceProduct", refid=trunkId)
+            for parameter, value in [("geoRegion", wktAoi), ("sourceBands", "")]:
+                element = subset.find("parameters/" + parameter)
+                if element is None:
+                    element = etree.SubElement(subset.find("parameters"), parameter)
+                element.text = value
+            fanned.append(subset)
+
+            for node in branchNodes:
+                branchNode = copy.deepcopy(node)
+                branchNode.set("id", idMap[node.get("id")])
+                for source in branchNode.find("sources") if branchNode.find("sources") is not None else []:
+                    if node is startNode and source.get("refid") == trunkId:
+                        source.set("refid", subset.get("id"))
+                    elif source.get("refid") in idMap:
+                        source.set("refid", idMap[source.get("refid")])
+                if branchNode.findtext("operator") == "Write":
+                    branchNode.find("parameters/file").text = outputFile
+                fanned.append(branchNode)
+
+        return fanned
+
+    # ##################################Helper#################################
+
+    @staticmethod
+    def __getProductPath(node, operator):
+        if node.findtext("operator") != operator:
+            return None
+
+        file = node.findtext("parameters/file")
+        if file is None or file.strip() == "":
+            return None
+
+        # #Write nodes are given the product name without extension, Read nodes the .dim file
+        product = file.strip()
+        product = product[:-len(".dim")] if product.endswith(".dim") else product
+        return os.path.abspath(product)
+
+    @staticmethod
+    def __getSourceId(node):
+        sources = node.find("sources")
+        if sources is None or len(sources) == 0:
+            return None
+        return sources[0].get("refid")
+
+    @staticmethod
+    def __getUniqueId(nodeId, stageNo, usedIds):
+        uniqueId = nodeId
+        if uniqueId in usedIds:
+            uniqueId = nodeId + " (stage " + str(stageNo + 1) + ")"
+        counter = 2
+        while uniqueId in usedIds:
+            uniqueId = nodeId + " (stage " + str(stageNo + 1) + "." + str(counter) + ")"
+            counter = counter + 1
+        usedIds.add(uniqueId)
+        return uniqueId
@@ -0,0 +1,180 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        snap_graph_job
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class binds the read/write paths and operator parameters of one processing job to in memory copies of the
+#-------Snap graph templates (see SnapGraphTemplates).
+#-------A graph is addressed by the path of its template, e.g. "<snap_graph_files>/spacial_calc_graphs/slice_assembly.xml".
+#-------Before execution the bound graph is rendered to its own .xml file in the job directory and handed to
+#-------SnapGraphProcessing. Bound values stay valid for the lifetime of the job, just like values written to a template.
+#-------Consecutive stages without decisions in between can be collected in a chain. With graph fusion enabled the chain is
+#-------composed to one graph (see SnapGraphComposer) and executed by one gpt call, otherwise each stage is executed in turn.
+#-------The last stage of a chain can be fanned out to several aois, so the stages before are executed once for all of them.
+#-------With a GraphResultCache, graph executions whose products are already cached are restored from the cache instead.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import copy
+import os
+
+from controller_modules.snap_graph_processing import SnapGraphProcessing
+from controller_modules.snap_graph_composer import SnapGraphComposer
+
+
+class SnapGraphJob:
+
+    def __init__(self, templates, jobDir, graphFusion=True, resultCache=None):
+        self.templates = templates
+        self.jobDir = jobDir
+        self.graphFusion = graphFusion
+        self.resultCache = resultCache
+        self.__graphs = {}
+        self.__chain = []
+
+    def getGraph(self, xmlFile):
+        """Returns the job specific copy of the given graph template. The copy is created on first access.
+
+        Parameters
+        ----------
+        xmlFile : str
+            The path of the graph template in the snap_graph_files folder
+
+        Returns
+        -------
+        lxml.etree._Element
+            The root of the graph bound to this job
+        """
+
+        if xmlFile not in self.__graphs:
+            self.__graphs[xmlFile] = copy.deepcopy(self.templates.getTemplate(xmlFile))
+        return self.__graphs[xmlFile]
+
+    def fork(self, jobDir):
+        """Returns a job with copies of all graphs bound so far, rendering to the given folder. Values bound to the
+        fork do not change this job, so forks can be executed concurrently, e.g. one per subswath."""
+
+        forkedJob = SnapGraphJob(self.templates, jobDir, self.graphFusion, self.resultCache)
+        forkedJob.__graphs = copy.deepcopy(self.__graphs)
+        return forkedJob
+
+    # ######################Here are the methods to bind values to the graphs of the job#####################
+
+    def setInOutputPaths(self, xmlFile, inputPath, outputPath):
+        SnapGraphProcessing.setInOutputPathsOnGraph(self.getGraph(xmlFile), inputPath, outputPath)
+
+    def setMultiplePaths(self, xmlFile, pathList, mode="Read"):
+        SnapGraphProcessing.setMultiplePathsOnGraph(self.getGraph(xmlFile), pathList, mode, xmlFile)
+
+    def setNewOperatorParameter(self, xmlFile, operatorName, parameterName, newValue):
+        SnapGraphProcessing.setNewOperatorParameterOnGraph(self.getGraph(xmlFile), operatorName, parameterName,
+                                                           newValue)
+
+    def getOperatorParameter(self, xmlFile, operatorName, parameterName):
+        return SnapGraphProcessing.getOperatorParameterFromGraph(self.getGraph(xmlFile), operatorName, parameterName)
+
+    # ######################Here are the methods to render and execute the graphs of the job#####################
+
+    def renderGraph(self, xmlFile):
+        """Writes the bound graph to its own file in the job directory.
+
+        Parameters
+        ----------
+        xmlFile : str
+            The path of the graph template in the snap_graph_files folder
+
+        Returns
+        -------
+        str
+            The path of the rendered graph file that can be executed by gpt
+        """
+
+        return self.__writeRenderedGraph(self.getGraph(xmlFile), os.path.basename(xmlFile))
+
+    def performProcessing(self, xmlFile, logobject=None):
+        self.__executeGraph(self.getGraph(xmlFile), os.path.basename(xmlFile), logobject)
+
+    def executeByGroups(self, xmlFile, logobject, outputPath, amountGroups):
+        SnapGraphProcessing.executeByGroups(self.renderGraph(xmlFile), logobject, outputPath, amountGroups)
+
+    # ######################Here are the methods to execute chains of graphs#####################
+
+    def addToChain(self, xmlFile):
+        """Adds the graph with its currently bound values as next stage of the chain. Values bound afterwards do not
+        change the added stage, so the same graph can be added several times with different paths."""
+        self.__chain.append((xmlFile, copy.deepcopy(self.getGraph(xmlFile))))
+
+    def performChain(self, logobject=None):
+        """Executes all stages of the chain and clears it. Only the products of the last stage and products not read
+        by a following stage are written when graph fusion is enabled."""
+
+        chain = self.__chain
+        self.__chain = []
+        if len(chain) == 0:
+            return
+
+        if self.graphFusion and len(chain) > 1:
+            fusedGraph = SnapGraphComposer.composeGraphs([root for xmlFile, root in chain])
+            fileName = "fused_" + str(len(chain)) + "_" + os.path.basename(chain[-1][0])
+            self.__executeGraph(fusedGraph, fileName, logobject)
+            return
+
+        for stageNo, (xmlFile, root) in enumerate(chain):
+            fileName = "stage" + str(stageNo + 1) + "_" + os.path.basename(xmlFile)
+            self.__executeGraph(root, fileName, logobject)
+
+    def performFanOut(self, branchOperator, subsetXmlFile, branches, logobject=None):
+        """Executes all stages of the chain like performChain and clears it, but the last stage is fanned out from the
+        node of the branch operator on to one branch per aoi (see SnapGraphComposer.fanOutGraph).
+
+        Parameters
+        ----------
+        branchOperator : str
+            The operator of the first node executed per aoi, e.g. "Terrain-Correction"
+        subsetXmlFile : str
+            The path of the graph template whose Subset node is copied in front of each branch
+        branches : list
+            The aoi in Wkt format and the file of the Write node of each branch
+        logobject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        """
+
+        chain = self.__chain
+        self.__chain = []
+        if len(chain) == 0:
+            return
+
+        subsetNode = next(node for node in self.getGraph(subsetXmlFile).findall("node")
+                          if node.findtext("operator") == "Subset")
+        fileName = "fan_out_" + str(len(branches)) + "_" + os.path.basename(chain[-1][0])
+
+        if self.graphFusion and len(chain) > 1:
+            fusedGraph = SnapGraphComposer.composeGraphs([root for xmlFile, root in chain])
+            self.__executeGraph(SnapGraphComposer.fanOutGraph(fusedGraph, branchOperator, subsetNode, branches),
+                                fileName, logobject)
+            return
+
+        for stageNo, (xmlFile, root) in enumerate(chain[:-1]):
+            self.__executeGraph(root, "stage" + str(stageNo + 1) + "_" + os.path.basename(xmlFile), logobject)
+        self.__executeGraph(SnapGraphComposer.fanOutGraph(chain[-1][1], branchOperator, subsetNode, branches),
+                            fileName, logobject)
+
+    def __executeGraph(self, root, fileName, logobject):
+        key = self.resultCache.getKey(root) if self.resultCache is not None else None
+        if key is not None and self.resultCache.restoreResults(key, root, logobject):
+            return
+
+        if SnapGraphProcessing.performProcessing(self.__writeRenderedGraph(root, fileName), logobject) and \
+                key is not None:
+            self.resultCache.storeResults(key, root)
+
+    def __writeRenderedGraph(self, root, fileName):
+        if not os.path.exists(self.jobDir):
+            os.makedirs(self.jobDir)
+
+        renderedFile = self.jobDir + fileName
+        SnapGraphProcessing.writeGraph(root, renderedFile)
+        return renderedFile
@@ -15,19 +15,20 @@
 #-------smaller groups. The intermediate results are stored on harddrive temporarily thus disburdening the memory management and
 #-------significantly speeding up the performance time. The size of groups depend on the operation and the underlying architecture.
 #-------For more documentation see: https://pyrosar.readthedocs.io/en/v0.12/pyroSAR.html?highlight=groupbyworkers#pyroSAR.snap.auxil.groupbyWorkers
+#-------The graphs are executed by the GptExecutor of the current run, either one gpt call per graph or a warm worker pool.
 #-----------------------------------------------------------------------------------------------------------------------------------------------------------
 
-import io
 import os
 from lxml import etree
 
-from pyroSAR.snap.auxil import execute as pyroSarGptExecute
 from pyroSAR.snap.auxil import split
 from pyroSAR.snap.auxil import groupbyWorkers
 
-from contextlib import redirect_stdout
 import datetime
 
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.gpt_executor import GptExecutor
+
 class SnapGraphProcessing:
 
     # #TODO:Check this method after changes
@@ -36,6 +37,14 @@ class SnapGraphProcessing:
         tree = etree.parse(xmlFile)
         root = tree.getroot()
 
+        SnapGraphProcessing.setInOutputPathsOnGraph(root, inputPath, outputPath)
+
+        # #Write new paths to xml
+        SnapGraphProcessing.writeGraph(root, xmlFile)
+
+    @staticmethod
+    def setInOutputPathsOnGraph(root, inputPath, outputPath):
+
         # #Check for Read and Write Nodes
         read = root.xpath("//node[@id = 'Read']")
         read = root.xpath("//node[@id = 'Read (1)']") if read is None or len(read) == 0 else read
@@ -76,16 +85,19 @@ class SnapGraphProcessing:
             print("New input path:" + inputPath)
             print("New output path:" + outputPath)
 
-        # #Write new paths to xml
-        prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
-        with open(xmlFile, "w") as f:
-            f.write(prettyString)
-
     @staticmethod
     def setMultiplePaths(xmlFile, pathList, mode="Read"):
         tree = etree.parse(xmlFile)
         root = tree.getroot()
 
+        SnapGraphProcessing.setMultiplePathsOnGraph(root, pathList, mode, xmlFile)
+
+        # #Write new paths to xml
+        SnapGraphProcessing.writeGraph(root, xmlFile)
+
+    @staticmethod
+    def setMultiplePathsOnGraph(root, pathList, mode="Read", graphName=""):
+
         # #Check for Read and Write Nodes
         index = 1
         for path in pathList:
@@ -103,45 +115,48 @@ class SnapGraphProcessing:
                 print("Path Input not valid")
             else:
                 fileName.text = path
-                print("New " + mode + " path " + str(index) + " for " + xmlFile + ":\n" + path)
+                print("New " + mode + " path " + str(index) + " for " + graphName + ":\n" + path)
 
             index += 1
 
-        # #Write new paths to xml
-        prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
-        with open(xmlFile, "w") as f:
-            f.write(prettyString)
-
     @staticmethod
     def setNewOperatorParameter(xmlFile, operatorName, parameterName, newValue):
         tree = etree.parse(xmlFile)
         root = tree.getroot()
+
+        if SnapGraphProcessing.setNewOperatorParameterOnGraph(root, operatorName, parameterName, newValue):
+            SnapGraphProcessing.writeGraph(root, xmlFile)
+
+    @staticmethod
+    def setNewOperatorParameterOnGraph(root, operatorName, parameterName, newValue):
         pathResult = root.xpath("//node[@id = '" + operatorName + "']")
 
         if pathResult is None or len(pathResult) == 0:
-            return
+            return False
 
         parameters = pathResult[0].find("parameters")
         parameter = parameters.find(parameterName) if parameters is not None and len(parameters) > 0 else None
 
         if parameter is None:
             print("Parameter Invalid")
-            return
+            return False
 
         if parameter.text == newValue:
             print(operatorName + " " + parameterName + " " + newValue + " already valid")
-            return
+            return False
 
         parameter.text = newValue
-        prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
-        with open(xmlFile, "w") as f:
-            f.write(prettyString)
         print(operatorName + " has new " + parameterName + " value " + newValue)
+        return True
 
     @staticmethod
     def getOperatorParameter(xmlFile, operatorName, parameterName):
         tree = etree.parse(xmlFile)
         root = tree.getroot()
+        return SnapGraphProcessing.getOperatorParameterFromGraph(root, operatorName, parameterName)
+
+    @staticmethod
+    def getOperatorParameterFromGraph(root, operatorName, parameterName):
         pathResult = root.xpath("//node[@id = '" + operatorName + "']")
 
         if pathResult is None or len(pathResult) == 0:
@@ -156,6 +171,12 @@ class SnapGraphProcessing:
 
         return parameter.text
 
+    @staticmethod
+    def writeGraph(root, xmlFile):
+        prettyString = etree.tostring(root, pretty_print=True, encoding='unicode')
+        with open(xmlFile, "w") as f:
+            f.write(prettyString)
+
     @staticmethod
     def getElementByName(xmlFile, name):
         if not os.path.exists(xmlFile):
@@ -171,7 +192,7 @@ class SnapGraphProcessing:
         return pathResult[0].text
 
     @staticmethod
-    def performProcessing(xmlFile, logobject=None):
+    def performProcessing(xmlFile, logobject=None) -> bool:
         readPath = SnapGraphProcessing.getOperatorParameter(xmlFile, "Read", "file")
 
         if readPath is None:
@@ -181,14 +202,11 @@ class SnapGraphProcessing:
             if logobject is not None:
                 logobject.appendOutputToLog("Aborting Processing of: " + xmlFile + ".\n"
                                             + readPath + " does not exist.")
-            return
+            return False
 
         timeBefore = datetime.datetime.now()
         try:
-            f = io.StringIO()
-            with redirect_stdout(f):
-                pyroSarGptExecute(xmlFile, cleanup=False)
-            output = 'Got stdout: {0}'.format(f.getvalue())
+            output = 'Got stdout: {0}'.format(GptExecutor.default().execute(xmlFile))
             timeAfter = datetime.datetime.now()
             timeForProcessing = timeAfter-timeBefore
             timeOutput = "The processing time: %s sec" % (datetime.timedelta(seconds=timeForProcessing.seconds))
@@ -202,6 +220,9 @@ class SnapGraphProcessing:
             if logobject is not None:
                 logobject.appendOutputToLog("RuntimeError: \n" + str(e), error=True)
                 logobject.setCurrentErrorMsg(str(e))
+            return False
+
+        return True
 
     @staticmethod
     def executeByGroups(xmlFile, logobject, outputPath, amountGroups):
@@ -223,15 +244,6 @@ class SnapGraphProcessing:
 
     @staticmethod
     def getAscendingMode(scenePair):
-        tree = etree.parse(scenePair[0] + "/manifest.safe")
-        root = tree.getroot()
-        result = root.findall('.//{http://www.esa.int/safe/sentinel-1.0/sentinel-1}pass')
-
-        mode1 = result[0].text if result is not None and len(result) > 0 else None
-
-        tree = etree.parse(scenePair[1] + "/manifest.safe")
-        root = tree.getroot()
-        result = root.findall('.//{http://www.esa.int/safe/sentinel-1.0/sentinel-1}pass')
-
-        mode2 = result[0].text if result is not None and len(result) > 0 else None
+        mode1 = SceneCatalog.default().getPassDirection(scenePair[0])
+        mode2 = SceneCatalog.default().getPassDirection(scenePair[1])
         return mode1 if (mode1 is not None and mode1 == mode2) else None
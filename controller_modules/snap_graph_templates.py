@@ -0,0 +1,56 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        snap_graph_templates
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class loads the Snap graph operator .xml files from the snap_graph_files folder once per process.
+#-------The parsed graphs are kept in memory as read only templates and are shared by all processing jobs.
+#-------The checked-in .xml files are never modified at runtime. Read/write paths and operator parameters are bound
+#-------per job on a copy of the template (see SnapGraphJob).
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import threading
+from lxml import etree
+
+
+class SnapGraphTemplates:
+
+    TEMPLATE_FOLDERS = ["preprocessing_graphs/", "spacial_calc_graphs/", "simple_sub_graphs/", "main_calc_graphs/"]
+
+    __templates = {}
+    __lock = threading.Lock()
+
+    def __init__(self, xmlFolder):
+        self.xmlFolder = xmlFolder
+
+        for folder in self.TEMPLATE_FOLDERS:
+            if not os.path.isdir(xmlFolder + folder):
+                continue
+            for file in sorted(os.listdir(xmlFolder + folder)):
+                if file.endswith(".xml"):
+                    self.getTemplate(xmlFolder + folder + file)
+
+    def getTemplate(self, xmlFile):
+        """Returns the parsed graph of the given template file. Each file is parsed only once per process.
+
+        Parameters
+        ----------
+        xmlFile : str
+            The path of the graph template in the snap_graph_files folder
+
+        Returns
+        -------
+        lxml.etree._Element
+            The root of the parsed graph. It must not be modified by the caller.
+        """
+
+        key = os.path.abspath(xmlFile)
+        with SnapGraphTemplates.__lock:
+            if key not in SnapGraphTemplates.__templates:
+                SnapGraphTemplates.__templates[key] = etree.parse(xmlFile).getroot()
+            return SnapGraphTemplates.__templates[key]
@@ -0,0 +1,79 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        snap_graph_worker
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This script is a long-lived graph processing worker of the WarmGptWorkerPool.
+#-------The JVM of the Snap installation is started once via the Snap python interface (esa_snappy or snappy) and the
+#-------operator registry is loaded once. Afterwards the worker executes one graph .xml file per line read from stdin.
+#-------Protocol on stdout, each message on its own line:
+#-------"<PROTOCOL_PREFIX> READY" once the worker is started,
+#-------"<PROTOCOL_PREFIX> DONE 0" after a graph was executed successfully, "<PROTOCOL_PREFIX> DONE 1 <message>" on failure.
+#-------All other lines are output of the graph execution. The worker ends when stdin is closed.
+#-------Execute via "python3 -m controller_modules.snap_graph_worker" from the repository folder.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import sys
+
+
+class SnapGraphWorker:
+
+    PROTOCOL_PREFIX = "@@SNAP_GRAPH_WORKER"
+
+    @staticmethod
+    def reportReady():
+        print(SnapGraphWorker.PROTOCOL_PREFIX + " READY", flush=True)
+
+    @staticmethod
+    def reportDone(errorMessage=None):
+        if errorMessage is None:
+            print(SnapGraphWorker.PROTOCOL_PREFIX + " DONE 0", flush=True)
+        else:
+            print(SnapGraphWorker.PROTOCOL_PREFIX + " DONE 1 " + " ".join(str(errorMessage).split()), flush=True)
+
+    @staticmethod
+    def run():
+        try:
+            import esa_snappy as snappy
+        except ImportError:
+            import snappy
+
+        jpy = snappy.jpy
+        fileReader = jpy.get_type('java.io.FileReader')
+        graphIO = jpy.get_type('org.esa.snap.core.gpf.graph.GraphIO')
+        graphProcessor = jpy.get_type('org.esa.snap.core.gpf.graph.GraphProcessor')
+        progressMonitor = jpy.get_type('com.bc.ceres.core.ProgressMonitor')
+        jai = jpy.get_type('javax.media.jai.JAI')
+        system = jpy.get_type('java.lang.System')
+
+        # #Loading the operator registry is the main part of the gpt startup time
+        jpy.get_type('org.esa.snap.core.gpf.GPF').getDefaultInstance().getOperatorSpiRegistry().loadOperatorSpis()
+        SnapGraphWorker.reportReady()
+
+        for line in sys.stdin:
+            xmlFile = line.strip()
+            if xmlFile == "":
+                continue
+
+            try:
+                reader = fileReader(xmlFile)
+                try:
+                    graph = graphIO.read(reader)
+                finally:
+                    reader.close()
+                graphProcessor().executeGraph(graph, progressMonitor.NULL)
+                SnapGraphWorker.reportDone()
+            except Exception as e:
+                SnapGraphWorker.reportDone(e)
+            finally:
+                # #Tiles of the finished graph must not stay in the cache of the long-lived JVM
+                jai.getDefaultInstance().getTileCache().flush()
+                system.gc()
+
+
+if __name__ == "__main__":
+    SnapGraphWorker.run()
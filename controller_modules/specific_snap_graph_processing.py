@@ -11,6 +11,12 @@
 # -------Specific sequences of xml files are executed.
 # --------The predefined .xml files are located in the snap_graph_files folder and accessed.
 # -------The read and write paths for processing graphs are set per scene during batch processing.
+# -------Paths and parameters are bound in memory per instance. The .xml files are rendered to the job directory
+# -------before execution, the predefined .xml files themselves are never modified.
+# -------The subswaths of a scene are independent until their merge and can be processed by concurrent branches.
+# -------The burst window of a split is planned from the burst footprints before the split, see BurstPlanner.
+# -------Scenes shared by neighbouring aois can be processed once for all of them, only the subset to each aoi, the
+# -------terrain correction and the following nodes are executed per aoi (see multiSceneProcBackscatterForAois).
 # -------Specific output data file naming structure is defined.
 # -------Read node: "<path to output folder>/<scene id>_<graph node abreviation><.dim>"
 # -------Write node: "<path to output folder>/<scene id>_<graph node abreviation>"
@@ -19,17 +25,32 @@
 from geojson import Polygon
 
 from controller_modules.snap_graph_processing import SnapGraphProcessing
+from controller_modules.snap_graph_templates import SnapGraphTemplates
+from controller_modules.snap_graph_job import SnapGraphJob
+from controller_modules.graph_result_cache import GraphResultCache
+from controller_modules.split_orbit_store import SplitOrbitStore
+from controller_modules.coherence_planner import CoherencePlanner
+from controller_modules.burst_planner import BurstPlanner
+from controller_modules.grd_window_planner import GrdWindowPlanner
+from controller_modules.dp_rvi_engine import DpRviEngine
 from controller_modules.geo_position import GeoPosition
 
 import os
+import copy
 import shutil
+import hashlib
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from shapely import wkt
+from shapely.ops import unary_union
 from lxml import etree
 
 
 class SpecificSnapGraphProcessing:
 
-    def __init__(self, xmlFolder, outputPath):
+    def __init__(self, xmlFolder, outputPath, scratchPath=None, graphFusion=True, graphCacheSize=0,
+                 subswathBranches=1, aoiPushdown=False, dpRviEngine="snap"):
         self.preprocessingGraphs = xmlFolder + "preprocessing_graphs/"
         self.spacialCalcGraphs = xmlFolder + "spacial_calc_graphs/"
         self.simpleSubGraphs = xmlFolder + "simple_sub_graphs/"
@@ -39,7 +60,11 @@ class SpecificSnapGraphProcessing:
             print("Abort because of missing output path")
             quit()
 
-        self.tempFiles = outputPath + "temp/"
+        # #The scratch root holds a private temp folder for each scene job (see createSceneScratch).
+        # #It can be set to a local disk to keep the intermediate products away from the output location.
+        self.scratchRoot = outputPath + "temp/" if scratchPath is None or scratchPath == "" else scratchPath
+        self.scratchRoot = self.scratchRoot if self.scratchRoot.endswith("/") else self.scratchRoot + "/"
+        self.tempFiles = self.scratchRoot
         if not os.path.exists(self.tempFiles):
             os.makedirs(self.tempFiles)
 
@@ -58,24 +83,58 @@ class SpecificSnapGraphProcessing:
                                  '"false_easting", 500000.0], PARAMETER["false_northing", 0.0], UNIT["m", 1.0], ' \
                                  'AXIS["Easting", EAST], AXIS["Northing", NORTH], AUTHORITY["EPSG","25832"]]'
 
+        # #Intermediate products of graph executions are cached on the scratch volume, if a cache size is given in GB
+        self.graphCacheFolder = self.scratchRoot + "graph_cache/"
+        resultCache = None
+        try:
+            cacheBytes = int(float(str(graphCacheSize).strip() or "0") * 1024 ** 3)
+        except ValueError:
+            print("Invalid graph cache size " + str(graphCacheSize) + ". Graph results are not cached.")
+            cacheBytes = 0
+        if cacheBytes > 0:
+            resultCache = GraphResultCache(self.graphCacheFolder, self.scratchRoot, cacheBytes)
+
+        # #Split products shared by the coherence pairs of a run, see setSplitOrbitStore. A store created for a single
+        # #coherence entry is removed with the scene scratch
+        self.splitOrbitStore = None
+        self.splitOrbitStoreCreated = False
+
+        # #Amount of subswaths processed concurrently until their merge, limited by the memory budget of the gpt
+        self.subswathBranches = max(1, int(subswathBranches))
+
+        # #Only the pixel window of the aoi is read from GRD scenes in the backscatter processing, see GrdWindowPlanner
+        self.aoiPushdown = aoiPushdown
+
+        # #The dual-pol radar vegetation index is computed by the snap operator or by the DpRviEngine ("numpy")
+        self.dpRviEngine = dpRviEngine
+
+        # #The aoi and final product of each branch while an entry is processed for several aois, see __processForAois
+        self.aoiBranches = None
+
+        # #Each instance binds its own copy of the graph templates and renders them to its own folder
+        self.renderedGraphs = SnapGraphJob(SnapGraphTemplates(xmlFolder),
+                                           self.tempFiles + "graphs_" + uuid.uuid4().hex[:8] + "/", graphFusion,
+                                           resultCache)
+        self.setAllProcessingParameters()
+
     def setAllProcessingParameters(self):
 
         # ################Ensure final output format is GeoTiff###############################
-        SnapGraphProcessing.setNewOperatorParameter(
+        self.renderedGraphs.setNewOperatorParameter(
             self.simpleSubGraphs + "terrain_correction.xml", "Write", "formatName", "GeoTIFF")
 
         # Ensure terrain projection is set
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml",
                                                     "Terrain-Correction", "mapProjection",
                                                     self.terrainProjection)
-        SnapGraphProcessing.setNewOperatorParameter(
+        self.renderedGraphs.setNewOperatorParameter(
             self.mainCalcGraphs + "calc_coherence_no_deburst.xml", "Terrain-Correction",
             "mapProjection", self.terrainProjection)
 
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_backscatter.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_backscatter.xml",
                                                     "Terrain-Correction", "mapProjection",
                                                     self.terrainProjection)
-        SnapGraphProcessing.setNewOperatorParameter(
+        self.renderedGraphs.setNewOperatorParameter(
             self.simpleSubGraphs + "terrain_correction.xml", "Terrain-Correction",
             "mapProjection", self.terrainProjection)
 
@@ -84,32 +143,32 @@ class SpecificSnapGraphProcessing:
     def setBackscatterPaths(self, scene, resultName, outputPath):
 
         sceneId = self.getSceneId(scene)
-        SnapGraphProcessing.setInOutputPaths(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setInOutputPaths(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     self.tempFiles + sceneId + ".dim",
                                                     self.tempFiles + "step1_" + sceneId)
 
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setInOutputPaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                     self.tempFiles + "step1_" + sceneId + ".dim",
                                                     self.tempFiles + sceneId + "_subset")
 
-        SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_backscatter.xml",
+        self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_backscatter.xml",
                                                     self.tempFiles + sceneId + "_subset.dim",
                                                     outputPath + resultName)
 
     def setRadVegIdPaths(self, scene, merged):
         sceneId = self.getSceneId(scene)
 
-        SnapGraphProcessing.setInOutputPaths(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setInOutputPaths(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     scene, self.tempFiles + "step1_" + sceneId)
 
         path = self.tempFiles + "step1_" + sceneId + ".dim" if merged[0] is True else \
             self.tempFiles + "step1_" + sceneId + "_deb.dim"
 
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setInOutputPaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                     path,
                                                     self.tempFiles + "subset_" + sceneId)
 
-        SnapGraphProcessing.setInOutputPaths(
+        self.renderedGraphs.setInOutputPaths(
             self.preprocessingGraphs + "polar_matrix_multilook_speckle_filter.xml",
             self.tempFiles + "subset_" + sceneId + ".dim",
             self.tempFiles + "polarmlsf_" + sceneId)
@@ -118,23 +177,23 @@ class SpecificSnapGraphProcessing:
      #   self.setCpVegIdPaths(sceneId)
 
     def setDpVegIdPaths(self, sceneId):
-        SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_dp_rad_veg_index.xml",
+        self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_dp_rad_veg_index.xml",
                                                     self.tempFiles + "polarmlsf_" + sceneId + ".dim",
                                                     self.tempFiles + sceneId + "_dpradid")
 
     def setCpVegIdPaths(self, sceneId):
-        SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_cp_rad_veg_index.xml",
+        self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_cp_rad_veg_index.xml",
                                                     self.tempFiles + "polarmlsf_" + sceneId + ".dim",
                                                     self.tempFiles + sceneId + "_cpradid")
 
     # ###############################Here specific operator parameter values can be set############################
 
     def setSubsetAoiValue(self, wktAoi):
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                            "Subset", "geoRegion", wktAoi)
 
     def setSplitwktAoiValue(self, wktAoi):
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                            "TOPSAR-Split", "wktAoi", wktAoi)
 
     # ##################Here are the methods to execute the xml file graphs in specific sequences######################
@@ -206,10 +265,13 @@ class SpecificSnapGraphProcessing:
         logObject.appendOutputToLog("Processing entry:" + str(scenePair))
 
         sceneId = self.getSceneId(scene[0])
-        SnapGraphProcessing.setInOutputPaths(self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
+                                                    "Read", "pixelRegion",
+                                                    self.__getAoiPixelRegion(scene, wktAoi, logObject))
+        self.renderedGraphs.setInOutputPaths(self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
                                                     scene[0],
                                                     self.tempFiles + sceneId + "_grd_prepro")
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
+        self.renderedGraphs.performProcessing(self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
                                                      logObject)
 
         if not self.__isFileAvailable(self.tempFiles + sceneId + "_grd_prepro.dim"):
@@ -220,11 +282,11 @@ class SpecificSnapGraphProcessing:
 
         if len(scene) == 2:
             sceneId2 = self.getSceneId(scene[1])
-            SnapGraphProcessing.setInOutputPaths(
+            self.renderedGraphs.setInOutputPaths(
                 self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml",
                 scene[1],
                 self.tempFiles + sceneId2 + "_grd_prepro")
-            SnapGraphProcessing.performProcessing(
+            self.renderedGraphs.performProcessing(
                 self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml", logObject)
 
             self.__setAndProcessSlice(sceneId + "_grd_prepro", sceneId2 + "_grd_prepro", self.tempFiles, logObject)
@@ -248,26 +310,49 @@ class SpecificSnapGraphProcessing:
 
         self.deleteAllTempFiles()
 
+    def __getAoiPixelRegion(self, scene, wktAoi, logObject):
+        """Returns the pixel window of the aoi in a single GRD scene as pixelRegion of the Read operator. An empty
+        pixelRegion reads the whole scene, e.g. for sliced scenes."""
+
+        if not self.aoiPushdown or len(scene) != 1 or wktAoi == "":
+            return ""
+
+        # #The window keeps a margin to the border pixels trimmed by Remove-GRD-Border-Noise
+        borderLimit = self.renderedGraphs.getOperatorParameter(
+            self.preprocessingGraphs + "grd_border_thermal_noise_removal.xml", "Remove-GRD-Border-Noise", "borderLimit")
+        margin = int(borderLimit or 0) + GrdWindowPlanner.MARGIN
+
+        window = GrdWindowPlanner().getPixelWindow(scene[0], wktAoi, margin)
+        if window is None:
+            return ""
+
+        pixelRegion = ",".join(str(value) for value in window)
+        logObject.appendOutputToLog("Reading pixel window " + pixelRegion + " of " + self.getSceneId(scene[0]))
+        return pixelRegion
+
     def processBackscatter(self, scene, logObject):
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "selectedPolarisations", 'VV,VH')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputSigmaBand", 'False')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputGammaBand", 'False')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputBetaBand", 'True')
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
-                                                     logObject)
+        self.renderedGraphs.addToChain(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml")
 
-        sceneId = self.getSceneId(scene)
-        bands = self.__getAvailableBands(self.tempFiles + "step1_" + sceneId + ".dim")
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
-                                                           "Subset", "sourceBands", bands)
+        # #The calibrated product is not written before the subset, an empty band list subsets all bands
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+                                                           "Subset", "sourceBands", "")
 
         self.__processAndCheckSubset(logObject)
-        SnapGraphProcessing.executeByGroups(self.mainCalcGraphs + "calc_backscatter.xml", logObject,
-                                                   self.tempFiles, 1)
+        if self.aoiBranches:
+            # #Terrain flattening is executed once for all aois, the terrain correction per aoi
+            self.renderedGraphs.addToChain(self.mainCalcGraphs + "calc_backscatter.xml")
+            self.__performFinalChain("Terrain-Correction", logObject)
+        else:
+            self.renderedGraphs.executeByGroups(self.mainCalcGraphs + "calc_backscatter.xml", logObject,
+                                                self.tempFiles, 1)
 
     # ###########------------------Methods to process multiscene vegetation id-----------------------------############
 
@@ -320,9 +405,9 @@ class SpecificSnapGraphProcessing:
             resultScene = scenePair[0]
         elif len(scenePair) == 2:
             logObject.appendOutputToLog("Slice must be performed before processing.")
-            SnapGraphProcessing.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml",
+            self.renderedGraphs.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml",
                                                                "TOPSAR-Split", "selectedPolarisations", "VH,VV")
-            SnapGraphProcessing.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml",
+            self.renderedGraphs.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml",
                                                                "TOPSAR-Split", "wktAoi", wktAoi)
             validPairs = self.__getAoiSubswathOverlap(scenePair, wktAoi)
             resultScene = self.getProcSliceByValidSw(validPairs, scenePair, self.tempFiles, merged, logObject)
@@ -332,7 +417,9 @@ class SpecificSnapGraphProcessing:
             self.setRadVegIdPaths(resultScene, merged)
             self.processRadVegId(resultScene, outputPath + outputFileName, merged, logObject)
 
-            if not self.__isFileAvailable(outputPath + outputFileName + "_dp.tif"):
+            outputFiles = [outputFile for wktBranch, outputFile in self.aoiBranches] if self.aoiBranches else \
+                [outputPath + outputFileName + "_dp.tif"]
+            if not all(self.__isFileAvailable(outputFile) for outputFile in outputFiles):
                 logObject.appendOutputToLog("Rad Veg Indicies can not be processed.")
                 logObject.appendSceneToList(entryByTime)
         else:
@@ -369,31 +456,19 @@ class SpecificSnapGraphProcessing:
             This is for the caller to continue futher processing steps.
         """
 
-        subswaths = []
-
-        for i in range(0, len(validPairs)):
-
-            if validPairs[i][0] or validPairs[i][1]:
-                subswath = "IW" + str(3 - i)
-
-                success1 = self.__setAndProcessSplit(scene[0], outputPath, subswath, logObject)
-                if self.__wktOverlapsProcessedSw(logObject) is False:
-                    logObject.setCurrentErrorMsg("")
-                    continue
-
-                success2 = self.__setAndProcessSplit(scene[1], outputPath, subswath, logObject)
-                if self.__wktOverlapsProcessedSw(logObject) is False:
-                    logObject.setCurrentErrorMsg("")
-                    continue
-
-                if not success2 or not success1:
-                    return ""
-
-                subswaths.append(subswath)
-                self.__setAndProcessSlice(self.getSceneId(scene[0]) + "_" + subswath + "_split",
-                                          self.getSceneId(scene[1]) + "_" + subswath + "_split", outputPath, logObject)
+        validSubswaths = ["IW" + str(3 - i) for i in range(0, len(validPairs)) if validPairs[i][0] or validPairs[i][1]]
+        results = self.__processSubswathBranches(
+            lambda branch, subswath, branchLog: branch.__processSplitSliceSubswath(scene, outputPath, subswath,
+                                                                                   branchLog),
+            validSubswaths, logObject)
 
-        subswaths = list(set(subswaths))
+        subswaths = []
+        for subswath, result in zip(validSubswaths, results):
+            if result is None:
+                continue
+            if result is False:
+                return ""
+            subswaths.append(subswath)
 
         if len(subswaths) == 0:
             logObject.appendOutputToLog(
@@ -406,22 +481,22 @@ class SpecificSnapGraphProcessing:
 
         if len(subswaths) == 2:
             merged[0] = True
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [outputPath + self.getSceneId(scene[1]) + "_" + subswaths[
                                                             0] + "_split_slice.dim",
                                                          outputPath + self.getSceneId(scene[1]) + "_" + subswaths[
                                                              1] + "_split_slice.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [outputPath + self.getSceneId(
                                                             scene[1]) + "_split_slice_merge2"], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                          logObject)
             return outputPath + self.getSceneId(scene[1]) + "_split_slice_merge2.dim"
 
         if len(subswaths) == 3:
             merged[0] = True
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [outputPath + self.getSceneId(
                                                             scene[1]) + "_IW1_split_slice.dim",
                                                          outputPath + self.getSceneId(
@@ -429,13 +504,34 @@ class SpecificSnapGraphProcessing:
                                                          outputPath + self.getSceneId(
                                                              scene[1]) + "_IW3_split_slice.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [outputPath + self.getSceneId(
                                                             scene[1]) + "_split_slice_merge3"], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                          logObject)
             return outputPath + self.getSceneId(scene[1]) + "_split_slice_merge3.dim"
 
+    def __processSplitSliceSubswath(self, scene, outputPath, subswath, logObject):
+        """Splits both scenes to the subswath and slices them. Returns None if the wkt aoi does not overlap the bursts
+        of the subswath, False if the split failed."""
+
+        success1 = self.__setAndProcessSplit(scene[0], outputPath, subswath, logObject)
+        if self.__wktOverlapsProcessedSw(logObject) is False:
+            logObject.setCurrentErrorMsg("")
+            return None
+
+        success2 = self.__setAndProcessSplit(scene[1], outputPath, subswath, logObject)
+        if self.__wktOverlapsProcessedSw(logObject) is False:
+            logObject.setCurrentErrorMsg("")
+            return None
+
+        if not success2 or not success1:
+            return False
+
+        self.__setAndProcessSlice(self.getSceneId(scene[0]) + "_" + subswath + "_split",
+                                  self.getSceneId(scene[1]) + "_" + subswath + "_split", outputPath, logObject)
+        return True
+
     def processRadVegId(self, scene, outputFileName, merged, logObject):
 
         """This function processes calculation of Radar Vegetation Index on given scene.
@@ -459,31 +555,29 @@ class SpecificSnapGraphProcessing:
                 "File:{0}/ already processed.\n".format(outputFileName + ".tif"))
             return
 
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "selectedPolarisations", 'VH,VV')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputSigmaBand", 'true')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputGammaBand", 'false')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                            "Calibration", "outputBetaBand", 'false')
 
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
-                                                     logObject)
+        # #All graphs up to the subset are executed as one chain, see SnapGraphJob.performChain
+        self.renderedGraphs.addToChain(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml")
 
         sceneId = self.getSceneId(scene)
         if merged[0] is False:
-            self.__setAndProcessDeburst("step1_" + sceneId + ".dim", self.tempFiles, logObject)
+            self.__setDeburstPaths("step1_" + sceneId + ".dim", self.tempFiles)
+            self.renderedGraphs.addToChain(self.spacialCalcGraphs + "topsar_deburst.xml")
 
-        path = self.tempFiles + "step1_" + sceneId + ".dim" if merged[0] is True else \
-            self.tempFiles + "step1_" + sceneId + "_deb.dim"
-        bands = self.__getAvailableBands(path)
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
-                                                           "Subset", "sourceBands", bands)
+        # #The calibrated product is not written before the subset, an empty band list subsets all bands
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+                                                           "Subset", "sourceBands", "")
 
         self.__processAndCheckSubset(logObject)
-        SnapGraphProcessing.performProcessing(
-            self.preprocessingGraphs + "polar_matrix_multilook_speckle_filter.xml", logObject)
+        self.renderedGraphs.addToChain(self.preprocessingGraphs + "polar_matrix_multilook_speckle_filter.xml")
 
         outputFileNameDp = outputFileName + "_dp.tif"
         outputFileNameCp = outputFileName + "_cp.tif"
@@ -491,20 +585,98 @@ class SpecificSnapGraphProcessing:
     #    self.processCpVegId(sceneId, outputFileNameCp, logObject)
 
     def processDpVegId(self, sceneId, outputFileName, logObject):
-        SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_dp_rad_veg_index.xml", logObject)
+        if self.dpRviEngine == "numpy":
+            # #The polarimetric matrix product is written and the index is computed without gpt
+            self.renderedGraphs.performChain(logObject)
+            windowSize = self.renderedGraphs.getOperatorParameter(self.mainCalcGraphs + "calc_dp_rad_veg_index.xml",
+                                                                  "Rad-Veg-Id", "windowSize")
+            if not self.__isFileAvailable(self.tempFiles + "polarmlsf_" + sceneId + ".dim") or \
+                    not DpRviEngine().process(self.tempFiles + "polarmlsf_" + sceneId + ".dim",
+                                              self.tempFiles + sceneId + "_dpradid", int(windowSize or 3),
+                                              logObject):
+                return
+        else:
+            self.renderedGraphs.addToChain(self.mainCalcGraphs + "calc_dp_rad_veg_index.xml")
 
-        SnapGraphProcessing.setInOutputPaths(self.simpleSubGraphs + "terrain_correction.xml",
+        self.renderedGraphs.setInOutputPaths(self.simpleSubGraphs + "terrain_correction.xml",
                                                     self.tempFiles + sceneId + "_dpradid" + ".dim",
                                                     outputFileName)
-        SnapGraphProcessing.performProcessing(self.simpleSubGraphs + "terrain_correction.xml", logObject)
+        self.renderedGraphs.addToChain(self.simpleSubGraphs + "terrain_correction.xml")
+        self.__performFinalChain("Terrain-Correction", logObject)
 
     def processCpVegId(self, sceneId, outputFileName, logObject):
-        SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_cp_rad_veg_index.xml", logObject)
+        self.renderedGraphs.addToChain(self.mainCalcGraphs + "calc_cp_rad_veg_index.xml")
 
-        SnapGraphProcessing.setInOutputPaths(self.simpleSubGraphs + "terrain_correction.xml",
+        self.renderedGraphs.setInOutputPaths(self.simpleSubGraphs + "terrain_correction.xml",
                                                     self.tempFiles + sceneId + "_cpradid" + ".dim",
                                                     outputFileName)
-        SnapGraphProcessing.performProcessing(self.simpleSubGraphs + "terrain_correction.xml", logObject)
+        self.renderedGraphs.addToChain(self.simpleSubGraphs + "terrain_correction.xml")
+        self.renderedGraphs.performChain(logObject)
+
+    # ###########------------------Methods to process one entry for several aois-----------------------------############
+
+    def multiSceneProcBackscatterForAois(self, entryByTime, areaNames, wktAois, outputPath, logObject):
+        """Processes the backscatter of one entry once for several aois intersecting its scenes. The preprocessing
+        and the terrain flattening are executed for the bounding box of all aois, the subset, terrain correction and
+        conversion to dB per aoi. The final products are named as by multiSceneProcBackscatter for each aoi.
+
+        Parameters
+        ----------
+        entryByTime : list
+            The scenes and the output name of the entry
+        areaNames : list
+            The names of the aois, extended to the output file names
+        wktAois : list
+            The aois in Wkt format, in the order of the area names
+        outputPath : str
+            The path where the result data is produced
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        """
+
+        self.__processForAois(self.multiSceneProcBackscatter, entryByTime, areaNames, wktAois, outputPath, ".tif", "",
+                              logObject)
+
+    def multiSceneProcRadVegIdForAois(self, entryByTime, areaNames, wktAois, outputPath, logObject):
+        """Processes the Radar Vegetation Index of one entry once for several aois intersecting its scenes, only the
+        subset and terrain correction are executed per aoi. See multiSceneProcBackscatterForAois."""
+
+        self.__processForAois(self.multiSceneProcRadVegId, entryByTime, areaNames, wktAois, outputPath, "_dp.tif",
+                              "_dp.tif", logObject)
+
+    def __processForAois(self, procMethod, entryByTime, areaNames, wktAois, outputPath, productSuffix, writeSuffix,
+                         logObject):
+        remaining = [(areaName, wktAoi) for areaName, wktAoi in zip(areaNames, wktAois)
+                     if not self.__isFileAvailable(outputPath + entryByTime[-1] + "_" + areaName + productSuffix)]
+        if len(remaining) == 0:
+            logObject.appendOutputToLog("Entry " + entryByTime[-1] + " already processed for all aois.")
+            return
+        if len(remaining) == 1:
+            procMethod(entryByTime, remaining[0][0], remaining[0][1], outputPath, logObject)
+            return
+
+        # #The scenes are processed for the bounding box of the aois, the graph is fanned out per aoi at the end
+        self.aoiBranches = [(wktAoi, outputPath + entryByTime[-1] + "_" + areaName + writeSuffix)
+                            for areaName, wktAoi in remaining]
+        wktUnion = unary_union([wkt.loads(wktAoi) for areaName, wktAoi in remaining]).envelope.wkt
+        logObject.appendOutputToLog("Processing entry " + entryByTime[-1] + " once for the aois: " +
+                                    ", ".join(areaName for areaName, wktAoi in remaining))
+        try:
+            procMethod(entryByTime, None, wktUnion, outputPath, logObject)
+        finally:
+            self.aoiBranches = None
+
+        for areaName, wktAoi in remaining:
+            if not self.__isFileAvailable(outputPath + entryByTime[-1] + "_" + areaName + productSuffix):
+                logObject.appendOutputToLog("No final product of entry " + entryByTime[-1] + " for aoi " + areaName)
+
+    def __performFinalChain(self, branchOperator, logObject):
+        # #While an entry is processed for several aois, the chain is fanned out from the branch operator on
+        if self.aoiBranches:
+            self.renderedGraphs.performFanOut(branchOperator, self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+                                              self.aoiBranches, logObject)
+        else:
+            self.renderedGraphs.performChain(logObject)
 
     def __checkForReducedPair(self, entryByTime, wktAoi, logObject=None):
         """This method reduces invalid entryByTime pair to single entry for radar vegetation index calculation. If
@@ -541,6 +713,15 @@ class SpecificSnapGraphProcessing:
 
     def multiSceneProcCoherence(self, entryByTime, nameExtension, wktAoi, outputPath, logObject):
 
+        try:
+            self.__processCoherenceEntry(entryByTime, nameExtension, wktAoi, outputPath, logObject)
+        finally:
+            # #Split products of scenes without further pairs are removed from the store
+            for sceneId in CoherencePlanner.getSceneIds(entryByTime):
+                self.__getSplitOrbitStore().release(sceneId)
+
+    def __processCoherenceEntry(self, entryByTime, nameExtension, wktAoi, outputPath, logObject):
+
         self.__setAllCoherenceOperators(wktAoi)
 
         outputFileName = ""
@@ -607,33 +788,40 @@ class SpecificSnapGraphProcessing:
                 logObject.appendOutputToLog("One of the scenes pair could not be preprocessed.")
                 return
 
-            bands = self.__getAvailableBands(slicedRes)
+            # #A merged product is not written before the coherence calculation, an empty band list subsets all bands
+            bands = "" if merged[0] is True else self.__getAvailableBands(slicedRes)
 
             if merged[0] is True:
 
-                SnapGraphProcessing.setNewOperatorParameter(
+                self.renderedGraphs.setNewOperatorParameter(
                     self.mainCalcGraphs + "calc_coherence_no_deburst.xml", "Subset", "sourceBands", bands)
-                SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
+                self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
                                                             slicedRes,
                                                             outputPath + outputFileName)
 
-                SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
-                                                             logObject)
+                # #The merge of two or three subswaths is added to the chain by getGeocodedSliceByValidSw
+                self.renderedGraphs.addToChain(self.mainCalcGraphs + "calc_coherence_no_deburst.xml")
+                self.renderedGraphs.performChain(logObject)
             else:
-                SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
+                self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
                                                                    "sourceBands", bands)
-                SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_coherence.xml", slicedRes,
+                self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_coherence.xml", slicedRes,
                                                             outputPath + outputFileName)
 
-                SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_coherence.xml", logObject)
+                self.renderedGraphs.performProcessing(self.mainCalcGraphs + "calc_coherence.xml", logObject)
 
         self.deleteAllTempFiles()
 
     def setAndProcessCoherence(self, scene, scene2, outputFileName, subswaths, outputPath, logObject):
 
+        # #The split store is created before the branches are forked, so all branches and the caller share it
+        self.__getSplitOrbitStore()
+        results = self.__processSubswathBranches(
+            lambda branch, subswath, branchLog: branch.preprocessingCoherence(scene, scene2, subswath, branchLog),
+            subswaths, logObject)
+
         reducedSubswaths = []
-        for subswath in subswaths:
-            success = self.preprocessingCoherence(scene, scene2, subswath, logObject)
+        for subswath, success in zip(subswaths, results):
             if not success[0] and success[1]:
                 print("Removing subswath: " + str(subswath) + " since wkt does not overlap any bursts.")
                 continue
@@ -660,22 +848,21 @@ class SpecificSnapGraphProcessing:
             sceneId = self.getSceneId(scene)
             scenePath = self.tempFiles + sceneId + "_enhspediv" + "_slice_merge2"
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [self.tempFiles + sceneId + "_" + reducedSubswaths[
                                                             0] + "_enhspediv.dim",
                                                          self.tempFiles + sceneId + "_" + reducedSubswaths[
                                                              1] + "_enhspediv.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [scenePath], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
-                                                         logObject)
+            self.renderedGraphs.addToChain(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml")
 
         if len(reducedSubswaths) == 3:
             merged = True
             sceneId = self.getSceneId(scene)
             scenePath = self.tempFiles + sceneId + "_enhspediv" + "_slice_merge3"
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [self.tempFiles + sceneId + "_" + reducedSubswaths[
                                                             0] + "_enhspediv.dim",
                                                          self.tempFiles + sceneId + "_" + reducedSubswaths[
@@ -683,77 +870,58 @@ class SpecificSnapGraphProcessing:
                                                          self.tempFiles + sceneId + "_" + reducedSubswaths[
                                                              2] + "_enhspediv.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [scenePath], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
-                                                         logObject)
+            self.renderedGraphs.addToChain(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml")
 
-        bands = self.__getAvailableBands(scenePath + ".dim")
+        # #A merged product is not written before the coherence calculation, an empty band list subsets all bands
+        bands = "" if merged else self.__getAvailableBands(scenePath + ".dim")
 
         outputFile = outputPath + outputFileName if outputPath else os.getcwd() + outputFileName
         if merged is False:
-            SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
+            self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
                                                                "sourceBands", bands)
 
-            SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_coherence.xml", scenePath + ".dim",
+            self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_coherence.xml", scenePath + ".dim",
                                                         outputFile)
-            SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_coherence.xml", logObject)
+            self.renderedGraphs.performProcessing(self.mainCalcGraphs + "calc_coherence.xml", logObject)
         else:
-            SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
+            self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
                                                                "Subset", "sourceBands", bands)
 
-            SnapGraphProcessing.setInOutputPaths(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
+            self.renderedGraphs.setInOutputPaths(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
                                                         scenePath + ".dim", outputPath + outputFileName)
-            SnapGraphProcessing.performProcessing(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
-                                                         logObject)
+            self.renderedGraphs.addToChain(self.mainCalcGraphs + "calc_coherence_no_deburst.xml")
+            self.renderedGraphs.performChain(logObject)
         return True
 
     def preprocessingCoherence(self, scene1, scene2, subswath, logObject):
 
         sceneId1 = self.getSceneId(scene1)
-        sceneId2 = self.getSceneId(scene2)
-
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
-                                                           "TOPSAR-Split", "subswath", subswath)
-
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene1,
-                                                    self.tempFiles + sceneId1 + "_splitorb")
 
         logObject.appendOutputToLog("Starting Split calculation for " + subswath + ":")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
+        status1, splitProduct1 = self.__getSplitOrbitProduct(scene1, subswath, logObject)
 
         # Check if Split succeeded with given wktAoi on first Scene
-        if self.__wktOverlapsProcessedSw(logObject) is False:
-            logObject.setCurrentErrorMsg("")
+        if status1 == SplitOrbitStore.NO_OVERLAP:
             return False, True
-
-        if not self.__isFileAvailable(self.tempFiles + sceneId1 + "_splitorb.dim"):
+        if status1 == SplitOrbitStore.FAILED:
             return False, False
 
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene2,
-                                                    self.tempFiles + sceneId2 + "_splitorb")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
+        status2, splitProduct2 = self.__getSplitOrbitProduct(scene2, subswath, logObject)
 
         # Check if Split succeeded with given wktAoi on second Scene
-        if self.__wktOverlapsProcessedSw(logObject) is False:
-            logObject.setCurrentErrorMsg("")
+        if status2 == SplitOrbitStore.NO_OVERLAP:
             return False, True
-
-        if not self.__isFileAvailable(self.tempFiles + sceneId2 + "_splitorb.dim"):
+        if status2 == SplitOrbitStore.FAILED:
             return False, False
 
-        #Add check of burst amounts. If only one, reprocess split with specific amount of 2!
-        #TODO: Test this for all special cases
-        self.__checkAndReprocessSplit(scene1, "", logObject)
-        self.__checkAndReprocessSplit(scene2, "", logObject)
-
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "geocod_enh_spe_div.xml",
-                                                    [self.tempFiles + sceneId1 + "_splitorb.dim",
-                                                     self.tempFiles + sceneId2 + "_splitorb.dim"], "Read")
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "geocod_enh_spe_div.xml",
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "geocod_enh_spe_div.xml",
+                                                    [splitProduct1 + ".dim", splitProduct2 + ".dim"], "Read")
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "geocod_enh_spe_div.xml",
                                                     [self.tempFiles + sceneId1 + "_" + subswath + "_enhspediv"],
                                                     "Write")
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "geocod_enh_spe_div.xml", logObject)
+        self.renderedGraphs.performProcessing(self.preprocessingGraphs + "geocod_enh_spe_div.xml", logObject)
         return True, True
 
     def getGeocodedSliceByValidSw(self, validPairs, slice1, slice2, outputPath, merged, logObject=None) -> str:
@@ -787,22 +955,19 @@ class SpecificSnapGraphProcessing:
         geocodedSceneId = ""
         subswaths = []
 
-        for i in range(0, len(validPairs)):
-
-            if validPairs[i][0] or validPairs[i][1]:
-                subswath = "IW" + str(3 - i)
-
-                SnapGraphProcessing.setNewOperatorParameter(
-                    self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", "TOPSAR-Split", "subswath", subswath)
-
-                geocodedSceneId = self.getSlicedSplitApplyOrbitGeoCode(slice1, slice2, self.tempFiles, subswath,
-                                                                       logObject)
-                if geocodedSceneId is None:
-                    continue
+        validSubswaths = ["IW" + str(3 - i) for i in range(0, len(validPairs)) if validPairs[i][0] or validPairs[i][1]]
+        self.__getSplitOrbitStore()
+        results = self.__processSubswathBranches(
+            lambda branch, subswath, branchLog: branch.getSlicedSplitApplyOrbitGeoCode(slice1, slice2, self.tempFiles,
+                                                                                       subswath, branchLog),
+            validSubswaths, logObject)
 
-                subswaths.append(subswath)
+        for subswath, result in zip(validSubswaths, results):
+            if result is None:
+                continue
 
-        subswaths = list(set(subswaths))
+            geocodedSceneId = result
+            subswaths.append(subswath)
 
         if len(subswaths) == 1:
             return geocodedSceneId + ".dim"
@@ -812,23 +977,22 @@ class SpecificSnapGraphProcessing:
             sceneId2 = self.getSceneId(slice2[1])
 
             scenePath = outputPath + sceneId2 + "_slice" + "_enhspediv_merge2"
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [outputPath + sceneId2 + "_" + subswaths[0]
                                                          + "_enhspediv.dim",
                                                          outputPath + sceneId2 + "_" + subswaths[1]
                                                          + "_enhspediv.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
                                                         [scenePath], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml",
-                                                         logObject)
+            self.renderedGraphs.addToChain(self.spacialCalcGraphs + "step3_deburst_merge2_sw.xml")
             return scenePath + ".dim"
 
         if len(subswaths) == 3:
             merged[0] = True
             sceneId2 = self.getSceneId(slice2[1])
             scenePath = outputPath + sceneId2 + "_slice" + "_enhspediv_merge3"
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [outputPath + sceneId2 + "_" + subswaths[0]
                                                          + "_enhspediv.dim",
                                                          outputPath + sceneId2 + "_" + subswaths[1]
@@ -836,10 +1000,9 @@ class SpecificSnapGraphProcessing:
                                                          outputPath + sceneId2 + "_" + subswaths[2]
                                                          + "_enhspediv.dim"], "Read")
 
-            SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+            self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                         [scenePath], "Write")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
-                                                         logObject)
+            self.renderedGraphs.addToChain(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml")
             return scenePath + ".dim"
 
         else:
@@ -847,7 +1010,7 @@ class SpecificSnapGraphProcessing:
 
     def getSlicedSplitApplyOrbitGeoCode(self, slice1, slice2, outputPath, subswath, logObject=None):
 
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                            "TOPSAR-Split", "subswath", subswath)
 
         success1 = self.__sliceSplitOrbitPair(slice1[0], slice1[1], outputPath, subswath, logObject)
@@ -856,70 +1019,98 @@ class SpecificSnapGraphProcessing:
             return ""
 
         # Geocode both sliced of pairs
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "geocod.xml",
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "geocod.xml",
                                                     [outputPath + self.getSceneId(slice1[1]) + "_" + subswath +
                                                      "_splitorb_slice.dim",
                                                      outputPath + self.getSceneId(slice2[1]) + "_" + subswath +
                                                      "_splitorb_slice.dim"],
                                              "Read")
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "geocod.xml",
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "geocod.xml",
                                                     [outputPath + self.getSceneId(slice2[1]) + "_" + subswath +
                                                      "_geocod"], "Write")
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "geocod.xml", logObject)
+        self.renderedGraphs.performProcessing(self.preprocessingGraphs + "geocod.xml", logObject)
 
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "enh_spe_div.xml",
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "enh_spe_div.xml",
                                                     [outputPath + self.getSceneId(slice2[1]) + "_" + subswath +
                                                      "_geocod.dim"],
                                              "Read")
-        SnapGraphProcessing.setMultiplePaths(self.preprocessingGraphs + "enh_spe_div.xml",
+        self.renderedGraphs.setMultiplePaths(self.preprocessingGraphs + "enh_spe_div.xml",
                                                     [outputPath + self.getSceneId(slice2[1]) + "_" + subswath +
                                                      "_enhspediv"], "Write")
-        SnapGraphProcessing.performProcessing(self.preprocessingGraphs + "enh_spe_div.xml", logObject)
+        self.renderedGraphs.performProcessing(self.preprocessingGraphs + "enh_spe_div.xml", logObject)
 
 
         return outputPath + self.getSceneId(slice2[1]) + "_" + subswath + "_enhspediv"
 
     def __sliceSplitOrbitPair(self, scene, scene2, outputPath, subswath, logObject=None):
 
-        # Do Split and Apply Orbit for first scene of pair to slice
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene,
-                                             outputPath + self.getSceneId(scene) + "_" + subswath + \
-                                             "_splitorb")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
-
-        if not self.__isFileAvailable(outputPath + self.getSceneId(scene) + "_" + subswath + "_splitorb.dim"):
-            return False
+        # Do Split and Apply Orbit for both scenes of pair to slice
+        splitProducts = []
+        for sliceScene in [scene, scene2]:
+            status, splitProduct = self.__getSplitOrbitProduct(sliceScene, subswath, logObject)
+            if status == SplitOrbitStore.FAILED:
+                return False
 
-        if self.__wktOverlapsProcessedSw(logObject) is False:
-            logObject.setCurrentErrorMsg("")
-            logObject.appendOutputToLog("Skipping scene Pair in coherence processing:" + scene + "/" + scene2)
-            logObject.appendOutputToLog("Wkt aoi does not overlap any bursts")
-            return False
+            if status == SplitOrbitStore.NO_OVERLAP:
+                logObject.appendOutputToLog("Skipping scene Pair in coherence processing:" + scene + "/" + scene2)
+                logObject.appendOutputToLog("Wkt aoi does not overlap any bursts")
+                return False
+            splitProducts.append(splitProduct + ".dim")
 
-        self.__checkAndReprocessSplit(scene, subswath, logObject)
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml", splitProducts, "Read")
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml",
+                                             [outputPath + self.getSceneId(scene2) + "_" + subswath +
+                                              "_splitorb_slice"], "Write")
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "slice_assembly.xml", logObject)
 
-        # Do Split and Apply Orbit for second scene of pair to slice
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene2,
-                                             outputPath + self.getSceneId(scene2) + "_" + subswath + "_splitorb")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
+        return True
 
-        if not self.__isFileAvailable(outputPath + self.getSceneId(scene2) + "_" + subswath + "_splitorb.dim"):
-            return False
+    def __getSplitOrbitProduct(self, scene, subswath, logObject):
+        """Returns the status and the product base path of the split and orbit corrected scene subswath. The product
+        is processed once per run and burst window and shared by all coherence pairs of the scene, also by the pairs
+        of other aois covering the same bursts, see SplitOrbitStore."""
+
+        wktAoi = self.renderedGraphs.getOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                          "TOPSAR-Split", "wktAoi") or ""
+
+        # #The burst window is planned from the burst footprints, None if the scene has no annotation files
+        burstWindow = BurstPlanner().getBurstWindow(scene, subswath, wktAoi)
+        if burstWindow == BurstPlanner.NO_OVERLAP:
+            logObject.appendOutputToLog("Wkt aoi does not overlap any bursts of " + subswath + ": " + scene)
+            return SplitOrbitStore.NO_OVERLAP, None
+
+        # #Without planned window the split is restricted by the aoi itself, so its product is kept per aoi
+        window = "b%s-%s" % burstWindow if burstWindow is not None else \
+            "aoi" + hashlib.sha1(wktAoi.encode("utf-8")).hexdigest()[:8]
+        return self.__getSplitOrbitStore().acquire(
+            self.getSceneId(scene), subswath,
+            lambda productBase: self.__processSplitOrbit(scene, subswath, productBase, wktAoi, burstWindow, logObject),
+            window)
+
+    def __processSplitOrbit(self, scene, subswath, productBase, wktAoi, burstWindow, logObject):
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                    "TOPSAR-Split", "subswath", subswath)
+        if burstWindow is not None:
+            self.__setSplitBurstWindow("", burstWindow[0], burstWindow[1])
+        self.renderedGraphs.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene,
+                                             productBase)
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
+
+        # #The product is shared by other pairs, so the split parameters are restored afterwards
+        if burstWindow is not None:
+            self.__setSplitBurstWindow(wktAoi, 1, 9999)
 
         if self.__wktOverlapsProcessedSw(logObject) is False:
             logObject.setCurrentErrorMsg("")
-            logObject.appendOutputToLog("Skipping scene Pair in coherence processing:" + scene + "/" + scene2)
-            logObject.appendOutputToLog("Wkt aoi does not overlap any bursts")
-            return False
+            return SplitOrbitStore.NO_OVERLAP
 
-        self.__checkAndReprocessSplit(scene2, subswath, logObject)
+        if not self.__isFileAvailable(productBase + ".dim"):
+            return SplitOrbitStore.FAILED
 
-        splitScene = self.getSceneId(scene) + "_" + subswath + "_splitorb"
-        splitScene2 = self.getSceneId(scene2) + "_" + subswath + "_splitorb"
-        self.__setAndProcessSlice(splitScene, splitScene2,
-                                  self.tempFiles, logObject)
-
-        return True
+        # #Without planned window check the burst amount. If only one, reprocess split with specific amount of 2!
+        if burstWindow is None:
+            self.__checkAndReprocessSplit(scene, productBase, logObject)
+        return SplitOrbitStore.AVAILABLE
 
     def __createValidCoherencePair(self, entryByTime1, entryByTime2, wktAoi, logObject=None):
 
@@ -1043,32 +1234,32 @@ class SpecificSnapGraphProcessing:
         return entryByTime1, entryByTime2
 
     def __setAllCoherenceOperators(self, wktAoi):
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     "Calibration", "selectedPolarisations", 'VV')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     "Calibration", "outputSigmaBand", 'true')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     "Calibration", "outputGammaBand", 'false')
-        SnapGraphProcessing.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.preprocessingGraphs + "step1_apply_orbit_calibr.xml",
                                                     "Calibration", "outputBetaBand", 'false')
 
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                     "TOPSAR-Split", "selectedPolarisations", "VV")
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                     "TOPSAR-Split", "wktAoi", wktAoi)
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                     "TOPSAR-Split", "firstBurstIndex", str(1))
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
                                                     "TOPSAR-Split", "lastBurstIndex", str(9999))
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
                                                     "Subset", "geoRegion", wktAoi)
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence_no_deburst.xml",
                                                     "Write", "formatName", "GeoTIFF")
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Subset",
                                                     "geoRegion", wktAoi)
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "TOPSAR-Deburst",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "TOPSAR-Deburst",
                                                     "selectedPolarisations", "VV")
-        SnapGraphProcessing.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Write",
+        self.renderedGraphs.setNewOperatorParameter(self.mainCalcGraphs + "calc_coherence.xml", "Write",
                                                     "formatName", "GeoTIFF")
 
     # ###################Helper methods for subswath selection for processing############################
@@ -1091,7 +1282,7 @@ class SpecificSnapGraphProcessing:
             The contained boolean values indicate if wktAoi overlaps subswath or not.
         """
 
-        SnapGraphProcessing.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml", "TOPSAR-Split",
+        self.renderedGraphs.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml", "TOPSAR-Split",
                                                            "wktAoi", wktAoi)
 
         if wktAoi == "":
@@ -1114,15 +1305,16 @@ class SpecificSnapGraphProcessing:
             print("Attention: WktAoi does not intersect both scene pairs for Split")
             return validPairs
 
-        swMultipolyscene1 = GeoPosition().swMultiPolygonFromScene(scenePair[0] + "/manifest.safe")
-        swMultipolyscene2 = GeoPosition().swMultiPolygonFromScene(scenePair[1] + "/manifest.safe")
-
-        for i in range(0, len(validPairs)):
-            if swMultipolyscene1[i].intersects(polyWktAoi):
-                validPairs[i][0] = True
+        # #A subswath is only valid if the aoi overlaps one of its bursts, otherwise TOPSAR-Split would fail
+        for sceneNo in range(0, len(scenePair)):
+            swBursts = GeoPosition().swBurstPolygonsFromScene(scenePair[sceneNo] + "/manifest.safe")
+            if swBursts is None:
+                swBursts = [[polygon] for polygon in
+                            GeoPosition().swMultiPolygonFromScene(scenePair[sceneNo] + "/manifest.safe")]
 
-            if swMultipolyscene2[i].intersects(polyWktAoi):
-                validPairs[i][1] = True
+            for i in range(0, len(validPairs)):
+                if any(burst.intersects(polyWktAoi) for burst in swBursts[i]):
+                    validPairs[i][sceneNo] = True
 
         return validPairs
 
@@ -1143,38 +1335,130 @@ class SpecificSnapGraphProcessing:
     # ################################These methods set paths and process############################
 
     def __setAndProcessSplit(self, scene, outputPath, subswath, logobject=None):
-        SnapGraphProcessing.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml", "TOPSAR-Split",
+        self.renderedGraphs.setNewOperatorParameter(self.simpleSubGraphs + "topsar_split.xml", "TOPSAR-Split",
                                                            "subswath", subswath)
-        SnapGraphProcessing.setInOutputPaths(self.simpleSubGraphs + "topsar_split.xml", scene,
+        self.renderedGraphs.setInOutputPaths(self.simpleSubGraphs + "topsar_split.xml", scene,
                                                     outputPath + self.getSceneId(scene) + "_" + subswath + "_split")
 
-        SnapGraphProcessing.performProcessing(self.simpleSubGraphs + "topsar_split.xml", logobject)
+        self.renderedGraphs.performProcessing(self.simpleSubGraphs + "topsar_split.xml", logobject)
         return self.__isFileAvailable(outputPath + self.getSceneId(scene) + "_" + subswath + "_split.dim")
 
     def __setAndProcessSlice(self, scene1, scene2, outputPath, logobject=None):
         sentinelScene = scene1.endswith(".safe") or scene1.endswith(".SAFE")
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml",
                                                     [scene1 if sentinelScene else outputPath + scene1 + ".dim",
                                                      scene2 if sentinelScene else outputPath + scene2 + ".dim"], "Read")
 
         sceneId = self.getSceneId(scene2)
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "slice_assembly.xml",
                                                     [outputPath + sceneId + "_slice"], "Write")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "slice_assembly.xml", logobject)
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "slice_assembly.xml", logobject)
 
-    def __setAndProcessDeburst(self, scene, outputPath, logobject=None):
+    def __setDeburstPaths(self, scene, outputPath):
         sceneId = self.getSceneId(scene)
-        SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_deburst.xml",
+        self.renderedGraphs.setInOutputPaths(self.spacialCalcGraphs + "topsar_deburst.xml",
                                                     outputPath + sceneId + ".dim",
                                                     outputPath + sceneId + "_deb")
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_deburst.xml", logobject)
 
     # ##################################Here are accessible helper methods#################################
 
+    def createSceneScratch(self):
+        """Creates a private temp folder for the next scene job in the scratch root. All intermediate products and
+        rendered graphs of the job are written to this folder until removeSceneScratch is called.
+
+        Returns
+        -------
+        str
+            The path of the created temp folder
+        """
+
+        self.tempFiles = tempfile.mkdtemp(prefix="job_", dir=self.scratchRoot) + "/"
+        self.renderedGraphs.jobDir = self.tempFiles + "graphs/"
+        return self.tempFiles
+
+    def __processSubswathBranches(self, processSubswath, subswaths, logObject):
+        """Processes the independent subswath branches before their merge concurrently, up to subswathBranches at a
+        time. Each branch binds its graphs on its own fork of the graph job and logs to its own buffer, which is
+        appended in subswath order once all branches are joined.
+        Objects shared by the branches: the SceneCatalog opens one connection per thread, the GptExecutor is safe for
+        concurrent graphs, the SplitOrbitStore and the GraphResultCache lock or separate their files per thread. The
+        coherence callers create the split store before, so all branches and the caller share it.
+
+        Parameters
+        ----------
+        processSubswath : callable
+            Called with the branch processing object, the subswath and the branch log object
+        subswaths : list
+            The subswaths to process, e.g. ["IW3", "IW2"]
+        logObject : LogOutput
+            The logOutput class object of the scene
+
+        Returns
+        -------
+        list
+            The results of processSubswath in the order of the subswaths
+        """
+
+        if self.subswathBranches <= 1 or len(subswaths) <= 1:
+            return [processSubswath(self, subswath, logObject) for subswath in subswaths]
+
+        branches = []
+        for subswath in subswaths:
+            branch = copy.copy(self)
+            branch.renderedGraphs = self.renderedGraphs.fork(self.renderedGraphs.jobDir + subswath + "/")
+            branches.append((branch, logObject.createBranch()))
+
+        logObject.appendOutputToLog("Processing subswaths " + ", ".join(subswaths) + " with " +
+                                    str(min(self.subswathBranches, len(subswaths))) + " concurrent branches.")
+        with ThreadPoolExecutor(max_workers=min(self.subswathBranches, len(subswaths))) as executor:
+            futures = [executor.submit(processSubswath, branch, subswath, branchLog)
+                       for (branch, branchLog), subswath in zip(branches, subswaths)]
+            wait(futures)
+
+        for (branch, branchLog), subswath in zip(branches, subswaths):
+            logObject.appendOutputToLog("-----------------------Output of subswath " + subswath + "------------------")
+            logObject.appendBranch(branchLog)
+        return [future.result() for future in futures]
+
+    def setSplitOrbitStore(self, splitOrbitStore):
+        """Sets the store of the split products shared by the coherence pairs of the current run (see
+        CoherencePlanner). Without a store set, the split products are kept for one coherence entry only."""
+        self.splitOrbitStore = splitOrbitStore
+        self.splitOrbitStoreCreated = False
+
+    def __getSplitOrbitStore(self):
+        if self.splitOrbitStore is None:
+            self.splitOrbitStore = SplitOrbitStore(self.scratchRoot + "split_orbit_" + uuid.uuid4().hex[:8] + "/")
+            self.splitOrbitStoreCreated = True
+        return self.splitOrbitStore
+
+    def removeSceneScratch(self):
+        """Removes the temp folder of the current scene job. The folder is renamed first, so a partially deleted
+        folder is never visible under its job name."""
+
+        # #A split store set by the run is removed by the run
+        if self.splitOrbitStoreCreated:
+            self.splitOrbitStore.remove()
+            self.setSplitOrbitStore(None)
+
+        if self.tempFiles == self.scratchRoot:
+            return
+
+        jobFolder = self.tempFiles.rstrip("/")
+        try:
+            os.rename(jobFolder, jobFolder + ".delete")
+            shutil.rmtree(jobFolder + ".delete")
+        except OSError as e:
+            print('Failed to delete %s. Reason: %s' % (jobFolder, e))
+
+        self.tempFiles = self.scratchRoot
+
     def deleteAllTempFiles(self):
         folder = self.tempFiles
         for filename in os.listdir(folder):
             file_path = os.path.join(folder, filename)
+            if file_path + "/" == self.graphCacheFolder:
+                continue
             try:
                 if os.path.isfile(file_path) or os.path.islink(file_path):
                     os.unlink(file_path)
@@ -1248,7 +1532,9 @@ class SpecificSnapGraphProcessing:
 
     def __processAndCheckSubset(self, logObject):
 
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "subset_with_geo_coords.xml", logObject)
+        # #Graphs added to the chain beforehand are executed together with the subset
+        self.renderedGraphs.addToChain(self.spacialCalcGraphs + "subset_with_geo_coords.xml")
+        self.renderedGraphs.performChain(logObject)
 
         # Check if Subset succeeded with given wkt polygon on previous Scene
         if logObject.getError() is True and self.__checkErrForSubsetOverlap(logObject.getCurrentErrorMsg()) is False:
@@ -1257,17 +1543,9 @@ class SpecificSnapGraphProcessing:
             return False
         return True
 
-    def __checkAndReprocessSplit(self, scene, subswath, logObject):
-        sceneId1 = self.getSceneId(scene)
-        subswath = "" if subswath =="" else "_" + subswath
-
-        firstBurstIndex = int(SnapGraphProcessing.getElementByName(self.tempFiles + sceneId1 + subswath +
-                                                                   "_splitorb.dim",
-                                                                   "firstBurstIndex"))
-
-        lastBurstIndex = int(SnapGraphProcessing.getElementByName(self.tempFiles + sceneId1 + subswath +
-                                                                  "_splitorb.dim",
-                                                                  "lastBurstIndex"))
+    def __checkAndReprocessSplit(self, scene, productBase, logObject):
+        firstBurstIndex = int(SnapGraphProcessing.getElementByName(productBase + ".dim", "firstBurstIndex"))
+        lastBurstIndex = int(SnapGraphProcessing.getElementByName(productBase + ".dim", "lastBurstIndex"))
 
         if firstBurstIndex == lastBurstIndex:
             if firstBurstIndex == 1:
@@ -1276,16 +1554,24 @@ class SpecificSnapGraphProcessing:
                 firstBurstIndex = firstBurstIndex - 1
 
 
-            SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
-                                                        "TOPSAR-Split", "wktAoi", "")
-            SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
-                                                        "TOPSAR-Split", "firstBurstIndex", str(firstBurstIndex))
-            SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
-                                                        "TOPSAR-Split", "lastBurstIndex", str(lastBurstIndex))
+            # #The product is shared by other pairs, so the split parameters are restored afterwards
+            wktAoi = self.renderedGraphs.getOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                              "TOPSAR-Split", "wktAoi")
+            self.__setSplitBurstWindow("", firstBurstIndex, lastBurstIndex)
+
+            self.renderedGraphs.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene,
+                                                 productBase)
+            self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
 
-            SnapGraphProcessing.setInOutputPaths(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", scene,
-                                                 self.tempFiles + sceneId1 + subswath + "_splitorb")
-            SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml", logObject)
+            self.__setSplitBurstWindow(wktAoi or "", 1, 9999)
+
+    def __setSplitBurstWindow(self, wktAoi, firstBurstIndex, lastBurstIndex):
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                    "TOPSAR-Split", "wktAoi", wktAoi)
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                    "TOPSAR-Split", "firstBurstIndex", str(firstBurstIndex))
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "topsar_split_apply_orbit.xml",
+                                                    "TOPSAR-Split", "lastBurstIndex", str(lastBurstIndex))
 
     # #########################Old methods no longer relevant for batch processing. #################################
     # Failed because of undocumented Snap limitations or bugs.
@@ -1295,7 +1581,7 @@ class SpecificSnapGraphProcessing:
         sceneId1 = self.getSceneId(scene1)
         sceneId2 = self.getSceneId(scene2)
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
                                                     [scene1 + "/manifest.safe",
                                                      scene1 + "/manifest.safe",
                                                      scene1 + "/manifest.safe",
@@ -1303,7 +1589,7 @@ class SpecificSnapGraphProcessing:
                                                      scene2 + "/manifest.safe",
                                                      scene2 + "/manifest.safe"], "Read")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
                                                     [self.tempFiles + sceneId1 + "_sw1_split",
                                                      self.tempFiles + sceneId1 + "_sw2_split",
                                                      self.tempFiles + sceneId1 + "_sw3_split",
@@ -1311,7 +1597,7 @@ class SpecificSnapGraphProcessing:
                                                      self.tempFiles + sceneId2 + "_sw2_split",
                                                      self.tempFiles + sceneId2 + "_sw3_split"], "Write")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
                                                     [self.tempFiles + sceneId1 + "_sw1_split.dim",
                                                      self.tempFiles + sceneId1 + "_sw2_split.dim",
                                                      self.tempFiles + sceneId1 + "_sw3_split.dim",
@@ -1319,40 +1605,40 @@ class SpecificSnapGraphProcessing:
                                                      self.tempFiles + sceneId2 + "_sw2_split.dim",
                                                      self.tempFiles + sceneId2 + "_sw3_split.dim"], "Read")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
                                                     [self.tempFiles + sceneId1 + "_sw1_split_slice",
                                                      self.tempFiles + sceneId1 + "_sw2_split_slice",
                                                      self.tempFiles + sceneId1 + "_sw3_split_slice"], "Write")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                     [self.tempFiles + sceneId1 + "_sw1_split_slice.dim",
                                                      self.tempFiles + sceneId1 + "_sw2_split_slice.dim",
                                                      self.tempFiles + sceneId1 + "_sw3_split_slice.dim"], "Read")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                     [self.tempFiles + sceneId1 + "_split_slice_merge"], "Write")
 
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                     [self.tempFiles + sceneId1 + "_split_slice_merge.dim"], "Read")
-        SnapGraphProcessing.setMultiplePaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setMultiplePaths(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                     [self.tempFiles + sceneId1 + "_split_slice_merge_sub"], "Write")
 
-        SnapGraphProcessing.setMultiplePaths(self.simpleSubGraphs + "terrain_correction.xml",
+        self.renderedGraphs.setMultiplePaths(self.simpleSubGraphs + "terrain_correction.xml",
                                                     [self.tempFiles + sceneId1 + "_split_slice_merge_sub.dim"], "Read")
-        SnapGraphProcessing.setMultiplePaths(self.simpleSubGraphs + "terrain_correction.xml",
+        self.renderedGraphs.setMultiplePaths(self.simpleSubGraphs + "terrain_correction.xml",
                                                     [outputPath + sceneId1 + "_split_slice_merge_sub_tc"], "Write")
 
     def processSplitSliceMergeSubset(self, scene, logObject=None):
         sceneId = self.getSceneId(scene)
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "step1_topsar_split_all_sw.xml",
                                                      logObject)
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "step2_topsar_slice_all_sw.xml",
                                                      logObject)
-        SnapGraphProcessing.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
+        self.renderedGraphs.performProcessing(self.spacialCalcGraphs + "step3_deburst_merge_all_sw.xml",
                                                      logObject)
 
         bands = self.__getAvailableBands(self.tempFiles + sceneId + "_split_slice_merge" + ".dim")
-        SnapGraphProcessing.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
+        self.renderedGraphs.setNewOperatorParameter(self.spacialCalcGraphs + "subset_with_geo_coords.xml",
                                                            "Subset", "sourceBands", bands)
         self.__processAndCheckSubset(logObject)
-        SnapGraphProcessing.performProcessing(self.simpleSubGraphs + "terrain_correction.xml")
+        self.renderedGraphs.performProcessing(self.simpleSubGraphs + "terrain_correction.xml")
@@ -0,0 +1,134 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        split_orbit_store
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class holds the TOPSAR-Split/Apply-Orbit products of one coherence run, shared by all coherence pairs.
+#-------A scene subswath is split and orbit corrected by the first pair needing it, all following pairs use the product.
+#-------The products are kept per burst window, so the pairs of several aois of a run share the products of the aois
+#-------covering the same bursts.
+#-------The CoherencePlanner sets the amount of pairs consuming each scene. Each pair releases its scenes when finished
+#-------and the products of a scene are removed with its last consumer. Scenes without consumers set are removed with
+#-------their first release, like the temp files of a single pair.
+#-------The store is shared by the processes of a parallel run, so the state is kept in the store folder and guarded by
+#-------file locks: "<key>.status" for the result of a split, "<scene id>.refs" for the remaining consumers.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import glob
+import fcntl
+import shutil
+from contextlib import contextmanager
+
+
+class SplitOrbitStore:
+
+    AVAILABLE = "available"
+    NO_OVERLAP = "noOverlap"
+    FAILED = "failed"
+
+    def __init__(self, storeFolder):
+        self.storeFolder = storeFolder if storeFolder.endswith("/") else storeFolder + "/"
+        if not os.path.exists(self.storeFolder):
+            os.makedirs(self.storeFolder, exist_ok=True)
+
+        # #Amount of splits executed and reused by this process
+        self.processed = 0
+        self.reused = 0
+
+    def getProductBase(self, sceneId, subswath, window=None):
+        return self.storeFolder + sceneId + "_" + subswath + ("_" + window if window else "") + "_splitorb"
+
+    def acquire(self, sceneId, subswath, processSplit, window=None):
+        """Returns the split product of the scene subswath and window. The product is processed if no pair processed
+        it before.
+
+        Parameters
+        ----------
+        sceneId : str
+            The id of the scene
+        subswath : str
+            The subswath, e.g. "IW1"
+        processSplit : callable
+            Processes the split product to the given product base path and returns AVAILABLE, NO_OVERLAP or FAILED
+        window : str
+            The key of the bursts of the split product, e.g. "b2-4". Pairs with the same window share the product
+
+        Returns
+        -------
+        tuple
+            The status of the split and the product base path (without .dim)
+        """
+
+        productBase = self.getProductBase(sceneId, subswath, window)
+        statusFile = productBase + ".status"
+
+        with self.__lock(productBase):
+            if os.path.exists(statusFile):
+                with open(statusFile) as f:
+                    status = f.read().strip()
+                if status == SplitOrbitStore.NO_OVERLAP or os.path.exists(productBase + ".dim"):
+                    self.reused = self.reused + 1
+                    return status, productBase
+
+            status = processSplit(productBase)
+            self.processed = self.processed + 1
+
+            # #Failed splits are not kept, so the next pair tries again
+            if status != SplitOrbitStore.FAILED:
+                with open(statusFile, "w") as f:
+                    f.write(status)
+            return status, productBase
+
+    def setConsumers(self, consumers):
+        """Sets the amount of pairs consuming each scene.
+
+        Parameters
+        ----------
+        consumers : dict
+            scene id -> amount of pairs
+        """
+
+        for sceneId, amount in consumers.items():
+            with self.__lock(self.storeFolder + sceneId):
+                with open(self.storeFolder + sceneId + ".refs", "w") as f:
+                    f.write(str(amount))
+
+    def release(self, sceneId):
+        """Releases the scene for one pair. The products of the scene are removed with the last consumer."""
+
+        refsFile = self.storeFolder + sceneId + ".refs"
+        with self.__lock(self.storeFolder + sceneId):
+            amount = 1
+            if os.path.exists(refsFile):
+                with open(refsFile) as f:
+                    amount = int(f.read().strip() or "1")
+
+            if amount > 1:
+                with open(refsFile, "w") as f:
+                    f.write(str(amount - 1))
+                return
+
+            for path in glob.glob(glob.escape(self.storeFolder + sceneId) + "_*_splitorb*"):
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif not path.endswith(".lock"):
+                    os.remove(path)
+            if os.path.exists(refsFile):
+                os.remove(refsFile)
+
+    def remove(self):
+        shutil.rmtree(self.storeFolder, ignore_errors=True)
+
+    @contextmanager
+    def __lock(self, path):
+        with open(path + ".lock", "w") as lockFile:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
@@ -0,0 +1,84 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        subprocess_gpt_executor
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class executes each Snap graph .xml file with its own gpt call, starting a new JVM per graph.
+#-------Without a given gpt command the graphs are executed with pyroSAR, which locates the gpt of the Snap installation.
+#-------A gpt command, e.g. ["/opt/snap/bin/gpt", "-e"] or a stub gpt for testing, is called with the graph file appended.
+#-------Additional gpt arguments, e.g. the heap and tile cache of the process, are given before the graph file.
+#-------Graphs can be executed concurrently from several threads, the output of pyroSAR is collected per thread.
+#-------Any failure of a graph execution is raised as RuntimeError, as documented by GptExecutor.execute.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import io
+import sys
+import threading
+import subprocess
+
+from pyroSAR.snap.auxil import execute as pyroSarGptExecute
+
+from controller_modules.gpt_executor import GptExecutor
+
+
+class SubprocessGptExecutor(GptExecutor):
+
+    class ThreadStdout:
+        """Replaces sys.stdout once. Writes go to the buffer of the current thread if one is set, else to stdout."""
+
+        def __init__(self, stdout):
+            self.stdout = stdout
+            self.local = threading.local()
+
+        def write(self, text):
+            buffer = getattr(self.local, "buffer", None)
+            return (buffer if buffer is not None else self.stdout).write(text)
+
+        def flush(self):
+            buffer = getattr(self.local, "buffer", None)
+            (buffer if buffer is not None else self.stdout).flush()
+
+        def __getattr__(self, name):
+            return getattr(self.stdout, name)
+
+    __lock = threading.Lock()
+
+    def __init__(self, gptCommand=None):
+        self.gptCommand = gptCommand
+
+    def execute(self, xmlFile, gptArgs=None) -> str:
+        if self.gptCommand is None:
+            # #redirect_stdout would replace sys.stdout for all threads, so the output is collected per thread
+            threadStdout = SubprocessGptExecutor.__getThreadStdout()
+            threadStdout.local.buffer = io.StringIO()
+            try:
+                pyroSarGptExecute(xmlFile, cleanup=False, gpt_args=list(gptArgs) if gptArgs else None)
+                return threadStdout.local.buffer.getvalue()
+            except RuntimeError:
+                raise
+            except Exception as e:
+                # #E.g. a KeyError of pyroSAR for a graph without a node "Write", callers only handle RuntimeError
+                raise RuntimeError(threadStdout.local.buffer.getvalue() + "\n" + xmlFile + " could not be executed: " +
+                                   type(e).__name__ + ": " + str(e)) from e
+            finally:
+                threadStdout.local.buffer = None
+
+        try:
+            proc = subprocess.run(list(self.gptCommand) + list(gptArgs or []) + [xmlFile], stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, universal_newlines=True)
+        except OSError as e:
+            raise RuntimeError(xmlFile + " could not be executed: " + str(e)) from e
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stdout + "\n" + xmlFile + " failed with return code " + str(proc.returncode))
+        return proc.stdout
+
+    @staticmethod
+    def __getThreadStdout():
+        with SubprocessGptExecutor.__lock:
+            if not isinstance(sys.stdout, SubprocessGptExecutor.ThreadStdout):
+                sys.stdout = SubprocessGptExecutor.ThreadStdout(sys.stdout)
+            return sys.stdout
@@ -0,0 +1,249 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        time_series_cube
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class appends the final GeoTIFF products of an output folder to chunked Zarr time series cubes, one cube
+#-------per aoi, product and relative orbit, e.g. "<cubeFolder>/BS_117.zarr" or "<cubeFolder>/polVI_dp_117.zarr".
+#-------The array "values" of a cube has the dimensions time, band, y and x and is chunked with many time steps and
+#-------small tiles, so the time series of a pixel or a parcel is read from a few chunks instead of hundreds of files.
+#-------The time coordinate "time" (and "second_time" of coherence products) is read from the output file names, as
+#-------days since 1970-01-01. The time steps are stored in the order they were appended, sort them by time for
+#-------analysis.
+#-------The grid of a cube is the grid of its first product, later products are warped to this grid if it differs.
+#-------New products are appended in batches that fill whole time chunks, the amount of time steps and the appended
+#-------products are stored in the attributes of the cube once all values are written. Time steps written after the
+#-------last stored amount, e.g. by a crashed run, are overwritten by the next append.
+#-------The cubes are read e.g. with xarray.open_zarr(cube).
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import datetime
+import numpy as np
+import rasterio
+import zarr
+from numcodecs import Blosc
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+from controller_modules.create_input_output import CreateInputOutput
+from controller_modules.raster_post_processing import RasterPostProcessing
+
+
+class TimeSeriesCube:
+
+    # #Time steps and pixels per side of one chunk. One chunk of float32 values is 2 MB uncompressed
+    TIME_CHUNK = 32
+    SPATIAL_CHUNK = 128
+
+    EPOCH = datetime.datetime(1970, 1, 1)
+    TIME_UNITS = "days since 1970-01-01"
+
+    def __init__(self, cubeFolder, timeChunk=TIME_CHUNK, spatialChunk=SPATIAL_CHUNK):
+        """
+        Parameters
+        ----------
+        cubeFolder : str
+            The folder of the cubes of an aoi. None disables the cubes
+        timeChunk : int
+            The time steps per chunk of new cubes
+        spatialChunk : int
+            The pixels per side of a chunk of new cubes
+        """
+
+        self.cubeFolder = cubeFolder
+        self.timeChunk = max(1, int(timeChunk))
+        self.spatialChunk = max(1, int(spatialChunk))
+
+    def processFolder(self, outputPath, logObject=None, areaName=None):
+        """Appends all GeoTIFF products in outputPath not yet in their cube.
+
+        Parameters
+        ----------
+        outputPath : str
+            The folder of the final products
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        areaName : str
+            Only products with this area name in their output name are appended
+
+        Returns
+        -------
+        int
+            The amount of products appended
+        """
+
+        if self.cubeFolder is None or self.cubeFolder == "" or outputPath is None or not os.path.isdir(outputPath):
+            return 0
+
+        # #Products by cube, the products of a cube are appended in the order of their dates
+        cubes = {}
+        for root, dirs, files in os.walk(outputPath):
+            for file in files:
+                if not file.lower().endswith((".tif", ".tiff")) or file.endswith(RasterPostProcessing.TEMP_SUFFIX):
+                    continue
+                fields = CreateInputOutput.parseOutputName(file)
+                if fields is None:
+                    self.__log(logObject, "No output name, not added to a time series cube: " + file, True)
+                    continue
+                # #The area name must match exactly, the products of field1 are not the ones of field10
+                if areaName is not None and areaName != "" and fields["areaName"] != areaName:
+                    continue
+                cubes.setdefault(self.getCubeName(fields), []).append((fields["date"], os.path.join(root, file)))
+
+        appended = 0
+        for cubeName, products in sorted(cubes.items()):
+            cube = os.path.join(self.cubeFolder, cubeName)
+            try:
+                amount = self.appendProducts(cube, [product for date, product in sorted(products)])
+            except Exception as e:
+                self.__log(logObject, "Time series cube append failed for " + cube + ": " + str(e), True)
+                continue
+            if amount > 0:
+                self.__log(logObject, str(amount) + " products appended to the time series cube " + cube)
+            appended = appended + amount
+        return appended
+
+    @staticmethod
+    def getCubeName(fields):
+        """Returns the name of the cube of the fields of an output name, e.g. BS_117.zarr."""
+        return fields["product"] + ("_" + fields["index"] if fields.get("index") else "") + \
+            "_%03d.zarr" % fields["relativeOrbit"]
+
+    def appendProducts(self, cube, products):
+        """Appends the products not yet in the cube, the cube is created from the first product if needed.
+
+        Returns
+        -------
+        int
+            The amount of products appended
+        """
+
+        group = zarr.open_group(cube, mode="a")
+        # #The cube is complete once its attributes are written, a partly created cube is created again
+        if "length" not in group.attrs:
+            with rasterio.open(products[0]) as source:
+                self.__createCube(group, source, CreateInputOutput.parseOutputName(products[0])["secondDate"]
+                                  is not None)
+
+        # #Time steps after the stored amount were not completely written
+        length = group.attrs["length"]
+        appendedSources = set(group.attrs["sources"])
+        for name, array in group.arrays():
+            if name not in ["x", "y", "band"] and array.shape[0] != length:
+                array.resize(length, *array.shape[1:])
+
+        newProducts = [product for product in products if os.path.basename(product) not in appendedSources]
+        position = 0
+        while position < len(newProducts):
+            # #The first batch fills the open time chunk
+            amount = group["values"].chunks[0] - length % group["values"].chunks[0]
+            self.__appendBatch(group, newProducts[position:position + amount], length)
+            length = group.attrs["length"]
+            position = position + amount
+        return len(newProducts)
+
+    def __createCube(self, group, source, hasSecondDate):
+        tileSize = min(self.spatialChunk, max(source.width, source.height))
+        group.create_dataset("values", shape=(0, source.count, source.height, source.width),
+                             chunks=(self.timeChunk, 1, tileSize, tileSize), dtype="float32", fill_value=np.nan,
+                             compressor=Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE), overwrite=True)
+        group["values"].attrs["_ARRAY_DIMENSIONS"] = ["time", "band", "y", "x"]
+
+        timeNames = ["time", "second_time"] if hasSecondDate else ["time"]
+        for timeName in timeNames:
+            group.create_dataset(timeName, shape=(0,), chunks=(1024,), dtype="int64", fill_value=-1,
+                                 overwrite=True)
+            group[timeName].attrs.update({"_ARRAY_DIMENSIONS": ["time"], "units": self.TIME_UNITS,
+                                          "calendar": "proleptic_gregorian"})
+
+        # #Pixel center coordinates in the crs of the cube
+        transform = source.transform
+        group.array("x", transform.c + (np.arange(source.width) + 0.5) * transform.a, overwrite=True)
+        group.array("y", transform.f + (np.arange(source.height) + 0.5) * transform.e, overwrite=True)
+        bandNames = [description or "band_" + str(band) for band, description in enumerate(source.descriptions,
+                                                                                              start=1)]
+        group.array("band", np.array(bandNames, dtype="U"), overwrite=True)
+        for name in ["x", "y", "band"]:
+            group[name].attrs["_ARRAY_DIMENSIONS"] = [name]
+
+        group.attrs.update({"crs": source.crs.to_wkt() if source.crs is not None else "",
+                            "transform": list(transform)[:6], "length": 0, "sources": []})
+
+    def __appendBatch(self, group, products, length):
+        amount = len(products)
+        bands, height, width = group["values"].shape[1:]
+        crs = CRS.from_wkt(group.attrs["crs"]) if group.attrs["crs"] != "" else None
+        transform = Affine(*group.attrs["transform"])
+
+        for name in ["values", "time", "second_time"]:
+            if name in group:
+                group[name].resize(length + amount, *group[name].shape[1:])
+        values = group["values"]
+
+        sources = []
+        readers = []
+        try:
+            for product in products:
+                sources.append(rasterio.open(product))
+                if sources[-1].count != bands:
+                    raise ValueError(product + " has " + str(sources[-1].count) + " bands, the cube " + str(bands))
+                readers.append(self.__getReader(sources[-1], crs, transform, width, height))
+
+            # #Lines of one chunk row of all products of the batch at once, so each chunk is written once
+            for band in range(1, bands + 1):
+                for firstLine in range(0, height, values.chunks[2]):
+                    window = Window(0, firstLine, width, min(values.chunks[2], height - firstLine))
+                    block = np.stack([self.__readBlock(reader, source.nodata, band, window)
+                                      for reader, source in zip(readers, sources)])
+                    values[length:length + amount, band - 1, firstLine:firstLine + int(window.height), :] = block
+        finally:
+            for reader in readers + sources:
+                reader.close()
+
+        fields = [CreateInputOutput.parseOutputName(product) for product in products]
+        group["time"][length:length + amount] = [self.getDays(field["date"]) for field in fields]
+        if "second_time" in group:
+            group["second_time"][length:length + amount] = [self.getDays(field["secondDate"]) for field in fields]
+
+        # #The attributes are written in one file replace, the time steps are complete once they are stored
+        group.attrs.update({"length": length + amount,
+                            "sources": group.attrs["sources"] + [os.path.basename(product) for product in products]})
+
+    @staticmethod
+    def __getReader(source, crs, transform, width, height):
+        if source.crs == crs and source.transform.almost_equals(transform) and source.width == width and \
+                source.height == height:
+            return source
+        return WarpedVRT(source, crs=crs, transform=transform, width=width, height=height,
+                         resampling=Resampling.nearest, nodata=float("nan"))
+
+    @staticmethod
+    def __readBlock(reader, sourceNodata, band, window):
+        values = reader.read(band, window=window).astype(np.float32)
+        if reader.nodata is not None:
+            values[reader.read_masks(band, window=window) == 0] = np.nan
+        if sourceNodata is None:
+            # #Without no-data value the zero pixels of the terrain correction are not valid
+            values, valid = RasterPostProcessing.fixNodata(values, np.ones(values.shape, dtype=bool), None)
+            values[~valid] = np.nan
+        return values
+
+    @staticmethod
+    def getDays(date):
+        """Returns the days since 1970-01-01 of a date, -1 for None."""
+        return -1 if date is None else (date - TimeSeriesCube.EPOCH).days
+
+    @staticmethod
+    def __log(logObject, message, error=False):
+        if logObject is not None:
+            logObject.appendOutputToLog(message, error)
+        else:
+            print(message)
@@ -0,0 +1,183 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        warm_gpt_worker_pool
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class executes Snap graph .xml files in a pool of long-lived graph processing workers (see SnapGraphWorker).
+#-------Each worker starts its JVM and loads the operator registry only once, instead of once per graph as gpt does.
+#-------The workers are started on the first graph execution. Each graph is handed to an idle worker, so up to
+#-------"workers" graphs are executed at the same time.
+#-------A worker is replaced after maxGraphsPerWorker graphs to limit the memory growth of its JVM and after it died.
+#-------If the workers can not be started, e.g. without the Snap python interface, all graphs are executed by the
+#-------SubprocessGptExecutor instead.
+#-------The worker command can be replaced, e.g. by a stub gpt speaking the same protocol for testing.
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import queue
+import threading
+import subprocess
+
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.snap_graph_worker import SnapGraphWorker
+from controller_modules.subprocess_gpt_executor import SubprocessGptExecutor
+
+
+class WarmGptWorkerPool(GptExecutor):
+
+    def __init__(self, workers=1, workerCommand=None, maxGraphsPerWorker=50, fallbackExecutor=None):
+        """
+        Parameters
+        ----------
+        workers : int
+            Amount of graph processing workers
+        workerCommand : list
+            Command starting one worker, default is the SnapGraphWorker script
+        maxGraphsPerWorker : int
+            Amount of graphs after which a worker is replaced
+        fallbackExecutor : GptExecutor
+            Executor used if the workers can not be started, default is the SubprocessGptExecutor
+        """
+
+        self.workers = max(1, int(workers))
+        self.workerCommand = workerCommand if workerCommand is not None else \
+            [sys.executable, "-m", "controller_modules.snap_graph_worker"]
+        self.maxGraphsPerWorker = maxGraphsPerWorker
+        self.fallbackExecutor = fallbackExecutor
+
+        self.__idleWorkers = queue.Queue()
+        self.__allWorkers = []
+        self.__started = False
+        self.__useFallback = False
+        self.__lock = threading.RLock()
+
+        # #Workers belong to the process that started them, e.g. not to forked processes of the BatchProcessing pool
+        self.__pid = os.getpid()
+
+    def execute(self, xmlFile, gptArgs=None) -> str:
+        # #The heap of a worker is set once at its start, gpt arguments only apply to the fallback executor
+        self.__startWorkers()
+
+        if self.__useFallback:
+            return self.__getFallbackExecutor().execute(xmlFile, gptArgs)
+
+        worker = self.__idleWorkers.get()
+        try:
+            if not self.__useFallback and not self.__waitUntilReady(worker):
+                self.__useFallback = True
+            if self.__useFallback:
+                return self.__getFallbackExecutor().execute(xmlFile, gptArgs)
+
+            return self.__executeByWorker(worker, xmlFile)
+        finally:
+            if self.__useFallback:
+                self.__stopWorker(worker)
+            elif worker["process"].poll() is not None or worker["graphs"] >= self.maxGraphsPerWorker:
+                self.__stopWorker(worker)
+                worker = self.__startWorker()
+            self.__idleWorkers.put(worker)
+
+    def close(self):
+        if os.getpid() != self.__pid:
+            return
+
+        with self.__lock:
+            for worker in self.__allWorkers:
+                self.__stopWorker(worker)
+            self.__allWorkers = []
+            self.__idleWorkers = queue.Queue()
+            self.__started = False
+
+    # ##################################Worker handling#################################
+
+    def __startWorkers(self):
+        with self.__lock:
+            if self.__pid != os.getpid():
+                # #Inherited workers of the parent process must not be used
+                self.__allWorkers = []
+                self.__idleWorkers = queue.Queue()
+                self.__started = False
+                self.__pid = os.getpid()
+
+            if self.__started:
+                return
+            for i in range(self.workers):
+                self.__idleWorkers.put(self.__startWorker())
+            self.__started = True
+
+    def __startWorker(self):
+        process = subprocess.Popen(self.workerCommand, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        worker = {"process": process, "ready": False, "graphs": 0}
+        with self.__lock:
+            self.__allWorkers.append(worker)
+        return worker
+
+    def __stopWorker(self, worker):
+        process = worker["process"]
+        with self.__lock:
+            if worker in self.__allWorkers:
+                self.__allWorkers.remove(worker)
+        try:
+            process.stdin.close()
+            process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def __waitUntilReady(self, worker):
+        if worker["ready"]:
+            return True
+
+        message, output = self.__readUntilMessage(worker)
+        if message != "READY":
+            print("Graph processing worker could not be started. Graphs are executed by subprocess.\n" + output)
+            return False
+
+        worker["ready"] = True
+        return True
+
+    def __executeByWorker(self, worker, xmlFile):
+        worker["graphs"] = worker["graphs"] + 1
+        try:
+            worker["process"].stdin.write(os.path.abspath(xmlFile) + "\n")
+            worker["process"].stdin.flush()
+        except OSError as e:
+            raise RuntimeError("[" + os.path.basename(xmlFile) + "] graph processing worker died: " + str(e))
+
+        message, output = self.__readUntilMessage(worker)
+        if message is None:
+            returnCode = worker["process"].wait()
+            subMessage = " One possible cause is a lack of memory." if returnCode == -9 else ""
+            raise RuntimeError(output + "\n[" + os.path.basename(xmlFile) + "] graph processing worker died with "
+                                        "return code " + str(returnCode) + "." + subMessage)
+        if message != "DONE 0":
+            raise RuntimeError(output + "\n[" + os.path.basename(xmlFile) + "] failed: " +
+                               message.replace("DONE 1", "", 1).strip())
+        return output
+
+    @staticmethod
+    def __readUntilMessage(worker):
+        # #Returns the next protocol message and all output lines before it. The message is None if the worker ended.
+        output = []
+        for line in worker["process"].stdout:
+            position = line.find(SnapGraphWorker.PROTOCOL_PREFIX)
+            if position == -1:
+                output.append(line)
+                continue
+            if position > 0:
+                output.append(line[:position] + "\n")
+            return line[position + len(SnapGraphWorker.PROTOCOL_PREFIX):].strip(), "".join(output)
+        return None, "".join(output)
+
+    def __getFallbackExecutor(self):
+        with self.__lock:
+            if self.fallbackExecutor is None:
+                self.fallbackExecutor = SubprocessGptExecutor()
+            return self.fallbackExecutor
@@ -0,0 +1,260 @@
+#--------------------------------------------------------------------------------------------------------------------------------
+# Name:        zonal_statistics
+# Purpose:
+#
+# Author:      jennifer.mcclelland
+#
+# Created:     2023
+# Copyright:   (c) jennifer.mcclelland 2023
+#
+#-------This class computes mean, median, standard deviation and pixel count per parcel and band of the final GeoTIFF
+#-------products, e.g. for the agricultural parcels of an aoi.
+#-------The parcel layer is rasterized once per output grid to a label raster, the label of a pixel is the position of
+#-------its parcel in the layer + 1, 0 is outside of all parcels. Where parcels overlap the last parcel is used.
+#-------The label rasters are cached per grid signature (crs, transform and size) in memory and as .npy files, so all
+#-------products of a relative orbit share one rasterization.
+#-------The statistics of all parcels of a band are computed at once with np.bincount and one sort for the medians.
+#-------The rows of a product are written as one Parquet file "<product name>.parquet" to the table folder. The folder
+#-------is read as one table keyed by parcel id and acquisition date, e.g. with pandas.read_parquet(tableFolder).
+#--------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import rasterio
+from rasterio.features import rasterize
+
+from controller_modules.create_input_output import CreateInputOutput
+from controller_modules.raster_post_processing import RasterPostProcessing
+
+
+class ZonalStatistics:
+
+    STATISTICS = ["mean", "median", "std", "count"]
+
+    def __init__(self, parcelFile, parcelIdField="id", cacheFolder=None):
+        """
+        Parameters
+        ----------
+        parcelFile : str
+            The path of the parcel layer, any vector format read by geopandas
+        parcelIdField : str
+            The attribute of the parcel id. Without this attribute the position in the layer is used
+        cacheFolder : str
+            The folder of the label rasters. None keeps them in memory only
+        """
+
+        self.parcelFile = parcelFile
+        self.parcelIdField = parcelIdField
+        self.cacheFolder = cacheFolder
+        self.__parcels = None
+        self.__parcelsByCrs = {}
+        self.__labels = {}
+
+    def processFolder(self, outputPath, tableFolder, logObject=None, areaName=None):
+        """Computes the statistics of all GeoTIFF products in outputPath without a table file.
+
+        Parameters
+        ----------
+        outputPath : str
+            The folder of the final products
+        tableFolder : str
+            The folder of the Parquet files
+        logObject : LogOutput
+            The logOutput class object that adds processing content to the current logfile
+        areaName : str
+            Only products with this area name in their output name are processed
+
+        Returns
+        -------
+        int
+            The amount of products added to the table
+        """
+
+        if self.parcelFile is None or self.parcelFile == "" or outputPath is None or not os.path.isdir(outputPath):
+            return 0
+        if not os.path.exists(tableFolder):
+            os.makedirs(tableFolder)
+
+        added = 0
+        for root, dirs, files in os.walk(outputPath):
+            for file in sorted(files):
+                if not file.lower().endswith((".tif", ".tiff")) or file.endswith(RasterPostProcessing.TEMP_SUFFIX):
+                    continue
+                # #The area name must match exactly, the products of field1 are not the ones of field10
+                if areaName is not None and areaName != "":
+                    fields = CreateInputOutput.parseOutputName(file)
+                    if fields is None or fields["areaName"] != areaName:
+                        continue
+
+                product = os.path.join(root, file)
+                tableFile = os.path.join(tableFolder, os.path.splitext(file)[0] + ".parquet")
+                if os.path.exists(tableFile) and os.path.getmtime(tableFile) >= os.path.getmtime(product):
+                    continue
+
+                try:
+                    table = self.getProductTable(product)
+                except Exception as e:
+                    self.__log(logObject, "Zonal statistics failed for " + product + ": " + str(e), True)
+                    continue
+
+                # #The table file is renamed once complete, so a crash never leaves a partial file. Hidden files are
+                # #not read as part of the table
+                tempFile = os.path.join(tableFolder, "." + os.path.basename(tableFile) + ".tmp")
+                table.to_parquet(tempFile, index=False)
+                os.replace(tempFile, tableFile)
+                added = added + 1
+                self.__log(logObject, "Zonal statistics of " + str(table["parcel_id"].nunique()) + " parcels added: " +
+                           tableFile)
+        return added
+
+    def getProductTable(self, product):
+        """Returns the statistics of the parcels covered by the product, one row per parcel and band."""
+
+        fields = CreateInputOutput.parseOutputName(product) or {}
+        with rasterio.open(product) as source:
+            labels = self.getLabels(source)
+            parcelIds = self.__getParcelIds()
+            bandNames = [description or "band_" + str(band) for band, description in
+                         enumerate(source.descriptions, start=1)]
+
+            columns = {statistic: [] for statistic in self.STATISTICS}
+            rowLabels = []
+            rowBands = []
+            for band, bandName in enumerate(bandNames, start=1):
+                # #Without no-data value the zero pixels of the terrain correction are not counted
+                values = source.read(band).astype(np.float64)
+                if source.nodata is not None:
+                    values[source.read_masks(band) == 0] = np.nan
+                else:
+                    values, valid = RasterPostProcessing.fixNodata(values, np.ones(values.shape, dtype=bool), None)
+                    values[~valid] = np.nan
+                statistics = self.getStatistics(labels, values, len(parcelIds) + 1)
+
+                # #Only parcels with at least one valid pixel
+                covered = np.flatnonzero(statistics["count"][1:] > 0) + 1
+                for statistic in self.STATISTICS:
+                    columns[statistic].append(statistics[statistic][covered])
+                rowLabels.append(covered)
+                rowBands.extend([bandName] * len(covered))
+
+        rowLabels = np.concatenate(rowLabels) if len(rowLabels) > 0 else np.array([], dtype=np.int64)
+        table = pd.DataFrame({"parcel_id": parcelIds[rowLabels - 1],
+                              "date": pd.Series([fields.get("date")] * len(rowLabels), dtype="datetime64[ns]"),
+                              "second_date": pd.Series([fields.get("secondDate")] * len(rowLabels),
+                                                       dtype="datetime64[ns]"),
+                              "product": fields.get("product", "") + ("_" + fields["index"] if fields.get("index")
+                                                                      else ""),
+                              "relative_orbit": fields.get("relativeOrbit", -1),
+                              "band": rowBands,
+                              "source": os.path.basename(product)})
+        for statistic in self.STATISTICS:
+            table[statistic] = np.concatenate(columns[statistic]) if len(columns[statistic]) > 0 else []
+        table["count"] = table["count"].astype(np.int64)
+        return table
+
+    @staticmethod
+    def getStatistics(labels, values, amountLabels):
+        """Returns mean, median, std and count of the values per label. Non-finite values are not counted.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            The label of each pixel, 0 is not counted
+        values : numpy.ndarray
+            The values of the same shape as labels
+        amountLabels : int
+            The highest label + 1
+
+        Returns
+        -------
+        dict
+            An array of amountLabels entries per statistic, NaN for labels without values
+        """
+
+        selected = (labels > 0) & np.isfinite(values)
+        labels = labels[selected].astype(np.int64)
+        values = values[selected]
+
+        count = np.bincount(labels, minlength=amountLabels)
+        total = np.bincount(labels, weights=values, minlength=amountLabels)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / count
+            # #Deviations from the mean of the label, more precise than the sum of squares
+            variance = np.bincount(labels, weights=(values - mean[labels]) ** 2, minlength=amountLabels) / count
+
+        # #Sorted by label and value the median of a label lies in the middle of its range. The values are sorted
+        # #first, their position in this order then sorts the values within a label, faster than np.lexsort
+        byValue = np.argsort(values)
+        keys = np.sort(labels[byValue] * len(values) + np.arange(len(values)))
+        sortedValues = values[byValue][keys % max(1, len(values))]
+        starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+        median = np.full(amountLabels, np.nan)
+        hasValues = count > 0
+        lower = sortedValues[(starts + (count - 1) // 2)[hasValues]]
+        upper = sortedValues[(starts + count // 2)[hasValues]]
+        median[hasValues] = (lower + upper) / 2.0
+
+        return {"mean": mean, "median": median, "std": np.sqrt(variance), "count": count}
+
+    # ##################################Label rasters#################################
+
+    def getLabels(self, source):
+        """Returns the label raster of the parcels in the grid of the opened product."""
+
+        key = self.__getGridKey(source)
+        if key in self.__labels:
+            return self.__labels[key]
+
+        cacheFile = os.path.join(self.cacheFolder, key + ".npy") if self.cacheFolder is not None else None
+        if cacheFile is not None and os.path.exists(cacheFile):
+            labels = np.load(cacheFile, mmap_mode="r")
+        else:
+            parcels = self.__getParcels(source.crs)
+            shapes = [(parcel, label) for label, parcel in enumerate(parcels.geometry, start=1)
+                      if parcel is not None and not parcel.is_empty]
+            labels = rasterize(shapes, out_shape=(source.height, source.width), transform=source.transform, fill=0,
+                               dtype="int32") if len(shapes) > 0 else \
+                np.zeros((source.height, source.width), dtype=np.int32)
+
+            if cacheFile is not None:
+                os.makedirs(self.cacheFolder, exist_ok=True)
+                np.save(cacheFile + ".tmp.npy", labels)
+                os.replace(cacheFile + ".tmp.npy", cacheFile)
+
+        self.__labels[key] = labels
+        return labels
+
+    def __getGridKey(self, source):
+        signature = "|".join([os.path.abspath(self.parcelFile), str(os.path.getmtime(self.parcelFile)),
+                              source.crs.to_wkt() if source.crs is not None else "", str(tuple(source.transform)),
+                              str(source.width), str(source.height)])
+        return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+    def __getParcels(self, crs):
+        if self.__parcels is None:
+            self.__parcels = gpd.read_file(self.parcelFile)
+
+        key = crs.to_wkt() if crs is not None else ""
+        if key not in self.__parcelsByCrs:
+            parcels = self.__parcels
+            if crs is not None and parcels.crs is not None:
+                parcels = parcels.to_crs(crs.to_wkt())
+            self.__parcelsByCrs[key] = parcels
+        return self.__parcelsByCrs[key]
+
+    def __getParcelIds(self):
+        if self.__parcels is None:
+            self.__parcels = gpd.read_file(self.parcelFile)
+        if self.parcelIdField in self.__parcels.columns:
+            return self.__parcels[self.parcelIdField].to_numpy()
+        return np.arange(len(self.__parcels))
+
+    @staticmethod
+    def __log(logObject, message, error=False):
+        if logObject is not None:
+            logObject.appendOutputToLog(message, error)
+        else:
+            print(message)
@@ -9,8 +9,9 @@
 #
 # ----This is the main script for sentinel Sar data processing------------------------------------------------------------------- #
 # ----This script can be executed in Terminal via "python3 sentinel_sar_data_processing.py --<option>"--------------------------- #
-# ----Possible option is 'withGui'----------------------------------------------------------------------------------------------- #
+# ----Possible options are 'withGui' and 'parallelWorkers=<amount>'-------------------------------------------------------------- #
 # ----If '--withGui' is set the main function starts a gui to enter the user settings before processing-------------------------- #
+# ----If '--parallelWorkers=<amount>' is set the user settings entry 'parallelWorkers' is overwritten for this execution---------- #
 # ----Otherwise the main function starts processing immediately------------------------------------------------------------------ #
 # ----User Settings 'processingSequence' entry must contain either: 'Coherence', 'Radar Vegetation Index', 'Backscatter', or 'All'#
 #--------------------------------------------------------------------------------------------------------------------------------
@@ -19,37 +20,23 @@
 from controller_modules.create_user_setting_file import CreateUserSetting
 from controller_modules.create_user_settings_gui import CreateUserSettingsGui
 from controller_modules.geo_position import GeoPosition
-from controller_modules.snap_graph_processing import SnapGraphProcessing
 from controller_modules.batch_processing import BatchProcessing
 from controller_modules.create_input_output import CreateInputOutput
+from controller_modules.processing_list_file import ProcessingListFile
 from controller_modules.pyFunc_queries import PyFuncQueries
-from controller_modules.specific_snap_graph_processing import SpecificSnapGraphProcessing
+from controller_modules.code_de_catalogue_client import CodeDeCatalogueClient
+from controller_modules.scene_catalog import SceneCatalog
+from controller_modules.gpt_executor import GptExecutor
+from controller_modules.gpt_resource_scheduler import GptResourceScheduler
+from controller_modules.multi_aoi_planner import MultiAoiPlanner
 
 import os
 import sys
 
-def executeBySettings(userSettings):
-
-    snapGraphProcessing = SnapGraphProcessing()
-    specificSnapGraphProcessing = SpecificSnapGraphProcessing(os.getcwd() + "/snap_graph_files/", userSettings.dataPath)
-
-    # ################Ensure final output format is GeoTiff###############################
-    snapGraphProcessing.setNewOperatorParameter(specificSnapGraphProcessing.simpleSubGraphs + "terrain_correction.xml",
-                                                "Write", "formatName", "GeoTIFF")
-
-#    Ensure terrain projection is set
-    snapGraphProcessing.setNewOperatorParameter(specificSnapGraphProcessing.mainCalcGraphs + "calc_coherence.xml",
-                                                "Terrain-Correction", "mapProjection",
-                                                specificSnapGraphProcessing.terrainProjection)
-    snapGraphProcessing.setNewOperatorParameter(specificSnapGraphProcessing.mainCalcGraphs + "calc_coherence_no_deburst.xml",
-                                                "Terrain-Correction", "mapProjection",
-                                                specificSnapGraphProcessing.terrainProjection)
-    snapGraphProcessing.setNewOperatorParameter(specificSnapGraphProcessing.mainCalcGraphs + "calc_backscatter.xml",
-                                                "Terrain-Correction", "mapProjection",
-                                                specificSnapGraphProcessing.terrainProjection)
-    snapGraphProcessing.setNewOperatorParameter(specificSnapGraphProcessing.simpleSubGraphs + "terrain_correction.xml",
-                                                "Terrain-Correction", "mapProjection",
-                                                specificSnapGraphProcessing.terrainProjection)
+def executeBySettings(userSettings, processingLists=None):
+
+    # #The output format and terrain projection are bound to the graphs of each processing job.
+    # #See SpecificSnapGraphProcessing.setAllProcessingParameters
 
     productTypeSlc = 'SLC'
     productTypeGrd = 'GRD'
@@ -61,6 +48,7 @@ def executeBySettings(userSettings):
         return
 
     wktAoi = GeoPosition().loadWktFromGeojson(userSettings.currentAoi)
+    SceneCatalog.setDefaultLocation(userSettings.dataPath)
 
     filePath = userSettings.dataPath + "in_output_file_list/"
     if not os.path.exists(filePath):
@@ -73,12 +61,21 @@ def executeBySettings(userSettings):
 
     sliceMode = True if userSettings.processingMode == "AOI Processing" else False
 
-    if userSettings.processingList is None:
-
-        tilesSlc = PyFuncQueries().buildSentinel1QueryTileList(userSettings.currentAoi, userSettings.calculationStartDate,
-                                                               userSettings.calculationEndDate, productTypeSlc)
-        tilesGrd = PyFuncQueries().buildSentinel1QueryTileList(userSettings.currentAoi, userSettings.calculationStartDate,
-                                                               userSettings.calculationEndDate, productTypeGrd)
+    if processingLists is not None:
+        # #Lists created for all aois of the aoi folder by the MultiAoiPlanner
+        vegIdProcessingList = processingLists["polarimetry"]
+        cohProcessingList12Days = processingLists["coherence_12d"]
+        cohProcessingList6Days = processingLists["coherence_6d"]
+        backscatterProcessingList = processingLists["backscatter"]
+
+    elif userSettings.processingList is None:
+
+        # #Catalogue responses are cached in the data path and reused by following runs
+        pyFuncQueries = PyFuncQueries(CodeDeCatalogueClient(userSettings.dataPath + "query_cache/"))
+        tilesSlc = pyFuncQueries.buildSentinel1QueryTileList(userSettings.currentAoi, userSettings.calculationStartDate,
+                                                             userSettings.calculationEndDate, productTypeSlc)
+        tilesGrd = pyFuncQueries.buildSentinel1QueryTileList(userSettings.currentAoi, userSettings.calculationStartDate,
+                                                             userSettings.calculationEndDate, productTypeGrd)
         inOutputListSlc = CreateInputOutput().generateFileList(tilesSlc, productTypeSlc, userSettings.calculationStartDate,
                                                                userSettings.calculationEndDate, filePath,
                                                                userSettings.areaName, sliceMode)
@@ -86,22 +83,28 @@ def executeBySettings(userSettings):
                                                                userSettings.calculationEndDate, filePath,
                                                                userSettings.areaName, sliceMode)
 
-        vegIdProcessingList = inOutputListSlc[0] if len(inOutputListSlc) >= 1 else []
-        cohProcessingList12Days = inOutputListSlc[1] if len(inOutputListSlc) >= 2 else []
-        cohProcessingList6Days = inOutputListSlc[2] if len(inOutputListSlc) == 3 else []
-        backscatterProcessingList = inOutputListGrd
+        processingLists = MultiAoiPlanner.getProcessingLists(inOutputListSlc, inOutputListGrd)
+        vegIdProcessingList = processingLists["polarimetry"]
+        cohProcessingList12Days = processingLists["coherence_12d"]
+        cohProcessingList6Days = processingLists["coherence_6d"]
+        backscatterProcessingList = processingLists["backscatter"]
 
     else:
+        # #The entries are read while they are processed, lists still being written are followed until complete
         for root, dirs, files in os.walk(userSettings.processingList):
             for file in files:
-                if file.endswith("backscatter.txt"):
-                    backscatterProcessingList = CreateInputOutput().readFileToList(userSettings.processingList + file)
-                if file.endswith("polarimetry.txt") or file.endswith("veg_index.txt"):
-                    vegIdProcessingList = CreateInputOutput().readFileToList(userSettings.processingList + file)
-                if file.endswith("coherence_6d.txt"):
-                    cohProcessingList6Days = CreateInputOutput().readFileToList(userSettings.processingList + file)
-                if file.endswith("coherence_12d.txt"):
-                    cohProcessingList12Days = CreateInputOutput().readFileToList(userSettings.processingList + file)
+                listType = ProcessingListFile.getListType(file)
+                if listType is None:
+                    continue
+                entries = ProcessingListFile.readEntries(userSettings.processingList + file, follow=True)
+                if listType == "backscatter":
+                    backscatterProcessingList = entries
+                if listType == "polarimetry":
+                    vegIdProcessingList = entries
+                if listType == "coherence_6d":
+                    cohProcessingList6Days = entries
+                if listType == "coherence_12d":
+                    cohProcessingList12Days = entries
 
     if userSettings.processingSequence == "All":
         BatchProcessing(userSettings).calculateBackscatter(backscatterProcessingList,  wktAoi, userSettings)
@@ -118,30 +121,96 @@ def executeBySettings(userSettings):
         BatchProcessing(userSettings).calculateCoh(cohProcessingList6Days, cohProcessingList12Days,  wktAoi, userSettings)
 
 
+def planMultiAoiLists(userSettings, aois):
+    # #One catalogue query for all aois, the lists of the aois are generated in parallel from the shared scene index
+    if userSettings.processingList is not None or userSettings.calculationStartDate == "" or \
+            userSettings.calculationEndDate == "" or userSettings.calculationStartDate is None or \
+            userSettings.calculationEndDate is None:
+        return {}
+
+    SceneCatalog.setDefaultLocation(userSettings.dataPath)
+    filePath = userSettings.dataPath + "in_output_file_list/"
+    if not os.path.exists(filePath):
+        os.makedirs(filePath)
+
+    sliceMode = True if userSettings.processingMode == "AOI Processing" else False
+    pyFuncQueries = PyFuncQueries(CodeDeCatalogueClient(userSettings.dataPath + "query_cache/"))
+    planner = MultiAoiPlanner(aois, pyFuncQueries, userSettings.parallelWorkers, userSettings.dataPath)
+    return planner.planProcessingLists(userSettings.calculationStartDate, userSettings.calculationEndDate, filePath,
+                                       sliceMode)
+
+
 def multiAoiExecution(userSettings):
     path = userSettings.aoiLocation
+    aois = {}
     for root, dirs, files in os.walk(path):
         for file in files:
             if file.endswith(".geojson"):
-                userSettings.currentAoi = path + file
-                name = file.removesuffix('.geojson')
-                userSettings.areaName = name
-                userSettings.setAttribute("areaName", name)
-                executeBySettings(userSettings)
+                aois[file.removesuffix('.geojson')] = path + file
+
+    processingLists = planMultiAoiLists(userSettings, aois)
+    if str(userSettings.sharedAoiProcessing).strip().lower() == "true" and len(processingLists) > 1:
+        executeSharedByAois(userSettings, aois, processingLists)
+        return
+
+    for name, aoi in aois.items():
+        userSettings.currentAoi = aoi
+        userSettings.areaName = name
+        userSettings.setAttribute("areaName", name)
+        executeBySettings(userSettings, processingLists.get(name))
+
+def executeSharedByAois(userSettings, aois, processingLists):
+    # #Backscatter and vegetation index entries shared by close aois are processed once, see
+    # #BatchProcessing.calculateForAois. The coherence pairs are processed per aoi, their split products are shared by
+    # #the pairs of all aois covering the same bursts, see BatchProcessing.calculateCohForAois.
+    wktAois = {name: GeoPosition().loadWktFromGeojson(aoi) for name, aoi in aois.items() if name in processingLists}
+    sequence = userSettings.processingSequence
+
+    if sequence in ["All", "Backscatter"]:
+        BatchProcessing(userSettings).calculateForAois(
+            "backscatter", {name: lists["backscatter"] for name, lists in processingLists.items()}, wktAois,
+            userSettings)
+    if sequence in ["All", "Radar Vegetation Index"]:
+        BatchProcessing(userSettings).calculateForAois(
+            "veg_index", {name: lists["polarimetry"] for name, lists in processingLists.items()}, wktAois,
+            userSettings)
+    if sequence in ["Backscatter", "Radar Vegetation Index"]:
+        return
+
+    BatchProcessing(userSettings).calculateCohForAois(
+        {name: lists["coherence_6d"] for name, lists in processingLists.items()},
+        {name: lists["coherence_12d"] for name, lists in processingLists.items()}, wktAois, userSettings)
 
 def executeByLocationSettings(userSettings):
-    if os.path.exists(userSettings.aoiLocation) and os.path.isdir(userSettings.aoiLocation):
-        multiAoiExecution(userSettings)
-    else:
-        userSettings.currentAoi = userSettings.aoiLocation
-        executeBySettings(userSettings)
+    # #All snap graphs of this run are executed by the gpt executor set in the user settings
+    resourceScheduler = GptResourceScheduler.fromSetting(userSettings.gptAdmission, userSettings.dataPath,
+                                                         userSettings.scratchPath, userSettings.memoryBudget,
+                                                         userSettings.gptMemory, userSettings.parallelWorkers)
+    GptExecutor.setDefault(GptExecutor.create(userSettings.gptExecutor, userSettings.gptWorkers, resourceScheduler))
+    try:
+        if os.path.exists(userSettings.aoiLocation) and os.path.isdir(userSettings.aoiLocation):
+            multiAoiExecution(userSettings)
+        else:
+            userSettings.currentAoi = userSettings.aoiLocation
+            executeBySettings(userSettings)
+    finally:
+        GptExecutor.default().close()
 
 def main():
     args = sys.argv[1:]
     userSettings = CreateUserSetting()
 
-    if len(args) == 1 and args[0] == "--withGui":
-        CreateUserSettingsGui(executeByLocationSettings).runGui()
+    parallelWorkers = None
+    for arg in args:
+        if arg.startswith("--parallelWorkers="):
+            parallelWorkers = arg.split("=")[1]
+            userSettings.parallelWorkers = parallelWorkers
+
+    if "--withGui" in args:
+        gui = CreateUserSettingsGui(executeByLocationSettings)
+        if parallelWorkers is not None:
+            gui.userSettings.parallelWorkers = parallelWorkers
+        gui.runGui()
     else:
         executeByLocationSettings(userSettings)
         print("Ensure all Settings are set in 'user_settings.xml' file")